@@ -25,6 +25,23 @@ from submodules.model.models import Base
 
 target_metadata = [Base.metadata]
 
+# tables that are only accessed with plain sql and have no model, autogenerate
+# would drop them otherwise
+UNMODELED_TABLES = {
+    "job",
+    "payload_fingerprint",
+    "payload_record_version",
+    "payload_snapshot",
+    "record_key_hash",
+    "record_key_hash_project",
+    "record_tokenized_version",
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == "table" and reflected and name in UNMODELED_TABLES)
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -47,6 +64,7 @@ def run_migrations_offline():
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -69,7 +87,11 @@ def run_migrations_online():
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,50 @@
+"""Adds payload fingerprint table
+
+Revision ID: 4a9b07e3d5c1
+Revises: c2f6d1a8e4b7
+Create Date: 2026-10-18 11:47:05.902611
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "4a9b07e3d5c1"
+down_revision = "c2f6d1a8e4b7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "payload_fingerprint",
+        sa.Column("payload_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("source_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("fingerprint", sa.String(), nullable=False),
+        sa.Column("result_count", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["payload_id"], ["information_source_payload.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["source_id"], ["information_source.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("payload_id"),
+    )
+    op.create_index(
+        op.f("ix_payload_fingerprint_source_id"),
+        "payload_fingerprint",
+        ["source_id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_payload_fingerprint_source_id"), table_name="payload_fingerprint"
+    )
+    op.drop_table("payload_fingerprint")
@@ -0,0 +1,74 @@
+"""Adds record key hash tables
+
+Revision ID: 7d3e9c41b2f8
+Revises: e81c5f2b9a06
+Create Date: 2026-10-18 16:05:12.640193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "7d3e9c41b2f8"
+down_revision = "e81c5f2b9a06"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "record_key_hash_project",
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("key_names", sa.ARRAY(sa.String()), nullable=False),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("project_id"),
+    )
+    op.create_table(
+        "record_key_hash",
+        sa.Column("record_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("key_hash", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["record_id"], ["record.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("record_id"),
+    )
+    op.create_index(
+        op.f("ix_record_key_hash_project_id_key_hash"),
+        "record_key_hash",
+        ["project_id", "key_hash"],
+        unique=False,
+    )
+    # a hash is dropped as soon as the data of its record changes, no matter which
+    # path wrote it. Records without hash are hashed with the next upload check.
+    op.execute(
+        """
+        CREATE FUNCTION record_key_hash_invalidate() RETURNS TRIGGER AS $$
+        BEGIN
+            DELETE FROM record_key_hash WHERE record_id = NEW.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER record_key_hash_invalidate
+        AFTER UPDATE OF data ON record
+        FOR EACH ROW
+        WHEN (OLD.data::TEXT IS DISTINCT FROM NEW.data::TEXT)
+        EXECUTE PROCEDURE record_key_hash_invalidate();
+        """
+    )
+
+
+def downgrade():
+    op.execute(
+        """
+        DROP TRIGGER record_key_hash_invalidate ON record;
+        DROP FUNCTION record_key_hash_invalidate();
+        """
+    )
+    op.drop_index(
+        op.f("ix_record_key_hash_project_id_key_hash"), table_name="record_key_hash"
+    )
+    op.drop_table("record_key_hash")
+    op.drop_table("record_key_hash_project")
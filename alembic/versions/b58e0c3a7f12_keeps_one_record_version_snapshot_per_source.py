@@ -0,0 +1,80 @@
+"""Keeps one record version snapshot per source
+
+Revision ID: b58e0c3a7f12
+Revises: 7d3e9c41b2f8
+Create Date: 2026-10-18 18:42:07.913524
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "b58e0c3a7f12"
+down_revision = "7d3e9c41b2f8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # snapshots are only an optimization, the next run of every source is a full one
+    op.execute("DELETE FROM payload_record_version")
+    op.drop_index(
+        op.f("ix_payload_record_version_source_id"),
+        table_name="payload_record_version",
+    )
+    op.drop_constraint(
+        "payload_record_version_pkey", "payload_record_version", type_="primary"
+    )
+    op.drop_column("payload_record_version", "payload_id")
+    op.alter_column("payload_record_version", "source_id", nullable=False)
+    op.create_primary_key(
+        "payload_record_version_pkey",
+        "payload_record_version",
+        ["source_id", "record_id"],
+    )
+    op.create_table(
+        "payload_snapshot",
+        sa.Column("source_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("payload_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["source_id"], ["information_source.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["payload_id"], ["information_source_payload.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("source_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("payload_snapshot")
+    op.execute("DELETE FROM payload_record_version")
+    op.drop_constraint(
+        "payload_record_version_pkey", "payload_record_version", type_="primary"
+    )
+    op.add_column(
+        "payload_record_version",
+        sa.Column("payload_id", postgresql.UUID(as_uuid=True), nullable=False),
+    )
+    op.create_foreign_key(
+        "payload_record_version_payload_id_fkey",
+        "payload_record_version",
+        "information_source_payload",
+        ["payload_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.alter_column("payload_record_version", "source_id", nullable=True)
+    op.create_primary_key(
+        "payload_record_version_pkey",
+        "payload_record_version",
+        ["payload_id", "record_id"],
+    )
+    op.create_index(
+        op.f("ix_payload_record_version_source_id"),
+        "payload_record_version",
+        ["source_id"],
+        unique=False,
+    )
@@ -0,0 +1,48 @@
+"""Adds job table
+
+Revision ID: c2f6d1a8e4b7
+Revises: 87f463aa5112
+Create Date: 2026-10-18 09:12:41.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "c2f6d1a8e4b7"
+down_revision = "87f463aa5112"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "job",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("arguments", sa.JSON(), nullable=True),
+        sa.Column("state", sa.String(), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("worker", sa.String(), nullable=True),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_job_kind_state"), "job", ["kind", "state"], unique=False)
+    op.create_index(op.f("ix_job_project_id"), "job", ["project_id"], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f("ix_job_project_id"), table_name="job")
+    op.drop_index(op.f("ix_job_kind_state"), table_name="job")
+    op.drop_table("job")
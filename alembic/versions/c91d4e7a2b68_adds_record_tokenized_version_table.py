@@ -0,0 +1,75 @@
+"""Adds record tokenized version table
+
+Revision ID: c91d4e7a2b68
+Revises: b58e0c3a7f12
+Create Date: 2026-10-18 19:57:33.208417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "c91d4e7a2b68"
+down_revision = "b58e0c3a7f12"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "record_tokenized_version",
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("project_id"),
+    )
+    # every statement that changes the docbins of a project counts its version up,
+    # so the docbins can be compared without reading all of them. Rows of projects
+    # that are deleted in the same statement are skipped.
+    op.execute(
+        """
+        CREATE FUNCTION record_tokenized_count_version() RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO record_tokenized_version (project_id, version)
+            SELECT DISTINCT c.project_id, 1
+            FROM changed_rows c
+            INNER JOIN project p ON p.id = c.project_id
+            ON CONFLICT (project_id)
+            DO UPDATE SET version = record_tokenized_version.version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER record_tokenized_version_insert
+        AFTER INSERT ON record_tokenized
+        REFERENCING NEW TABLE AS changed_rows
+        FOR EACH STATEMENT
+        EXECUTE PROCEDURE record_tokenized_count_version();
+
+        CREATE TRIGGER record_tokenized_version_update
+        AFTER UPDATE ON record_tokenized
+        REFERENCING NEW TABLE AS changed_rows
+        FOR EACH STATEMENT
+        EXECUTE PROCEDURE record_tokenized_count_version();
+
+        CREATE TRIGGER record_tokenized_version_delete
+        AFTER DELETE ON record_tokenized
+        REFERENCING OLD TABLE AS changed_rows
+        FOR EACH STATEMENT
+        EXECUTE PROCEDURE record_tokenized_count_version();
+        """
+    )
+
+
+def downgrade():
+    op.execute(
+        """
+        DROP TRIGGER record_tokenized_version_delete ON record_tokenized;
+        DROP TRIGGER record_tokenized_version_update ON record_tokenized;
+        DROP TRIGGER record_tokenized_version_insert ON record_tokenized;
+        DROP FUNCTION record_tokenized_count_version();
+        """
+    )
+    op.drop_table("record_tokenized_version")
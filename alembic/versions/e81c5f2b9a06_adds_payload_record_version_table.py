@@ -0,0 +1,56 @@
+"""Adds payload record version table
+
+Revision ID: e81c5f2b9a06
+Revises: 4a9b07e3d5c1
+Create Date: 2026-10-18 14:26:51.437180
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "e81c5f2b9a06"
+down_revision = "4a9b07e3d5c1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "payload_fingerprint",
+        sa.Column("base_fingerprint", sa.String(), nullable=True),
+    )
+    op.create_table(
+        "payload_record_version",
+        sa.Column("payload_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("record_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("project_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("source_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("version", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["payload_id"], ["information_source_payload.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["record_id"], ["record.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["project_id"], ["project.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["source_id"], ["information_source.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("payload_id", "record_id"),
+    )
+    op.create_index(
+        op.f("ix_payload_record_version_source_id"),
+        "payload_record_version",
+        ["source_id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_payload_record_version_source_id"),
+        table_name="payload_record_version",
+    )
+    op.drop_table("payload_record_version")
+    op.drop_column("payload_fingerprint", "base_fingerprint")
@@ -1,9 +1,10 @@
 import logging
 import traceback
+from typing import Union
 
 from controller import organization
 from starlette.endpoints import HTTPEndpoint
-from starlette.responses import PlainTextResponse, JSONResponse
+from starlette.responses import PlainTextResponse, JSONResponse, StreamingResponse
 from submodules.s3 import controller as s3
 from submodules.model.business_objects import organization
 
@@ -25,6 +26,11 @@ from controller.tokenization import tokenization_service
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+STREAMED_EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
 
 class Notify(HTTPEndpoint):
     async def post(self, request) -> PlainTextResponse:
@@ -73,6 +79,9 @@ class FileExport(HTTPEndpoint):
             return JSONResponse({"error": "Could not find project"}, status_code=404)
         except exceptions.AccessDeniedException:
             return JSONResponse({"error": "Access denied"}, status_code=403)
+        file_format = request.query_params.get("format")
+        if file_format in STREAMED_EXPORT_MEDIA_TYPES:
+            return stream_file_export(request, project_id, num_samples, file_format)
         result = transfer_manager.export_records(project_id, num_samples)
         return JSONResponse(result)
 
@@ -226,3 +235,20 @@ def file_import_error_handling(
     notification.send_organization_update(
         project_id, f"file_upload:{str(task.id)}:state:{task.state}", is_global_update
     )
+
+
+def stream_file_export(
+    request, project_id: str, num_samples: str, file_format: str
+) -> Union[StreamingResponse, JSONResponse]:
+    compress = request.query_params.get("compression") == "gzip"
+    chunks = transfer_manager.stream_records(
+        project_id, num_samples, file_format=file_format, compress=compress
+    )
+    if chunks is None:
+        return JSONResponse({"error": "Project has no attributes"}, status_code=404)
+    headers = {"Content-Encoding": "gzip"} if compress else None
+    return StreamingResponse(
+        chunks,
+        media_type=STREAMED_EXPORT_MEDIA_TYPES[file_format],
+        headers=headers,
+    )
@@ -16,7 +16,9 @@ from starlette.graphql import GraphQLApp
 from starlette.middleware import Middleware
 from starlette.routing import Route
 
+from controller.job_queue import manager as job_manager
 from graphql_api import schema
+from util import container_pool
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -44,4 +46,8 @@ routes = [
 
 middleware = [Middleware(DatabaseSessionHandler)]
 
-app = Starlette(routes=routes, middleware=middleware)
+app = Starlette(
+    routes=routes,
+    middleware=middleware,
+    on_startup=[container_pool.warm_up, job_manager.start_workers],
+)
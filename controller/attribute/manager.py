@@ -4,7 +4,8 @@ from controller.tokenization.tokenization_service import request_tokenize_projec
 from submodules.model.business_objects import attribute, record, tokenization
 from submodules.model.models import Attribute
 from submodules.model.enums import AttributeState, DataTypes
-from util import daemon, notification
+from controller.job_queue import manager as job_manager
+from util import notification
 
 from . import util
 
@@ -133,11 +134,11 @@ def add_running_id(
         project_id, attribute_name, for_retokenization, with_commit=True
     )
     if for_retokenization:
-
-        daemon.run(
-            request_tokenize_project,
+        job_manager.enqueue(
+            "tokenize_project",
             project_id,
-            user_id,
+            {"project_id": project_id, "user_id": str(user_id)},
+            with_commit=True,
         )
 
 
@@ -187,11 +188,15 @@ def calculate_user_attribute_all_records(
     notification.send_organization_update(
         project_id=project_id, message=f"calculate_attribute:started:{attribute_id}"
     )
-    daemon.run(
-        __calculate_user_attribute_all_records,
+    job_manager.enqueue(
+        "calculate_attribute",
         project_id,
-        user_id,
-        attribute_id,
+        {
+            "project_id": project_id,
+            "user_id": str(user_id),
+            "attribute_id": attribute_id,
+        },
+        with_commit=True,
     )
 
 
@@ -289,3 +294,6 @@ def calculate_user_attribute_sample_records(
         attribute_id=attribute_id, project_id=project_id, doc_bin=doc_bin_samples
     )
     return list(calculated_attributes.keys()), list(calculated_attributes.values())
+
+
+job_manager.register("calculate_attribute", __calculate_user_attribute_all_records)
@@ -1,4 +1,3 @@
-import docker
 import json
 import os
 import pytz
@@ -7,10 +6,9 @@ from datetime import datetime
 from submodules.model.business_objects import attribute, record, project, tokenization
 from submodules.model.enums import DataTypes
 from submodules.s3 import controller as s3
+from util import container_pool
 
-client = docker.from_env()
 image = os.getenv("AC_EXEC_ENV_IMAGE")
-exec_env_network = os.getenv("LF_NETWORK")
 
 
 def find_free_name(project_id: str) -> str:
@@ -103,20 +101,7 @@ def run_attribute_calculation_exec_env(
         s3.create_file_upload_link(org_id, project_id + "/" + prefixed_payload),
     ]
 
-    container = client.containers.run(
-        image=image,
-        command=command,
-        remove=True,
-        detach=True,
-        network=exec_env_network,
-    )
-
-    logs = [
-        line.decode("utf-8").strip("\n")
-        for line in container.logs(
-            stream=True, stdout=True, stderr=True, timestamps=True
-        )
-    ]
+    logs = container_pool.execute(image, command)
 
     attribute.update(
         project_id=project_id, attribute_id=attribute_id, logs=logs, with_commit=True
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# seconds an access decision or organization of a user is reused across requests.
+# The cache lives in the process: the invalidate functions only clear the process
+# that made the change, the other gateway replicas keep their decisions until the
+# TTL ends. So a removed user or a user moved to another organization can keep
+# access for up to this long, keep it short.
+ACCESS_CACHE_TTL = int(os.getenv("ACCESS_CACHE_TTL", 30))
+MAX_ENTRIES = 10000
+
+# user id -> (organization id, cached at)
+__organization_ids: Dict[str, Tuple[str, float]] = {}
+# (user id, project id) -> cached at, only granted access is cached
+__project_access: Dict[Tuple[str, str], float] = {}
+__lock = threading.Lock()
+__cache_stats = {"hits": 0, "misses": 0}
+
+
+def get_organization_id(user_id: str) -> Optional[str]:
+    cached = __organization_ids.get(str(user_id))
+    if cached and __is_fresh(cached[1]):
+        __cache_stats["hits"] += 1
+        return cached[0]
+    __cache_stats["misses"] += 1
+    return None
+
+
+def set_organization_id(user_id: str, organization_id: str) -> None:
+    __organization_ids[str(user_id)] = (str(organization_id), time.monotonic())
+
+
+def has_project_access(user_id: str, project_id: str) -> bool:
+    cached_at = __project_access.get((str(user_id), str(project_id)))
+    if cached_at and __is_fresh(cached_at):
+        __cache_stats["hits"] += 1
+        return True
+    __cache_stats["misses"] += 1
+    return False
+
+
+def grant_project_access(user_id: str, project_id: str) -> None:
+    with __lock:
+        if len(__project_access) >= MAX_ENTRIES:
+            # expired decisions are only dropped here
+            for key, cached_at in list(__project_access.items()):
+                if not __is_fresh(cached_at):
+                    __project_access.pop(key, None)
+        __project_access[(str(user_id), str(project_id))] = time.monotonic()
+
+
+def invalidate_user(user_id: str) -> None:
+    # local process only, see ACCESS_CACHE_TTL
+    user_id = str(user_id)
+    with __lock:
+        __organization_ids.pop(user_id, None)
+        for key in [key for key in __project_access if key[0] == user_id]:
+            __project_access.pop(key, None)
+
+
+def invalidate_project(project_id: str) -> None:
+    project_id = str(project_id)
+    with __lock:
+        for key in [key for key in __project_access if key[1] == project_id]:
+            __project_access.pop(key, None)
+
+
+def invalidate_all() -> None:
+    with __lock:
+        __organization_ids.clear()
+        __project_access.clear()
+
+
+def get_cache_info() -> Dict[str, Any]:
+    return {
+        **__cache_stats,
+        "organizations": len(__organization_ids),
+        "project_access": len(__project_access),
+        "ttl": ACCESS_CACHE_TTL,
+    }
+
+
+def __is_fresh(cached_at: float) -> bool:
+    return time.monotonic() - cached_at < ACCESS_CACHE_TTL
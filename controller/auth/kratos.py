@@ -1,34 +1,153 @@
-from typing import Union, Any
+from typing import Any, Dict, List, Optional
 from requests import Response
 import os
 import requests
 import logging
+import threading
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger: logging.Logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 KRATOS_ADMIN_URL = os.getenv("KRATOS_ADMIN_URL")
+# seconds a fetched identity (or the knowledge that an id doesn't exist) is reused
+KRATOS_CACHE_TTL = int(os.getenv("KRATOS_CACHE_TTL", 300))
+# seconds a request to kratos may take, the identities are resolved within requests
+KRATOS_TIMEOUT = float(os.getenv("KRATOS_TIMEOUT", 5))
+
+# user id -> (identity or None if unknown, fetched at)
+__identities: Dict[str, Any] = {}
+__ids_by_mail: Dict[str, str] = {}
+# fetched at of the last full identity list, the mail index is as old as it
+__listed_at = None
+__lock = threading.Lock()
+__cache_stats = {"hits": 0, "misses": 0, "list_fetches": 0, "single_fetches": 0}
 
 
 def get_userid_from_mail(user_mail: str) -> str:
-    for identity in requests.get(f"{KRATOS_ADMIN_URL}/identities").json():
-        if identity["traits"]["email"] == user_mail:
-            return identity["id"]
-    return None
+    user_id = __ids_by_mail.get(user_mail)
+    if user_id and __is_fresh(__listed_at):
+        __count("hits")
+        return user_id
+    # new users only show up with a new list
+    __count("misses")
+    __fetch_all_identities()
+    return __ids_by_mail.get(user_mail)
 
 
 def resolve_user_mail_by_id(user_id: str) -> str:
-    res: Response = requests.get("{}/identities/{}".format(KRATOS_ADMIN_URL, user_id))
-    data: Any = res.json()
-    if res.status_code == 200 and data["traits"]:
-        return data["traits"]["email"]
+    identity = __get_identity(user_id)
+    if identity and identity["traits"]:
+        return identity["traits"]["email"]
     return None
 
 
 def resolve_user_name_by_id(user_id: str) -> str:
-    res: Response = requests.get("{}/identities/{}".format(KRATOS_ADMIN_URL, user_id))
-    data: Any = res.json()
-    if res.status_code == 200 and data["traits"]:
-        return data["traits"]["name"]
+    identity = __get_identity(user_id)
+    if identity and identity["traits"]:
+        return identity["traits"]["name"]
     return None
+
+
+def resolve_users_by_ids(user_ids: List[str]) -> Dict[str, Any]:
+    # traits by user id, more than one unknown id is filled by one list call
+    user_ids = [str(user_id) for user_id in user_ids]
+    missing_ids = [user_id for user_id in user_ids if not __get_cached(user_id)]
+    if len(missing_ids) > 1:
+        __fetch_all_identities()
+    traits_by_id = {}
+    for user_id in user_ids:
+        identity = __get_identity(user_id)
+        if identity:
+            traits_by_id[user_id] = identity["traits"]
+    return traits_by_id
+
+
+def invalidate(user_id: Optional[str] = None) -> None:
+    # drops one identity or everything, e.g. after a user changed the name or mail
+    global __listed_at
+    with __lock:
+        if user_id:
+            __identities.pop(str(user_id), None)
+        else:
+            __identities.clear()
+        __ids_by_mail.clear()
+        __listed_at = None
+
+
+def get_cache_info() -> Dict[str, Any]:
+    with __lock:
+        return {
+            **__cache_stats,
+            "identities": len(__identities),
+            "mails": len(__ids_by_mail),
+            "ttl": KRATOS_CACHE_TTL,
+        }
+
+
+def __get_identity(user_id: str) -> Optional[Dict[str, Any]]:
+    user_id = str(user_id)
+    cached = __get_cached(user_id)
+    if cached:
+        __count("hits")
+        return cached[0]
+    __count("misses")
+    return __fetch_identity(user_id)
+
+
+def __get_cached(user_id: str) -> Optional[Any]:
+    cached = __identities.get(user_id)
+    if cached and __is_fresh(cached[1]):
+        return cached
+    return None
+
+
+def __fetch_identity(user_id: str) -> Optional[Dict[str, Any]]:
+    __count("single_fetches")
+    try:
+        res: Response = requests.get(
+            "{}/identities/{}".format(KRATOS_ADMIN_URL, user_id),
+            timeout=KRATOS_TIMEOUT,
+        )
+    except requests.RequestException:
+        # not cached, the next lookup asks again
+        logger.warning(f"Could not fetch identity {user_id} from kratos")
+        return None
+    identity = res.json() if res.status_code == 200 else None
+    if res.status_code == 200 or res.status_code == 404:
+        with __lock:
+            __identities[user_id] = (identity, time.monotonic())
+    return identity
+
+
+def __fetch_all_identities() -> None:
+    global __listed_at
+    __count("list_fetches")
+    try:
+        res: Response = requests.get(
+            f"{KRATOS_ADMIN_URL}/identities", timeout=KRATOS_TIMEOUT
+        )
+    except requests.RequestException:
+        logger.warning("Could not fetch identities from kratos")
+        return
+    if res.status_code != 200:
+        return
+    fetched_at = time.monotonic()
+    identities = res.json()
+    with __lock:
+        __ids_by_mail.clear()
+        for identity in identities:
+            __identities[identity["id"]] = (identity, fetched_at)
+            if identity["traits"]:
+                __ids_by_mail[identity["traits"]["email"]] = identity["id"]
+        __listed_at = fetched_at
+
+
+def __count(key: str) -> None:
+    with __lock:
+        __cache_stats[key] += 1
+
+
+def __is_fresh(fetched_at: Optional[float]) -> bool:
+    return fetched_at is not None and time.monotonic() - fetched_at < KRATOS_CACHE_TTL
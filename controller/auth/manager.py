@@ -1,6 +1,7 @@
 from typing import Any, Dict, List, Set
 
 from graphene import ResolveInfo
+from controller.auth import access_cache
 from controller.misc import config_service
 from exceptions.exceptions import NotAllowedInDemoError
 import jwt
@@ -22,8 +23,11 @@ def get_organization_id_by_info(info) -> Organization:
 
 
 def get_user_by_info(info) -> User:
-    user_id: str = get_user_id_by_jwt_token(info.context["request"])
-    return user_manager.get_or_create_user(user_id)
+    # resolvers ask for the user several times per request
+    memo = __get_request_memo(info)
+    if "user" not in memo:
+        memo["user"] = user_manager.get_or_create_user(__get_token_user_id(info))
+    return memo["user"]
 
 
 def get_user_by_email(email: str) -> User:
@@ -58,13 +62,20 @@ def get_user_id_by_jwt_token(request) -> str:
 
 
 def check_project_access(info, project_id: str) -> None:
-    organization_id: str = get_organization_id_by_info(info).id
+    user_id = __get_token_user_id(info)
+    if access_cache.has_project_access(user_id, project_id):
+        return
+    organization_id = access_cache.get_organization_id(user_id)
+    if not organization_id:
+        organization_id = str(get_organization_id_by_info(info).id)
+        access_cache.set_organization_id(user_id, organization_id)
     project: Project = project_manager.get_project_with_orga_id(
         organization_id, project_id
     )
     # TODO move graphql error into graphql layer
     if project is None:
         raise GraphQLError("Project not found")
+    access_cache.grant_project_access(user_id, project_id)
 
 
 def check_admin_access(info) -> None:
@@ -75,15 +86,20 @@ def check_admin_access(info) -> None:
 def check_project_access_from_user_id(
     user_id: str, project_id: str, from_api: bool = False
 ) -> bool:
-    organization_id: str = get_organization_by_user_id(user_id).id
-    try:
-        project: Project = project_manager.get_project_with_orga_id(
-            organization_id, project_id
-        )
-    except sqlalchemy.exc.DataError:
-        raise exceptions.EntityNotFoundException("Project not found")
-    if project is None:
-        raise exceptions.EntityNotFoundException("Project not found")
+    if not access_cache.has_project_access(user_id, project_id):
+        organization_id = access_cache.get_organization_id(user_id)
+        if not organization_id:
+            organization_id = str(get_organization_by_user_id(user_id).id)
+            access_cache.set_organization_id(user_id, organization_id)
+        try:
+            project: Project = project_manager.get_project_with_orga_id(
+                organization_id, project_id
+            )
+        except sqlalchemy.exc.DataError:
+            raise exceptions.EntityNotFoundException("Project not found")
+        if project is None:
+            raise exceptions.EntityNotFoundException("Project not found")
+        access_cache.grant_project_access(user_id, project_id)
     if from_api:
         user = user_manager.get_user(user_id)
         if user.role != enums.UserRoles.ENGINEER.value:
@@ -130,3 +146,17 @@ def check_is_demo_without_info() -> None:
 
 def check_is_single_organization() -> bool:
     return len(organization_manager.get_all_organizations()) == 1
+
+
+def __get_token_user_id(info) -> str:
+    memo = __get_request_memo(info)
+    if "user_id" not in memo:
+        memo["user_id"] = str(get_user_id_by_jwt_token(info.context["request"]))
+    return memo["user_id"]
+
+
+def __get_request_memo(info) -> Dict[str, Any]:
+    # lives in the graphql context, so it's dropped with the request
+    if not isinstance(info.context, dict):
+        return {}
+    return info.context.setdefault("auth", {})
@@ -2,7 +2,7 @@ import time
 from typing import Any, Dict, List
 
 from submodules.model import enums
-from util import daemon
+from controller.job_queue import manager as job_manager
 from . import util
 from . import connector
 
@@ -14,24 +14,34 @@ def get_recommended_encoders() -> List[Any]:
 def create_attribute_level_embedding(
     project_id: str, user_id: str, attribute_id: str, embedding_handle: str
 ) -> None:
-    daemon.run(
-        connector.request_creating_attribute_level_embedding,
+    job_manager.enqueue(
+        "embedding",
         project_id,
-        attribute_id,
-        user_id,
-        embedding_handle,
+        {
+            "project_id": project_id,
+            "attribute_id": attribute_id,
+            "user_id": str(user_id),
+            "config_string": embedding_handle,
+            "embedding_type": enums.EmbeddingType.ON_ATTRIBUTE.value,
+        },
+        with_commit=True,
     )
 
 
 def create_token_level_embedding(
     project_id: str, user_id: str, attribute_id: str, embedding_handle: str
 ) -> None:
-    daemon.run(
-        connector.request_creating_token_level_embedding,
+    job_manager.enqueue(
+        "embedding",
         project_id,
-        attribute_id,
-        user_id,
-        embedding_handle,
+        {
+            "project_id": project_id,
+            "attribute_id": attribute_id,
+            "user_id": str(user_id),
+            "config_string": embedding_handle,
+            "embedding_type": enums.EmbeddingType.ON_TOKEN.value,
+        },
+        with_commit=True,
     )
 
 
@@ -41,12 +51,16 @@ def create_embeddings_one_by_one(
     embedding_data: Dict[str, Any],
     attribute_names: Dict[str, str],
 ) -> None:
-    daemon.run(
-        __embed_one_by_one_helper,
+    job_manager.enqueue(
+        "embedding_import",
         project_id,
-        user_id,
-        embedding_data,
-        attribute_names,
+        {
+            "project_id": project_id,
+            "user_id": str(user_id),
+            "embedding_data": embedding_data,
+            "attribute_names": attribute_names,
+        },
+        with_commit=True,
     )
 
 
@@ -58,6 +72,23 @@ def delete_embedding(project_id: str, embedding_id: str) -> None:
     connector.request_deleting_embedding(project_id, embedding_id)
 
 
+def __request_embedding(
+    project_id: str,
+    attribute_id: str,
+    user_id: str,
+    config_string: str,
+    embedding_type: str,
+) -> None:
+    if embedding_type == enums.EmbeddingType.ON_TOKEN.value:
+        connector.request_creating_token_level_embedding(
+            project_id, attribute_id, user_id, config_string
+        )
+    else:
+        connector.request_creating_attribute_level_embedding(
+            project_id, attribute_id, user_id, config_string
+        )
+
+
 def __embed_one_by_one_helper(
     project_id: str,
     user_id: str,
@@ -83,3 +114,9 @@ def __embed_one_by_one_helper(
         time.sleep(10)
         while util.has_encoder_running(project_id):
             time.sleep(10)
+
+
+# the embedding service encodes on its own, a job only lasts until it accepted the
+# request. The import waits for every encoder before it requests the next one.
+job_manager.register("embedding", __request_embedding, workers=2, project_limit=2)
+job_manager.register("embedding_import", __embed_one_by_one_helper)
@@ -0,0 +1,230 @@
+import json
+import uuid
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.sql import text as sql_text
+
+from submodules.model.session import session
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+FINISHED = "FINISHED"
+FAILED = "FAILED"
+
+
+def create(
+    kind: str,
+    project_id: Optional[str],
+    arguments: Dict[str, Any],
+    priority: int,
+    max_attempts: int,
+    with_commit: bool = False,
+) -> str:
+    job_id = str(uuid.uuid4())
+    session.execute(
+        sql_text(
+            """
+            INSERT INTO job (
+                id, kind, project_id, arguments, state, priority, attempts,
+                max_attempts, created_at, run_after
+            )
+            VALUES (
+                :id, :kind, :project_id, CAST(:arguments AS JSON), :state, :priority,
+                0, :max_attempts, NOW(), NOW()
+            )
+            """
+        ),
+        {
+            "id": job_id,
+            "kind": kind,
+            "project_id": str(project_id) if project_id else None,
+            # ids are passed on as strings, e.g. uuids of freshly created rows
+            "arguments": json.dumps(arguments, default=str),
+            "state": QUEUED,
+            "priority": priority,
+            "max_attempts": max_attempts,
+        },
+    )
+    if with_commit:
+        session.commit()
+    return job_id
+
+
+def claim(
+    kind: str, worker: str, project_limit: int, with_commit: bool = False
+) -> Optional[Any]:
+    # claims of one kind are serialized for the transaction, otherwise two workers
+    # could both see a free slot of the same project. Skip locked lets the claim
+    # pass rows that are held by a heartbeat or by a claim of another kind.
+    session.execute(
+        sql_text("SELECT pg_advisory_xact_lock(HASHTEXT(:lock))"),
+        {"lock": f"job:{kind}"},
+    )
+    row = session.execute(
+        sql_text(
+            """
+            UPDATE job
+            SET state = :running, attempts = attempts + 1, worker = :worker,
+                started_at = NOW(), heartbeat_at = NOW()
+            WHERE id = (
+                SELECT j.id
+                FROM job j
+                WHERE j.kind = :kind AND j.state = :queued AND j.run_after <= NOW()
+                    AND (
+                        j.project_id IS NULL
+                        OR (
+                            SELECT COUNT(*)
+                            FROM job r
+                            WHERE r.kind = j.kind AND r.project_id = j.project_id
+                                AND r.state = :running
+                        ) < :project_limit
+                    )
+                ORDER BY j.priority DESC, j.created_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id::TEXT, project_id::TEXT, arguments, attempts, max_attempts
+            """
+        ),
+        {
+            "kind": kind,
+            "worker": worker,
+            "queued": QUEUED,
+            "running": RUNNING,
+            "project_limit": project_limit,
+        },
+    ).first()
+    if with_commit:
+        session.commit()
+    return row
+
+
+def finish(
+    job_id: str, state: str, error: Optional[str] = None, with_commit: bool = False
+) -> None:
+    session.execute(
+        sql_text(
+            """
+            UPDATE job
+            SET state = :state, error = :error, finished_at = NOW()
+            WHERE id = :id
+            """
+        ),
+        {"id": job_id, "state": state, "error": error},
+    )
+    if with_commit:
+        session.commit()
+
+
+def requeue(
+    job_id: str, error: str, delay_seconds: int, with_commit: bool = False
+) -> None:
+    session.execute(
+        sql_text(
+            """
+            UPDATE job
+            SET state = :queued, error = :error, worker = NULL, started_at = NULL,
+                run_after = NOW() + MAKE_INTERVAL(secs => :delay)
+            WHERE id = :id
+            """
+        ),
+        {"id": job_id, "queued": QUEUED, "error": error, "delay": delay_seconds},
+    )
+    if with_commit:
+        session.commit()
+
+
+def touch(job_ids: List[str], with_commit: bool = False) -> None:
+    if not job_ids:
+        return
+    session.execute(
+        sql_text("UPDATE job SET heartbeat_at = NOW() WHERE id::TEXT = ANY(:ids)"),
+        {"ids": job_ids},
+    )
+    if with_commit:
+        session.commit()
+
+
+def release_stale(stale_after_seconds: int, with_commit: bool = False) -> int:
+    # running jobs without heartbeat belong to a worker that is gone, they are
+    # queued again if attempts are left
+    result = session.execute(
+        sql_text(
+            """
+            UPDATE job
+            SET state = CASE WHEN attempts < max_attempts THEN :queued ELSE :failed END,
+                error = 'worker stopped while the job was running',
+                worker = NULL,
+                started_at = CASE WHEN attempts < max_attempts THEN NULL ELSE started_at END,
+                finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE NOW() END
+            WHERE state = :running
+                AND heartbeat_at < NOW() - MAKE_INTERVAL(secs => :stale_after)
+            """
+        ),
+        {
+            "queued": QUEUED,
+            "failed": FAILED,
+            "running": RUNNING,
+            "stale_after": stale_after_seconds,
+        },
+    )
+    if with_commit:
+        session.commit()
+    return result.rowcount
+
+
+def delete_finished(older_than_days: int, with_commit: bool = False) -> None:
+    session.execute(
+        sql_text(
+            """
+            DELETE FROM job
+            WHERE state IN (:finished, :failed)
+                AND finished_at < NOW() - MAKE_INTERVAL(days => :days)
+            """
+        ),
+        {"finished": FINISHED, "failed": FAILED, "days": older_than_days},
+    )
+    if with_commit:
+        session.commit()
+
+
+def get_states(job_ids: List[str]) -> Dict[str, str]:
+    return {
+        row.id: row.state
+        for row in session.execute(
+            sql_text(
+                "SELECT id::TEXT, state FROM job WHERE id = ANY(CAST(:job_ids AS UUID[]))"
+            ),
+            {"job_ids": job_ids},
+        )
+    }
+
+
+def get_all(
+    project_id: Optional[str] = None,
+    states: Optional[List[str]] = None,
+    limit: int = 500,
+) -> List[Any]:
+    return session.execute(
+        sql_text(
+            """
+            SELECT
+                id::TEXT, kind, project_id::TEXT, state, priority, attempts,
+                max_attempts, error, created_at, started_at, finished_at,
+                EXTRACT(EPOCH FROM COALESCE(started_at, NOW()) - created_at)
+                    AS wait_seconds,
+                EXTRACT(EPOCH FROM COALESCE(finished_at, NOW()) - started_at)
+                    AS run_seconds
+            FROM job
+            WHERE (CAST(:project_id AS UUID) IS NULL OR project_id = CAST(:project_id AS UUID))
+                AND (CAST(:states AS VARCHAR[]) IS NULL OR state = ANY(CAST(:states AS VARCHAR[])))
+            ORDER BY state DESC, priority DESC, created_at
+            LIMIT :limit
+            """
+        ),
+        {
+            "project_id": str(project_id) if project_id else None,
+            "states": states or None,
+            "limit": limit,
+        },
+    ).all()
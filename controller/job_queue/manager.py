@@ -0,0 +1,209 @@
+import os
+import socket
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+from controller.job_queue import job
+from submodules.model.business_objects import general
+from util import daemon
+
+# seconds an idle worker waits before it looks for queued jobs again
+JOB_POLL_INTERVAL = int(os.getenv("JOB_POLL_INTERVAL", 2))
+# first retry delay in seconds, doubled with every further attempt
+JOB_RETRY_DELAY = int(os.getenv("JOB_RETRY_DELAY", 30))
+JOB_HEARTBEAT_INTERVAL = int(os.getenv("JOB_HEARTBEAT_INTERVAL", 30))
+# running jobs without heartbeat for this long are given back to the queue
+JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", 300))
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", 7))
+
+# kind -> handler and pool settings
+__kinds: Dict[str, Dict[str, Any]] = {}
+# kind -> set when this process queued a job of the kind, wakes the idle workers
+__wake_ups: Dict[str, threading.Event] = {}
+# job id -> kind of the jobs the workers of this process are running
+__running: Dict[str, str] = {}
+__worker_name = f"{socket.gethostname()}:{os.getpid()}"
+__lock = threading.Lock()
+__started = False
+# counted by the workers of this process, listed for admins as jobPools
+__stats = {"claimed": 0, "finished": 0, "failed": 0, "retried": 0, "released": 0}
+
+
+def register(
+    kind: str,
+    handler: Callable[..., None],
+    workers: int = 1,
+    project_limit: int = 1,
+    max_attempts: int = 1,
+) -> None:
+    # workers is the pool size per process and can be overwritten with e.g.
+    # JOB_WORKERS_PAYLOAD. project_limit bounds the running jobs of one project
+    # across all processes, retries only make sense for idempotent handlers.
+    __kinds[kind] = {
+        "handler": handler,
+        "workers": int(os.getenv(f"JOB_WORKERS_{kind.upper()}", workers)),
+        "project_limit": project_limit,
+        "max_attempts": max_attempts,
+    }
+    __wake_ups[kind] = threading.Event()
+    if __started:
+        __start_pool(kind)
+
+
+def enqueue(
+    kind: str,
+    project_id: Optional[str],
+    arguments: Dict[str, Any],
+    priority: int = 0,
+    with_commit: bool = False,
+) -> str:
+    # arguments are stored as json and passed to the handler as keywords, so a
+    # queued job survives a restart. Higher priorities are claimed first.
+    # Workers only see the job once the caller's transaction is committed, a
+    # worker woken up before that finds it on its next poll.
+    job_id = job.create(
+        kind,
+        project_id,
+        arguments,
+        priority,
+        __kinds[kind]["max_attempts"],
+        with_commit=with_commit,
+    )
+    __wake_ups[kind].set()
+    return job_id
+
+
+def wait_for(job_ids: List[str]) -> None:
+    # e.g. for a job that fans out to jobs of another kind. Every poll ends the
+    # transaction, so no transaction stays open while waiting.
+    while True:
+        states = job.get_states(job_ids)
+        general.commit()
+        if not any(state in (job.QUEUED, job.RUNNING) for state in states.values()):
+            return
+        time.sleep(JOB_POLL_INTERVAL)
+
+
+def start_workers() -> None:
+    global __started
+    with __lock:
+        if __started:
+            return
+        __started = True
+    for kind in __kinds:
+        __start_pool(kind)
+    daemon.run(__maintain)
+
+
+def get_jobs(
+    project_id: Optional[str] = None, states: Optional[List[str]] = None
+) -> List[Any]:
+    return job.get_all(project_id, states or [job.QUEUED, job.RUNNING])
+
+
+def get_pool_info() -> Dict[str, Any]:
+    running = list(__running.values())
+    return {
+        **__stats,
+        "worker": __worker_name,
+        "pools": {
+            kind: {"workers": settings["workers"], "running": running.count(kind)}
+            for kind, settings in __kinds.items()
+        },
+    }
+
+
+def __start_pool(kind: str) -> None:
+    for _ in range(__kinds[kind]["workers"]):
+        daemon.run(__work, kind)
+
+
+def __work(kind: str) -> None:
+    settings = __kinds[kind]
+    wake_up = __wake_ups[kind]
+    while True:
+        claimed = __claim(kind, settings["project_limit"])
+        if not claimed:
+            wake_up.wait(timeout=JOB_POLL_INTERVAL)
+            wake_up.clear()
+            continue
+        __run(settings["handler"], kind, claimed)
+
+
+def __claim(kind: str, project_limit: int) -> Optional[Any]:
+    ctx_token = general.get_ctx_token()
+    try:
+        return job.claim(kind, __worker_name, project_limit, with_commit=True)
+    except Exception:
+        general.rollback()
+        print(traceback.format_exc(), flush=True)
+        # e.g. database not reachable, the wait keeps the worker from spinning
+        time.sleep(JOB_POLL_INTERVAL)
+        return None
+    finally:
+        general.reset_ctx_token(ctx_token, True)
+
+
+def __run(handler: Callable[..., None], kind: str, claimed: Any) -> None:
+    with __lock:
+        __running[claimed.id] = kind
+    __stats["claimed"] += 1
+    error = None
+    # every job gets a fresh session, the worker thread outlives it
+    ctx_token = general.get_ctx_token()
+    try:
+        handler(**claimed.arguments)
+    except Exception:
+        general.rollback()
+        error = traceback.format_exc()
+        print(error, flush=True)
+    finally:
+        general.reset_ctx_token(ctx_token, True)
+        with __lock:
+            __running.pop(claimed.id, None)
+    __complete(claimed, error)
+
+
+def __complete(claimed: Any, error: Optional[str]) -> None:
+    ctx_token = general.get_ctx_token()
+    try:
+        if not error:
+            job.finish(claimed.id, job.FINISHED, with_commit=True)
+            __stats["finished"] += 1
+        elif claimed.attempts < claimed.max_attempts:
+            delay = JOB_RETRY_DELAY * 2 ** (claimed.attempts - 1)
+            job.requeue(claimed.id, error, delay, with_commit=True)
+            __stats["retried"] += 1
+        else:
+            job.finish(claimed.id, job.FAILED, error, with_commit=True)
+            __stats["failed"] += 1
+    except Exception:
+        general.rollback()
+        print(traceback.format_exc(), flush=True)
+    finally:
+        general.reset_ctx_token(ctx_token, True)
+
+
+def __maintain() -> None:
+    # single thread for the process: heartbeat of the own running jobs, release
+    # of jobs whose worker is gone (e.g. restart) and cleanup of old jobs
+    while True:
+        with __lock:
+            running_ids = list(__running)
+        ctx_token = general.get_ctx_token()
+        try:
+            job.touch(running_ids, with_commit=True)
+            released = job.release_stale(JOB_STALE_AFTER, with_commit=True)
+            if released:
+                __stats["released"] += released
+                for wake_up in __wake_ups.values():
+                    wake_up.set()
+            job.delete_finished(JOB_RETENTION_DAYS, with_commit=True)
+        except Exception:
+            general.rollback()
+            print(traceback.format_exc(), flush=True)
+        finally:
+            general.reset_ctx_token(ctx_token, True)
+        time.sleep(JOB_HEARTBEAT_INTERVAL)
@@ -1,35 +1,62 @@
 from typing import Dict, Any, Optional, Union
+import os
 import requests
 import json
+import threading
 import time
+import traceback
 from util import daemon
 from util import service_requests
 
+# (config, fetched at) swapped as a whole so readers never see a half updated state
 __config = None
+__refresh_lock = threading.Lock()
+__refresh_requested = threading.Event()
+__refresher_started = False
+__cache_stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
 
 # these are ment to be constant values since os variables will sooner or later be removed for adresses (and used with values from config-service)
 REQUEST_URL = "http://refinery-config:80/full_config"
 CHANGE_URL = "http://refinery-config:80/change_config"
+# seconds a fetched config counts as fresh, older values are still served while they are refetched
+CONFIG_TTL = int(os.getenv("CONFIG_TTL", 3600))
+# seconds before a failed background refresh is retried
+CONFIG_RETRY = int(os.getenv("CONFIG_RETRY", 30))
+# seconds a request to the config service may take
+CONFIG_REQUEST_TIMEOUT = float(os.getenv("CONFIG_REQUEST_TIMEOUT", 10))
 
 
 def __get_config() -> Dict[str, Any]:
-    global __config
-    if __config:
-        return __config
-    refresh_config()
-    return __config
+    cached = __config
+    if not cached:
+        # only the very first access (or after a failed first fetch) waits for the service
+        __cache_stats["misses"] += 1
+        return refresh_config()
+    config, fetched_at = cached
+    if time.monotonic() - fetched_at < CONFIG_TTL:
+        __cache_stats["hits"] += 1
+    else:
+        __cache_stats["stale_hits"] += 1
+        __refresh_requested.set()
+    return config
 
 
-def refresh_config():
-    response = requests.get(REQUEST_URL)
+def refresh_config() -> Dict[str, Any]:
+    # the request runs outside of the lock, a hanging config service would block
+    # everyone waiting for it otherwise
+    response = requests.get(REQUEST_URL, timeout=CONFIG_REQUEST_TIMEOUT)
     if response.status_code == 200:
         global __config
-        __config = json.loads(json.loads(response.text))
-        daemon.run(invalidate_after, 3600)  # one hour as failsave
+        config = json.loads(json.loads(response.text))
+        with __refresh_lock:
+            __config = (config, time.monotonic())
+            __cache_stats["refreshes"] += 1
     else:
         raise Exception(
             f"Config service cant be reached -- response.code{response.status_code}"
         )
+    __ensure_refresher()
+    return config
 
 
 def get_config_value(
@@ -49,12 +76,42 @@ def get_config_value(
         raise Exception(f"Subkey {subkey} coudn't be found in config[{key}]")
 
 
-def invalidate_after(sec: int) -> None:
-    time.sleep(sec)
-    global __config
-    __config = None
+def get_cache_info() -> Dict[str, Any]:
+    cached = __config
+    return {
+        **__cache_stats,
+        "age": time.monotonic() - cached[1] if cached else None,
+        "ttl": CONFIG_TTL,
+    }
 
 
 def change_config(dict_str: str) -> None:
     data = {"dict_string": dict_str}
     service_requests.post_call_or_raise(CHANGE_URL, data)
+
+
+def __ensure_refresher() -> None:
+    global __refresher_started
+    with __refresh_lock:
+        if __refresher_started:
+            return
+        __refresher_started = True
+    daemon.run(__refresh_periodically)
+
+
+def __refresh_periodically() -> None:
+    # single thread for the process, refreshes once the ttl is over or a stale read
+    # asked for it. On errors the last config stays in use.
+    wait = CONFIG_TTL
+    while True:
+        __refresh_requested.wait(timeout=wait)
+        __refresh_requested.clear()
+        try:
+            refresh_config()
+            wait = CONFIG_TTL
+        except Exception:
+            __cache_stats["errors"] += 1
+            print(traceback.format_exc(), flush=True)
+            # stale reads keep asking for a refresh, don't hammer the service meanwhile
+            time.sleep(CONFIG_RETRY)
+            wait = 0
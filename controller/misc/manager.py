@@ -5,7 +5,7 @@ from graphql_api.types import ServiceVersionResult
 from datetime import datetime
 import os
 
-from util import service_requests
+from util import container_pool, service_requests
 
 BASE_URI_UPDATER = os.getenv("UPDATER")
 
@@ -48,6 +48,10 @@ def has_updates() -> List[ServiceVersionResult]:
     return has_updates
 
 
+def get_container_pool_metrics() -> Dict[str, Dict[str, Any]]:
+    return container_pool.get_metrics()
+
+
 def __updater_version_overview() -> List[Dict[str, Any]]:
     url = f"{BASE_URI_UPDATER}/version_overview"
     return service_requests.get_call_or_raise(url)
@@ -1,4 +1,5 @@
 from typing import Any, List, Dict, Optional, Union
+from controller.auth import access_cache
 from controller.misc import config_service
 
 from graphql_api.types import UserCountsWrapper
@@ -60,6 +61,7 @@ def create_organization(name: str) -> Organization:
 def delete_organization(name: str) -> None:
     org = organization.get_by_name(name)
     organization.delete(org.id, with_commit=True)
+    access_cache.invalidate_all()
 
 
 def get_overview_stats(org_id: str) -> List[Dict[str, Union[str, int]]]:
@@ -0,0 +1,245 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.sql import text as sql_text
+
+from submodules.model import enums
+from submodules.model.session import session
+
+# labeling functions only run on records that changed since their last run
+USE_INCREMENTAL_PAYLOAD = os.getenv("PAYLOAD_INCREMENTAL", "true") == "true"
+# above this share of changed records the function runs on all records, replacing
+# the results of many single records costs more than replacing all of them
+INCREMENTAL_MAX_SHARE = float(os.getenv("PAYLOAD_INCREMENTAL_MAX_SHARE", 0.5))
+
+# counted per gateway process since its start, listed for admins as
+# incrementalPayloadInfo
+__run_stats = {"incremental": 0, "full": 0, "changed_records": 0}
+
+
+def is_tracked(base_fingerprint: Optional[str]) -> bool:
+    # runs of tracked sources keep a snapshot of the docbin versions they ran on
+    return USE_INCREMENTAL_PAYLOAD and bool(base_fingerprint)
+
+
+def get_changed_records(
+    project_id: str,
+    payload_id: str,
+    information_source_id: str,
+    base_fingerprint: Optional[str],
+) -> Optional[Tuple[List[str], List[str]]]:
+    # compares the current docbin versions with the snapshot of the last run.
+    # Returns the changed and the removed record ids or None if the function needs
+    # to run on all records.
+    if not is_tracked(base_fingerprint):
+        return None
+    if not __builds_on_previous_run(
+        project_id, payload_id, information_source_id, base_fingerprint
+    ):
+        __run_stats["full"] += 1
+        return None
+    parameters = {
+        "project_id": str(project_id),
+        "source_id": str(information_source_id),
+    }
+    changed_record_ids = __get_record_ids(
+        """
+        SELECT rt.record_id::TEXT
+        FROM record_tokenized rt
+        LEFT JOIN payload_record_version v
+            ON v.source_id = :source_id AND v.record_id = rt.record_id
+        WHERE rt.project_id = :project_id
+            AND (v.version IS NULL OR v.version != rt.id)
+        """,
+        parameters,
+    )
+    record_count = session.execute(
+        sql_text(
+            "SELECT COUNT(*) FROM record_tokenized WHERE project_id = :project_id"
+        ),
+        parameters,
+    ).scalar()
+    if len(changed_record_ids) > record_count * INCREMENTAL_MAX_SHARE:
+        __run_stats["full"] += 1
+        return None
+    # e.g. updated records that wait for their tokenization, their old results
+    # are outdated
+    removed_record_ids = __get_record_ids(
+        """
+        SELECT v.record_id::TEXT
+        FROM payload_record_version v
+        WHERE v.source_id = :source_id AND NOT EXISTS (
+            SELECT 1 FROM record_tokenized rt WHERE rt.record_id = v.record_id
+        )
+        """,
+        parameters,
+    )
+    __run_stats["incremental"] += 1
+    __run_stats["changed_records"] += len(changed_record_ids)
+    return changed_record_ids, removed_record_ids
+
+
+def take_snapshot(
+    project_id: str,
+    information_source_id: str,
+    record_ids: Optional[List[str]] = None,
+    removed_record_ids: Optional[List[str]] = None,
+) -> None:
+    # has to run before the docbin of the run is built. A record retokenized in
+    # between then has an older version in the snapshot than the one processed
+    # and is run again next time, the other way round its results would be
+    # outdated for good. Only rows whose version changed are written. Without
+    # record ids the snapshot is taken of all records.
+    parameters = {
+        "project_id": str(project_id),
+        "source_id": str(information_source_id),
+        "record_ids": record_ids,
+    }
+    # until the run is finished the snapshot belongs to no run
+    delete_snapshot(information_source_id)
+    session.execute(
+        sql_text(
+            """
+            INSERT INTO payload_record_version (record_id, project_id, source_id, version)
+            SELECT record_id, project_id, :source_id, id
+            FROM record_tokenized
+            WHERE project_id = :project_id
+                AND (
+                    CAST(:record_ids AS UUID[]) IS NULL
+                    OR record_id = ANY(CAST(:record_ids AS UUID[]))
+                )
+            ON CONFLICT (source_id, record_id) DO UPDATE SET version = EXCLUDED.version
+            WHERE payload_record_version.version IS DISTINCT FROM EXCLUDED.version
+            """
+        ),
+        parameters,
+    )
+    if record_ids is None:
+        session.execute(
+            sql_text(
+                """
+                DELETE FROM payload_record_version v
+                WHERE v.source_id = :source_id AND NOT EXISTS (
+                    SELECT 1 FROM record_tokenized rt WHERE rt.record_id = v.record_id
+                )
+                """
+            ),
+            parameters,
+        )
+    elif removed_record_ids:
+        session.execute(
+            sql_text(
+                """
+                DELETE FROM payload_record_version
+                WHERE source_id = :source_id
+                    AND record_id = ANY(CAST(:removed_record_ids AS UUID[]))
+                """
+            ),
+            {**parameters, "removed_record_ids": removed_record_ids},
+        )
+
+
+def get_snapshot_record_ids(information_source_id: str) -> List[str]:
+    return __get_record_ids(
+        """
+        SELECT record_id::TEXT
+        FROM payload_record_version
+        WHERE source_id = :source_id
+        """,
+        {"source_id": str(information_source_id)},
+    )
+
+
+def confirm_snapshot(
+    information_source_id: str, payload_id: str, with_commit: bool = False
+) -> None:
+    # the next run builds upon the snapshot once its run finished
+    session.execute(
+        sql_text(
+            """
+            INSERT INTO payload_snapshot (source_id, payload_id)
+            VALUES (:source_id, :payload_id)
+            ON CONFLICT (source_id) DO UPDATE SET payload_id = EXCLUDED.payload_id
+            """
+        ),
+        {"source_id": str(information_source_id), "payload_id": str(payload_id)},
+    )
+    if with_commit:
+        session.commit()
+
+
+def carry_over_snapshot(
+    from_payload_id: str, to_payload_id: str, with_commit: bool = False
+) -> None:
+    # a payload that kept the results of an earlier run saw the same records
+    session.execute(
+        sql_text(
+            """
+            UPDATE payload_snapshot
+            SET payload_id = :to_payload_id
+            WHERE payload_id = :from_payload_id
+            """
+        ),
+        {"from_payload_id": str(from_payload_id), "to_payload_id": str(to_payload_id)},
+    )
+    if with_commit:
+        session.commit()
+
+
+def delete_snapshot(information_source_id: str, with_commit: bool = False) -> None:
+    # the versions are kept, a later full run only writes the ones that changed
+    session.execute(
+        sql_text("DELETE FROM payload_snapshot WHERE source_id = :source_id"),
+        {"source_id": str(information_source_id)},
+    )
+    if with_commit:
+        session.commit()
+
+
+def get_run_info() -> Dict[str, Any]:
+    return {
+        **__run_stats,
+        "enabled": USE_INCREMENTAL_PAYLOAD,
+        "max_share": INCREMENTAL_MAX_SHARE,
+    }
+
+
+def __builds_on_previous_run(
+    project_id: str, payload_id: str, information_source_id: str, base_fingerprint: str
+) -> bool:
+    # results are only built upon if the last run of the source finished, used
+    # the same code, knowledge bases and labels and left its snapshot. Failed runs
+    # can remove results.
+    previous = session.execute(
+        sql_text(
+            """
+            SELECT p.state, pf.base_fingerprint, EXISTS (
+                SELECT 1 FROM payload_snapshot s
+                WHERE s.source_id = p.source_id AND s.payload_id = p.id
+            ) AS has_snapshot
+            FROM information_source_payload p
+            LEFT JOIN payload_fingerprint pf ON pf.payload_id = p.id
+            WHERE p.project_id = :project_id AND p.source_id = :source_id
+                AND p.created_at < (
+                    SELECT created_at FROM information_source_payload WHERE id = :payload_id
+                )
+            ORDER BY p.created_at DESC
+            LIMIT 1
+            """
+        ),
+        {
+            "project_id": str(project_id),
+            "source_id": str(information_source_id),
+            "payload_id": str(payload_id),
+        },
+    ).first()
+    return bool(
+        previous
+        and previous.state == enums.PayloadState.FINISHED.value
+        and previous.base_fingerprint == base_fingerprint
+        and previous.has_snapshot
+    )
+
+
+def __get_record_ids(sql: str, parameters: Dict[str, Any]) -> List[str]:
+    return [row[0] for row in session.execute(sql_text(sql), parameters)]
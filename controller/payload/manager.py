@@ -1,29 +1,89 @@
 from typing import Any, Dict, List, Optional, Tuple
-from controller.payload import payload_scheduler
+from controller.payload import incremental, payload_scheduler, result_cache
+from controller.weak_supervision import manager as ws_manager
 from graphql_api.types import (
     LabelingFunctionSampleRecordWrapper,
     LabelingFunctionSampleRecords,
 )
 from submodules.model import InformationSourcePayload, enums
-from submodules.model.business_objects import information_source, payload
+from submodules.model.business_objects import (
+    general,
+    information_source,
+    labeling_task,
+    payload,
+)
+from submodules.model.business_objects.information_source import (
+    get_task_information_sources,
+)
+from util import notification
+from util.notification import create_notification
 
 
 def get_payload(project_id: str, payload_id: str) -> InformationSourcePayload:
     return payload.get(project_id, payload_id)
 
 
+def get_cache_info() -> Dict[str, Any]:
+    return result_cache.get_cache_info()
+
+
+def get_incremental_info() -> Dict[str, Any]:
+    return incremental.get_run_info()
+
+
 def create_payload(
-    info,
     project_id: str,
     information_source_id: str,
     user_id: str,
     asynchronous: Optional[bool] = True,
 ) -> InformationSourcePayload:
     return payload_scheduler.create_payload(
-        info, project_id, information_source_id, user_id, asynchronous
+        project_id, information_source_id, user_id, asynchronous
     )
 
 
+def create_payload_batch(
+    project_id: str,
+    information_source_ids: List[str],
+    user_id: str,
+    initiate_weak_supervision: bool = False,
+) -> List[InformationSourcePayload]:
+    return payload_scheduler.create_payload_batch(
+        project_id, information_source_ids, user_id, initiate_weak_supervision
+    )
+
+
+def run_heuristic_then_weak_supervision(
+    project_id: str, information_source_id: str, labeling_task_id: str, user_id: str
+) -> None:
+    create_payload(project_id, information_source_id, user_id, asynchronous=False)
+    labeling_task_item = labeling_task.get(project_id, labeling_task_id)
+    for information_source_item in labeling_task_item.information_sources:
+        information_source_item.is_selected = any(
+            source_statistic.true_positives > 0
+            for source_statistic in information_source_item.source_statistics
+            if source_statistic.true_positives is not None
+        )
+    general.commit()
+
+    source_names = get_task_information_sources(project_id, labeling_task_id)
+    if len(source_names) > 0:
+        weak_supervision_task_id = ws_manager.create_task_with_notification(
+            project_id, user_id, source_names, labeling_task_item.name
+        )
+        ws_manager.run_task(
+            project_id, user_id, weak_supervision_task_id, [labeling_task_id]
+        )
+    else:
+        create_notification(
+            enums.NotificationType.WEAK_SUPERVISION_TASK_FAILED,
+            user_id,
+            project_id,
+            "Weak Supervision Task",
+        )
+        notification.send_organization_update(project_id, "weak_supervision_failed")
+
+
 def create_empty_crowd_payload(
     project_id: str, information_source_id: str, user_id: str
 ) -> InformationSourcePayload:
@@ -1,13 +1,14 @@
 import os
 import re
 from sqlalchemy.orm.attributes import flag_modified
-from typing import Any, Tuple, Dict, List
+from typing import Any, Iterable, Iterator, Optional, Tuple, Dict, List
 
 import pytz
 import json
-import docker
+import numpy as np
 import timeit
 import traceback
+import uuid
 from datetime import datetime
 
 from graphql.error.base import GraphQLError
@@ -17,7 +18,6 @@ from submodules.model.business_objects import (
     information_source,
     embedding,
     labeling_task,
-    labeling_task_label,
     record,
     record_label_association,
     general,
@@ -41,41 +41,163 @@ from submodules.model.business_objects.tokenization import (
 from submodules.model.models import (
     InformationSource,
     InformationSourceStatisticsExclusion,
-    RecordLabelAssociation,
     InformationSourcePayload,
     User,
 )
-from controller.auth.manager import get_user_by_info
-from util import daemon, doc_ock, notification
+from controller.job_queue import manager as job_manager
+from controller.payload import incremental, result_cache
+from controller.user import manager as user_manager
+from util import bulk_write, container_pool, doc_ock, json_stream, notification
 from submodules.s3 import controller as s3
 from controller.knowledge_base import util as knowledge_base
 from util.notification import create_notification
-from util.miscellaneous_functions import chunk_dict
+from util.miscellaneous_functions import chunk_items
 from controller.weak_supervision import weak_supervision_service as weak_supervision
+from controller.weak_supervision import manager as ws_manager
 
 # lf container is run in frankfurt, graphql-gateway is utc --> german time zone needs to be used to match
 
-client = docker.from_env()
 __tz = pytz.timezone("Europe/Berlin")
 lf_exec_env_image = os.getenv("LF_EXEC_ENV_IMAGE")
 ml_exec_env_image = os.getenv("ML_EXEC_ENV_IMAGE")
-exec_env_network = os.getenv("LF_NETWORK")
+
+__RLA_COPY_COLUMNS = [
+    "id",
+    "project_id",
+    "record_id",
+    "labeling_task_label_id",
+    "source_type",
+    "source_id",
+    "return_type",
+    "confidence",
+    "created_at",
+    "created_by",
+]
+__RLA_TOKEN_COPY_COLUMNS = [
+    "id",
+    "project_id",
+    "record_label_association_id",
+    "token_index",
+    "is_beginning_token",
+]
 
 
 def create_payload(
-    info,
     project_id: str,
     information_source_id: str,
     user_id: str,
     asynchronous: bool,
+) -> InformationSourcePayload:
+    payload = __create_payload_item(project_id, information_source_id, user_id)
+    if asynchronous:
+        job_manager.enqueue(
+            "payload",
+            project_id,
+            {
+                "project_id": project_id,
+                "payload_id": str(payload.id),
+                "information_source_id": information_source_id,
+                "user_id": str(user_id),
+            },
+            with_commit=True,
+        )
+    else:
+        run_payload(project_id, str(payload.id), information_source_id, str(user_id))
+    return payload
+
+
+def create_payload_batch(
+    project_id: str,
+    information_source_ids: List[str],
+    user_id: str,
+    initiate_weak_supervision: bool = False,
+) -> List[InformationSourcePayload]:
+    payloads = [
+        __create_payload_item(project_id, information_source_id, user_id)
+        for information_source_id in information_source_ids
+    ]
+    job_manager.enqueue(
+        "payload_batch",
+        project_id,
+        {
+            "project_id": project_id,
+            "payload_ids": [str(payload.id) for payload in payloads],
+            "information_source_ids": information_source_ids,
+            "user_id": str(user_id),
+            "initiate_weak_supervision": initiate_weak_supervision,
+        },
+        with_commit=True,
+    )
+    return payloads
+
+
+def run_payload_batch(
+    project_id: str,
+    payload_ids: List[str],
+    information_source_ids: List[str],
+    user_id: str,
+    initiate_weak_supervision: bool,
+) -> None:
+    # knowledge bases and docbin progress are the same for every heuristic of the
+    # batch, so they are staged once. The heuristics run as payload jobs and count
+    # against the payload limit of the project, weak supervision waits for them.
+    org_id = organization.get_id_by_project_id(project_id)
+    staged = {
+        "knowledge_base": f"{uuid.uuid4()}_knowledge",
+        "progress": get_doc_bin_progress(project_id),
+    }
+    s3.put_object(
+        org_id,
+        project_id + "/" + staged["knowledge_base"],
+        knowledge_base.build_knowledge_base_from_project(project_id),
+    )
+    try:
+        job_ids = [
+            job_manager.enqueue(
+                "payload",
+                project_id,
+                {
+                    "project_id": project_id,
+                    "payload_id": payload_id,
+                    "information_source_id": information_source_id,
+                    "user_id": user_id,
+                    "staged": staged,
+                },
+            )
+            for payload_id, information_source_id in zip(
+                payload_ids, information_source_ids
+            )
+        ]
+        general.commit()
+        job_manager.wait_for(job_ids)
+    finally:
+        s3.delete_object(org_id, project_id + "/" + staged["knowledge_base"])
+    if not initiate_weak_supervision:
+        return
+    if any(
+        information_source.get_payload(project_id, payload_id).state
+        != enums.PayloadState.FINISHED.value
+        for payload_id in payload_ids
+    ):
+        # the failed heuristics are reported on their own, a weak supervision
+        # without their results would look like a complete one
+        create_notification(
+            enums.NotificationType.WEAK_SUPERVISION_TASK_FAILED,
+            user_id,
+            project_id,
+            "Weak Supervision Task",
+        )
+        notification.send_organization_update(project_id, "weak_supervision_failed")
+        return
+    weak_supervision_task_id = ws_manager.create_task_for_project(project_id, user_id)
+    ws_manager.run_task_for_project(project_id, user_id, weak_supervision_task_id)
+
+
+def __create_payload_item(
+    project_id: str, information_source_id: str, user_id: str
 ) -> InformationSourcePayload:
     information_source_item = information_source.get(project_id, information_source_id)
     count = len(information_source_item.payloads) + 1
-    # remove session connection to prevent timeout errors, caution no update possible!
-    # timeouts can occur if the data collection takes longer than the session stays active
-    # TODO outsource in general file maybe
-    general.expunge(information_source_item)
-    general.make_transient(information_source_item)
     payload = information_source.create_payload(
         project_id=project_id,
         created_by=user_id,
@@ -88,6 +210,24 @@ def create_payload(
     notification.send_organization_update(
         project_id, f"payload_created:{information_source_item.id}:{payload.id}"
     )
+    return payload
+
+
+def run_payload(
+    project_id: str,
+    payload_id: str,
+    information_source_id: str,
+    user_id: str,
+    staged: Optional[Dict[str, str]] = None,
+) -> None:
+    payload = information_source.get_payload(project_id, payload_id)
+    user = user_manager.get_user(user_id)
+    information_source_item = information_source.get(project_id, information_source_id)
+    # remove session connection to prevent timeout errors, caution no update possible!
+    # timeouts can occur if the data collection takes longer than the session stays active
+    # TODO outsource in general file maybe
+    general.expunge(information_source_item)
+    general.make_transient(information_source_item)
 
     def prepare_and_run_execution_pipeline(
         user: User,
@@ -225,15 +365,39 @@ def create_payload(
                 information_source_item.name,
             )
             start = timeit.default_timer()
-            run_container(
-                payload_item,
-                project_id,
-                image,
-                information_source_item.type,
-                add_file_name,
-                input_data,
+            fingerprint, base_fingerprint = result_cache.get_fingerprints(
+                project_id, information_source_item, payload_item
+            )
+            reusable = result_cache.get_reusable_payload(
+                project_id, payload_id, information_source_item.id, fingerprint
             )
-            has_error = update_records(payload_item, project_id)
+            if reusable:
+                incremental.carry_over_snapshot(reusable.id, payload_id)
+                __add_reuse_log(payload_item, reusable.iteration)
+                has_error = False
+            else:
+                changed_records = incremental.get_changed_records(
+                    project_id, payload_id, information_source_item.id, base_fingerprint
+                )
+                if changed_records:
+                    has_error = __run_incremental(
+                        payload_item, project_id, image, changed_records, staged
+                    )
+                elif incremental.is_tracked(base_fingerprint):
+                    has_error = __run_tracked_full(
+                        payload_item, project_id, image, staged
+                    )
+                else:
+                    run_container(
+                        payload_item,
+                        project_id,
+                        image,
+                        information_source_item.type,
+                        add_file_name,
+                        input_data,
+                        staged,
+                    )
+                    has_error = update_records(payload_item, project_id)
             if has_error:
                 payload_item = information_source.get_payload(project_id, payload_id)
                 tmp_log_store = payload_item.logs
@@ -254,6 +418,15 @@ def create_payload(
                 )
 
             payload_item.state = enums.PayloadState.FINISHED.value
+            result_cache.store_fingerprint(
+                project_id,
+                payload_id,
+                information_source_item.id,
+                fingerprint,
+                base_fingerprint,
+            )
+            if not reusable and incremental.is_tracked(base_fingerprint):
+                incremental.confirm_snapshot(information_source_item.id, payload_id)
             general.commit()
             create_notification(
                 enums.NotificationType.INFORMATION_SOURCE_COMPLETED,
@@ -270,6 +443,7 @@ def create_payload(
             if not type(e) == ValueError:
                 print(traceback.format_exc())
             payload_item.state = enums.PayloadState.FAILED.value
+            incremental.delete_snapshot(information_source_item.id)
             general.commit()
             create_notification(
                 enums.NotificationType.INFORMATION_SOURCE_FAILED,
@@ -312,23 +486,12 @@ def create_payload(
             ),
         )
 
-    user = get_user_by_info(info)
-    if asynchronous:
-        daemon.run(
-            prepare_and_run_execution_pipeline,
-            user,
-            payload.id,
-            project_id,
-            information_source_item,
-        )
-    else:
-        prepare_and_run_execution_pipeline(
-            user,
-            payload.id,
-            project_id,
-            information_source_item,
-        )
-    return payload
+    prepare_and_run_execution_pipeline(
+        user,
+        payload.id,
+        project_id,
+        information_source_item,
+    )
 
 
 def run_container(
@@ -338,6 +501,8 @@ def run_container(
     information_source_type: str,
     add_file_name: str,
     input_data: Dict[str, Any],
+    staged: Optional[Dict[str, str]] = None,
+    doc_bin: str = "docbin_full",
 ) -> None:
     project_item = project.get(project_id)
     payload_id = str(information_source_payload.id)
@@ -360,34 +525,27 @@ def run_container(
             s3.create_file_upload_link(org_id, project_id + "/" + payload_id),
         ]
     else:
-        s3.put_object(
-            org_id,
-            project_id + "/" + prefixed_knowledge_base,
-            knowledge_base.build_knowledge_base_from_project(project_id),
-        )
-        progress = get_doc_bin_progress(project_id)
+        if staged:
+            knowledge_base_name = staged["knowledge_base"]
+            progress = staged["progress"]
+        else:
+            knowledge_base_name = prefixed_knowledge_base
+            s3.put_object(
+                org_id,
+                project_id + "/" + knowledge_base_name,
+                knowledge_base.build_knowledge_base_from_project(project_id),
+            )
+            progress = get_doc_bin_progress(project_id)
+        # links are signed per run, they could expire while a long batch waits
         command = [
-            s3.create_access_link(org_id, project_id + "/" + "docbin_full"),
+            s3.create_access_link(org_id, project_id + "/" + doc_bin),
             s3.create_access_link(org_id, project_id + "/" + prefixed_function_name),
-            s3.create_access_link(org_id, project_id + "/" + prefixed_knowledge_base),
+            s3.create_access_link(org_id, project_id + "/" + knowledge_base_name),
             progress,
             project_item.tokenizer_blank,
             s3.create_file_upload_link(org_id, project_id + "/" + payload_id),
         ]
-    container = client.containers.run(
-        image=image,
-        command=command,
-        remove=True,
-        detach=True,
-        network=exec_env_network,
-    )
-
-    information_source_payload.logs = [
-        line.decode("utf-8").strip("\n")
-        for line in container.logs(
-            stream=True, stdout=True, stderr=True, timestamps=True
-        )
-    ]
+    information_source_payload.logs = container_pool.execute(image, command)
 
     information_source_payload.finished_at = datetime.now()
     general.commit()
@@ -395,32 +553,25 @@ def run_container(
     s3.delete_object(org_id, project_id + "/" + prefixed_input_name)
     s3.delete_object(org_id, project_id + "/" + prefixed_function_name)
     s3.delete_object(org_id, project_id + "/" + prefixed_knowledge_base)
+    if not doc_bin == "docbin_full":
+        s3.delete_object(org_id, project_id + "/" + doc_bin)
 
 
 def update_records(
-    information_source_payload: InformationSourcePayload, project_id: str
+    information_source_payload: InformationSourcePayload,
+    project_id: str,
+    record_ids: Optional[List[str]] = None,
 ) -> bool:
+    # with record_ids only the results of these records are replaced
     org_id = organization.get_id_by_project_id(project_id)
     tmp_log_store = information_source_payload.logs
     try:
-        output_data = json.loads(
-            s3.get_object(
-                org_id, str(project_id) + "/" + str(information_source_payload.id)
-            )
+        # output can be large, so it is streamed from the downloaded file
+        output_file_name = s3.download_object(
+            org_id, str(project_id) + "/" + str(information_source_payload.id), "json"
         )
     except Exception:
-        berlin_now = datetime.now(__tz)
-        tmp_log_store.append(
-            " ".join(
-                [
-                    berlin_now.strftime("%Y-%m-%dT%H:%M:%S"),
-                    "Code execution exited with errors. Please check the logs.",
-                ]
-            )
-        )
-        information_source_payload.logs = tmp_log_store
-        flag_modified(information_source_payload, "logs")
-        general.commit()
+        __add_execution_error_log(information_source_payload, tmp_log_store)
         return True
 
     berlin_now = datetime.now(__tz)
@@ -431,22 +582,38 @@ def update_records(
     information_source: InformationSource = (
         information_source_payload.informationSource  # backref resolves in camelCase
     )
-    if information_source.return_type == enums.InformationSourceReturnType.YIELD.value:
-        has_errors = add_data_extraction(
-            information_source_payload,
-            project_id,
-            information_source.labeling_task_id,
-            tmp_log_store,
-            output_data,
-        )
-    else:
-        has_errors = add_data_classification(
-            information_source_payload,
-            project_id,
-            information_source.labeling_task_id,
-            tmp_log_store,
-            output_data,
-        )
+    try:
+        output_data = json_stream.iterate_file_object_items(output_file_name)
+        if (
+            information_source.return_type
+            == enums.InformationSourceReturnType.YIELD.value
+        ):
+            has_errors = add_data_extraction(
+                information_source_payload,
+                project_id,
+                information_source.labeling_task_id,
+                tmp_log_store,
+                output_data,
+                record_ids,
+            )
+        else:
+            has_errors = add_data_classification(
+                information_source_payload,
+                project_id,
+                information_source.labeling_task_id,
+                tmp_log_store,
+                output_data,
+                record_ids,
+            )
+    except ValueError:
+        # malformed output is only noticed while streaming
+        print(traceback.format_exc(), flush=True)
+        general.rollback()
+        __add_execution_error_log(information_source_payload, tmp_log_store)
+        return True
+    finally:
+        if os.path.exists(output_file_name):
+            os.remove(output_file_name)
     berlin_now = datetime.now(__tz)
     if has_errors:
         tmp_log_store.append(
@@ -463,61 +630,228 @@ def update_records(
     return has_errors
 
 
+def __run_incremental(
+    information_source_payload: InformationSourcePayload,
+    project_id: str,
+    image: str,
+    changed_records: Tuple[List[str], List[str]],
+    staged: Optional[Dict[str, str]] = None,
+) -> bool:
+    # only the docbins of new or retokenized records are passed to the exec env,
+    # results of the other records are kept
+    changed_record_ids, removed_record_ids = changed_records
+    incremental.take_snapshot(
+        project_id,
+        str(information_source_payload.source_id),
+        changed_record_ids,
+        removed_record_ids,
+    )
+    if not changed_record_ids:
+        __delete_previous_results(
+            project_id, information_source_payload.source_id, removed_record_ids
+        )
+        information_source_payload.logs = []
+        information_source_payload.finished_at = datetime.now()
+        __add_incremental_log(information_source_payload, 0, len(removed_record_ids))
+        return False
+    doc_bin = __upload_doc_bin(
+        project_id, str(information_source_payload.id), changed_record_ids
+    )
+    run_container(
+        information_source_payload,
+        project_id,
+        image,
+        enums.InformationSourceType.LABELING_FUNCTION.value,
+        None,
+        None,
+        staged,
+        doc_bin,
+    )
+    __add_incremental_log(
+        information_source_payload,
+        len(changed_record_ids),
+        len(removed_record_ids),
+    )
+    return update_records(
+        information_source_payload,
+        project_id,
+        changed_record_ids + removed_record_ids,
+    )
+
+
+def __run_tracked_full(
+    information_source_payload: InformationSourcePayload,
+    project_id: str,
+    image: str,
+    staged: Optional[Dict[str, str]] = None,
+) -> bool:
+    # the next run builds upon this one, so it runs on the records of its snapshot
+    # instead of docbin_full, which can lag behind the tokenization
+    source_id = str(information_source_payload.source_id)
+    incremental.take_snapshot(project_id, source_id)
+    doc_bin = __upload_doc_bin(
+        project_id,
+        str(information_source_payload.id),
+        incremental.get_snapshot_record_ids(source_id),
+    )
+    run_container(
+        information_source_payload,
+        project_id,
+        image,
+        enums.InformationSourceType.LABELING_FUNCTION.value,
+        None,
+        None,
+        staged,
+        doc_bin,
+    )
+    return update_records(information_source_payload, project_id)
+
+
+def __upload_doc_bin(project_id: str, payload_id: str, record_ids: List[str]) -> str:
+    doc_bin = get_doc_bin_table_to_json(
+        project_id=project_id,
+        missing_columns=get_missing_columns_tokenization(project_id),
+        record_ids=record_ids,
+    )
+    org_id = organization.get_id_by_project_id(project_id)
+    prefixed_doc_bin = f"{payload_id}_doc_bin.json"
+    s3.put_object(org_id, project_id + "/" + prefixed_doc_bin, doc_bin)
+    return prefixed_doc_bin
+
+
+def __delete_previous_results(
+    project_id: str, information_source_id: str, record_ids: Optional[List[str]]
+) -> None:
+    if record_ids is None:
+        record_label_association.delete_by_source_id(project_id, information_source_id)
+    elif record_ids:
+        record_label_association.delete_by_source_id_and_record_ids(
+            project_id, information_source_id, record_ids
+        )
+
+
+def __add_incremental_log(
+    information_source_payload: InformationSourcePayload,
+    changed_count: int,
+    removed_count: int,
+) -> None:
+    berlin_now = datetime.now(__tz)
+    tmp_log_store = information_source_payload.logs or []
+    tmp_log_store.append(
+        " ".join(
+            [
+                berlin_now.strftime("%Y-%m-%dT%H:%M:%S"),
+                f"Ran on {changed_count} new or changed records,",
+                f"removed results of {removed_count} records.",
+                "Results of all other records are kept.",
+            ]
+        )
+    )
+    information_source_payload.logs = tmp_log_store
+    flag_modified(information_source_payload, "logs")
+    general.commit()
+
+
+def __add_reuse_log(
+    information_source_payload: InformationSourcePayload, iteration: int
+) -> None:
+    berlin_now = datetime.now(__tz)
+    information_source_payload.logs = [
+        " ".join(
+            [
+                berlin_now.strftime("%Y-%m-%dT%H:%M:%S"),
+                "Code, knowledge bases, tokenization and labels are unchanged since",
+                f"run {iteration}, its results are kept.",
+            ]
+        )
+    ]
+    information_source_payload.finished_at = datetime.now()
+    flag_modified(information_source_payload, "logs")
+    general.commit()
+
+
+def __add_execution_error_log(
+    information_source_payload: InformationSourcePayload, tmp_log_store: List[str]
+) -> None:
+    berlin_now = datetime.now(__tz)
+    tmp_log_store.append(
+        " ".join(
+            [
+                berlin_now.strftime("%Y-%m-%dT%H:%M:%S"),
+                "Code execution exited with errors. Please check the logs.",
+            ]
+        )
+    )
+    information_source_payload.logs = tmp_log_store
+    flag_modified(information_source_payload, "logs")
+    general.commit()
+
+
 def add_data_classification(
     information_source_payload: InformationSourcePayload,
     project_id: str,
     labeling_task_id: str,
     tmp_log_store: List[str],
-    output_data: Any,
+    output_data: Iterable[Tuple[str, Any]],
+    record_ids: Optional[List[str]] = None,
 ) -> bool:
-    record_label_associations = []
     labels_valid = {}
+    # resolved once per payload, name -> id
     labels_in_task = get_label_ids_by_names(labeling_task_id, project_id)
-    my_chunks = chunk_dict(output_data)
     has_errors = False
-    for chunk in my_chunks:
-        valid_record_ids = record.get_ids_by_keys(chunk)
-        valid_record_ids = set([x[0] for x in valid_record_ids])
-        for idx, (record_id, lf_result) in enumerate(chunk.items()):
-            if record_id not in valid_record_ids:
-                # not an error since this is a failsaive to prevend deleted records from erroring out
-                continue
-            confidence, label_name = lf_result
-            if __check_label_errors(
-                label_name, labels_in_task, tmp_log_store, labels_valid
-            ):
-                has_errors = True
-                continue
-            if not isinstance(label_name, str):
-                raise TypeError(
-                    f"Expected String, but Label name is of type {type(label_name)}"
-                )
-
-            label = labeling_task_label.get_by_name(
-                project_id, labeling_task_id, label_name
-            )
-
-            if label is not None:
-                record_label_associations.append(
-                    RecordLabelAssociation(
-                        project_id=project_id,
-                        record_id=record_id,
-                        labeling_task_label_id=label.id,
-                        source_type=enums.LabelSource.INFORMATION_SOURCE.value,
-                        source_id=information_source_payload.source_id,
-                        return_type=enums.InformationSourceReturnType.RETURN.value,
-                        confidence=confidence,
-                        created_by=information_source_payload.created_by,
+    created_at = datetime.now()
+
+    def build_rows() -> Iterator[Tuple[Any, ...]]:
+        nonlocal has_errors
+        for chunk in chunk_items(output_data):
+            valid_record_ids = record.get_ids_by_keys(chunk)
+            valid_record_ids = set([x[0] for x in valid_record_ids])
+            for record_id, lf_result in chunk.items():
+                if record_id not in valid_record_ids:
+                    # not an error since this is a failsaive to prevend deleted records from erroring out
+                    continue
+                confidence, label_name = lf_result
+                if __check_label_errors(
+                    label_name, labels_in_task, tmp_log_store, labels_valid
+                ):
+                    has_errors = True
+                    continue
+                if not isinstance(label_name, str):
+                    raise TypeError(
+                        f"Expected String, but Label name is of type {type(label_name)}"
                     )
+                if has_errors:
+                    # nothing will be written, only collect the remaining label errors
+                    continue
+                yield (
+                    uuid.uuid4(),
+                    project_id,
+                    record_id,
+                    labels_in_task[label_name],
+                    enums.LabelSource.INFORMATION_SOURCE.value,
+                    information_source_payload.source_id,
+                    enums.InformationSourceReturnType.RETURN.value,
+                    confidence,
+                    created_at,
+                    information_source_payload.created_by,
                 )
 
-    record_label_association.delete_by_source_id(
-        project_id, information_source_payload.source_id
+    __delete_previous_results(
+        project_id, information_source_payload.source_id, record_ids
+    )
+    savepoint = bulk_write.begin_savepoint()
+    start = timeit.default_timer()
+    row_count = bulk_write.copy_rows(
+        "record_label_association",
+        __RLA_COPY_COLUMNS,
+        build_rows(),
     )
-    if not has_errors:
-        general.add_all(record_label_associations, with_commit=True)
+    if has_errors:
+        savepoint.rollback()
     else:
-        general.commit()
+        savepoint.commit()
+        __add_rows_per_second_log(tmp_log_store, row_count, start)
+    general.commit()
     return has_errors
 
 
@@ -526,62 +860,176 @@ def add_data_extraction(
     project_id: str,
     labeling_task_id: str,
     tmp_log_store: List[str],
-    output_data: Any,
+    output_data: Iterable[Tuple[str, Any]],
+    record_ids: Optional[List[str]] = None,
 ) -> bool:
-    record_label_associations = []
     labels_valid = {}
     labels_in_task = get_label_ids_by_names(labeling_task_id, project_id)
     has_errors = False
-    my_chunks = chunk_dict(output_data)
-    for chunk in my_chunks:
+    created_at = datetime.now()
+    rla_count = 0
+    token_count = 0
+
+    __delete_previous_results(
+        project_id, information_source_payload.source_id, record_ids
+    )
+    savepoint = bulk_write.begin_savepoint()
+    start = timeit.default_timer()
+    for chunk in chunk_items(output_data):
         max_token_num = get_max_token(chunk.keys(), labeling_task_id, project_id)
-        for idx, (record_id, lf_results) in enumerate(chunk.items()):
-            if record_id not in max_token_num:
-                # not an error since this is a failsaive to prevend deleted records from erroring out
-                continue
-            for lf_result in lf_results:
-                if __check_extraction_errors(
-                    max_token_num,
-                    record_id,
-                    lf_result,
-                    labels_in_task,
-                    tmp_log_store,
-                    labels_valid,
-                ):
-                    has_errors = True
-                    continue
-                confidence, label_name, token_idx_start, token_idx_end = lf_result
+        spans = __collect_extraction_spans(chunk, max_token_num)
+        if __check_extraction_span_errors(
+            spans, labels_in_task, tmp_log_store, labels_valid
+        ):
+            has_errors = True
+        if has_errors:
+            # nothing will be written, only collect the remaining errors
+            continue
+        rla_ids, rla_rows = __build_extraction_rla_rows(
+            spans,
+            project_id,
+            labels_in_task,
+            information_source_payload,
+            created_at,
+        )
+        rla_count += bulk_write.copy_rows(
+            "record_label_association", __RLA_COPY_COLUMNS, rla_rows
+        )
+        token_count += bulk_write.copy_rows(
+            "record_label_association_token",
+            __RLA_TOKEN_COPY_COLUMNS,
+            __build_extraction_token_rows(spans, project_id, rla_ids),
+        )
+    if has_errors:
+        savepoint.rollback()
+    else:
+        savepoint.commit()
+        __add_rows_per_second_log(tmp_log_store, rla_count + token_count, start)
+    general.commit()
+    return has_errors
 
-                tokens = record_label_association.create_token_objects(
-                    project_id, token_idx_start, token_idx_end
-                )
 
-                label = labeling_task_label.get_by_name(
-                    project_id, labeling_task_id, label_name
-                )
+def __collect_extraction_spans(
+    chunk: Dict[str, Any], max_token_num: Dict[str, int]
+) -> Dict[str, Any]:
+    # flattens the spans of a chunk into columns so they can be checked at once
+    record_ids = []
+    confidences = []
+    label_names = []
+    starts = []
+    ends = []
+    max_tokens = []
+    for record_id, lf_results in chunk.items():
+        if record_id not in max_token_num:
+            # not an error since this is a failsaive to prevend deleted records from erroring out
+            continue
+        max_token = max_token_num[record_id]
+        for confidence, label_name, token_idx_start, token_idx_end in lf_results:
+            record_ids.append(record_id)
+            confidences.append(confidence)
+            label_names.append(label_name)
+            starts.append(token_idx_start)
+            ends.append(token_idx_end)
+            max_tokens.append(max_token)
+    return {
+        "record_ids": record_ids,
+        "confidences": confidences,
+        "label_names": label_names,
+        "starts": np.array(starts, dtype=np.int64),
+        "ends": np.array(ends, dtype=np.int64),
+        "max_tokens": np.array(max_tokens, dtype=np.int64),
+    }
+
+
+def __check_extraction_span_errors(
+    spans: Dict[str, Any],
+    labels_in_task: Dict[str, str],
+    tmp_log_store: List[str],
+    labels_valid: Dict[str, bool],
+) -> bool:
+    starts = spans["starts"]
+    ends = spans["ends"]
+    max_tokens = spans["max_tokens"]
+    start_exceeds = starts > max_tokens
+    end_exceeds = ends > max_tokens
+    no_length = ends - starts < 1
+
+    label_names = spans["label_names"]
+    unique_labels = set(label_names)
+    invalid_labels = {
+        label_name
+        for label_name in unique_labels
+        if __check_label_errors(label_name, labels_in_task, tmp_log_store, labels_valid)
+    }
+    has_errors = bool(invalid_labels)
+
+    # errors are rare, only the affected spans are visited to write the log
+    for idx in np.flatnonzero(start_exceeds | end_exceeds | no_length):
+        has_errors = True
+        __check_extraction_errors(
+            {spans["record_ids"][idx]: int(max_tokens[idx])},
+            spans["record_ids"][idx],
+            (
+                spans["confidences"][idx],
+                label_names[idx],
+                int(starts[idx]),
+                int(ends[idx]),
+            ),
+            labels_in_task,
+            tmp_log_store,
+            labels_valid,
+        )
+    return has_errors
 
-                record_label_associations.append(
-                    RecordLabelAssociation(
-                        project_id=project_id,
-                        record_id=record_id,
-                        source_type=enums.LabelSource.INFORMATION_SOURCE.value,
-                        source_id=information_source_payload.source_id,
-                        labeling_task_label_id=label.id,
-                        return_type=enums.InformationSourceReturnType.YIELD.value,
-                        tokens=tokens,
-                        confidence=confidence,
-                        created_by=information_source_payload.created_by,
-                    )
-                )
 
-    record_label_association.delete_by_source_id(
-        project_id, information_source_payload.source_id
-    )
-    if not has_errors:
-        general.add_all(record_label_associations, with_commit=True)
-    else:
-        general.commit()
-    return has_errors
+def __build_extraction_rla_rows(
+    spans: Dict[str, Any],
+    project_id: str,
+    labels_in_task: Dict[str, str],
+    information_source_payload: InformationSourcePayload,
+    created_at: datetime,
+) -> Tuple[List[uuid.UUID], List[Tuple[Any, ...]]]:
+    rla_ids = [uuid.uuid4() for _ in spans["record_ids"]]
+    rows = [
+        (
+            rla_id,
+            project_id,
+            record_id,
+            labels_in_task[label_name],
+            enums.LabelSource.INFORMATION_SOURCE.value,
+            information_source_payload.source_id,
+            enums.InformationSourceReturnType.YIELD.value,
+            confidence,
+            created_at,
+            information_source_payload.created_by,
+        )
+        for rla_id, record_id, label_name, confidence in zip(
+            rla_ids,
+            spans["record_ids"],
+            spans["label_names"],
+            spans["confidences"],
+        )
+    ]
+    return rla_ids, rows
+
+
+def __build_extraction_token_rows(
+    spans: Dict[str, Any], project_id: str, rla_ids: List[uuid.UUID]
+) -> Iterator[Tuple[Any, ...]]:
+    # one row per token in [start, end), expanded for all spans at once
+    starts = spans["starts"]
+    lengths = spans["ends"] - starts
+    if not len(lengths):
+        return
+    span_idx = np.repeat(np.arange(len(lengths)), lengths)
+    span_offsets = np.cumsum(lengths) - lengths
+    offsets = np.arange(len(span_idx)) - np.repeat(span_offsets, lengths)
+    token_index = starts[span_idx] + offsets
+    is_beginning = offsets == 0
+    for rla_idx, token_idx, beginning in zip(
+        span_idx.tolist(), token_index.tolist(), is_beginning.tolist()
+    ):
+        yield (uuid.uuid4(), project_id, rla_ids[rla_idx], token_idx, beginning)
 
 
 def __check_extraction_errors(
@@ -641,6 +1089,18 @@ def __check_label_errors(
     return not labels_valid[label_name]
 
 
+def __add_rows_per_second_log(
+    tmp_log_store: List[str], row_count: int, start: float
+) -> None:
+    duration = timeit.default_timer() - start
+    rows_per_second = row_count / duration if duration > 0 else row_count
+    berlin_now = datetime.now(__tz)
+    tmp_log_store.append(
+        berlin_now.strftime("%Y-%m-%dT%H:%M:%S")
+        + f" Wrote {row_count} results in {duration:.2f}s ({rows_per_second:.0f} rows/sec)."
+    )
+
+
 def __get_embedding_id_from_function(
     user_id: str, project_id: str, source_item: InformationSource
 ) -> str:
@@ -757,20 +1217,7 @@ def run_labeling_function_exec_env(
         s3.create_file_upload_link(org_id, project_id + "/" + prefixed_payload),
     ]
 
-    container = client.containers.run(
-        image=lf_exec_env_image,
-        command=command,
-        remove=True,
-        detach=True,
-        network=exec_env_network,
-    )
-
-    container_logs = [
-        line.decode("utf-8").strip("\n")
-        for line in container.logs(
-            stream=True, stdout=True, stderr=True, timestamps=True
-        )
-    ]
+    container_logs = container_pool.execute(lf_exec_env_image, command)
 
     code_has_errors = False
 
@@ -803,3 +1250,9 @@ def get_missing_columns_tokenization(project_id: str) -> str:
     )
 
     return missing_columns_str
+
+
+# at most two containers of one project run at the same time across all processes
+job_manager.register("payload", run_payload, workers=4, project_limit=2)
+# a batch only stages and waits, its heuristics are queued as payload jobs
+job_manager.register("payload_batch", run_payload_batch, project_limit=1)
@@ -0,0 +1,174 @@
+import hashlib
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.sql import text as sql_text
+
+from submodules.model import enums
+from submodules.model.models import InformationSource, InformationSourcePayload
+from submodules.model.session import session
+
+# results of an unchanged labeling function are kept instead of running it again
+USE_RESULT_CACHE = os.getenv("PAYLOAD_RESULT_CACHE", "true") == "true"
+# a new exec env can label the same records differently
+LF_EXEC_ENV_IMAGE = os.getenv("LF_EXEC_ENV_IMAGE", "")
+
+# counted per gateway process since its start, listed for admins as payloadCacheInfo
+__cache_stats = {"hits": 0, "misses": 0}
+
+
+def get_fingerprints(
+    project_id: str,
+    information_source_item: InformationSource,
+    payload_item: InformationSourcePayload,
+) -> Tuple[Optional[str], Optional[str]]:
+    # everything a labeling function sees: its code, the exec env, the knowledge
+    # bases, the tokenized records (their version is counted up by a trigger with
+    # every change) and the labels of its task. The base fingerprint leaves out the
+    # records, if only they changed the function can be run on the changed ones.
+    # Active learners also depend on embeddings and manual labels and are always run.
+    if (
+        information_source_item.type
+        != enums.InformationSourceType.LABELING_FUNCTION.value
+    ):
+        return None, None
+    knowledge_base_hash, docbin_version, label_hash = session.execute(
+        sql_text(
+            """
+            SELECT
+                (
+                    SELECT MD5(COALESCE(STRING_AGG(
+                        kb.name || ':' || COALESCE(kt.value, '') || ':'
+                            || COALESCE(kt.blacklisted::TEXT, ''),
+                        E'\\n' ORDER BY kb.name, kt.value, kt.id
+                    ), ''))
+                    FROM knowledge_base kb
+                    LEFT JOIN knowledge_term kt ON kt.knowledge_base_id = kb.id
+                    WHERE kb.project_id = :project_id
+                ),
+                (
+                    SELECT COALESCE(MAX(version), 0)::TEXT
+                    FROM record_tokenized_version
+                    WHERE project_id = :project_id
+                ),
+                (
+                    SELECT MD5(COALESCE(STRING_AGG(
+                        id::TEXT || ':' || COALESCE(name, ''), ',' ORDER BY id
+                    ), ''))
+                    FROM labeling_task_label
+                    WHERE labeling_task_id = :labeling_task_id
+                )
+            """
+        ),
+        {
+            "project_id": str(project_id),
+            "labeling_task_id": str(information_source_item.labeling_task_id),
+        },
+    ).first()
+    base_fingerprint = __hash(
+        payload_item.source_code or "",
+        LF_EXEC_ENV_IMAGE,
+        information_source_item.return_type or "",
+        str(information_source_item.labeling_task_id),
+        knowledge_base_hash,
+        label_hash,
+    )
+    return __hash(base_fingerprint, docbin_version), base_fingerprint
+
+
+def get_reusable_payload(
+    project_id: str, payload_id: str, information_source_id: str, fingerprint: str
+) -> Optional[Any]:
+    # the results of a source belong to its last finished payload, failed runs keep
+    # them. They are only reused if nothing removed them since.
+    if not USE_RESULT_CACHE or not fingerprint:
+        return None
+    reusable = session.execute(
+        sql_text(
+            """
+            SELECT p.id::TEXT, p.iteration, pf.fingerprint, pf.result_count
+            FROM information_source_payload p
+            LEFT JOIN payload_fingerprint pf ON pf.payload_id = p.id
+            WHERE p.project_id = :project_id AND p.source_id = :source_id
+                AND p.state = :finished AND p.id != :payload_id
+            ORDER BY p.created_at DESC
+            LIMIT 1
+            """
+        ),
+        {
+            "project_id": str(project_id),
+            "source_id": str(information_source_id),
+            "payload_id": str(payload_id),
+            "finished": enums.PayloadState.FINISHED.value,
+        },
+    ).first()
+    if (
+        reusable
+        and reusable.fingerprint == fingerprint
+        and reusable.result_count == __count_results(project_id, information_source_id)
+    ):
+        __cache_stats["hits"] += 1
+        return reusable
+    __cache_stats["misses"] += 1
+    return None
+
+
+def store_fingerprint(
+    project_id: str,
+    payload_id: str,
+    information_source_id: str,
+    fingerprint: Optional[str],
+    base_fingerprint: Optional[str],
+    with_commit: bool = False,
+) -> None:
+    if not fingerprint:
+        return
+    session.execute(
+        sql_text(
+            """
+            INSERT INTO payload_fingerprint (
+                payload_id, project_id, source_id, fingerprint, base_fingerprint,
+                result_count, created_at
+            )
+            VALUES (
+                :payload_id, :project_id, :source_id, :fingerprint, :base_fingerprint,
+                :result_count, NOW()
+            )
+            ON CONFLICT (payload_id) DO UPDATE
+            SET fingerprint = EXCLUDED.fingerprint,
+                base_fingerprint = EXCLUDED.base_fingerprint,
+                result_count = EXCLUDED.result_count
+            """
+        ),
+        {
+            "payload_id": str(payload_id),
+            "project_id": str(project_id),
+            "source_id": str(information_source_id),
+            "fingerprint": fingerprint,
+            "base_fingerprint": base_fingerprint,
+            "result_count": __count_results(project_id, information_source_id),
+        },
+    )
+    if with_commit:
+        session.commit()
+
+
+def get_cache_info() -> Dict[str, Any]:
+    return {**__cache_stats, "enabled": USE_RESULT_CACHE}
+
+
+def __count_results(project_id: str, information_source_id: str) -> int:
+    return session.execute(
+        sql_text(
+            """
+            SELECT COUNT(*)
+            FROM record_label_association
+            WHERE project_id = :project_id AND source_id = :source_id
+            """
+        ),
+        {"project_id": str(project_id), "source_id": str(information_source_id)},
+    ).scalar()
+
+
+def __hash(*parts: str) -> str:
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
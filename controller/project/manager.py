@@ -2,6 +2,7 @@ import json
 from typing import Dict, List, Optional
 
 from controller.transfer import project_transfer_manager as handler
+from controller.auth import access_cache
 from controller.labeling_access_link import manager as link_manager
 from submodules.model import Project, enums
 from submodules.model.business_objects import (
@@ -12,7 +13,7 @@ from submodules.model.business_objects import (
     data_slice,
 )
 from graphql_api.types import HuddleData, ProjectSize
-from util import daemon
+from controller.job_queue import manager as job_manager
 from controller.tokenization.tokenization_service import request_tokenize_project
 from submodules.model.business_objects import data_slice as ds_manager
 from submodules.model.business_objects import (
@@ -21,6 +22,7 @@ from submodules.model.business_objects import (
 from submodules.model.business_objects import util as db_util
 from submodules.s3 import controller as s3
 from service.search import search
+from util import notification
 
 
 def get_project(project_id: str) -> Project:
@@ -81,7 +83,15 @@ def update_project(
 def delete_project(project_id: str) -> None:
     org_id = organization.get_id_by_project_id(project_id)
     project.delete_by_id(project_id, with_commit=True)
-    daemon.run(s3.archive_bucket, org_id, project_id + "/")
+    access_cache.invalidate_project(project_id)
+    notification.invalidate_project(project_id)
+    # the project row is gone, so the job isn't bound to it
+    job_manager.enqueue(
+        "archive_bucket",
+        None,
+        {"org_id": org_id, "prefix": project_id + "/"},
+        with_commit=True,
+    )
 
 
 def import_sample_project(user_id: str, organization_id: str, name: str) -> Project:
@@ -210,3 +220,10 @@ def __get_first_data_id(project_id: str, user_id: str, huddle_type: str) -> str:
         )
     else:
         raise ValueError("invalid huddle type")
+
+
+def __archive_bucket(org_id: str, prefix: str) -> None:
+    s3.archive_bucket(org_id, prefix)
+
+
+job_manager.register("archive_bucket", __archive_bucket, max_attempts=3)
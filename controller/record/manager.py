@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from graphql_api.types import ExtendedSearch
 from submodules.model import Record, Attribute
@@ -69,9 +69,10 @@ def get_records_by_static_slice(
     order_by: Dict[str, str],
     limit: int,
     offset: int,
+    cursor: Optional[str] = None,
 ) -> ExtendedSearch:
     return search.resolve_records_by_static_slice(
-        user_id, project_id, slice_id, order_by, limit, offset
+        user_id, project_id, slice_id, order_by, limit, offset, cursor
     )
 
 
@@ -81,9 +82,10 @@ def get_records_by_extended_search(
     filter_data: List[Dict[str, Any]],
     limit: int,
     offset: int,
+    cursor: Optional[str] = None,
 ) -> ExtendedSearch:
     return search.resolve_extended_search(
-        project_id, user_id, filter_data, limit, offset
+        project_id, user_id, filter_data, limit, offset, cursor
     )
 
 
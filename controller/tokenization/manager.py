@@ -1,24 +1,46 @@
-from typing import Any, List, Dict
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, List, Dict, Optional, Set, Tuple
 
 import spacy
 from spacy.tokens import DocBin
+from sqlalchemy.sql import text as sql_text
 from controller.project import manager as project_manager
 from graphql_api.types import TokenizedRecord, TokenizedAttribute, TokenWrapper
 from submodules.model import enums, Record
-from submodules.model.business_objects import tokenization, attribute
+from submodules.model.business_objects import (
+    attribute,
+    general,
+    labeling_task,
+    tokenization,
+)
 from submodules.model.business_objects.record import __get_tokenized_record
+from submodules.model.session import session
 from util import daemon
-from controller.tokenization import tokenization_service
-from controller.tokenization.tokenization_service import (
-    request_tokenize_project,
-    request_tokenize_record,
-)
+from util.miscellaneous_functions import is_uuid
+from controller.job_queue import manager as job_manager
+from controller.tokenization import tokenization_service, tokenized_record_cache
+from controller.tokenization.tokenization_service import request_tokenize_project
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 __blank_tokenizer_vocab = {}
+# DocBin.get_docs writes to the string store of the shared vocab, which isn't thread
+# safe. Requests & prefetches decode under this lock, reentrant for __decode.
+__vocab_lock = threading.RLock()
+# (project id, user id) of running prefetches
+__prefetching = set()
+__prefetch_lock = threading.Lock()
+
+# records after the current one of the user's labeling session that are loaded ahead
+PREFETCH_COUNT = int(os.getenv("TOKENIZED_RECORD_PREFETCH", 5))
+# tokenizer requests running at the same time for batched calls
+BATCH_PARALLELISM = int(os.getenv("TOKENIZE_BATCH_PARALLELISM", 4))
 
 
 # spacy needs the vocab of a blank spacy object to extract docs from doc_bins
@@ -26,46 +48,91 @@ __blank_tokenizer_vocab = {}
 
 
 def get_blank_tokenizer_vocab(project_id: str) -> Any:
-    project = project_manager.get_project(project_id)
-    if not __blank_tokenizer_vocab.get(project.tokenizer_blank):
-        __init_blank_tokenizer_vocab(project.tokenizer_blank)
-    return __blank_tokenizer_vocab.get(project.tokenizer_blank)
+    language = tokenized_record_cache.get_language(project_id)
+    if not language:
+        language = project_manager.get_project(project_id).tokenizer_blank
+        tokenized_record_cache.set_language(project_id, language)
+    if not __blank_tokenizer_vocab.get(language):
+        __init_blank_tokenizer_vocab(language)
+    return __blank_tokenizer_vocab.get(language)
 
 
-def get_tokenized_record(project_id: str, record_id: str) -> TokenizedRecord:
-    # ensure docs are in db (prio queue)
+def get_tokenized_record(
+    project_id: str, record_id: str, user_id: Optional[str] = None
+) -> TokenizedRecord:
+    # deserialized docbins are cached per record, the cheap version lookup makes sure
+    # a retokenized record isn't served from the cache
+    version = __get_docbin_version(project_id, record_id)
+    entry = None
+    if version:
+        entry = tokenized_record_cache.get(project_id, record_id, version)
+    if entry is None:
+        table_entry = __get_table_entry(project_id, record_id)
+        entry = __decode(project_id, table_entry)
+        tokenized_record_cache.put(project_id, record_id, table_entry.id, entry)
+    if user_id and PREFETCH_COUNT > 0:
+        __start_prefetch(project_id, user_id, record_id)
 
-    docs = __get_docs_from_db(project_id, record_id)
-    tokenized_record = TokenizedRecord()
-    tokenized_record.record_id = record_id
-    tokenized_record.attributes = []
+    attributes_by_name, extraction_attribute_ids = __get_attribute_lookups(project_id)
+    return __to_tokenized_record(
+        record_id, entry, attributes_by_name, extraction_attribute_ids
+    )
 
-    for attribute_name in docs:
-        attribute_item = attribute.get_by_name(project_id, attribute_name)
-        if attribute_item is None:
-            # the docs could contain already deleted user created attributes
-            continue
 
-        tokenized_attribute = TokenizedAttribute()
-        tokenized_attribute.raw = docs[attribute_name].text
-        if attribute_item is not None and any(
-            labeling_task.task_type
-            == enums.LabelingTaskType.INFORMATION_EXTRACTION.value
-            for labeling_task in attribute_item.labeling_tasks
-        ):
-            tokenized_attribute.tokens = [
-                TokenWrapper(
-                    value=token.text,
-                    idx=token.i,
-                    pos_start=token.idx,
-                    pos_end=token.idx + len(token),
-                    type=token.ent_type_,
+def get_tokenized_records(
+    project_id: str, record_ids: List[str]
+) -> List[Optional[TokenizedRecord]]:
+    # batched get_tokenized_record, one docbin query for all records & one parallel
+    # round of tokenizer requests for those without docbin. Records that aren't part
+    # of the project are returned as None.
+    record_ids = [str(record_id) for record_id in record_ids]
+    versions = __get_docbin_versions(
+        project_id, [record_id for record_id in record_ids if is_uuid(record_id)]
+    )
+    entries = {}
+    for record_id, version in versions.items():
+        entry = tokenized_record_cache.get(project_id, record_id, version)
+        if entry is not None:
+            entries[record_id] = entry
+
+    untokenized_ids = __get_project_record_ids(
+        project_id,
+        [
+            record_id
+            for record_id in record_ids
+            if record_id not in versions and is_uuid(record_id)
+        ],
+    )
+    if untokenized_ids:
+        with ThreadPoolExecutor(max_workers=BATCH_PARALLELISM) as executor:
+            list(
+                executor.map(
+                    partial(tokenization_service.request_tokenize_record, project_id),
+                    untokenized_ids,
                 )
-                for token in docs[attribute_name]
-            ]
-        tokenized_attribute.attribute = attribute_item
-        tokenized_record.attributes.append(tokenized_attribute)
-    return tokenized_record
+            )
+        versions.update(__get_docbin_versions(project_id, untokenized_ids))
+
+    missing_versions = [
+        version for record_id, version in versions.items() if record_id not in entries
+    ]
+    if missing_versions:
+        for table_entry in __get_table_entries(missing_versions):
+            entry = __decode(project_id, table_entry)
+            tokenized_record_cache.put(
+                project_id, table_entry.record_id, table_entry.id, entry
+            )
+            entries[table_entry.record_id] = entry
+
+    attributes_by_name, extraction_attribute_ids = __get_attribute_lookups(project_id)
+    return [
+        __to_tokenized_record(
+            record_id, entries[record_id], attributes_by_name, extraction_attribute_ids
+        )
+        if record_id in entries
+        else None
+        for record_id in record_ids
+    ]
 
 
 def create_rats_entries(project_id: str, user_id: str, attribute_id: str = "") -> None:
@@ -78,39 +145,256 @@ def delete_token_statistics(records: List[Record]) -> None:
 
 def delete_docbins(project_id: str, records: List[Record]) -> None:
     tokenization.delete_record_docbins(project_id, records)
+    tokenized_record_cache.invalidate_records(
+        project_id, [record_item.id for record_item in records]
+    )
 
 
 def start_record_tokenization(project_id: str, record_id: str) -> None:
-    daemon.run(
-        request_tokenize_record,
+    job_manager.enqueue(
+        "tokenize_record",
         project_id,
-        record_id,
+        {"project_id": project_id, "record_id": record_id},
+        with_commit=True,
     )
 
 
 def start_project_tokenization(project_id: str, user_id: str) -> None:
-    daemon.run(
-        request_tokenize_project,
+    job_manager.enqueue(
+        "tokenize_project",
         project_id,
-        user_id,
+        {"project_id": project_id, "user_id": str(user_id)},
+        with_commit=True,
     )
 
 
+def __get_attribute_lookups(project_id: str) -> Tuple[Dict[str, Any], Set[str]]:
+    attributes_by_name = {
+        attribute_item.name: attribute_item
+        for attribute_item in attribute.get_all(project_id, state_filter=[])
+    }
+    extraction_attribute_ids = {
+        str(labeling_task_item.attribute_id)
+        for labeling_task_item in labeling_task.get_all(project_id)
+        if labeling_task_item.task_type
+        == enums.LabelingTaskType.INFORMATION_EXTRACTION.value
+    }
+    return attributes_by_name, extraction_attribute_ids
+
+
+def __to_tokenized_record(
+    record_id: str,
+    entry: tokenized_record_cache.Entry,
+    attributes_by_name: Dict[str, Any],
+    extraction_attribute_ids: Set[str],
+) -> TokenizedRecord:
+    tokenized_record = TokenizedRecord()
+    tokenized_record.record_id = record_id
+    tokenized_record.attributes = []
+
+    for attribute_name, (raw, tokens) in entry.items():
+        attribute_item = attributes_by_name.get(attribute_name)
+        if attribute_item is None:
+            # the docs could contain already deleted user created attributes
+            continue
+
+        tokenized_attribute = TokenizedAttribute()
+        tokenized_attribute.raw = raw
+        if str(attribute_item.id) in extraction_attribute_ids:
+            tokenized_attribute.tokens = [
+                TokenWrapper(
+                    value=value,
+                    idx=idx,
+                    pos_start=pos_start,
+                    pos_end=pos_end,
+                    type=token_type,
+                )
+                for value, idx, pos_start, pos_end, token_type in tokens
+            ]
+        tokenized_attribute.attribute = attribute_item
+        tokenized_record.attributes.append(tokenized_attribute)
+    return tokenized_record
+
+
 def __get_docs_from_db(project_id: str, record_id: str) -> Dict[str, Any]:
-    vocab = get_blank_tokenizer_vocab(project_id)
+    return __get_docs(project_id, __get_table_entry(project_id, record_id))
+
 
+def __get_table_entry(project_id: str, record_id: str) -> Any:
     table_entry = __get_tokenized_record(project_id, record_id)
     if not table_entry:
         tokenization_service.request_tokenize_record(project_id, record_id)
         table_entry = __get_tokenized_record(project_id, record_id)
+    return table_entry
 
-    doc_bin_loaded = DocBin().from_bytes(table_entry.bytes)
-    docs = list(doc_bin_loaded.get_docs(vocab))
+
+def __get_docs(project_id: str, table_entry: Any) -> Dict[str, Any]:
+    vocab = get_blank_tokenizer_vocab(project_id)
+    doc_bin_loaded = DocBin().from_bytes(bytes(table_entry.bytes))
+    with __vocab_lock:
+        docs = list(doc_bin_loaded.get_docs(vocab))
     doc_dict = {}
     for (col, doc) in zip(table_entry.columns, docs):
         doc_dict[col] = doc
     return doc_dict
 
 
+def __decode(project_id: str, table_entry: Any) -> tokenized_record_cache.Entry:
+    # the token texts are read from the same string store
+    with __vocab_lock:
+        return __to_cache_entry(__get_docs(project_id, table_entry))
+
+
+def __to_cache_entry(docs: Dict[str, Any]) -> tokenized_record_cache.Entry:
+    # plain values only, spacy docs hold a reference to the shared vocab
+    return {
+        attribute_name: (
+            doc.text,
+            [
+                (
+                    token.text,
+                    token.i,
+                    token.idx,
+                    token.idx + len(token),
+                    token.ent_type_,
+                )
+                for token in doc
+            ],
+        )
+        for attribute_name, doc in docs.items()
+    }
+
+
+def __get_docbin_version(project_id: str, record_id: str) -> Optional[str]:
+    if not is_uuid(str(record_id)):
+        return None
+    return session.execute(
+        sql_text(
+            """
+            SELECT id::TEXT
+            FROM record_tokenized
+            WHERE project_id = :project_id AND record_id = :record_id
+            """
+        ),
+        {"project_id": str(project_id), "record_id": str(record_id)},
+    ).scalar()
+
+
+def __get_docbin_versions(project_id: str, record_ids: List[str]) -> Dict[str, str]:
+    # record ids can come from the client, they are only passed as parameters
+    if not record_ids:
+        return {}
+    rows = session.execute(
+        sql_text(
+            """
+            SELECT record_id::TEXT, id::TEXT
+            FROM record_tokenized
+            WHERE project_id = :project_id
+                AND record_id = ANY(CAST(:record_ids AS UUID[]))
+            """
+        ),
+        {"project_id": str(project_id), "record_ids": record_ids},
+    )
+    return {record_id: version for record_id, version in rows}
+
+
+def __get_table_entries(versions: List[str]) -> List[Any]:
+    return session.execute(
+        sql_text(
+            """
+            SELECT record_id::TEXT, id::TEXT, bytes, columns
+            FROM record_tokenized
+            WHERE id = ANY(CAST(:versions AS UUID[]))
+            """
+        ),
+        {"versions": versions},
+    ).all()
+
+
+def __get_project_record_ids(project_id: str, record_ids: List[str]) -> List[str]:
+    if not record_ids:
+        return []
+    rows = session.execute(
+        sql_text(
+            """
+            SELECT id::TEXT
+            FROM record
+            WHERE project_id = :project_id AND id = ANY(CAST(:record_ids AS UUID[]))
+            """
+        ),
+        {"project_id": str(project_id), "record_ids": record_ids},
+    )
+    return [row[0] for row in rows]
+
+
+def __start_prefetch(project_id: str, user_id: str, record_id: str) -> None:
+    key = (str(project_id), str(user_id))
+    with __prefetch_lock:
+        if key in __prefetching:
+            return
+        __prefetching.add(key)
+    daemon.run(__prefetch_session_records, project_id, user_id, record_id, key)
+
+
+def __prefetch_session_records(
+    project_id: str, user_id: str, record_id: str, key: Tuple[str, str]
+) -> None:
+    # loads the next records of the newest labeling session of the user that contains
+    # the current record. Records without docbin are left to the regular request.
+    ctx_token = general.get_ctx_token()
+    try:
+        record_ids = __get_next_session_record_ids(project_id, user_id, record_id)
+        if not record_ids:
+            return
+        missing_versions = [
+            version
+            for next_id, version in __get_docbin_versions(
+                project_id, record_ids
+            ).items()
+            if not tokenized_record_cache.contains(project_id, next_id, version)
+        ]
+        if not missing_versions:
+            return
+        for table_entry in __get_table_entries(missing_versions):
+            entry = __decode(project_id, table_entry)
+            tokenized_record_cache.put(
+                project_id, table_entry.record_id, table_entry.id, entry
+            )
+    except Exception:
+        print(traceback.format_exc(), flush=True)
+    finally:
+        general.reset_ctx_token(ctx_token, True)
+        with __prefetch_lock:
+            __prefetching.discard(key)
+
+
+def __get_next_session_record_ids(
+    project_id: str, user_id: str, record_id: str
+) -> List[str]:
+    row = session.execute(
+        sql_text(
+            """
+            SELECT session_record_ids
+            FROM user_sessions
+            WHERE project_id = :project_id
+                AND created_by = :user_id
+                AND session_record_ids::JSONB ? :record_id
+            ORDER BY created_at DESC
+            LIMIT 1
+            """
+        ),
+        {
+            "project_id": str(project_id),
+            "user_id": str(user_id),
+            "record_id": str(record_id),
+        },
+    ).first()
+    if not row:
+        return []
+    session_record_ids = [str(session_id) for session_id in row[0]]
+    position = session_record_ids.index(str(record_id))
+    return session_record_ids[position + 1 : position + 1 + PREFETCH_COUNT]
+
+
 def __init_blank_tokenizer_vocab(language: str) -> None:
     __blank_tokenizer_vocab[language] = spacy.blank(language).vocab
@@ -1,5 +1,7 @@
 import os
 
+from controller.job_queue import manager as job_manager
+from controller.tokenization import tokenized_record_cache
 from util import service_requests
 
 BASE_URI = os.getenv("TOKENIZER")
@@ -16,6 +18,8 @@ def request_tokenize_record(project_id: str, record_id: str) -> None:
 
 
 def request_tokenize_project(project_id: str, user_id: str) -> None:
+    # every docbin of the project is recreated
+    tokenized_record_cache.invalidate_project(project_id)
     url = f"{BASE_URI}/tokenize_project"
     data = {
         "project_id": str(project_id),
@@ -36,3 +40,10 @@ def request_create_rats_entries(
         "attribute_id": str(attribute_id),
     }
     service_requests.post_call_or_raise(url, data)
+
+
+# the tokenizer works on its own, the requests are retried if it can't be reached
+job_manager.register("tokenize_record", request_tokenize_record, max_attempts=3)
+job_manager.register(
+    "tokenize_project", request_tokenize_project, workers=2, max_attempts=3
+)
@@ -0,0 +1,102 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# (text, index, start, end, entity type) per token
+Token = Tuple[str, int, int, int, str]
+# attribute name -> (raw text, tokens)
+Entry = Dict[str, Tuple[str, List[Token]]]
+
+# estimated size of the deserialized records that are kept
+MAX_BYTES = int(os.getenv("TOKENIZED_RECORD_CACHE_MB", 128)) * 1024 * 1024
+# python object overhead of one cached token tuple
+TOKEN_OVERHEAD = 200
+
+# (project id, record id) -> (docbin version, entry, estimated size)
+__entries: "OrderedDict[Tuple[str, str], Tuple[str, Entry, int]]" = OrderedDict()
+__project_languages: Dict[str, str] = {}
+__size = 0
+__lock = threading.Lock()
+__cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def get(project_id: str, record_id: str, version: str) -> Optional[Entry]:
+    # version is the id of the record_tokenized row, retokenization creates a new one
+    key = (str(project_id), str(record_id))
+    with __lock:
+        cached = __entries.get(key)
+        if not cached or cached[0] != str(version):
+            __cache_stats["misses"] += 1
+            return None
+        __entries.move_to_end(key)
+        __cache_stats["hits"] += 1
+        return cached[1]
+
+
+def contains(project_id: str, record_id: str, version: str) -> bool:
+    # unlike get it doesn't count as a hit or move the record to the end
+    with __lock:
+        cached = __entries.get((str(project_id), str(record_id)))
+    return bool(cached) and cached[0] == str(version)
+
+
+def put(project_id: str, record_id: str, version: str, entry: Entry) -> None:
+    global __size
+    key = (str(project_id), str(record_id))
+    size = __estimate_size(entry)
+    if size > MAX_BYTES:
+        return
+    with __lock:
+        __remove(key)
+        __entries[key] = (str(version), entry, size)
+        __size += size
+        while __size > MAX_BYTES:
+            __remove(next(iter(__entries)))
+            __cache_stats["evictions"] += 1
+
+
+def invalidate_records(project_id: str, record_ids: Iterable[str]) -> None:
+    with __lock:
+        for record_id in record_ids:
+            __remove((str(project_id), str(record_id)))
+
+
+def invalidate_project(project_id: str) -> None:
+    project_id = str(project_id)
+    with __lock:
+        for key in [key for key in __entries if key[0] == project_id]:
+            __remove(key)
+        __project_languages.pop(project_id, None)
+
+
+def get_language(project_id: str) -> Optional[str]:
+    return __project_languages.get(str(project_id))
+
+
+def set_language(project_id: str, language: str) -> None:
+    __project_languages[str(project_id)] = language
+
+
+def get_cache_info() -> Dict[str, Any]:
+    return {
+        **__cache_stats,
+        "entries": len(__entries),
+        "bytes": __size,
+        "max_bytes": MAX_BYTES,
+    }
+
+
+def __remove(key: Tuple[str, str]) -> None:
+    # callers hold the lock
+    global __size
+    cached = __entries.pop(key, None)
+    if cached:
+        __size -= cached[2]
+
+
+def __estimate_size(entry: Entry) -> int:
+    return sum(
+        len(raw) + sum(len(token[0]) + TOKEN_OVERHEAD for token in tokens)
+        for raw, tokens in entry.values()
+    )
@@ -1,12 +1,14 @@
-from typing import Tuple, List, Union, Dict
+from typing import Iterable, List, Union, Dict
 from controller.misc.config_service import get_config_value
 
-from controller.transfer import util as transfer_util
+from controller.transfer import key_hash_index, util as transfer_util
 from controller.transfer.valid_arguments import valid_arguments
+import numpy as np
 import pandas as pd
 from util.notification import create_notification
 from submodules.model.enums import NotificationType
-from submodules.model.business_objects import attribute, record, general
+from submodules.model.business_objects import attribute, record
+from submodules.model.models import Attribute
 from controller.labeling_task.util import infer_labeling_task_name
 import logging
 
@@ -14,10 +16,72 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
-def run_checks(df: pd.DataFrame, project_id, user_id) -> None:
+def run_checks_on_chunks(
+    chunks: Iterable[pd.DataFrame], project_id: str, user_id: str
+) -> int:
+    # runs run_limit_checks & run_checks on a file that is read in chunks, only the
+    # aggregates needed by the checks are kept. Returns the number of rows.
+    attribute_entities = attribute.get_all(project_id)
+    primary_key_names = [
+        attribute_item.name
+        for attribute_item in attribute_entities
+        if attribute_item.is_primary_key
+    ]
+    count_current_records = record.count(project_id)
+    if primary_key_names and count_current_records:
+        key_hash_index.sync(project_id, primary_key_names, with_commit=True)
+
+    columns = None
+    row_count = 0
+    updating = 0
+    max_length_dict = {}
+    key_hashes = []
+    for df in chunks:
+        if columns is None:
+            columns = df.columns
+        row_count += df.shape[0]
+        for key, max_length in get_max_lengths(df).items():
+            max_length_dict[key] = max(max_length, max_length_dict.get(key, 0))
+        if primary_key_names and set(primary_key_names).issubset(df.columns):
+            # composite keys are compared as 64 bit hashes instead of joined strings
+            chunk_hashes = key_hash_index.hash_keys(df, primary_key_names)
+            key_hashes.append(chunk_hashes)
+            if count_current_records:
+                updating += key_hash_index.count_existing(project_id, chunk_hashes)
+    if columns is None:
+        columns = pd.Index([])
+    has_duplicated_composite_keys = bool(key_hashes) and (
+        key_hash_index.has_duplicates(np.concatenate(key_hashes))
+    )
+
+    run_limit_checks(
+        project_id,
+        user_id,
+        row_count,
+        len(columns),
+        max_length_dict,
+        count_current_records,
+        updating,
+    )
+    run_checks(
+        columns,
+        project_id,
+        user_id,
+        attribute_entities,
+        has_duplicated_composite_keys,
+    )
+    return row_count
+
+
+def run_checks(
+    columns: pd.Index,
+    project_id: str,
+    user_id: str,
+    attribute_entities: List[Attribute],
+    has_duplicated_composite_keys: bool,
+) -> None:
     guard = False
     errors = {}
-    columns = df.columns
 
     # check if columns are unique
     columns_duplicated = columns.duplicated()
@@ -69,7 +133,6 @@ def run_checks(df: pd.DataFrame, project_id, user_id) -> None:
         errors["DuplicatedTaskNames"] = notification.message
 
     # check attribute equality
-    attribute_entities = attribute.get_all(project_id)
     attribute_names = [attribute_item.name for attribute_item in attribute_entities]
     differences = set(attribute_names).difference(set(attributes))
     if differences:
@@ -100,72 +163,61 @@ def run_checks(df: pd.DataFrame, project_id, user_id) -> None:
         errors["NonExistentTargetAttributes"] = notification.message
 
     # check if composite key constraint is not hurt
-    primary_key_names = [
-        attribute_item.name
-        for attribute_item in attribute_entities
-        if attribute_item.is_primary_key
-    ]
-    if primary_key_names:
-        concatenated_primary_keys = (
-            df[primary_key_names].astype(str).apply("-".join, axis=1)
+    if has_duplicated_composite_keys:
+        guard = True
+        notification = create_notification(
+            NotificationType.DUPLICATED_COMPOSITE_KEY, user_id, project_id
         )
-        duplicated_composite_keys = df.loc[concatenated_primary_keys.duplicated(), :]
-        if not duplicated_composite_keys.empty:
-            guard = True
-            notification = create_notification(
-                NotificationType.DUPLICATED_COMPOSITE_KEY, user_id, project_id
-            )
-            errors["DuplicatedCompositeKeys"] = notification.message
+        errors["DuplicatedCompositeKeys"] = notification.message
     if guard:
         logger.error(errors)
         raise Exception(str(errors))
 
 
-def run_limit_checks(df: pd.DataFrame, project_id, user_id) -> None:
+def run_limit_checks(
+    project_id: str,
+    user_id: str,
+    row_count: int,
+    col_count: int,
+    max_length_dict: Dict[str, int],
+    count_current_records: int,
+    updating: int,
+) -> None:
     limits = get_config_value("limit_checks")
     guard = False
     errors = {}
-    if df.shape[0] > limits["max_rows"]:
+    if row_count > limits["max_rows"]:
         guard = True
         notification = create_notification(
             NotificationType.NEW_ROWS_EXCEED_MAXIMUM_LIMIT,
             user_id,
             project_id,
-            df.shape[0],
+            row_count,
             limits["max_rows"],
         )
         errors["MaxRows"] = notification.message
-    else:
-        count_current_records = record.count(project_id)
-        if count_current_records:
-            updating = get_update_amount(df, project_id)
-            if count_current_records - updating + df.shape[0] > limits["max_rows"]:
-                guard = True
-                notification = create_notification(
-                    NotificationType.TOTAL_ROWS_EXCEED_MAXIMUM_LIMIT,
-                    user_id,
-                    project_id,
-                    count_current_records - updating + df.shape[0],
-                    limits["max_rows"],
-                )
-                errors["MaxRows"] = notification.message
+    elif count_current_records:
+        if count_current_records - updating + row_count > limits["max_rows"]:
+            guard = True
+            notification = create_notification(
+                NotificationType.TOTAL_ROWS_EXCEED_MAXIMUM_LIMIT,
+                user_id,
+                project_id,
+                count_current_records - updating + row_count,
+                limits["max_rows"],
+            )
+            errors["MaxRows"] = notification.message
 
-    if df.shape[1] > limits["max_cols"]:
+    if col_count > limits["max_cols"]:
         guard = True
         notification = create_notification(
             NotificationType.COLS_EXCEED_MAXIMUM_LIMIT,
             user_id,
             project_id,
-            df.shape[1],
+            col_count,
             limits["max_cols"],
         )
         errors["MaxCols"] = notification.message
-    max_length_dict = dict(
-        [
-            (v, df[v].apply(lambda r: len(str(r)) if r != None else 0).max())
-            for v in df.columns.values
-        ]
-    )
 
     for key in max_length_dict:
         if max_length_dict[key] > limits["max_char_count"]:
@@ -186,17 +238,13 @@ def run_limit_checks(df: pd.DataFrame, project_id, user_id) -> None:
         raise Exception(str(errors))
 
 
-def build_df_sql(project_id: str) -> Tuple[str, List[str]]:
-    primary_keys = attribute.get_primary_keys(project_id)
-    if not primary_keys:
-        return None, None
-    sql = "SELECT id record_id"
-    keys = []
-    for att in primary_keys:
-        sql += f", r.data->>'{att.name}' {att.name}"
-        keys.append(att.name)
-    sql += f"\nFROM record r WHERE project_id = '{project_id}'"
-    return sql, keys
+def get_max_lengths(df: pd.DataFrame) -> Dict[str, int]:
+    return dict(
+        [
+            (v, df[v].apply(lambda r: len(str(r)) if r != None else 0).max())
+            for v in df.columns.values
+        ]
+    )
 
 
 def check_argument_allowed(arg: str) -> bool:
@@ -224,19 +272,3 @@ def string_to_import_option_dict(
                 if import_options[parameter].isdigit():
                     import_options[parameter] = int(import_options[parameter])
     return import_options
-
-
-def get_update_amount(df: pd.DataFrame, project_id: str) -> int:
-    updating = 0
-    sql, keys = build_df_sql(project_id)
-    if sql:
-        sql_df = pd.read_sql(sql, con=general.get_bind())
-        for column in keys:
-            if not column in df.columns:
-                return 0
-            type_name = df[column].dtype.name
-            if type_name in ["int64", "float64", "bool"]:
-                sql_df[column] = sql_df[column].astype(type_name)
-
-        updating = pd.merge(left=df[keys], right=sql_df, on=keys).shape[0]
-    return updating
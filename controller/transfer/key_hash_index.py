@@ -0,0 +1,140 @@
+import hashlib
+from typing import Any, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.sql import text as sql_text
+
+from submodules.model.business_objects import general
+from submodules.model.session import session
+from util import bulk_write
+
+FETCH_SIZE = 50000
+
+
+def hash_keys(df: pd.DataFrame, key_names: List[str]) -> np.ndarray:
+    # one 64 bit hash per row over the text of the key columns as postgres returns it
+    # for record.data->>'key', so file rows & existing records hash the same way. The
+    # hashes are stored, so they don't depend on the pandas version.
+    key_texts = [__to_key_text(df[name]) for name in key_names]
+    return np.fromiter(
+        (__hash(values) for values in zip(*key_texts)), dtype=np.uint64, count=len(df)
+    )
+
+
+def sync(project_id: str, key_names: List[str], with_commit: bool = False) -> None:
+    # the key hashes of the records are kept in record_key_hash. A trigger drops the
+    # hash of a record whose data changes and deleted records cascade, so only
+    # records without hash are hashed here.
+    project_id = str(project_id)
+    session.execute(
+        sql_text("SELECT pg_advisory_xact_lock(HASHTEXT(:lock))"),
+        {"lock": f"record_key_hash:{project_id}"},
+    )
+    stored_key_names = session.execute(
+        sql_text(
+            "SELECT key_names FROM record_key_hash_project WHERE project_id = :project_id"
+        ),
+        {"project_id": project_id},
+    ).scalar()
+    if list(stored_key_names or []) != list(key_names):
+        # other key attributes, every stored hash is outdated
+        session.execute(
+            sql_text(
+                """
+                DELETE FROM record_key_hash WHERE project_id = :project_id;
+
+                INSERT INTO record_key_hash_project (project_id, key_names)
+                VALUES (:project_id, :key_names)
+                ON CONFLICT (project_id) DO UPDATE SET key_names = EXCLUDED.key_names;
+                """
+            ),
+            {"project_id": project_id, "key_names": list(key_names)},
+        )
+    bulk_write.copy_rows(
+        "record_key_hash",
+        ["record_id", "project_id", "key_hash"],
+        __hash_missing_records(project_id, key_names),
+    )
+    if with_commit:
+        general.commit()
+
+
+def count_existing(project_id: str, hashes: np.ndarray) -> int:
+    # expects a synced index
+    if not len(hashes):
+        return 0
+    return session.execute(
+        sql_text(
+            """
+            SELECT COUNT(*)
+            FROM record_key_hash
+            WHERE project_id = :project_id AND key_hash = ANY(:hashes)
+            """
+        ),
+        {"project_id": str(project_id), "hashes": __to_signed(hashes).tolist()},
+    ).scalar()
+
+
+def has_duplicates(hashes: np.ndarray) -> bool:
+    return len(np.unique(hashes)) != len(hashes)
+
+
+def __hash_missing_records(
+    project_id: str, key_names: List[str]
+) -> Iterator[Tuple[Any, str, int]]:
+    # hashed partition wise from a server side cursor on the session's connection, so
+    # the hashes removed by sync in the same transaction count as missing
+    columns = ", ".join(f"r.data->>'{__escape(name)}'" for name in key_names)
+    result = (
+        session.connection()
+        .execution_options(stream_results=True)
+        .execute(
+            sql_text(
+                f"""
+                SELECT r.id, {columns}
+                FROM record r
+                LEFT JOIN record_key_hash h ON h.record_id = r.id
+                WHERE r.project_id = :project_id AND h.record_id IS NULL
+                """
+            ),
+            {"project_id": project_id},
+        )
+    )
+    try:
+        for rows in result.partitions(FETCH_SIZE):
+            df = pd.DataFrame([row[1:] for row in rows], columns=key_names)
+            hashes = __to_signed(hash_keys(df, key_names)).tolist()
+            for row, key_hash in zip(rows, hashes):
+                yield row[0], project_id, key_hash
+    finally:
+        result.close()
+
+
+def __hash(values: Tuple[str, ...]) -> int:
+    # the length prefix keeps e.g. ("ab", "c") & ("a", "bc") apart
+    digest = hashlib.blake2b(digest_size=8)
+    for value in values:
+        encoded = str(value).encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "little"))
+        digest.update(encoded)
+    return int.from_bytes(digest.digest(), "little")
+
+
+def __to_key_text(values: pd.Series) -> pd.Series:
+    if values.dtype == bool:
+        return values.map({True: "true", False: "false"})
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype(str)
+    # integral numbers are compared without fraction: an int column with missing
+    # values is read as float, so 1 can be uploaded as 1.0 and stored either way
+    return values.astype(str).str.replace(r"^(-?\d+)\.0+$", r"\1", regex=True)
+
+
+def __to_signed(hashes: np.ndarray) -> np.ndarray:
+    # postgres has no unsigned bigint
+    return hashes.astype(np.uint64).view(np.int64)
+
+
+def __escape(value: str) -> str:
+    return value.replace("'", "''")
@@ -1,13 +1,17 @@
 import os
+import csv
+import io
 import json
-from typing import Any, Optional, Dict
-import zipfile
+import zlib
+from decimal import Decimal
+from typing import Any, Iterator, List, Optional, Dict
 from controller.transfer.knowledge_base_transfer_manager import (
     import_knowledge_base_file,
 )
 from controller.transfer.project_transfer_manager import (
     import_file_by_task,
     get_project_export_dump,
+    write_project_export_archive,
 )
 from controller.upload_task import manager as upload_task_manager
 from controller.transfer.record_transfer_manager import import_file
@@ -25,10 +29,13 @@ from submodules.model.business_objects import general, project
 from controller.upload_task import manager as upload_task_manager
 from submodules.s3 import controller as s3
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
 from util import notification
 from sqlalchemy.sql import text as sql_text
 
+# rows fetched from the server side cursor and written per streamed chunk
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000))
+
 
 def get_upload_credentials_and_id(
     project_id: str,
@@ -120,6 +127,87 @@ def export_records(
         return sql_df.to_json(orient="records")
 
 
+def stream_records(
+    project_id: str,
+    num_samples: Optional[int] = None,
+    user_session_id: Optional[str] = None,
+    file_format: str = "ndjson",
+    compress: bool = False,
+) -> Optional[Iterator[bytes]]:
+    # same data as export_records but rows are streamed chunk wise from a server side
+    # cursor, the full export is never held in memory. None if the project has no
+    # attributes
+    attributes = attribute.get_all_ordered(project_id, True)
+    if not attributes:
+        return None
+
+    final_sql = build_full_record_sql_export(project_id, attributes, user_session_id)
+    chunks = __stream_export_chunks(final_sql, num_samples, file_format)
+    if compress:
+        chunks = __gzip_chunks(chunks)
+    return chunks
+
+
+def __stream_export_chunks(
+    final_sql: str, num_samples: Optional[int], file_format: str
+) -> Iterator[bytes]:
+    # own connection since the request session is already closed while the response streams
+    remaining = int(num_samples) if num_samples is not None else None
+    with general.get_bind().connect() as connection:
+        result = connection.execution_options(stream_results=True).execute(
+            sql_text(final_sql)
+        )
+        columns = list(result.keys())
+        if file_format == "csv":
+            yield __to_csv_chunk([columns])
+        for rows in result.partitions(EXPORT_CHUNK_SIZE):
+            if remaining is not None:
+                rows = rows[:remaining]
+                remaining -= len(rows)
+            if file_format == "csv":
+                yield __to_csv_chunk(
+                    [[__to_csv_value(value) for value in row] for row in rows]
+                )
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=__to_json_value)
+                    + "\n"
+                    for row in rows
+                ).encode("utf-8")
+            if remaining == 0:
+                break
+        result.close()
+
+
+def __gzip_chunks(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def __to_csv_chunk(rows: List[List[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def __to_csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=__to_json_value)
+    return value
+
+
+def __to_json_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
 def export_project(
     project_id: str, user_id: str, export_options: Dict[str, bool]
 ) -> str:
@@ -155,30 +243,21 @@ def prepare_project_export(
     for o in objects:
         s3.delete_object(org_id, o)
 
-    data = get_project_export_dump(project_id, user_id, export_options)
     file_name_base = "project_export_" + datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
     file_name_local = file_name_base + ".zip"
     file_name_download = project_id + "/download/" + file_name_local
-    __write_to_zip(data, file_name_base)
-    s3.upload_object(org_id, file_name_download, file_name_local)
+    try:
+        write_project_export_archive(
+            project_id, user_id, export_options, file_name_local
+        )
+        s3.upload_object(org_id, file_name_download, file_name_local)
+    finally:
+        if os.path.exists(file_name_local):
+            os.remove(file_name_local)
     notification.send_organization_update(project_id, "project_export")
-
-    if os.path.exists(file_name_local):
-        os.remove(file_name_local)
     return True
 
 
-def __write_to_zip(dumped_json: str, base_file_name: str) -> None:
-    with zipfile.ZipFile(
-        base_file_name + ".zip",
-        mode="w",
-        compression=zipfile.ZIP_DEFLATED,
-        compresslevel=9,
-    ) as zip_file:
-        zip_file.writestr(base_file_name + ".json", data=dumped_json)
-        zip_file.testzip()
-
-
 def last_project_export_credentials(project_id: str) -> str:
     org_id = organization.get_id_by_project_id(project_id)
     objects = s3.get_bucket_objects(org_id, project_id + "/download/project_export_")
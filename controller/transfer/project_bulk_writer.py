@@ -0,0 +1,194 @@
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from submodules.model.business_objects import general
+from util import bulk_write
+
+
+def derive_id(project_id: str, old_id: Optional[str]) -> Optional[str]:
+    # new ids of bulk loaded entities are derived from the old ones, so references
+    # between sections are resolved row by row without holding id mappings in memory.
+    # The project id as namespace keeps repeated imports of one export apart.
+    if not old_id:
+        return None
+    return str(uuid.uuid5(uuid.UUID(str(project_id)), str(old_id)))
+
+
+def get_record_ids(project_id: str, old_ids: Iterable[str]) -> Dict[str, str]:
+    # old -> new id for the given ids that belong to an imported record
+    derived_ids = {derive_id(project_id, old_id): old_id for old_id in set(old_ids)}
+    derived_ids.pop(None, None)
+    if not derived_ids:
+        return {}
+    id_list = ", ".join(f"'{new_id}'" for new_id in derived_ids)
+    sql = f"""
+    SELECT id::TEXT
+    FROM record
+    WHERE project_id = '{project_id}' AND id IN ({id_list})
+    """
+    return {derived_ids[row[0]]: row[0] for row in general.execute_all(sql)}
+
+
+def copy_records(project_id: str, rows: Iterable[Dict[str, Any]]) -> int:
+    created_at = datetime.now()
+    return bulk_write.copy_rows(
+        "record",
+        ["id", "project_id", "data", "category", "created_at"],
+        (
+            (
+                derive_id(project_id, row.get("id")),
+                project_id,
+                row.get("data"),
+                row.get("category"),
+                created_at,
+            )
+            for row in rows
+        ),
+    )
+
+
+def copy_record_attribute_token_statistics(
+    project_id: str, rows: Iterable[Dict[str, Any]], attribute_ids: Dict[str, str]
+) -> int:
+    return bulk_write.copy_rows(
+        "record_attribute_token_statistics",
+        ["id", "project_id", "record_id", "attribute_id", "num_token"],
+        (
+            (
+                uuid.uuid4(),
+                project_id,
+                derive_id(project_id, row.get("record_id")),
+                attribute_ids.get(row.get("attribute_id")),
+                row.get("num_token"),
+            )
+            for row in rows
+        ),
+    )
+
+
+def copy_data_slice_record_associations(
+    project_id: str, rows: Iterable[Dict[str, Any]], data_slice_ids: Dict[str, str]
+) -> int:
+    return bulk_write.copy_rows(
+        "data_slice_record_association",
+        ["data_slice_id", "record_id", "project_id", "outlier_score"],
+        (
+            (
+                data_slice_ids.get(row.get("data_slice_id")),
+                derive_id(project_id, row.get("record_id")),
+                project_id,
+                row.get("outlier_score"),
+            )
+            for row in rows
+        ),
+    )
+
+
+def copy_record_label_associations(
+    project_id: str,
+    rows: Iterable[Dict[str, Any]],
+    labeling_task_label_ids: Dict[str, str],
+    information_source_ids: Dict[str, str],
+    weak_supervision_ids: Dict[str, str],
+) -> int:
+    return bulk_write.copy_rows(
+        "record_label_association",
+        [
+            "id",
+            "project_id",
+            "record_id",
+            "labeling_task_label_id",
+            "source_id",
+            "weak_supervision_id",
+            "source_type",
+            "return_type",
+            "confidence",
+            "created_at",
+            "created_by",
+            "is_gold_star",
+            "is_valid_manual_label",
+        ],
+        (
+            (
+                derive_id(project_id, row.get("id")),
+                project_id,
+                derive_id(project_id, row.get("record_id")),
+                labeling_task_label_ids.get(row.get("labeling_task_label_id")),
+                information_source_ids.get(row.get("source_id")),
+                weak_supervision_ids.get(row.get("weak_supervision_id")),
+                row.get("source_type"),
+                row.get("return_type"),
+                row.get("confidence"),
+                row.get("created_at"),
+                row.get("created_by"),
+                row.get("is_gold_star"),
+                row.get("is_valid_manual_label"),
+            )
+            for row in rows
+        ),
+    )
+
+
+def copy_record_label_association_tokens(
+    project_id: str, rows: Iterable[Dict[str, Any]]
+) -> int:
+    return bulk_write.copy_rows(
+        "record_label_association_token",
+        [
+            "id",
+            "project_id",
+            "record_label_association_id",
+            "token_index",
+            "is_beginning_token",
+        ],
+        (
+            (
+                uuid.uuid4(),
+                project_id,
+                derive_id(project_id, row.get("record_label_association_id")),
+                row.get("token_index"),
+                row.get("is_beginning_token"),
+            )
+            for row in rows
+        ),
+    )
+
+
+def copy_embedding_tensors(
+    project_id: str, rows: Iterable[Dict[str, Any]], embedding_ids: Dict[str, str]
+) -> int:
+    return bulk_write.copy_rows(
+        "embedding_tensor",
+        ["id", "project_id", "record_id", "embedding_id", "data"],
+        (
+            (
+                uuid.uuid4(),
+                project_id,
+                derive_id(project_id, row.get("record_id")),
+                embedding_ids.get(row.get("embedding_id")),
+                row.get("data"),
+            )
+            for row in rows
+        ),
+    )
+
+
+def copy_knowledge_terms(
+    project_id: str, rows: Iterable[Dict[str, Any]], knowledge_base_ids: Dict[str, str]
+) -> int:
+    return bulk_write.copy_rows(
+        "knowledge_term",
+        ["id", "project_id", "knowledge_base_id", "value", "comment", "blacklisted"],
+        (
+            (
+                uuid.uuid4(),
+                project_id,
+                knowledge_base_ids.get(row.get("knowledge_base_id")),
+                row.get("value"),
+                row.get("comment"),
+                row.get("blacklisted"),
+            )
+            for row in rows
+        ),
+    )
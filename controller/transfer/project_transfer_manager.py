@@ -3,9 +3,13 @@ import json
 import logging
 import time
 import re
-from typing import Dict, Any, List, Optional
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
 from zipfile import ZipFile
 
+from sqlalchemy.sql import text as sql_text
+
 from submodules.model import enums, UploadTask, Project
 from submodules.model.business_objects import (
     organization,
@@ -19,15 +23,16 @@ from submodules.model.business_objects import (
     record_label_association,
     information_source,
     knowledge_base,
-    record,
     user,
     knowledge_term,
     weak_supervision,
     comments as comment,
 )
 from submodules.model.enums import NotificationType
+from controller.auth import access_cache
 from controller.labeling_access_link import manager as link_manager
-from util import notification
+from controller.transfer import project_bulk_writer
+from util import export_archive, notification
 from util.decorator import param_throttle
 from controller.embedding import manager as embedding_manager
 from util.notification import create_notification
@@ -37,11 +42,111 @@ import os
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# rows fetched per round trip from the server side cursors of streamed export sections
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", 5000))
+
+# order of the sections in the export, project details are stored separately
+EXPORT_SECTIONS = [
+    "records_data",
+    "embeddings_data",
+    "embedding_tensors_data",
+    "attributes_data",
+    "labeling_tasks_data",
+    "labeling_task_labels_data",
+    "information_sources_data",
+    "information_source_payloads_data",
+    "information_source_statistics_data",
+    "record_label_associations_data",
+    "record_label_association_tokens_data",
+    "record_attribute_token_statistics_data",
+    "knowledge_bases_data",
+    "weak_supervision_task_data",
+    "terms_data",
+    "data_slice_data",
+    "data_slice_record_association_data",
+    "comments",
+]
+
+# sections that grow with the record count, read from the archive row by row on import
+STREAMED_SECTIONS = {
+    "records_data",
+    "embedding_tensors_data",
+    "information_source_payloads_data",
+    "record_label_associations_data",
+    "record_label_association_tokens_data",
+    "record_attribute_token_statistics_data",
+    "data_slice_record_association_data",
+}
+
+__UUID_PATTERN = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+)
 
-def extract_first_zip_data(local_file_name: str) -> Dict[str, Any]:
-    zip_file = ZipFile(local_file_name)
-    file_name = zip_file.namelist()[0]
-    return json.loads(zip_file.read(file_name).decode())
+__RECORD_SQL = """
+SELECT id, data, category
+FROM record
+WHERE project_id = '{project_id}'
+"""
+
+__RECORD_LABEL_ASSOCIATION_SQL = """
+SELECT
+    id,
+    source_id,
+    record_id,
+    labeling_task_label_id,
+    source_type,
+    return_type,
+    confidence,
+    is_gold_star,
+    created_by,
+    created_at,
+    weak_supervision_id,
+    is_valid_manual_label
+FROM record_label_association
+WHERE project_id = '{project_id}'
+"""
+
+__RECORD_LABEL_ASSOCIATION_TOKEN_SQL = """
+SELECT record_label_association_id, token_index, is_beginning_token
+FROM record_label_association_token
+WHERE project_id = '{project_id}'
+"""
+
+__DATA_SLICE_RECORD_ASSOCIATION_SQL = """
+SELECT data_slice_id, record_id, outlier_score
+FROM data_slice_record_association
+WHERE project_id = '{project_id}'
+"""
+
+__INFORMATION_SOURCE_PAYLOAD_SQL = """
+SELECT id, source_id, created_at, finished_at, iteration, source_code, logs, state
+FROM information_source_payload
+WHERE project_id = '{project_id}'
+"""
+
+__RECORD_ATTRIBUTE_TOKEN_STATISTICS_SQL = """
+SELECT id, record_id, attribute_id, num_token
+FROM record_attribute_token_statistics
+WHERE project_id = '{project_id}'
+"""
+
+__EMBEDDING_TENSOR_SQL = """
+SELECT embedding_id, record_id, data
+FROM embedding_tensor
+WHERE project_id = '{project_id}'
+"""
+
+
+@contextmanager
+def open_export_file(local_file_name: str) -> Iterator[Any]:
+    # archives of write_project_export_archive are read section wise while importing,
+    # older exports hold the full json in the first zip entry
+    with ZipFile(local_file_name) as zip_file:
+        if export_archive.is_archive(zip_file):
+            yield export_archive.ArchiveData(zip_file, STREAMED_SECTIONS)
+        else:
+            file_name = zip_file.namelist()[0]
+            yield json.loads(zip_file.read(file_name).decode())
 
 
 def import_file_by_task(project_id: str, task: UploadTask) -> None:
@@ -57,14 +162,17 @@ def import_file_by_task(project_id: str, task: UploadTask) -> None:
         file_name = s3.download_object(
             org_id, project_id + "/" + f"{task.id}/{task.file_name}", "zip"
         )
-        data = extract_first_zip_data(file_name)
-        if os.path.exists(file_name):
-            os.remove(file_name)
+        try:
+            with open_export_file(file_name) as data:
+                import_file(project_id, task.user_id, data, str(task.id))
+        finally:
+            if os.path.exists(file_name):
+                os.remove(file_name)
     else:
         data = json.loads(
             s3.get_object(org_id, project_id + "/" + f"{task.id}/{task.file_name}")
         )
-    import_file(project_id, task.user_id, data, str(task.id))
+        import_file(project_id, task.user_id, data, str(task.id))
     task.state = enums.UploadStates.DONE.value
     task.progress = 100
     general.commit()
@@ -120,8 +228,8 @@ def import_sample_project(
         notification.send_organization_update(
             project_item.id, f"project_update:{str(project_item.id)}", is_global=True
         )
-        data = extract_first_zip_data(file_name)
-        import_file(project_item.id, user_id, data)
+        with open_export_file(file_name) as data:
+            import_file(project_item.id, user_id, data)
 
         general.commit()
 
@@ -143,9 +251,13 @@ def import_file(
 ) -> None:
     """Imports data for a project. Loads a file form s3-storage into
     JSON format, extracts data and writes it to according database tables.
+    data can also be an export archive (see open_export_file) so big sections are
+    iterated row by row instead of being loaded at once.
     Dictionaries are used to match old ids to new ids for linking entities
-    according to the old project. Please take note that this handler
-    may needs regular refactoring in case of database model changes.
+    according to the old project. Sections that grow with the record count are
+    written with COPY instead, their new ids are derived from the old ones.
+    Please take note that this handler may needs regular refactoring in case of
+    database model changes.
     """
     send_progress_update_throttle(project_id, task_id, 0)
     project_item = project.get(project_id)
@@ -332,44 +444,14 @@ def import_file(
 
     send_progress_update_throttle(project_id, task_id, 40)
 
-    record_ids = {}
-    for record_item in data.get(
-        "records_data",
-    ):
-        record_object = record.create(
-            record_data=record_item.get(
-                "data",
-            ),
-            category=record_item.get(
-                "category",
-            ),
-            project_id=project_id,
-        )
-        record_ids[
-            record_item.get(
-                "id",
-            )
-        ] = record_object.id
-
-    for record_attribute_token_statistics_item in data.get(
-        "record_attribute_token_statistics_data",
-    ):
-        record.create_record_attribute_token_statistics(
-            project_id=project_id,
-            record_id=record_ids.get(
-                record_attribute_token_statistics_item.get(
-                    "record_id",
-                )
-            ),
-            attribute_id=attribute_ids_by_old_id.get(
-                record_attribute_token_statistics_item.get(
-                    "attribute_id",
-                )
-            ),
-            num_token=record_attribute_token_statistics_item.get(
-                "num_token",
-            ),
-        )
+    # big sections are written with COPY, their ids are derived from the old ones
+    general.flush()
+    project_bulk_writer.copy_records(project_id, data.get("records_data"))
+    project_bulk_writer.copy_record_attribute_token_statistics(
+        project_id,
+        data.get("record_attribute_token_statistics_data"),
+        attribute_ids_by_old_id,
+    )
 
     send_progress_update_throttle(project_id, task_id, 50)
 
@@ -407,6 +489,11 @@ def import_file(
                 # currently without organization to know they are imported/dummy -- maybe there is a better solution?
                 user.create(user_id=user_id)
 
+    # only the records referenced by slice filters & comments need their new id here
+    record_ids = project_bulk_writer.get_record_ids(
+        project_id,
+        __get_referenced_record_ids(data.get("data_slice_data"), data.get("comments")),
+    )
     data_slice_ids = {}
     if data.get(
         "data_slice_data",
@@ -567,31 +654,17 @@ def import_file(
     if data.get(
         "data_slice_record_association_data",
     ):
-        for data_slice_record_association_item in data.get(
-            "data_slice_record_association_data",
-        ):
-            data_slice.create_association(
-                data_slice_id=data_slice_ids.get(
-                    data_slice_record_association_item.get(
-                        "data_slice_id",
-                    )
-                ),
-                record_id=record_ids.get(
-                    data_slice_record_association_item.get(
-                        "record_id",
-                    )
-                ),
-                project_id=project_id,
-                outlier_score=data_slice_record_association_item.get(
-                    "outlier_score",
-                ),
-            )
+        project_bulk_writer.copy_data_slice_record_associations(
+            project_id,
+            data.get("data_slice_record_association_data"),
+            data_slice_ids,
+        )
 
+    embedding_ids = {}
     if data.get(
         "embedding_tensors_data",
     ):
         # if tensor data exists use that otherwise recreate embedding
-        embedding_ids = {}
         for embedding_item in data.get(
             "embeddings_data",
         ):
@@ -624,26 +697,6 @@ def import_file(
                 )
             ] = embedding_object.id
 
-        for embedding_tensor_item in data.get(
-            "embedding_tensors_data",
-        ):
-            embedding.create_tensor(
-                project_id=project_id,
-                record_id=record_ids.get(
-                    embedding_tensor_item.get(
-                        "record_id",
-                    )
-                ),
-                embedding_id=embedding_ids.get(
-                    embedding_tensor_item.get(
-                        "embedding_id",
-                    )
-                ),
-                data=embedding_tensor_item.get(
-                    "data",
-                ),
-            )
-
     weak_supervision_ids = {}
     if data.get("weak_supervision_task_data"):
         for weak_supervision_item in data.get("weak_supervision_task_data"):
@@ -669,75 +722,19 @@ def import_file(
     send_progress_update_throttle(project_id, task_id, 80)
 
     # add rlas
-    record_label_association_ids = {}
-    for record_label_association_item in data.get(
-        "record_label_associations_data",
-    ):
-        association = record_label_association.create(
-            project_id=project_id,
-            record_id=record_ids.get(
-                record_label_association_item.get(
-                    "record_id",
-                )
-            ),
-            labeling_task_label_id=labeling_task_labels_ids.get(
-                record_label_association_item.get("labeling_task_label_id")
-            ),
-            created_by=record_label_association_item.get(
-                "created_by",
-            ),
-            source_type=record_label_association_item.get(
-                "source_type",
-            ),
-            return_type=record_label_association_item.get(
-                "return_type",
-            ),
-            is_gold_star=record_label_association_item.get(
-                "is_gold_star",
-            ),
-            source_id=information_source_ids.get(
-                record_label_association_item.get(
-                    "source_id",
-                )
-            ),
-            confidence=record_label_association_item.get(
-                "confidence",
-            ),
-            created_at=record_label_association_item.get(
-                "created_at",
-            ),
-            weak_supervision_id=weak_supervision_ids.get(
-                record_label_association_item.get("weak_supervision_id")
-            ),
-            is_valid_manual_label=record_label_association_item.get(
-                "is_valid_manual_label"
-            ),
-        )
-
-        record_label_association_ids[
-            record_label_association_item.get(
-                "id",
-            )
-        ] = association.id
+    general.flush()
+    project_bulk_writer.copy_record_label_associations(
+        project_id,
+        data.get("record_label_associations_data"),
+        labeling_task_labels_ids,
+        information_source_ids,
+        weak_supervision_ids,
+    )
 
     send_progress_update_throttle(project_id, task_id, 90)
-    for token_item in data.get(
-        "record_label_association_tokens_data",
-    ):
-        record_label_association.import_token_object(
-            project_id=project_id,
-            record_label_association_id=record_label_association_ids.get(
-                token_item.get(
-                    "record_label_association_id",
-                )
-            ),
-            token_index=token_item.get(
-                "token_index",
-            ),
-            is_beginning_token=token_item.get(
-                "is_beginning_token",
-            ),
-        )
+    project_bulk_writer.copy_record_label_association_tokens(
+        project_id, data.get("record_label_association_tokens_data")
+    )
 
     send_progress_update_throttle(project_id, task_id, 99)
     knowledge_base_ids = {}
@@ -759,62 +756,30 @@ def import_file(
             )
         ] = knowledge_base_object.id
 
-    for term_item in data.get(
-        "terms_data",
-    ):
-        knowledge_term.create(
-            project_id=project_id,
-            knowledge_base_id=knowledge_base_ids.get(
-                term_item.get(
-                    "knowledge_base_id",
-                )
-            ),
-            value=term_item.get(
-                "value",
-            ),
-            comment=term_item.get(
-                "comment",
-            ),
-            blacklisted=term_item.get(
-                "blacklisted",
-            ),
-        )
-    comment_data = data.get("comments")
-    if comment_data:
-        for comment_item in comment_data:
-            old_xfkey = comment_item.get("xfkey")
-            new_xfkey = None
-            xftype = comment_item.get("xftype")
-            if xftype == enums.CommentCategory.RECORD.value:
-                new_xfkey = record_ids.get(old_xfkey)
-            if xftype == enums.CommentCategory.LABELING_TASK.value:
-                new_xfkey = labeling_task_ids.get(old_xfkey)
-            if xftype == enums.CommentCategory.ATTRIBUTE.value:
-                new_xfkey = attribute_ids_by_old_id.get(old_xfkey)
-            if xftype == enums.CommentCategory.LABEL.value:
-                new_xfkey = labeling_task_labels_ids.get(old_xfkey)
-            if xftype == enums.CommentCategory.DATA_SLICE.value:
-                new_xfkey = data_slice_ids.get(old_xfkey)
-            if xftype == enums.CommentCategory.EMBEDDING.value:
-                new_xfkey = embedding_ids.get(old_xfkey)
-            if xftype == enums.CommentCategory.HEURISTIC.value:
-                new_xfkey = information_source_ids.get(old_xfkey)
-            if xftype == enums.CommentCategory.KNOWLEDGE_BASE.value:
-                new_xfkey = knowledge_base_ids.get(old_xfkey)
-            if not new_xfkey:
-                continue
-
-            comment.create(
-                xfkey=new_xfkey,
-                xftype=comment_item.get("xftype"),
-                comment=comment_item.get("comment"),
-                created_by=import_user_id,
-                project_id=project_id,
-                order_key=comment_item.get("order_key"),
-                is_markdown=comment_item.get("is_markdown"),
-                created_at=comment_item.get("created_at"),
-                is_private=comment_item.get("is_private"),
-            )
+    # the big sections are written in the import transaction as well, a failing
+    # section rolls back the whole import instead of leaving a half imported project
+    general.flush()
+    project_bulk_writer.copy_embedding_tensors(
+        project_id, data.get("embedding_tensors_data") or [], embedding_ids
+    )
+    project_bulk_writer.copy_knowledge_terms(
+        project_id, data.get("terms_data"), knowledge_base_ids
+    )
+    __import_comments(
+        project_id,
+        import_user_id,
+        data.get("comments") or [],
+        {
+            enums.CommentCategory.RECORD.value: record_ids,
+            enums.CommentCategory.LABELING_TASK.value: labeling_task_ids,
+            enums.CommentCategory.ATTRIBUTE.value: attribute_ids_by_old_id,
+            enums.CommentCategory.LABEL.value: labeling_task_labels_ids,
+            enums.CommentCategory.DATA_SLICE.value: data_slice_ids,
+            enums.CommentCategory.EMBEDDING.value: embedding_ids,
+            enums.CommentCategory.HEURISTIC.value: information_source_ids,
+            enums.CommentCategory.KNOWLEDGE_BASE.value: knowledge_base_ids,
+        },
+    )
 
     general.commit()
 
@@ -843,9 +808,37 @@ def get_project_export_dump(
     project_id: str, user_id: str, export_options: Dict[str, bool]
 ) -> str:
     """Exports data of a project in JSON-String format. Queries all useful database entries and
-    puts them in a format which again fits for import. For some entities database joins
-    are useful, so there are vanilla SQL statements in execute-blocks.
-    Please take note that this handler may needs regular refactoring in case of database model changes.
+    puts them in a format which again fits for import. For big projects use
+    write_project_export_archive since this holds the full dump in memory.
+    """
+    header, sections = __get_export_sections(project_id, user_id, export_options)
+    project_data = {**header}
+    for name, rows, _ in sections:
+        project_data[name] = list(rows())
+    logger.info(f"Finished export of project {project_id}")
+    return json.dumps(project_data, default=str)
+
+
+def write_project_export_archive(
+    project_id: str, user_id: str, export_options: Dict[str, bool], file_name: str
+) -> None:
+    """Writes the export as zip archive with one entry per entity section. Big sections
+    are read with server side cursors and written while they are fetched.
+    """
+    header, sections = __get_export_sections(project_id, user_id, export_options)
+    export_archive.write_archive(file_name, header, sections)
+    logger.info(f"Finished export of project {project_id}")
+
+
+def __get_export_sections(
+    project_id: str, user_id: str, export_options: Dict[str, bool]
+) -> Tuple[Dict[str, Any], List[export_archive.Section]]:
+    """Queries all useful database entries and puts them in a format which again fits
+    for import. Entities that grow with the record count are streamed from vanilla SQL
+    statements on an own connection (so they can be fetched in parallel), everything
+    else is read by SQLAlchemy.
+    Please take note that this handler may needs regular refactoring in case of
+    database model changes.
     """
 
     logger.info(f"Started export of project {project_id}")
@@ -855,20 +848,14 @@ def get_project_export_dump(
     labeling_tasks = []
     labeling_task_labels = []
     data_slices = []
-    data_slice_record_association = []
-    records = []
-    record_attribute_token_statistics = []
     embeddings = []
-    embedding_tensors = []
     information_sources = []
     information_source_statistics = []
-    information_source_payloads = []
-    record_label_associations = []
-    record_label_association_tokens = []
     knowledge_bases = []
     weak_supervision_task = []
     terms = []
     comments = []
+    streamed = {}
     # -------------------- READ OF ENTITIES BY SQLALCHEMY --------------------
 
     if "basic project data" in export_options:
@@ -876,26 +863,36 @@ def get_project_export_dump(
         labeling_tasks = labeling_task.get_all(project_id)
         labeling_task_labels = labeling_task_label.get_all(project_id)
         data_slices = data_slice.get_all(project_id)
-        data_slice_record_association = data_slice.get_all_associations(project_id)
+        streamed["data_slice_record_association_data"] = (
+            __DATA_SLICE_RECORD_ASSOCIATION_SQL,
+            __format_data_slice_record_association,
+        )
 
     if "records" in export_options:
-        records = record.get_all(project_id)
+        streamed["records_data"] = (__RECORD_SQL, __format_record)
         if "record attribute token statistics" in export_options:
-            record_attribute_token_statistics = (
-                record.get_token_statistics_by_project_id(project_id)
+            streamed["record_attribute_token_statistics_data"] = (
+                __RECORD_ATTRIBUTE_TOKEN_STATISTICS_SQL,
+                __format_record_attribute_token_statistic,
             )
         # without records embeddings are useless
         if "embeddings" in export_options:
             embeddings = embedding.get_finished_embeddings(project_id)
             # no need for tensors if no embeddings are exported
             if "embedding tensors" in export_options:
-                embedding_tensors = embedding.get_tensors_by_project_id(project_id)
+                streamed["embedding_tensors_data"] = (
+                    __EMBEDDING_TENSOR_SQL,
+                    __format_embedding_tensor,
+                )
         # without records associations are useless
         if "record label associations" in export_options:
-            record_label_associations = record_label_association.get_all(project_id)
-
-            record_label_association_tokens = record_label_association.get_tokens(
-                project_id
+            streamed["record_label_associations_data"] = (
+                __RECORD_LABEL_ASSOCIATION_SQL,
+                __format_record_label_association,
+            )
+            streamed["record_label_association_tokens_data"] = (
+                __RECORD_LABEL_ASSOCIATION_TOKEN_SQL,
+                __format_record_label_association_token,
             )
             weak_supervision_task = weak_supervision.get_all(project_id)
 
@@ -906,8 +903,9 @@ def get_project_export_dump(
         )
         # no need for payload if no information sources are exported
         if "information sources payloads" in export_options:
-            information_source_payloads = information_source.get_payloads_by_project_id(
-                project_id
+            streamed["information_source_payloads_data"] = (
+                __INFORMATION_SOURCE_PAYLOAD_SQL,
+                __format_information_source_payload,
             )
 
     if "knowledge bases" in export_options:
@@ -955,15 +953,6 @@ def get_project_export_dump(
         "status": project_item.status,
     }
 
-    records_data = [
-        {
-            "id": str(record_item.id),
-            "data": record_item.data,
-            "category": record_item.category,
-        }
-        for record_item in records
-    ]
-
     attributes_data = [
         {
             "id": str(attribute_item.id),
@@ -1017,26 +1006,6 @@ def get_project_export_dump(
         for information_source_item in information_sources
     ]
 
-    record_label_associations_data = [
-        {
-            "id": str(record_label_association_item.id),
-            "source_id": str(record_label_association_item.source_id),
-            "record_id": str(record_label_association_item.record_id),
-            "labeling_task_label_id": str(
-                record_label_association_item.labeling_task_label_id
-            ),
-            "source_type": record_label_association_item.source_type,
-            "return_type": record_label_association_item.return_type,
-            "confidence": record_label_association_item.confidence,
-            "is_gold_star": record_label_association_item.is_gold_star,
-            "created_by": record_label_association_item.created_by,
-            "created_at": record_label_association_item.created_at,
-            "weak_supervision_id": record_label_association_item.weak_supervision_id,
-            "is_valid_manual_label": record_label_association_item.is_valid_manual_label,
-        }
-        for record_label_association_item in record_label_associations
-    ]
-
     weak_supervision_task_data = [
         {
             "id": str(row.id),
@@ -1089,43 +1058,9 @@ def get_project_export_dump(
         for slice_item in data_slices
     ]
 
-    data_slice_record_association_data = [
-        {
-            "data_slice_id": association_item.data_slice_id,
-            "record_id": association_item.record_id,
-            "outlier_score": association_item.outlier_score,
-        }
-        for association_item in data_slice_record_association
-    ]
-
     # no need to format since db reteurns as json :)
     comment_data = comments
 
-    # -------------------- READ AND FORMATTING OF ENTITIES WITH SQL JOINS --------------------
-
-    record_label_association_tokens_data = [
-        {
-            "record_label_association_id": str(record_label_association_token_item[0]),
-            "token_index": record_label_association_token_item[1],
-            "is_beginning_token": record_label_association_token_item[2],
-        }
-        for record_label_association_token_item in record_label_association_tokens
-    ]
-
-    information_source_payloads_data = [
-        {
-            "id": str(payload_item[0]),
-            "source_id": str(payload_item[1]),
-            "created_at": payload_item[2],
-            "finished_at": payload_item[3],
-            "iteration": payload_item[4],
-            "source_code": payload_item[5],
-            "logs": payload_item[6],
-            "state": payload_item[7],
-        }
-        for payload_item in information_source_payloads
-    ]
-
     information_source_statistics_data = [
         {
             "id": str(statistic_item.id),
@@ -1142,16 +1077,6 @@ def get_project_export_dump(
         for statistic_item in information_source_statistics
     ]
 
-    record_attribute_token_statistics_data = [
-        {
-            "id": str(statistic_item[0]),
-            "record_id": str(statistic_item[1]),
-            "attribute_id": str(statistic_item[2]),
-            "num_token": statistic_item[3],
-        }
-        for statistic_item in record_attribute_token_statistics
-    ]
-
     terms_data = [
         {
             "knowledge_base_id": str(term_item[0]),
@@ -1162,45 +1087,120 @@ def get_project_export_dump(
         for term_item in terms
     ]
 
-    embedding_tensors_data = [
-        {
-            "embedding_id": str(embedding_tensor_item[0]),
-            "record_id": str(embedding_tensor_item[1]),
-            "data": embedding_tensor_item[2],
-        }
-        for embedding_tensor_item in embedding_tensors
-    ]
-
     # -------------------- EXPORT --------------------
-    project_data = {
-        "project_details_data": project_details_data,
-        "records_data": records_data,
+    header = {"project_details_data": project_details_data}
+    loaded = {
         "embeddings_data": embeddings_data,
-        "embedding_tensors_data": embedding_tensors_data,
         "attributes_data": attributes_data,
         "labeling_tasks_data": labeling_tasks_data,
         "labeling_task_labels_data": labeling_task_labels_data,
         "information_sources_data": information_sources_data,
-        "information_source_payloads_data": information_source_payloads_data,
         "information_source_statistics_data": information_source_statistics_data,
-        "record_label_associations_data": record_label_associations_data,
-        "record_label_association_tokens_data": record_label_association_tokens_data,
-        "record_attribute_token_statistics_data": record_attribute_token_statistics_data,
         "knowledge_bases_data": knowledge_bases_data,
         "weak_supervision_task_data": weak_supervision_task_data,
         "terms_data": terms_data,
         "data_slice_data": data_slice_data,
-        "data_slice_record_association_data": data_slice_record_association_data,
         "comments": comment_data,
     }
+    sections = []
+    for name in EXPORT_SECTIONS:
+        if name in streamed:
+            sql, format_row = streamed[name]
+            rows = partial(__stream_rows, sql.format(project_id=project_id), format_row)
+            sections.append((name, rows, True))
+        else:
+            sections.append((name, partial(iter, loaded.get(name, [])), False))
+    return header, sections
+
+
+def __stream_rows(
+    sql: str, format_row: Callable[[Any], Dict[str, Any]]
+) -> Iterator[Dict[str, Any]]:
+    # own connection so the section can be fetched outside of the request session
+    with general.get_bind().connect() as connection:
+        result = connection.execution_options(stream_results=True).execute(
+            sql_text(sql)
+        )
+        for rows in result.partitions(EXPORT_FETCH_SIZE):
+            for row in rows:
+                yield format_row(row)
+        result.close()
 
-    logger.info(f"Finished export of project {project_id}")
 
-    return json.dumps(project_data, default=str)
+def __format_record(row: Any) -> Dict[str, Any]:
+    return {
+        "id": str(row.id),
+        "data": row.data,
+        "category": row.category,
+    }
+
+
+def __format_record_label_association(row: Any) -> Dict[str, Any]:
+    return {
+        "id": str(row.id),
+        "source_id": str(row.source_id),
+        "record_id": str(row.record_id),
+        "labeling_task_label_id": str(row.labeling_task_label_id),
+        "source_type": row.source_type,
+        "return_type": row.return_type,
+        "confidence": row.confidence,
+        "is_gold_star": row.is_gold_star,
+        "created_by": row.created_by,
+        "created_at": row.created_at,
+        "weak_supervision_id": row.weak_supervision_id,
+        "is_valid_manual_label": row.is_valid_manual_label,
+    }
+
+
+def __format_record_label_association_token(row: Any) -> Dict[str, Any]:
+    return {
+        "record_label_association_id": str(row.record_label_association_id),
+        "token_index": row.token_index,
+        "is_beginning_token": row.is_beginning_token,
+    }
+
+
+def __format_data_slice_record_association(row: Any) -> Dict[str, Any]:
+    return {
+        "data_slice_id": row.data_slice_id,
+        "record_id": row.record_id,
+        "outlier_score": row.outlier_score,
+    }
+
+
+def __format_information_source_payload(row: Any) -> Dict[str, Any]:
+    return {
+        "id": str(row.id),
+        "source_id": str(row.source_id),
+        "created_at": row.created_at,
+        "finished_at": row.finished_at,
+        "iteration": row.iteration,
+        "source_code": row.source_code,
+        "logs": row.logs,
+        "state": row.state,
+    }
+
+
+def __format_record_attribute_token_statistic(row: Any) -> Dict[str, Any]:
+    return {
+        "id": str(row.id),
+        "record_id": str(row.record_id),
+        "attribute_id": str(row.attribute_id),
+        "num_token": row.num_token,
+    }
+
+
+def __format_embedding_tensor(row: Any) -> Dict[str, Any]:
+    return {
+        "embedding_id": str(row.embedding_id),
+        "record_id": str(row.record_id),
+        "data": row.data,
+    }
 
 
 def delete_project(project_id: str) -> bool:
     project.delete_by_id(project_id, with_commit=True)
+    access_cache.invalidate_project(project_id)
     return True
 
 
@@ -1211,6 +1211,47 @@ def replace_by_mappings(text: str, mappings: List[Dict[str, str]]) -> str:
     return text
 
 
+def __get_referenced_record_ids(
+    data_slice_items: Optional[List[Dict[str, Any]]],
+    comment_items: Optional[List[Dict[str, Any]]],
+) -> List[str]:
+    # candidates only, ids of other entities are filtered out by get_record_ids
+    referenced_ids = []
+    for data_slice_item in data_slice_items or []:
+        for key in ["filter_data", "count_sql", "filter_raw"]:
+            referenced_ids += __UUID_PATTERN.findall(str(data_slice_item.get(key)))
+    for comment_item in comment_items or []:
+        if comment_item.get("xftype") == enums.CommentCategory.RECORD.value:
+            referenced_ids.append(comment_item.get("xfkey"))
+    return referenced_ids
+
+
+def __import_comments(
+    project_id: str,
+    import_user_id: str,
+    comment_items: List[Dict[str, Any]],
+    ids_by_category: Dict[str, Dict[str, str]],
+) -> None:
+    for comment_item in comment_items:
+        xftype = comment_item.get("xftype")
+        new_xfkey = ids_by_category.get(xftype, {}).get(comment_item.get("xfkey"))
+        if not new_xfkey:
+            continue
+
+        comment.create(
+            xfkey=new_xfkey,
+            xftype=xftype,
+            comment=comment_item.get("comment"),
+            created_by=import_user_id,
+            project_id=project_id,
+            order_key=comment_item.get("order_key"),
+            is_markdown=comment_item.get("is_markdown"),
+            created_at=comment_item.get("created_at"),
+            is_private=comment_item.get("is_private"),
+            with_commit=False,
+        )
+
+
 @param_throttle(seconds=2)
 def send_progress_update_throttle(project_id: str, task_id: str, value: float) -> None:
     send_progress_update(project_id, task_id, value)
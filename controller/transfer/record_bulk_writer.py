@@ -0,0 +1,212 @@
+import json
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.sql import text as sql_text
+
+from submodules.model import enums
+from submodules.model.session import session
+from util import bulk_write
+
+__RECORD_TABLE = "tmp_import_record"
+__LABEL_TABLE = "tmp_import_label"
+
+
+def write_records_and_labels(
+    project_id: str,
+    user_id: str,
+    records_data: List[Dict[str, Any]],
+    labels_data: List[Dict[str, Any]],
+    category: str,
+    primary_key_names: List[str],
+) -> Tuple[int, int]:
+    """Set based version of import_records_and_rlas_pipeline. The chunk is staged with
+    COPY in temp tables, records matching an existing composite key are updated with
+    one UPDATE ... FROM, the others inserted with one INSERT ... SELECT. Labels are
+    resolved to label ids in the same way. Returns the number of created & updated
+    records.
+    """
+    __create_staging_tables()
+    bulk_write.copy_rows(
+        __RECORD_TABLE,
+        ["idx", "id", "data"],
+        (
+            (idx, uuid.uuid4(), json.dumps(record_data, default=str))
+            for idx, record_data in enumerate(records_data)
+        ),
+    )
+    bulk_write.copy_rows(
+        __LABEL_TABLE,
+        ["idx", "id", "task_name", "label_name"],
+        (
+            (idx, uuid.uuid4(), task_name, str(label_name))
+            for idx, label_data in enumerate(labels_data)
+            for task_name, label_name in label_data.items()
+        ),
+    )
+
+    # temp tables aren't analyzed by autovacuum, without statistics the joins below
+    # are planned for empty tables
+    __execute(f"ANALYZE {__RECORD_TABLE}; ANALYZE {__LABEL_TABLE};")
+
+    parameters = {
+        "project_id": str(project_id),
+        "user_id": str(user_id),
+        "category": category,
+        "source_type": enums.LabelSource.MANUAL.value,
+        "return_type": enums.InformationSourceReturnType.RETURN.value,
+    }
+    updated = 0
+    if primary_key_names:
+        updated = __update_existing_records(parameters, primary_key_names)
+    __execute(
+        f"""
+        INSERT INTO record (id, project_id, data, category)
+        SELECT t.id, :project_id, t.data, :category
+        FROM {__RECORD_TABLE} t
+        WHERE t.record_id IS NULL;
+
+        UPDATE {__RECORD_TABLE} SET record_id = id WHERE record_id IS NULL;
+        """,
+        parameters,
+    )
+    if updated:
+        __delete_outdated_record_data(parameters)
+    __insert_record_label_associations(parameters)
+    __execute(f"DROP TABLE {__RECORD_TABLE}; DROP TABLE {__LABEL_TABLE};")
+    return len(records_data) - updated, updated
+
+
+def __create_staging_tables() -> None:
+    # temp tables live in the import transaction only
+    __execute(
+        f"""
+        DROP TABLE IF EXISTS {__RECORD_TABLE};
+        DROP TABLE IF EXISTS {__LABEL_TABLE};
+        CREATE TEMP TABLE {__RECORD_TABLE} (
+            idx INTEGER PRIMARY KEY,
+            id UUID NOT NULL,
+            data JSON NOT NULL,
+            record_id UUID,
+            updated BOOLEAN NOT NULL DEFAULT FALSE
+        ) ON COMMIT DROP;
+        CREATE TEMP TABLE {__LABEL_TABLE} (
+            idx INTEGER NOT NULL,
+            id UUID NOT NULL,
+            task_name TEXT NOT NULL,
+            label_name TEXT NOT NULL
+        ) ON COMMIT DROP;
+        """
+    )
+
+
+def __update_existing_records(
+    parameters: Dict[str, Any], primary_key_names: List[str]
+) -> int:
+    # ->> on both sides so the keys are compared in the same text representation.
+    # data is staged as json like record.data, so the key order of the upload is kept
+    key_parameters = {f"key_{idx}": name for idx, name in enumerate(primary_key_names)}
+    key_conditions = " AND ".join(
+        f"r.data->>:{key} = t.data->>:{key}" for key in key_parameters
+    )
+    __execute(
+        f"""
+        WITH updated_records AS (
+            UPDATE record r
+            SET data = t.data
+            FROM {__RECORD_TABLE} t
+            WHERE r.project_id = :project_id
+                AND r.category = :category
+                AND {key_conditions}
+            RETURNING r.id, t.idx
+        )
+        UPDATE {__RECORD_TABLE} t
+        SET record_id = u.id, updated = TRUE
+        FROM updated_records u
+        WHERE t.idx = u.idx
+        """,
+        {**parameters, **key_parameters},
+    )
+    # the statistics of updated & record_id are outdated now
+    __execute(f"ANALYZE {__RECORD_TABLE}")
+    count_sql = f"SELECT COUNT(*) FROM {__RECORD_TABLE} WHERE updated"
+    return __execute(count_sql).scalar()
+
+
+def __delete_outdated_record_data(parameters: Dict[str, Any]) -> None:
+    # new data of updated records invalidates their tokenization & manual labels of
+    # the tasks that are part of the upload
+    __execute(
+        f"""
+        DELETE FROM record_attribute_token_statistics s
+        USING {__RECORD_TABLE} t
+        WHERE t.updated
+            AND s.project_id = :project_id
+            AND s.record_id = t.record_id;
+
+        DELETE FROM record_tokenized rt
+        USING {__RECORD_TABLE} t
+        WHERE t.updated
+            AND rt.project_id = :project_id
+            AND rt.record_id = t.record_id;
+
+        DELETE FROM record_label_association rla
+        USING (
+            -- kept apart so the labels are matched on record & label at once, not
+            -- on the few task names first
+            SELECT DISTINCT t.record_id, ltl.id labeling_task_label_id
+            FROM {__RECORD_TABLE} t
+            INNER JOIN {__LABEL_TABLE} l
+                ON l.idx = t.idx
+            INNER JOIN labeling_task lt
+                ON lt.project_id = :project_id AND lt.name = l.task_name
+            INNER JOIN labeling_task_label ltl
+                ON ltl.labeling_task_id = lt.id
+            WHERE t.updated
+        ) outdated
+        WHERE rla.project_id = :project_id
+            AND rla.record_id = outdated.record_id
+            AND rla.labeling_task_label_id = outdated.labeling_task_label_id
+            AND rla.source_type = :source_type;
+        """,
+        parameters,
+    )
+
+
+def __insert_record_label_associations(parameters: Dict[str, Any]) -> None:
+    __execute(
+        f"""
+        INSERT INTO record_label_association (
+            id,
+            project_id,
+            record_id,
+            labeling_task_label_id,
+            source_type,
+            return_type,
+            created_by,
+            created_at
+        )
+        SELECT
+            l.id,
+            :project_id,
+            t.record_id,
+            ltl.id,
+            :source_type,
+            :return_type,
+            :user_id,
+            NOW()
+        FROM {__LABEL_TABLE} l
+        INNER JOIN {__RECORD_TABLE} t
+            ON t.idx = l.idx
+        INNER JOIN labeling_task lt
+            ON lt.project_id = :project_id AND lt.name = l.task_name
+        INNER JOIN labeling_task_label ltl
+            ON ltl.labeling_task_id = lt.id AND ltl.name = l.label_name
+        """,
+        parameters,
+    )
+
+
+def __execute(sql: str, parameters: Optional[Dict[str, Any]] = None) -> Any:
+    # values are bound, only the staging table names are part of the statement
+    return session.execute(sql_text(sql), parameters or {})
@@ -1,5 +1,10 @@
 import logging
-from typing import Dict, Any, Optional, Tuple, List
+import os
+import queue
+import threading
+import timeit
+from typing import Dict, Any, Iterable, Optional, Tuple, List
+from zipfile import ZipFile
 
 import pandas as pd
 
@@ -22,14 +27,21 @@ from controller.tokenization import manager as token_manager
 from util import doc_ock
 from submodules.s3 import controller as s3
 from submodules.model import enums, events, UploadTask, Attribute
-from util import category
+from util import category, daemon
 from util import notification
-from controller.transfer.util import convert_to_record_dict
+from controller.transfer import record_bulk_writer
+from controller.transfer.util import convert_to_record_chunks
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
-import os
-from zipfile import ZipFile
+
+# parsed chunks waiting for the db writer, bounds the memory the parser can run ahead
+IMPORT_QUEUE_SIZE = int(os.getenv("RECORD_IMPORT_QUEUE_SIZE", 4))
+# records & labels are written with COPY & set based statements instead of the orm,
+# see tests/test_record_bulk_writer.py
+USE_BULK_WRITE = os.getenv("RECORD_IMPORT_BULK_WRITE", "true") == "true"
+# records per chunk written by the bulk writer
+BULK_CHUNK_SIZE = int(os.getenv("RECORD_IMPORT_BULK_CHUNK_SIZE", 5000))
 
 
 def extract_first_zip_file(local_file_name: str) -> Dict[str, Any]:
@@ -42,50 +54,110 @@ def extract_first_zip_file(local_file_name: str) -> Dict[str, Any]:
 def import_records_and_rlas(
     project_id: str,
     user_id: str,
-    data: List,
+    chunks: Iterable[Tuple[List[Dict[str, Any]], float]],
     upload_task: Optional[UploadTask] = None,
     record_category: str = enums.RecordCategory.SCALE.value,
 ):
-    CHUNK_SIZE = 500
-    chunks = [data[x : x + CHUNK_SIZE] for x in range(0, len(data), CHUNK_SIZE)]
-    chunks_count = len(chunks)
-    for idx, chunk in enumerate(chunks):
-        if upload_task is not None:
-            logger.debug(
-                upload_task_manager.get_upload_task_message(
-                    upload_task,
-                    additional_information=f"--- START CHUNK #{idx} ---",
+    # chunks hold the records and the task progress reached once they are imported.
+    # They are read & split in a background thread while this thread (and its db
+    # session) writes the previous ones, the queue limits how far the parser runs ahead
+    parsed_chunks = queue.Queue(maxsize=IMPORT_QUEUE_SIZE)
+    cancelled = threading.Event()
+    daemon.run(__parse_chunks, chunks, parsed_chunks, cancelled)
+    try:
+        idx = 0
+        primary_keys = None
+        while True:
+            start = timeit.default_timer()
+            item = parsed_chunks.get()
+            wait_time = timeit.default_timer() - start
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            records_data, labels_data, tasks_data, progress, parse_time = item
+            if upload_task is not None:
+                logger.debug(
+                    upload_task_manager.get_upload_task_message(
+                        upload_task,
+                        additional_information=f"--- START CHUNK #{idx} ---",
+                    )
                 )
-            )
 
-        (
-            records_data,
-            labels_data,
-            tasks_data,
-        ) = split_record_data_and_label_data(chunk)
+            start = timeit.default_timer()
+            if idx == 0:
+                create_attributes_and_get_text_attributes(project_id, records_data)
+                primary_keys = attribute.get_primary_keys(project_id)
 
-        primary_keys = None
-        if idx == 0:
-            create_attributes_and_get_text_attributes(project_id, records_data)
-            primary_keys = attribute.get_primary_keys(project_id)
+            import_labeling_tasks_and_labels_pipeline(
+                project_id=project_id, tasks_data=tasks_data
+            )
+            if USE_BULK_WRITE:
+                record_bulk_writer.write_records_and_labels(
+                    project_id=project_id,
+                    user_id=user_id,
+                    records_data=records_data,
+                    labels_data=labels_data,
+                    category=record_category,
+                    primary_key_names=[key.name for key in primary_keys or []],
+                )
+            else:
+                import_records_and_rlas_pipeline(
+                    user_id=user_id,
+                    project_id=project_id,
+                    records_data=records_data,
+                    labels_data=labels_data,
+                    category=record_category,
+                    primary_keys=primary_keys,
+                )
 
-        import_labeling_tasks_and_labels_pipeline(
-            project_id=project_id, tasks_data=tasks_data
-        )
-        import_records_and_rlas_pipeline(
-            user_id=user_id,
-            project_id=project_id,
-            records_data=records_data,
-            labels_data=labels_data,
-            category=record_category,
-            primary_keys=primary_keys,
-        )
+            if upload_task is not None:
+                upload_task_manager.update_task(
+                    project_id, upload_task.id, progress=progress
+                )
+                write_time = timeit.default_timer() - start
+                logger.debug(
+                    upload_task_manager.get_upload_task_message(
+                        upload_task,
+                        additional_information=f"--- CHUNK #{idx} parse: "
+                        f"{parse_time:.3f}s, write: {write_time:.3f}s, "
+                        f"waited for parser: {wait_time:.3f}s ---",
+                    )
+                )
+            idx += 1
+    finally:
+        cancelled.set()
 
-        if upload_task is not None:
-            progress = ((idx + 1) / chunks_count) * 100
-            upload_task_manager.update_task(
-                project_id, upload_task.id, progress=progress
-            )
+
+def __parse_chunks(
+    chunks: Iterable[Tuple[List[Dict[str, Any]], float]],
+    parsed_chunks: queue.Queue,
+    cancelled: threading.Event,
+) -> None:
+    # notifications of conversion errors need a session in this thread
+    ctx_token = general.get_ctx_token()
+    try:
+        iterator = iter(chunks)
+        while True:
+            start = timeit.default_timer()
+            chunk = next(iterator, None)
+            if chunk is None:
+                break
+            data, progress = chunk
+            (
+                records_data,
+                labels_data,
+                tasks_data,
+            ) = split_record_data_and_label_data(data)
+            parse_time = timeit.default_timer() - start
+            item = (records_data, labels_data, tasks_data, progress, parse_time)
+            if not daemon.put_unless_cancelled(parsed_chunks, item, cancelled):
+                return
+        daemon.put_unless_cancelled(parsed_chunks, None, cancelled)
+    except Exception as e:
+        daemon.put_unless_cancelled(parsed_chunks, e, cancelled)
+    finally:
+        general.reset_ctx_token(ctx_token, True)
 
 
 def import_file(project_id: str, upload_task: UploadTask) -> None:
@@ -116,17 +188,21 @@ def import_file(project_id: str, upload_task: UploadTask) -> None:
     )
     record_category = category.infer_category(upload_task.file_name)
 
-    data = convert_to_record_dict(
-        file_type,
-        tmp_file_name,
-        upload_task.user_id,
-        upload_task.file_import_options,
-        project_id,
-    )
-    number_records = len(data)
-    import_records_and_rlas(
-        project_id, upload_task.user_id, data, upload_task, record_category
-    )
+    try:
+        number_records, chunks = convert_to_record_chunks(
+            file_type,
+            tmp_file_name,
+            upload_task.user_id,
+            upload_task.file_import_options,
+            project_id,
+            BULK_CHUNK_SIZE if USE_BULK_WRITE else 500,
+        )
+        import_records_and_rlas(
+            project_id, upload_task.user_id, chunks, upload_task, record_category
+        )
+    finally:
+        if os.path.exists(tmp_file_name):
+            os.remove(tmp_file_name)
 
     upload_task_manager.update_upload_task_to_finished(upload_task)
     upload_task_manager.update_task(
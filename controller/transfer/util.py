@@ -1,9 +1,12 @@
 import datetime
-from typing import List, Dict, Tuple, Union, Optional
+import io
+import json
+from typing import Any, Iterator, List, Dict, Set, Tuple, Union, Optional
 
 from submodules.model import enums
-from .checks import check_argument_allowed, run_checks, run_limit_checks
+from .checks import check_argument_allowed, run_checks_on_chunks
 from submodules.model.models import UploadTask, Attribute
+import numpy as np
 import pandas as pd
 from util.notification import create_notification
 from submodules.model.enums import NotificationType
@@ -11,10 +14,16 @@ import os
 import logging
 import traceback
 from submodules.model.business_objects import export
+from util import json_stream
+from util.miscellaneous_functions import chunk_items
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+# rows parsed from an upload file at once, files are never loaded as a whole if pandas
+# can read them in parts (csv, json lines & json arrays)
+FILE_CHUNK_SIZE = int(os.getenv("RECORD_FILE_CHUNK_SIZE", 10000))
+
 
 def get_upload_task_message(
     task: UploadTask,
@@ -38,13 +47,19 @@ def get_upload_task_message(
     return message
 
 
-def convert_to_record_dict(
+def convert_to_record_chunks(
     file_type: str,
     file_name: str,
     user_id: str,
     file_import_options: str,
     project_id: str,
-) -> List:
+    chunk_size: int = 500,
+) -> Tuple[int, Iterator[Tuple[List[Dict[str, Any]], float]]]:
+    """Checks the file chunk wise and returns the number of records and an iterator
+    reading the file again in chunks of chunk_size records. Next to the records each
+    chunk holds the share (0-100) of the file bytes processed once it's imported.
+    The file is needed until the iterator is consumed, the caller has to remove it.
+    """
     if not file_type:
         create_notification(
             NotificationType.FILE_TYPE_NOT_GIVEN,
@@ -64,13 +79,117 @@ def convert_to_record_dict(
         if file_import_options
         else {}
     )
+    # chunks are defined by the reader
+    file_import_options.pop("iterator", None)
+    file_import_options.pop("chunksize", None)
+
+    # pandas infers the dtypes per chunk, e.g. an int column with a missing value in
+    # one chunk is float there. The dtypes seen in the first pass are unified for
+    # the second one, so the records match the ones of a full read.
+    seen_dtypes = {}
+    number_records = run_checks_on_chunks(
+        (
+            df
+            for df, _ in __read_record_frames(
+                file_type,
+                file_name,
+                file_import_options,
+                user_id,
+                project_id,
+                seen_dtypes=seen_dtypes,
+            )
+        ),
+        project_id,
+        user_id,
+    )
+    frames = __read_record_frames(
+        file_type,
+        file_name,
+        file_import_options,
+        user_id,
+        project_id,
+        dtypes=__unify_dtypes(seen_dtypes),
+    )
+    return number_records, __to_record_chunks(
+        frames, os.path.getsize(file_name), chunk_size
+    )
+
+
+def __read_record_frames(
+    file_type: str,
+    file_name: str,
+    file_import_options: Dict[str, Union[str, int]],
+    user_id: str,
+    project_id: str,
+    seen_dtypes: Optional[Dict[str, Set[Any]]] = None,
+    dtypes: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[pd.DataFrame, int]]:
     try:
-        if file_type in ["csv", "txt", "text"]:
-            df = pd.read_csv(file_name, **file_import_options)
-        elif file_type == "xlsx":
+        for df, bytes_read in __parse_record_file(
+            file_type, file_name, file_import_options, user_id, project_id, dtypes
+        ):
+            if seen_dtypes is not None:
+                for column, dtype in df.dtypes.items():
+                    seen_dtypes.setdefault(column, set()).add(dtype)
+            # ensure useable columns dont break the import
+            yield df.fillna(" "), bytes_read
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        create_notification(
+            NotificationType.UPLOAD_CONVERSION_FAILED,
+            user_id,
+            project_id,
+            str(e),
+        )
+        raise Exception("Upload conversion error", "Upload ran into errors")
+
+
+def __parse_record_file(
+    file_type: str,
+    file_name: str,
+    file_import_options: Dict[str, Union[str, int]],
+    user_id: str,
+    project_id: str,
+    dtypes: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[pd.DataFrame, int]]:
+    # yields DataFrames of at most FILE_CHUNK_SIZE rows & the bytes read so far
+    if file_type in ["csv", "txt", "text"]:
+        with open(file_name, "rb") as file:
+            # parsed with the given dtypes, an object column keeps the file's text
+            for df in pd.read_csv(
+                file,
+                chunksize=FILE_CHUNK_SIZE,
+                dtype=dtypes or None,
+                **file_import_options,
+            ):
+                yield df, file.tell()
+    elif file_type == "json" and file_import_options.get("lines"):
+        with open(file_name, "rb") as file:
+            for df in pd.read_json(
+                file, chunksize=FILE_CHUNK_SIZE, **file_import_options
+            ):
+                yield __cast(df, dtypes), file.tell()
+    elif file_type == "json" and __is_record_array(file_name, file_import_options):
+        options = {**file_import_options, "orient": "records"}
+        options.pop("encoding", None)
+        with open(file_name, "rb") as file:
+            text_file = io.TextIOWrapper(
+                file, encoding=file_import_options.get("encoding", "utf-8")
+            )
+            for items in chunk_items(
+                enumerate(json_stream.iterate_array_items(text_file)), FILE_CHUNK_SIZE
+            ):
+                # parsed again by pandas so conversions match a full read_json
+                df = pd.read_json(
+                    io.StringIO(json.dumps(list(items.values()))), **options
+                )
+                yield __cast(df, dtypes), file.tell()
+    else:
+        # pandas can't read these in parts
+        if file_type == "xlsx":
             df = pd.read_excel(file_name, **file_import_options)
         elif file_type == "html":
-            df = pd.read_html(file_name, **file_import_options)
+            df = pd.read_html(file_name, **file_import_options)[0]
         elif file_type == "json":
             df = pd.read_json(file_name, **file_import_options)
         else:
@@ -81,24 +200,67 @@ def convert_to_record_dict(
                 file_type,
             )
             raise Exception("Upload conversion error", "Upload ran into errors")
-        # ensure useable columns dont break the import
-        df.fillna(" ", inplace=True)
-    except Exception as e:
-        logger.error(traceback.format_exc())
-        create_notification(
-            NotificationType.UPLOAD_CONVERSION_FAILED,
-            user_id,
-            project_id,
-            str(e),
-        )
-        if os.path.exists(file_name):
-            os.remove(file_name)
-        raise Exception("Upload conversion error", "Upload ran into errors")
-    if os.path.exists(file_name):
-        os.remove(file_name)
-    run_limit_checks(df, project_id, user_id)
-    run_checks(df, project_id, user_id)
-    return df.to_dict(orient="records")
+        file_size = os.path.getsize(file_name)
+        row_count = df.shape[0]
+        for start in range(0, max(row_count, 1), FILE_CHUNK_SIZE):
+            end = min(start + FILE_CHUNK_SIZE, row_count)
+            yield df.iloc[start:end], (
+                int(file_size * end / row_count) if row_count else file_size
+            )
+
+
+def __unify_dtypes(seen_dtypes: Dict[str, Set[Any]]) -> Dict[str, Any]:
+    # only columns read with different dtypes are cast. Numbers are widened like
+    # pandas does for a whole column, anything else is kept as object.
+    dtypes = {}
+    for column, column_dtypes in seen_dtypes.items():
+        if len(column_dtypes) < 2:
+            continue
+        if all(
+            pd.api.types.is_numeric_dtype(dtype)
+            and not pd.api.types.is_bool_dtype(dtype)
+            for dtype in column_dtypes
+        ):
+            dtypes[column] = np.result_type(*column_dtypes)
+        else:
+            dtypes[column] = object
+    return dtypes
+
+
+def __cast(df: pd.DataFrame, dtypes: Optional[Dict[str, Any]]) -> pd.DataFrame:
+    if not dtypes:
+        return df
+    return df.astype(
+        {column: dtypes[column] for column in df.columns if column in dtypes}
+    )
+
+
+def __is_record_array(
+    file_name: str, file_import_options: Dict[str, Union[str, int]]
+) -> bool:
+    if file_import_options.get("orient", "records") != "records":
+        return False
+    with open(
+        file_name, "r", encoding=file_import_options.get("encoding", "utf-8")
+    ) as file:
+        start = file.read(1024).lstrip()
+    return start.startswith("[")
+
+
+def __to_record_chunks(
+    frames: Iterator[Tuple[pd.DataFrame, int]], file_size: int, chunk_size: int
+) -> Iterator[Tuple[List[Dict[str, Any]], float]]:
+    processed = 0
+    for df, bytes_read in frames:
+        records = df.to_dict(orient="records")
+        del df
+        starts = range(0, len(records), chunk_size)
+        for idx, start in enumerate(starts):
+            # bytes of a frame are spread evenly over its chunks
+            done = processed + (bytes_read - processed) * (idx + 1) / len(starts)
+            progress = min(done / file_size * 100, 100.0) if file_size else 100.0
+            yield records[start : start + chunk_size], progress
+        processed = bytes_read
 
 
 def string_to_import_option_dict(
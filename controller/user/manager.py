@@ -2,7 +2,7 @@ from typing import Dict
 from submodules.model import User, enums
 from submodules.model.business_objects import user
 from submodules.model.business_objects import general
-from controller.auth import kratos
+from controller.auth import access_cache, kratos
 from submodules.model.exceptions import EntityNotFoundException
 from controller.organization import manager as organization_manager
 
@@ -48,6 +48,7 @@ def update_organization_of_user(organization_name: str, user_mail: str) -> None:
             f"User {user_mail} is already part of organization {user_item.organization.name}"
         )
     user.update_organization(user_item.id, organization.id, with_commit=True)
+    access_cache.invalidate_user(user_item.id)
 
 
 def update_user_role(user_id: str, role: str) -> User:
@@ -74,3 +75,4 @@ def remove_organization_from_user(user_mail: str) -> None:
         raise Exception("User has no organization")
 
     user.remove_organization(user_id, with_commit=True)
+    access_cache.invalidate_user(user_id)
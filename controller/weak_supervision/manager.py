@@ -1,12 +1,28 @@
+import os
 import timeit
-from typing import Any, Tuple, Optional
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Tuple, Optional
 
 from submodules.model import enums, WeakSupervisionTask
-from submodules.model.business_objects import labeling_task
+from submodules.model.business_objects import (
+    general,
+    labeling_task,
+    record_label_association,
+)
 from submodules.model.business_objects import weak_supervision
+from submodules.model.business_objects.information_source import (
+    get_selected_information_sources,
+)
+from controller.job_queue import manager as job_manager
 from controller.weak_supervision.weak_supervision_service import (
     initiate_weak_supervision,
 )
+from util import notification
+from util.notification import create_notification
+
+# labeling tasks of one weak supervision task that are fitted at the same time
+WEAK_SUPERVISION_PARALLELISM = int(os.getenv("WEAK_SUPERVISION_PARALLELISM", 4))
 
 
 def create_task(
@@ -41,10 +57,12 @@ def start_weak_supervision_by_project_id(
     project_id: str, user_id: str, ws_task_id: str
 ) -> None:
     selected_tasks = labeling_task.get_labeling_tasks_by_selected_sources(project_id)
-    for labeling_task_item in selected_tasks:
-        initiate_weak_supervision(
-            project_id, labeling_task_item.id, user_id, ws_task_id
-        )
+    fit_labeling_tasks(
+        project_id,
+        user_id,
+        ws_task_id,
+        [str(labeling_task_item.id) for labeling_task_item in selected_tasks],
+    )
 
 
 def start_weak_supervision_by_task_id(
@@ -54,3 +72,180 @@ def start_weak_supervision_by_task_id(
     initiate_weak_supervision(project_id, task_id, user_id, ws_task_id)
     stop = timeit.default_timer()
     return start, stop
+
+
+def create_task_with_notification(
+    project_id: str,
+    user_id: str,
+    selected_information_sources: Optional[str],
+    selected_labeling_tasks: Optional[str],
+) -> str:
+    create_notification(
+        enums.NotificationType.WEAK_SUPERVISION_TASK_STARTED,
+        user_id,
+        project_id,
+        "Weak Supervision Task",
+    )
+    notification.send_organization_update(project_id, "weak_supervision_started")
+    weak_supervision_task = create_task(
+        project_id=project_id,
+        created_by=user_id,
+        selected_information_sources=selected_information_sources,
+        selected_labeling_tasks=selected_labeling_tasks,
+    )
+    weak_supervision_task_id = str(weak_supervision_task.id)
+    record_label_association.update_used_information_sources(
+        project_id, weak_supervision_task_id, with_commit=True
+    )
+    return weak_supervision_task_id
+
+
+def create_task_for_project(project_id: str, user_id: str) -> str:
+    # all selected heuristics of all labeling tasks
+    return create_task_with_notification(
+        project_id,
+        user_id,
+        get_selected_information_sources(project_id),
+        labeling_task.get_selected_labeling_task_names(project_id),
+    )
+
+
+def run_task(
+    project_id: str,
+    user_id: str,
+    weak_supervision_task_id: str,
+    labeling_task_ids: List[str],
+) -> None:
+    try:
+        fit_labeling_tasks(
+            project_id, user_id, weak_supervision_task_id, labeling_task_ids
+        )
+        update_weak_supervision_task_stats(weak_supervision_task_id, project_id)
+        create_notification(
+            enums.NotificationType.WEAK_SUPERVISION_TASK_DONE,
+            user_id,
+            project_id,
+            "Weak Supervision Task",
+        )
+        notification.send_organization_update(project_id, "weak_supervision_finished")
+    except Exception as e:
+        print(traceback.format_exc(), flush=True)
+        general.rollback()
+        weak_supervision.update_state(
+            project_id,
+            weak_supervision_task_id,
+            enums.PayloadState.FAILED.value,
+            with_commit=True,
+        )
+        notification.send_organization_update(project_id, "weak_supervision_finished")
+        raise e
+
+
+def fit_labeling_tasks(
+    project_id: str,
+    user_id: str,
+    weak_supervision_task_id: str,
+    labeling_task_ids: List[str],
+) -> Dict[str, Dict[str, Any]]:
+    # the fits of the labeling tasks are independent, so the service is called for
+    # several of them at the same time. Every fit is awaited, the first error is
+    # raised afterwards.
+    progress = {
+        str(labeling_task_id): {
+            "state": enums.PayloadState.CREATED.value,
+            "seconds": None,
+            "error": None,
+        }
+        for labeling_task_id in labeling_task_ids
+    }
+    error = None
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(WEAK_SUPERVISION_PARALLELISM, len(progress)))
+    ) as executor:
+        futures = {
+            executor.submit(
+                __fit_labeling_task,
+                project_id,
+                labeling_task_id,
+                user_id,
+                weak_supervision_task_id,
+            ): labeling_task_id
+            for labeling_task_id in progress
+        }
+        # progress is reported from the calling thread, it holds the session
+        for finished_count, future in enumerate(as_completed(futures), 1):
+            labeling_task_id = futures[future]
+            task_progress = progress[labeling_task_id]
+            seconds, fit_error = future.result()
+            task_progress["seconds"] = seconds
+            if fit_error:
+                error = error or fit_error
+                task_progress["state"] = enums.PayloadState.FAILED.value
+                task_progress["error"] = str(fit_error)
+            else:
+                task_progress["state"] = enums.PayloadState.FINISHED.value
+            notification.send_organization_update(
+                project_id,
+                ":".join(
+                    [
+                        "weak_supervision_progress",
+                        weak_supervision_task_id,
+                        labeling_task_id,
+                        task_progress["state"],
+                        f"{seconds:.2f}",
+                        str(finished_count),
+                        str(len(progress)),
+                    ]
+                ),
+            )
+    if error:
+        raise error
+    return progress
+
+
+def __fit_labeling_task(
+    project_id: str,
+    labeling_task_id: str,
+    user_id: str,
+    weak_supervision_task_id: str,
+) -> Tuple[float, Optional[Exception]]:
+    # only calls the service, no session is needed in the thread
+    start = timeit.default_timer()
+    try:
+        initiate_weak_supervision(
+            project_id, labeling_task_id, user_id, weak_supervision_task_id
+        )
+    except Exception as e:
+        print(traceback.format_exc(), flush=True)
+        return timeit.default_timer() - start, e
+    return timeit.default_timer() - start, None
+
+
+def run_task_for_project(
+    project_id: str, user_id: str, weak_supervision_task_id: str
+) -> None:
+    labeling_task_ids = [
+        str(labeling_task_item.id)
+        for labeling_task_item in labeling_task.get_labeling_tasks_by_selected_sources(
+            project_id
+        )
+    ]
+    run_task(project_id, user_id, weak_supervision_task_id, labeling_task_ids)
+
+
+def start_task_for_project(project_id: str, user_id: str) -> str:
+    weak_supervision_task_id = create_task_for_project(project_id, user_id)
+    job_manager.enqueue(
+        "weak_supervision",
+        project_id,
+        {
+            "project_id": project_id,
+            "user_id": str(user_id),
+            "weak_supervision_task_id": weak_supervision_task_id,
+        },
+        with_commit=True,
+    )
+    return weak_supervision_task_id
+
+
+job_manager.register("weak_supervision", run_task_for_project, workers=2)
@@ -20,7 +20,7 @@ from submodules.model.business_objects import (
     payload,
     project,
 )
-from util import daemon
+from controller.job_queue import manager as job_manager
 from controller.weak_supervision import weak_supervision_service as weak_supervision
 
 
@@ -136,11 +136,15 @@ def create_zero_shot_information_source(
 def start_zero_shot_for_project_thread(
     project_id: str, information_source_id: str, user_id: str
 ) -> None:
-    daemon.run(
-        __start_zero_shot_for_project,
+    job_manager.enqueue(
+        "zero_shot",
         project_id,
-        information_source_id,
-        user_id,
+        {
+            "project_id": project_id,
+            "information_source_id": information_source_id,
+            "user_id": str(user_id),
+        },
+        with_commit=True,
     )
 
 
@@ -182,3 +186,6 @@ def __start_zero_shot_for_project(
             f"Can't calculate stats for zero shot project {project_id}, is {information_source_id}",
             flush=True,
         )
+
+
+job_manager.register("zero_shot", __start_zero_shot_for_project, workers=2)
@@ -0,0 +1,154 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from sqlalchemy.sql import text as sql_text
+
+from controller.auth import kratos
+from submodules.model.session import session
+from util.miscellaneous_functions import is_uuid
+
+
+class QueryLoader(DataLoader):
+    """
+    Collects the keys requested while one level of a graphql query is resolved and
+    loads them with a single call of load_many. Values are cached for the request.
+    """
+
+    def __init__(self, load_many: Callable[[List[str]], Dict[str, Any]], default: Any):
+        super().__init__()
+        self.load_many = load_many
+        self.default = default
+
+    def batch_load_fn(self, keys: List[Any]) -> Promise:
+        values = self.load_many([str(key) for key in keys])
+        return Promise.resolve([values.get(str(key), self.default) for key in keys])
+
+
+def load(info: Any, name: str, key: Any) -> Promise:
+    return get_loaders(info)[name].load(key)
+
+
+def get_loaders(info: Any) -> Dict[str, QueryLoader]:
+    # one set of loaders per request, stored in the graphql context
+    context = info.context if isinstance(info.context, dict) else {}
+    if "loaders" not in context:
+        context["loaders"] = {
+            # project id -> {record category: record count}
+            "project_record_counts": QueryLoader(__get_project_record_counts, {}),
+            # project id -> {(record category, label source): labeled record count}
+            "project_labeled_counts": QueryLoader(__get_project_labeled_counts, {}),
+            # label id -> {(record category, label source): association count}
+            "label_counts": QueryLoader(__get_label_counts, {}),
+            # labeling task id -> {(record category, label source): association count}
+            "labeling_task_counts": QueryLoader(__get_labeling_task_counts, {}),
+            "embedding_tensor_counts": QueryLoader(__get_embedding_tensor_counts, 0),
+            "embedding_dimensions": QueryLoader(__get_embedding_dimensions, 0),
+            # user id -> kratos traits
+            "user_traits": QueryLoader(kratos.resolve_users_by_ids, None),
+        }
+    return context["loaders"]
+
+
+def __get_project_record_counts(project_ids: List[str]) -> Dict[str, Dict[str, int]]:
+    sql = """
+    SELECT project_id::TEXT, category, COUNT(*)
+    FROM record
+    WHERE project_id = ANY(CAST(:ids AS UUID[]))
+    GROUP BY project_id, category
+    """
+    counts = {}
+    for project_id, category, count in __execute_all(sql, project_ids):
+        counts.setdefault(project_id, {})[category] = count
+    return counts
+
+
+def __get_project_labeled_counts(
+    project_ids: List[str],
+) -> Dict[str, Dict[Tuple[str, str], int]]:
+    sql = """
+    SELECT r.project_id::TEXT, r.category, rla.source_type, COUNT(DISTINCT r.id)
+    FROM record r
+    INNER JOIN record_label_association rla
+        ON rla.record_id = r.id AND rla.project_id = r.project_id
+    WHERE r.project_id = ANY(CAST(:ids AS UUID[]))
+    GROUP BY r.project_id, r.category, rla.source_type
+    """
+    return __group_counts(__execute_all(sql, project_ids))
+
+
+def __get_label_counts(label_ids: List[str]) -> Dict[str, Dict[Tuple[str, str], int]]:
+    sql = """
+    SELECT rla.labeling_task_label_id::TEXT, r.category, rla.source_type, COUNT(*)
+    FROM record_label_association rla
+    INNER JOIN record r
+        ON r.id = rla.record_id AND r.project_id = rla.project_id
+    WHERE rla.labeling_task_label_id = ANY(CAST(:ids AS UUID[]))
+    GROUP BY rla.labeling_task_label_id, r.category, rla.source_type
+    """
+    return __group_counts(__execute_all(sql, label_ids))
+
+
+def __get_labeling_task_counts(
+    labeling_task_ids: List[str],
+) -> Dict[str, Dict[Tuple[str, str], int]]:
+    sql = """
+    SELECT ltl.labeling_task_id::TEXT, r.category, rla.source_type, COUNT(*)
+    FROM record_label_association rla
+    INNER JOIN labeling_task_label ltl
+        ON ltl.id = rla.labeling_task_label_id
+    INNER JOIN record r
+        ON r.id = rla.record_id AND r.project_id = rla.project_id
+    WHERE ltl.labeling_task_id = ANY(CAST(:ids AS UUID[]))
+    GROUP BY ltl.labeling_task_id, r.category, rla.source_type
+    """
+    return __group_counts(__execute_all(sql, labeling_task_ids))
+
+
+def __get_embedding_tensor_counts(embedding_ids: List[str]) -> Dict[str, int]:
+    sql = """
+    SELECT embedding_id::TEXT, COUNT(*)
+    FROM embedding_tensor
+    WHERE embedding_id = ANY(CAST(:ids AS UUID[]))
+    GROUP BY embedding_id
+    """
+    return {
+        embedding_id: count for embedding_id, count in __execute_all(sql, embedding_ids)
+    }
+
+
+def __get_embedding_dimensions(embedding_ids: List[str]) -> Dict[str, int]:
+    # token embeddings hold one vector per token, the dimension is the one of the
+    # first vector. Only the length leaves the database, not the tensor.
+    sql = """
+    SELECT DISTINCT ON (embedding_id)
+        embedding_id::TEXT,
+        CASE
+            WHEN JSON_TYPEOF(data::JSON -> 0) = 'array'
+                THEN JSON_ARRAY_LENGTH(data::JSON -> 0)
+            ELSE JSON_ARRAY_LENGTH(data::JSON)
+        END
+    FROM embedding_tensor
+    WHERE embedding_id = ANY(CAST(:ids AS UUID[]))
+    """
+    return {
+        embedding_id: dimension
+        for embedding_id, dimension in __execute_all(sql, embedding_ids)
+    }
+
+
+def __group_counts(rows: List[Any]) -> Dict[str, Dict[Tuple[str, str], int]]:
+    counts = {}
+    for key, category, source_type, count in rows:
+        counts.setdefault(key, {})[(category, source_type)] = count
+    return counts
+
+
+def __execute_all(sql: str, ids: List[str]) -> List[Any]:
+    # loader keys can come from the client, they are only passed as parameters and
+    # keys that aren't ids get the default
+    ids = [id for id in ids if is_uuid(id)]
+    if not ids:
+        return []
+    return session.execute(sql_text(sql), {"ids": ids}).fetchall()
@@ -1,4 +1,6 @@
 import graphene
+from typing import List
+
 from controller.auth import manager as auth
 from graphql_api import types
 from controller.auth.manager import get_user_by_info
@@ -17,11 +19,34 @@ class CreatePayload(graphene.Mutation):
         auth.check_demo_access(info)
         auth.check_project_access(info, project_id)
         user = get_user_by_info(info)
-        payload = manager.create_payload(
-            info, project_id, information_source_id, user.id
-        )
+        payload = manager.create_payload(project_id, information_source_id, user.id)
         return CreatePayload(payload)
 
 
+class CreatePayloadBatch(graphene.Mutation):
+    class Arguments:
+        project_id = graphene.ID(required=True)
+        information_source_ids = graphene.List(graphene.ID, required=True)
+        initiate_weak_supervision = graphene.Boolean(required=False)
+
+    payloads = graphene.List(InformationSourcePayload)
+
+    def mutate(
+        self,
+        info,
+        project_id: str,
+        information_source_ids: List[str],
+        initiate_weak_supervision: bool = False,
+    ):
+        auth.check_demo_access(info)
+        auth.check_project_access(info, project_id)
+        user = get_user_by_info(info)
+        payloads = manager.create_payload_batch(
+            project_id, information_source_ids, user.id, initiate_weak_supervision
+        )
+        return CreatePayloadBatch(payloads)
+
+
 class PayloadMutation(graphene.ObjectType):
     create_payload = CreatePayload.Field()
+    create_payload_batch = CreatePayloadBatch.Field()
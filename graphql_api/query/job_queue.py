@@ -0,0 +1,38 @@
+import graphene
+from typing import Any, Dict, List, Optional
+
+from controller.auth import manager as auth
+from controller.job_queue import manager
+from graphql_api.types import Job
+
+
+class JobQueueQuery(graphene.ObjectType):
+
+    jobs = graphene.Field(
+        graphene.List(Job),
+        project_id=graphene.ID(required=False),
+        states=graphene.List(graphene.String),
+    )
+
+    job_pools = graphene.Field(graphene.JSONString)
+
+    def resolve_jobs(
+        self,
+        info,
+        project_id: Optional[str] = None,
+        states: Optional[List[str]] = None,
+    ) -> List[Job]:
+        # queued and running jobs unless other states are given, jobs of all
+        # projects are only listed for admins
+        auth.check_demo_access(info)
+        if project_id:
+            auth.check_project_access(info, project_id)
+        else:
+            auth.check_admin_access(info)
+        return manager.get_jobs(project_id, states)
+
+    def resolve_job_pools(self, info) -> Dict[str, Any]:
+        # workers and job counts of the gateway process that answers
+        auth.check_demo_access(info)
+        auth.check_admin_access(info)
+        return manager.get_pool_info()
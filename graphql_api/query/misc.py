@@ -31,6 +31,8 @@ class MiscQuery(graphene.ObjectType):
 
     has_updates = graphene.Field(graphene.Boolean)
 
+    container_pool_metrics = graphene.Field(graphene.JSONString)
+
     def resolve_tooltip(self, info, key: str) -> ToolTip:
         return tooltip.resolve_tooltip(key)
 
@@ -56,3 +58,7 @@ class MiscQuery(graphene.ObjectType):
 
     def resolve_has_updates(self, info) -> bool:
         return manager.has_updates()
+
+    def resolve_container_pool_metrics(self, info) -> str:
+        auth.check_admin_access(info)
+        return manager.get_container_pool_metrics()
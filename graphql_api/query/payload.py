@@ -1,3 +1,5 @@
+from typing import Any, Dict
+
 import graphene
 
 from controller.auth import manager as auth
@@ -19,6 +21,10 @@ class PayloadQuery(graphene.ObjectType):
         information_source_id=graphene.ID(required=True),
     )
 
+    payload_cache_info = graphene.Field(graphene.JSONString)
+
+    incremental_payload_info = graphene.Field(graphene.JSONString)
+
     def resolve_payload_by_payload_id(
         self, info, payload_id: str, project_id: str
     ) -> InformationSourcePayload:
@@ -34,3 +40,15 @@ class PayloadQuery(graphene.ObjectType):
         return manager.get_labeling_function_on_10_records(
             project_id, information_source_id
         )
+
+    def resolve_payload_cache_info(self, info) -> Dict[str, Any]:
+        # result cache hits and misses of this gateway process
+        auth.check_demo_access(info)
+        auth.check_admin_access(info)
+        return manager.get_cache_info()
+
+    def resolve_incremental_payload_info(self, info) -> Dict[str, Any]:
+        # incremental and full runs of this gateway process
+        auth.check_demo_access(info)
+        auth.check_admin_access(info)
+        return manager.get_incremental_info()
@@ -29,6 +29,7 @@ class RecordQuery(graphene.ObjectType):
         order_by=graphene.JSONString(),
         limit=graphene.Int(),
         offset=graphene.Int(),
+        cursor=graphene.String(),
     )
 
     search_records_extended = graphene.Field(
@@ -37,6 +38,7 @@ class RecordQuery(graphene.ObjectType):
         filter_data=graphene.List(graphene.JSONString, required=True),
         limit=graphene.Int(),
         offset=graphene.Int(),
+        cursor=graphene.String(),
     )
 
     search_records_by_similarity = graphene.Field(
@@ -52,6 +54,12 @@ class RecordQuery(graphene.ObjectType):
         record_id=graphene.ID(required=True),
     )
 
+    tokenize_records = graphene.Field(
+        graphene.List(TokenizedRecord),
+        project_id=graphene.ID(required=True),
+        record_ids=graphene.List(graphene.ID, required=True),
+    )
+
     def resolve_all_records(self, info, project_id: str) -> List[Record]:
         auth.check_project_access(info, project_id)
         return manager.get_all_records(project_id)
@@ -70,12 +78,13 @@ class RecordQuery(graphene.ObjectType):
         order_by: Optional[Dict[str, str]] = None,
         limit: Optional[int] = 20,
         offset: Optional[int] = 0,
+        cursor: Optional[str] = None,
     ) -> ExtendedSearch:
         auth.check_demo_access(info)
         auth.check_project_access(info, project_id)
         user_id = auth.get_user_by_info(info).id
         return manager.get_records_by_static_slice(
-            user_id, project_id, slice_id, order_by, limit, offset
+            user_id, project_id, slice_id, order_by, limit, offset, cursor
         )
 
     def resolve_search_records_extended(
@@ -85,12 +94,13 @@ class RecordQuery(graphene.ObjectType):
         filter_data: List[Dict[str, Any]],
         limit: Optional[int] = 20,
         offset: Optional[int] = 0,
+        cursor: Optional[str] = None,
     ) -> ExtendedSearch:
         auth.check_demo_access(info)
         auth.check_project_access(info, project_id)
         user_id = auth.get_user_by_info(info).id
         return manager.get_records_by_extended_search(
-            project_id, user_id, filter_data, limit, offset
+            project_id, user_id, filter_data, limit, offset, cursor
         )
 
     def resolve_search_records_by_similarity(
@@ -109,6 +119,14 @@ class RecordQuery(graphene.ObjectType):
         if not record_item:
             return None  # to prevent error calls in gql
         auth.check_project_access(info, record_item.project_id)
+        user_id = auth.get_user_by_info(info).id
         return tokenization_manager.get_tokenized_record(
-            record_item.project_id, record_id
+            record_item.project_id, record_id, user_id
         )
+
+    def resolve_tokenize_records(
+        self, info, project_id: str, record_ids: List[str]
+    ) -> List[Optional[TokenizedRecord]]:
+        auth.check_demo_access(info)
+        auth.check_project_access(info, project_id)
+        return tokenization_manager.get_tokenized_records(project_id, record_ids)
@@ -6,6 +6,7 @@ from graphql_api.query.labeling_access_link import LabelingAccessLinkQuery
 from graphql_api.query.embedding import EmbeddingQuery
 from graphql_api.query.transfer import TransferQuery
 from graphql_api.query.information_source import InformationSourceQuery
+from graphql_api.query.job_queue import JobQueueQuery
 from graphql_api.query.knowledge_base import KnowledgeBaseQuery
 from graphql_api.query.knowledge_term import KnowledgeTermQuery
 from graphql_api.query.labeling_task import LabelingTaskQuery
@@ -53,6 +54,7 @@ class Query(
     EmbeddingQuery,
     TransferQuery,
     InformationSourceQuery,
+    JobQueueQuery,
     KnowledgeBaseQuery,
     KnowledgeTermQuery,
     LabelingTaskQuery,
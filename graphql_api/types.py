@@ -4,15 +4,13 @@ import decimal
 from uuid import UUID
 import graphene
 from graphene.relay import Node
+from promise import Promise
 from graphene.types.generic import GenericScalar
 from graphene_sqlalchemy.types import SQLAlchemyObjectType
 from submodules.model import enums
 from submodules.model.business_objects import (
     data_slice,
     knowledge_term,
-    record_label_association,
-    embedding,
-    record,
     attribute,
     information_source,
     labeling_task,
@@ -20,7 +18,7 @@ from submodules.model.business_objects import (
 )
 from submodules.model import models
 from util import notification
-from controller.auth import kratos
+from graphql_api import loaders
 from util.inter_annotator.functions import (
     resolve_inter_annotator_matrix_classification,
     resolve_inter_annotator_matrix_extraction,
@@ -37,20 +35,22 @@ class User(SQLAlchemyObjectType):
     first_name = graphene.String()
     last_name = graphene.String()
 
+    @staticmethod
+    def _resolve_trait(info, user_id, get_value):
+        return loaders.load(info, "user_traits", user_id).then(
+            lambda traits: get_value(traits) if traits else None
+        )
+
     def resolve_mail(self, info) -> str:
-        return kratos.resolve_user_mail_by_id(self.id)
+        return User._resolve_trait(info, self.id, lambda traits: traits["email"])
 
     def resolve_first_name(self, info):
-        user = kratos.resolve_user_name_by_id(self.id)
-        if user:
-            return user["first"]
-        return None
+        return User._resolve_trait(
+            info, self.id, lambda traits: traits["name"]["first"]
+        )
 
     def resolve_last_name(self, info):
-        user = kratos.resolve_user_name_by_id(self.id)
-        if user:
-            return user["last"]
-        return None
+        return User._resolve_trait(info, self.id, lambda traits: traits["name"]["last"])
 
 
 class Label(SQLAlchemyObjectType):
@@ -71,37 +71,41 @@ class Label(SQLAlchemyObjectType):
     ratio_data_scale_programmatic = graphene.Float()
 
     @staticmethod
-    def _count_absolute(record_category, label_source, self):
-        return record_label_association.count_absolute(
-            self.id, record_category, label_source
+    def _count_absolute(info, record_category, label_source, self):
+        return loaders.load(info, "label_counts", self.id).then(
+            lambda counts: counts.get((record_category, label_source), 0)
         )
 
     @staticmethod
-    def _count_relative(record_category, label_source, self):
-        count_all_labels_in_task = record_label_association.count_relative(
-            self.labeling_task_id, record_category, label_source
-        )
-
-        if count_all_labels_in_task == 0:
-            return 0
-        else:
-            return (
-                Label._count_absolute(record_category, label_source, self)
-                / count_all_labels_in_task
-            )
+    def _count_relative(info, record_category, label_source, self):
+        def to_ratio(counts):
+            count_label, count_all_labels_in_task = counts
+            if count_all_labels_in_task == 0:
+                return 0
+            return count_label / count_all_labels_in_task
+
+        return Promise.all(
+            [
+                Label._count_absolute(info, record_category, label_source, self),
+                loaders.load(info, "labeling_task_counts", self.labeling_task_id).then(
+                    lambda counts: counts.get((record_category, label_source), 0)
+                ),
+            ]
+        ).then(to_ratio)
 
     def resolve_num_data_scale_manual(self, info):
         return Label._count_absolute(
-            enums.RecordCategory.SCALE.value, enums.LabelSource.MANUAL.value, self
+            info, enums.RecordCategory.SCALE.value, enums.LabelSource.MANUAL.value, self
         )
 
     def resolve_num_data_test_manual(self, info):
         return Label._count_absolute(
-            enums.RecordCategory.TEST.value, enums.LabelSource.MANUAL.value, self
+            info, enums.RecordCategory.TEST.value, enums.LabelSource.MANUAL.value, self
         )
 
     def resolve_num_data_scale_programmatic(self, info):
         return Label._count_absolute(
+            info,
             enums.RecordCategory.SCALE.value,
             enums.LabelSource.WEAK_SUPERVISION.value,
             self,
@@ -109,16 +113,17 @@ class Label(SQLAlchemyObjectType):
 
     def resolve_ratio_data_scale_manual(self, info):
         return Label._count_relative(
-            enums.RecordCategory.SCALE.value, enums.LabelSource.MANUAL.value, self
+            info, enums.RecordCategory.SCALE.value, enums.LabelSource.MANUAL.value, self
         )
 
     def resolve_ratio_data_test_manual(self, info):
         return Label._count_relative(
-            enums.RecordCategory.TEST.value, enums.LabelSource.MANUAL.value, self
+            info, enums.RecordCategory.TEST.value, enums.LabelSource.MANUAL.value, self
         )
 
     def resolve_ratio_data_scale_programmatic(self, info):
         return Label._count_relative(
+            info,
             enums.RecordCategory.SCALE.value,
             enums.LabelSource.WEAK_SUPERVISION.value,
             self,
@@ -144,28 +149,28 @@ class Embedding(SQLAlchemyObjectType):
     progress = graphene.Float()
 
     def resolve_count(self, info):
-        return embedding.get_tensor_count(self.id)
+        return loaders.load(info, "embedding_tensor_counts", self.id)
 
     def resolve_dimension(self, info):
-        embedding_item = embedding.get_tensor(self.id)
-
-        if embedding_item is not None:
-            # distinguish between token and attribute embeddings
-            if type(embedding_item.data[0]) is list:
-                return len(embedding_item.data[0])
-            else:
-                return len(embedding_item.data)
-        else:
-            return 0
+        # distinguishing between token and attribute embeddings happens in the query
+        return loaders.load(info, "embedding_dimensions", self.id)
 
     def resolve_progress(self, info):
         if self.state == "FINISHED":
             return 1
-        num_records = len(self.project.records)  # can never be 0
         progress = 0.1 if self.state != "INITIALIZING" else 0
-        return min(
-            progress + (Embedding.resolve_count(self, info) / num_records * 0.9), 0.99
-        )
+
+        def to_progress(counts):
+            count, record_counts = counts
+            num_records = sum(record_counts.values())  # can never be 0
+            return min(progress + (count / num_records * 0.9), 0.99)
+
+        return Promise.all(
+            [
+                Embedding.resolve_count(self, info),
+                loaders.load(info, "project_record_counts", self.project_id),
+            ]
+        ).then(to_progress)
 
 
 class Project(SQLAlchemyObjectType):
@@ -183,9 +188,15 @@ class Project(SQLAlchemyObjectType):
     project_type = graphene.String()
 
     @staticmethod
-    def _count_records(record_category, label_source, self):
-        return record.count_by_project_and_source(
-            self.id, record_category, label_source
+    def _count_records(info, record_category, label_source, self):
+        return loaders.load(info, "project_labeled_counts", self.id).then(
+            lambda counts: counts.get((record_category, label_source), 0)
+        )
+
+    @staticmethod
+    def _count_uploaded(info, record_category, self):
+        return loaders.load(info, "project_record_counts", self.id).then(
+            lambda counts: counts.get(record_category, 0)
         )
 
     def resolve_num_data_scale_manual(self, info):
@@ -193,7 +204,7 @@ class Project(SQLAlchemyObjectType):
             return -1
 
         return Project._count_records(
-            enums.RecordCategory.SCALE.value, enums.LabelSource.MANUAL.value, self
+            info, enums.RecordCategory.SCALE.value, enums.LabelSource.MANUAL.value, self
         )
 
     def resolve_num_data_scale_programmatical(self, info):
@@ -201,6 +212,7 @@ class Project(SQLAlchemyObjectType):
             return -1
 
         return Project._count_records(
+            info,
             enums.RecordCategory.SCALE.value,
             enums.LabelSource.WEAK_SUPERVISION.value,
             self,
@@ -211,20 +223,20 @@ class Project(SQLAlchemyObjectType):
             return -1
 
         return Project._count_records(
-            enums.RecordCategory.TEST.value, enums.LabelSource.MANUAL.value, self
+            info, enums.RecordCategory.TEST.value, enums.LabelSource.MANUAL.value, self
         )
 
     def resolve_num_data_scale_uploaded(self, info):
         if self.status == enums.ProjectStatus.IN_DELETION.value:
             return -1
 
-        return record.get_count_scale_uploaded(self.id)
+        return Project._count_uploaded(info, enums.RecordCategory.SCALE.value, self)
 
     def resolve_num_data_test_uploaded(self, info):
         if self.status == enums.ProjectStatus.IN_DELETION.value:
             return -1
 
-        return record.get_count_test_uploaded(self.id)
+        return Project._count_uploaded(info, enums.RecordCategory.TEST.value, self)
 
     def resolve_contains_unique_attribute(self, info):
         return attribute.get_unique_attributes_count(self.id) > 0
@@ -612,6 +624,7 @@ class ExtendedSearch(graphene.ObjectType):
     full_count = graphene.Int()
     session_id = graphene.UUID()
     record_list = graphene.List(ExtendedRecord)
+    next_cursor = graphene.String()
 
 
 class ToolTip(graphene.ObjectType):
@@ -762,3 +775,19 @@ class LabelingFunctionSampleRecords(graphene.ObjectType):
     records = graphene.List(LabelingFunctionSampleRecordWrapper)
     container_logs = graphene.List(graphene.String)
     code_has_errors = graphene.Boolean()
+
+
+class Job(graphene.ObjectType):
+    id = graphene.ID()
+    kind = graphene.String()
+    project_id = graphene.ID()
+    state = graphene.String()
+    priority = graphene.Int()
+    attempts = graphene.Int()
+    max_attempts = graphene.Int()
+    error = graphene.String()
+    created_at = graphene.DateTime()
+    started_at = graphene.DateTime()
+    finished_at = graphene.DateTime()
+    wait_seconds = graphene.Float()
+    run_seconds = graphene.Float()
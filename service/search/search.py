@@ -1,6 +1,10 @@
+import base64
 from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+import json
 import zlib
-from typing import Tuple, Dict, List, Any, Optional, Union
+from typing import Callable, Tuple, Dict, List, Any, Optional
 
 from exceptions.exceptions import TooManyRecordsForStaticSliceException
 from graphql_api import types
@@ -25,7 +29,11 @@ from .search_helper import (
     build_order_by_table_select,
     get_query_template,
     build_search_condition,
+    build_sort_key,
+    build_keyset_condition,
 )
+from . import search_query
+from .search_query import QueryParams, SearchQuery, Slot
 
 
 from submodules.model.business_objects import (
@@ -46,18 +54,36 @@ class UserSessionData:
     random_seed: float
 
 
-__seed_number = None
-
-
 def generate_data_slice_record_associations_insert_statement(
     project_id: str, filter_parsed: List[Dict[str, Any]], data_slice_id: str
 ) -> str:
-    sql_select = generate_select_sql(project_id, filter_parsed, 0, 0, True)
+    return search_query.render(
+        __compile_filter_query(
+            "dsra_insert",
+            __build_dsra_insert_query,
+            project_id,
+            filter_parsed,
+            data_slice_id=data_slice_id,
+        )
+    )
+
+
+def __build_dsra_insert_query(
+    params: QueryParams,
+    project_id: Any,
+    filter_data: List[Dict[str, Any]],
+    data_types: Dict[str, str],
+    limit: Any,
+    offset: Any,
+    data_slice_id: Any,
+) -> str:
+    sql_select = __build_select_sql(
+        params, project_id, filter_data, data_types, 0, 0, True
+    )
     sql_with_slice_column = __add_data_slice_id_and_project_id_column(
-        sql_select, data_slice_id, project_id
+        sql_select, data_slice_id, project_id, params
     )
-    sql_insert_statement = __add_insert_into_dsra_statement(sql_with_slice_column)
-    return sql_insert_statement
+    return __add_insert_into_dsra_statement(sql_with_slice_column)
 
 
 def resolve_records_by_static_slice(
@@ -67,59 +93,75 @@ def resolve_records_by_static_slice(
     order_by: Dict[str, str],
     limit: int,
     offset: int,
+    cursor: Optional[str] = None,
 ) -> ExtendedSearch:
-    global __seed_number
-    local_seed = None
-    order_by_add = None
-    select_add = None
-    from_add = None
-
+    # a cursor (empty string for the first page) switches to keyset pagination
     slice = data_slice.get(project_id, slice_id, True)
     if not slice:
         raise ValueError(f"Can't find slice with id {slice_id} in project.")
 
-    if slice.slice_type == SliceTypes.STATIC_OUTLIER.value:
-        order_by_add = "ORDER BY outlier_score DESC"
-        select_add = ", outlier_score"
-    else:
-        if order_by:
-            order_by_add = __build_order_by(order_by, project_id)
-            select_add, from_add = __build_order_by_subquery(order_by, project_id)
-
-    sql = __basic_query(
-        project_id,
-        limit,
-        offset,
-        slice_id,
-        order_by_add,
-        select_add,
-        from_add,
+    is_outlier_slice = slice.slice_type == SliceTypes.STATIC_OUTLIER.value
+    if is_outlier_slice or not order_by:
+        order_by = {}
+    keyset = cursor is not None
+    sort_key_count = 1 if is_outlier_slice else __count_sort_keys([order_by])
+    cursor_values = __decode_cursor(cursor, sort_key_count)
+    if keyset:
+        offset = 0
+    args = {"project_id": project_id, "slice_id": slice_id, "order_by": order_by}
+    skeleton_args = {
+        "project_id": Slot(("project_id",)),
+        "slice_id": Slot(("slice_id",)),
+        "order_by": __to_skeleton(order_by, ("order_by",)),
+        "data_types": __get_order_data_types(project_id, [order_by]),
+        "is_outlier_slice": is_outlier_slice,
+        "keyset": keyset,
+        "cursor": None,
+    }
+    sql = search_query.compile_query(
+        "static_slice",
+        {**args, "limit": limit, "offset": offset, "cursor": cursor_values},
+        {
+            **skeleton_args,
+            **__limit_skeleton(limit, offset),
+            "cursor": __cursor_skeleton(cursor_values),
+        },
+        __build_static_slice_query,
+    )
+    count_sql = search_query.compile_query(
+        "static_slice_count",
+        args,
+        {"slice_id": skeleton_args["slice_id"]},
+        __count_dsra,
     )
-    count_sql = __count_dsra(slice_id)
-    count = general.execute_first(count_sql)[0]
+    count = search_query.execute_first(count_sql)[0]
 
     extended_search = ExtendedSearch(
-        sql=sql,
+        sql=search_query.render(sql),
         query_limit=limit,
         query_offset=offset,
         full_count=count,
     )
-    if __seed_number:
-        local_seed = __seed_number
-        __seed_number = None
+    local_seed = __get_random_seed([order_by])
+    if local_seed and not keyset:
         general.execute(f"SELECT setseed({local_seed});")
 
-    extended_search.record_list = [record for record in general.execute_all(sql)]
+    extended_search.record_list = [
+        record for record in search_query.execute_all(sql)
+    ]
+    if keyset:
+        extended_search.next_cursor = __encode_next_cursor(
+            extended_search.record_list, limit, sort_key_count
+        )
 
-    select_statement = __select_record_data(
-        project_id, slice_id, order_by_add, select_add, from_add
+    id_sql_statement = search_query.compile_query(
+        "static_slice_ids", args, skeleton_args, __build_static_slice_id_query
     )
-    id_sql_statement = __build_final_query(select_statement, project_id, False, True)
     user_session_data = __create_static_user_session_object(
         project_id,
         user_id,
-        id_sql_statement,
-        count_sql,
+        search_query.render(id_sql_statement),
+        search_query.render(count_sql),
         count,
         local_seed,
     )
@@ -133,54 +175,53 @@ def resolve_extended_search(
     filter_data: List[Dict[str, Any]],
     limit: int,
     offset: int,
+    cursor: Optional[str] = None,
 ) -> ExtendedSearch:
-    global __seed_number
-    local_seed = None
-
-    __ensure_text(filter_data)
-    sql_statement_count = generate_count_sql(project_id, filter_data)
-
-    count = general.execute_distinct_count(sql_statement_count)
-
-    sql_statement_normal = generate_select_sql(project_id, filter_data, limit, offset)
+    # values are bound as parameters (or escaped when rendered) so no manual quoting
+    # a cursor (empty string for the first page) switches to keyset pagination
+    keyset = cursor is not None
+    sort_key_count = __count_sort_keys(filter_data)
+    cursor_values = __decode_cursor(cursor, sort_key_count)
+    if keyset:
+        offset = 0
+    count_query = __compile_count_query(project_id, filter_data)
+    count = search_query.execute_distinct_count(count_query)
+
+    select_query = __compile_select_query(
+        project_id, filter_data, limit, offset, keyset=keyset, cursor=cursor_values
+    )
 
     extended_search = ExtendedSearch(
-        sql=sql_statement_normal,
+        sql=search_query.render(select_query),
         query_limit=limit,
         query_offset=offset,
         full_count=count,
     )
-    if __seed_number:
-        local_seed = __seed_number
-        __seed_number = None
+    local_seed = __get_random_seed(filter_data)
+    if local_seed and not keyset:
         general.execute(f"SELECT setseed({local_seed});")
     extended_search.record_list = [
-        record for record in general.execute_all(sql_statement_normal)
+        record for record in search_query.execute_all(select_query)
     ]
+    if keyset:
+        extended_search.next_cursor = __encode_next_cursor(
+            extended_search.record_list, limit, sort_key_count
+        )
 
     user_session_data = __create_default_user_session_object(
-        project_id, user_id, filter_data, sql_statement_count, count, local_seed
+        project_id,
+        user_id,
+        filter_data,
+        search_query.render(count_query),
+        count,
+        local_seed,
+        keyset,
     )
 
     extended_search.session_id = __write_user_session_entry(user_session_data)
     return extended_search
 
 
-def __ensure_text(filter_data: List[Union[str, Dict[str, Any]]]) -> None:
-    for idx, element in enumerate(filter_data):
-        if isinstance(element, str):
-            filter_data[idx] = element.replace("'", "''")
-            continue
-        if isinstance(element, dict):
-            for key in element:
-                if isinstance(element[key], str):
-                    element[key] = element[key].replace("'", "''")
-                    continue
-                if isinstance(element[key], list):
-                    __ensure_text(element[key])
-                    continue
-
-
 def resolve_labeling_session(
     project_id: str, user_id: str, session_id: str
 ) -> UserSessions:
@@ -251,23 +292,15 @@ def __create_default_user_session_object(
     count_sql_statement: str,
     last_count: int,
     random_seed: int,
+    keyset: bool = False,
 ) -> UserSessionData:
-    id_sql_statement = ""
-
-    if len(filter_data) == 0:
-        id_sql_statement = __basic_id_query(project_id)
-    else:
-        inner_sql = __build_inner_query(filter_data, project_id, 0, 0, False)
-        id_sql_statement = __build_final_query(inner_sql, project_id, False, True)
-        order_extention = __get_order_by(filter_data, project_id)
-
-        if order_extention != "":
-            id_sql_statement += order_extention
-        else:
-            id_sql_statement += "ORDER BY db_order"
+    # same order as the pages so the labeling session follows the search result
+    id_sql_statement = __compile_filter_query(
+        "session_ids", __build_id_query, project_id, filter_data, keyset=keyset
+    )
     return UserSessionData(
         project_id,
-        id_sql_statement,
+        search_query.render(id_sql_statement),
         count_sql_statement,
         last_count,
         user_id,
@@ -300,35 +333,215 @@ def __write_user_session_entry(user_session_data: UserSessionData) -> str:
 
 
 def generate_count_sql(project_id: str, filter_data: List[Dict[str, Any]]) -> str:
+    return search_query.render(__compile_count_query(project_id, filter_data))
 
+
+def generate_select_sql(
+    project_id: str,
+    filter_data: List[Dict[str, Any]],
+    limit,
+    offset,
+    for_id: Optional[bool] = False,
+) -> str:
+    return search_query.render(
+        __compile_select_query(project_id, filter_data, limit, offset, for_id)
+    )
+
+
+def __compile_count_query(
+    project_id: str, filter_data: List[Dict[str, Any]]
+) -> SearchQuery:
+    return __compile_filter_query("count", __build_count_sql, project_id, filter_data)
+
+
+def __compile_select_query(
+    project_id: str,
+    filter_data: List[Dict[str, Any]],
+    limit: int,
+    offset: int,
+    for_id: Optional[bool] = False,
+    keyset: bool = False,
+    cursor: Optional[List[Any]] = None,
+) -> SearchQuery:
+    return __compile_filter_query(
+        "select",
+        __build_select_sql,
+        project_id,
+        filter_data,
+        limit=limit,
+        offset=offset,
+        keyset=keyset,
+        cursor=cursor,
+        for_id=for_id,
+    )
+
+
+def __compile_filter_query(
+    name: str,
+    build: Callable[..., str],
+    project_id: str,
+    filter_data: List[Dict[str, Any]],
+    limit: int = 0,
+    offset: int = 0,
+    keyset: bool = False,
+    cursor: Optional[List[Any]] = None,
+    **structure: Any,
+) -> SearchQuery:
+    # the template is cached by the shape of the filter, values are bound separately
+    args = {
+        "project_id": project_id,
+        "filter_data": filter_data,
+        "limit": limit,
+        "offset": offset,
+        "cursor": cursor,
+    }
+    skeleton_args = {
+        "project_id": Slot(("project_id",)),
+        "filter_data": __to_skeleton(filter_data, ("filter_data",)),
+        "data_types": __get_order_data_types(project_id, filter_data),
+        **__limit_skeleton(limit, offset),
+        **structure,
+    }
+    if "data_slice_id" in structure:
+        args["data_slice_id"] = structure["data_slice_id"]
+        skeleton_args["data_slice_id"] = Slot(("data_slice_id",))
+    if keyset:
+        skeleton_args["keyset"] = True
+        skeleton_args["cursor"] = __cursor_skeleton(cursor)
+    return search_query.compile_query(name, args, skeleton_args, build)
+
+
+def __to_skeleton(value: Any, path: Tuple[Any, ...]) -> Any:
+    # replaces the filter values with slots, everything else defines the query shape
+    if isinstance(value, list):
+        return [__to_skeleton(v, path + (idx,)) for idx, v in enumerate(value)]
+    if not isinstance(value, dict):
+        return value
+    skeleton = {}
+    for key, element in value.items():
+        if key == FilterDataDictKeys.VALUES.value and isinstance(element, list):
+            # one slot for all values, IN lists of any length share the template
+            skeleton[key] = Slot(path + (key,))
+        elif key == FilterDataDictKeys.ORDER_DIRECTION.value:
+            # the random seed is passed in the direction and only bound for keyset order
+            skeleton[key] = [
+                Slot(path + (key, idx)) if column == "RANDOM" else direction
+                for idx, (column, direction) in enumerate(
+                    zip(value[FilterDataDictKeys.ORDER_BY.value], element)
+                )
+            ]
+        else:
+            skeleton[key] = __to_skeleton(element, path + (key,))
+    return skeleton
+
+
+def __limit_skeleton(limit: int, offset: int) -> Dict[str, Any]:
+    # 0 means no limit/offset and changes the sql
+    return {
+        "limit": Slot(("limit",)) if limit else 0,
+        "offset": Slot(("offset",)) if offset else 0,
+    }
+
+
+def __get_order_data_types(
+    project_id: str, filter_data: List[Dict[str, Any]]
+) -> Dict[str, str]:
+    # data types of ordered record data are part of the query shape
+    data_types = {}
+    for filter_element in filter_data:
+        for column in filter_element.get(FilterDataDictKeys.ORDER_BY.value, []):
+            if "@" in column and column not in data_types:
+                data_types[column] = attribute.get_data_type(
+                    project_id, column.split("@")[1]
+                )
+    return data_types
+
+
+def __get_random_seed(filter_data: List[Dict[str, Any]]) -> Optional[float]:
+    for filter_element in filter_data:
+        if FilterDataDictKeys.ORDER_BY.value not in filter_element:
+            continue
+        for column, direction in zip(
+            filter_element[FilterDataDictKeys.ORDER_BY.value],
+            filter_element[FilterDataDictKeys.ORDER_DIRECTION.value],
+        ):
+            if column == "RANDOM":
+                return __string_to_postgres_seed(direction)
+        return None
+    return None
+
+
+def __build_count_sql(
+    params: QueryParams,
+    project_id: Any,
+    filter_data: List[Dict[str, Any]],
+    data_types: Dict[str, str],
+    limit: Any,
+    offset: Any,
+) -> str:
     if len(filter_data) == 0:
         return f"""
         SELECT COUNT(*) distinct_count
         FROM record
-        WHERE project_id = '{project_id}'
+        WHERE project_id = {params.add(project_id)}
         AND category = '{RecordCategory.SCALE.value}'
         """
     # no limit or offset since we want to count all
-    inner_sql = __build_inner_query(filter_data, project_id, 0, 0, True)
-    final_sql = __build_final_query(inner_sql, project_id, True, False)
+    inner_sql = __build_inner_query(
+        params, filter_data, data_types, project_id, 0, 0, True
+    )
+    final_sql = __build_final_query(params, inner_sql, project_id, True, False)
     return final_sql
 
 
-def generate_select_sql(
-    project_id: str,
+def __build_select_sql(
+    params: QueryParams,
+    project_id: Any,
     filter_data: List[Dict[str, Any]],
-    limit,
-    offset,
+    data_types: Dict[str, str],
+    limit: Any,
+    offset: Any,
     for_id: Optional[bool] = False,
+    keyset: bool = False,
+    cursor: Optional[List[Any]] = None,
 ) -> str:
+    if keyset:
+        order_element = __get_order_element(filter_data)
+        sort_keys = __get_sort_keys(params, order_element, data_types)
+        where_add = __build_keyset_where(params, sort_keys, cursor)
+        order_by_add = __build_keyset_page_order(params, sort_keys, limit)
+        if len(filter_data) == 0:
+            inner_sql = __select_record_data(
+                params,
+                project_id,
+                order_by=order_by_add,
+                select_add=__build_sort_columns(sort_keys),
+                where_add=where_add,
+            )
+        else:
+            inner_sql = __build_base_query(
+                params,
+                filter_data,
+                data_types,
+                project_id,
+                False,
+                sort_keys,
+                where_add,
+                order_by_add,
+            )
+        return __build_keyset_select(
+            params, project_id, inner_sql, sort_keys, for_id, len(filter_data) == 0
+        )
 
     if len(filter_data) == 0:
-        return __basic_query(project_id, limit, offset)
+        return __basic_query(params, project_id, limit, offset)
 
-    inner_sql = __build_inner_query(filter_data, project_id, limit, offset, False)
-    final_sql = __build_final_query(inner_sql, project_id, False, for_id)
+    inner_sql = __build_inner_query(
+        params, filter_data, data_types, project_id, limit, offset, False
+    )
+    final_sql = __build_final_query(params, inner_sql, project_id, False, for_id)
 
-    order_extention = __get_order_by(filter_data, project_id)
+    order_extention = __get_order_by(filter_data)
 
     if order_extention != "":
         final_sql += order_extention
@@ -337,46 +550,338 @@ def generate_select_sql(
     return final_sql
 
 
+def __build_id_query(
+    params: QueryParams,
+    project_id: Any,
+    filter_data: List[Dict[str, Any]],
+    data_types: Dict[str, str],
+    limit: Any,
+    offset: Any,
+    keyset: bool = False,
+    cursor: Optional[List[Any]] = None,
+) -> str:
+    if keyset:
+        return __build_select_sql(
+            params, project_id, filter_data, data_types, 0, 0, True, True
+        )
+    if len(filter_data) == 0:
+        return __basic_id_query(params, project_id)
+    return __build_select_sql(
+        params, project_id, filter_data, data_types, 0, 0, True
+    )
+
+
+def __build_static_slice_query(
+    params: QueryParams,
+    project_id: Any,
+    slice_id: Any,
+    order_by: Dict[str, Any],
+    data_types: Dict[str, str],
+    is_outlier_slice: bool,
+    limit: Any,
+    offset: Any,
+    keyset: bool = False,
+    cursor: Optional[List[Any]] = None,
+) -> str:
+    if keyset:
+        return __build_static_slice_keyset_query(
+            params,
+            project_id,
+            slice_id,
+            order_by,
+            data_types,
+            is_outlier_slice,
+            limit,
+            cursor,
+            False,
+        )
+    order_by_add, select_add, from_add = __static_slice_order(
+        order_by, data_types, is_outlier_slice
+    )
+    return __basic_query(
+        params,
+        project_id,
+        limit,
+        offset,
+        slice_id,
+        order_by_add,
+        select_add,
+        from_add,
+    )
+
+
+def __build_static_slice_id_query(
+    params: QueryParams,
+    project_id: Any,
+    slice_id: Any,
+    order_by: Dict[str, Any],
+    data_types: Dict[str, str],
+    is_outlier_slice: bool,
+    keyset: bool = False,
+    cursor: Optional[List[Any]] = None,
+) -> str:
+    if keyset:
+        return __build_static_slice_keyset_query(
+            params,
+            project_id,
+            slice_id,
+            order_by,
+            data_types,
+            is_outlier_slice,
+            0,
+            None,
+            True,
+        )
+    order_by_add, select_add, from_add = __static_slice_order(
+        order_by, data_types, is_outlier_slice
+    )
+    select_statement = __select_record_data(
+        params, project_id, slice_id, order_by_add, select_add, from_add
+    )
+    return __build_final_query(params, select_statement, project_id, False, True)
+
+
+def __build_static_slice_keyset_query(
+    params: QueryParams,
+    project_id: Any,
+    slice_id: Any,
+    order_by: Dict[str, Any],
+    data_types: Dict[str, str],
+    is_outlier_slice: bool,
+    limit: Any,
+    cursor: Optional[List[Any]],
+    for_id: bool,
+) -> str:
+    if is_outlier_slice:
+        sort_keys = [("dsra.outlier_score", "DESC NULLS FIRST")]
+        from_add = None
+    elif order_by:
+        sort_keys = __get_sort_keys(params, order_by, data_types)
+        from_add = __build_order_by_subquery(order_by, data_types)[1] or None
+    else:
+        sort_keys = []
+        from_add = None
+    inner_sql = __select_record_data(
+        params,
+        project_id,
+        slice_id,
+        __build_keyset_page_order(params, sort_keys, limit),
+        __build_sort_columns(sort_keys),
+        from_add,
+        __build_keyset_where(params, sort_keys, cursor),
+    )
+    return __build_keyset_select(params, project_id, inner_sql, sort_keys, for_id, True)
+
+
+def __build_keyset_select(
+    params: QueryParams,
+    project_id: Any,
+    inner_sql: str,
+    sort_keys: List[Tuple[str, str]],
+    for_id: bool,
+    full_record: bool,
+) -> str:
+    # inner_sql is the page itself (see __build_keyset_where), it provides record_id
+    # and the sort_<idx> columns.
+    # full_record: inner_sql already selects all record columns
+    if full_record and not for_id:
+        return __select_full_extended_search(
+            params, project_id, inner_sql, __build_keyset_order_by(sort_keys, "r")
+        )
+    sql = __build_final_query(params, inner_sql, project_id, False, for_id)
+    return sql + __build_keyset_order_by(sort_keys, "id_grabber")
+
+
+def __build_keyset_where(
+    params: QueryParams,
+    sort_keys: List[Tuple[str, str]],
+    cursor: Optional[List[Any]],
+) -> str:
+    # pages continue after the cursor row instead of skipping rows. The condition is
+    # on the sort expressions of the base query so its scan starts after the cursor
+    # and no page depends on the ones before it.
+    if not cursor:
+        return ""
+    return "\n    AND " + build_keyset_condition(
+        sort_keys + [("r.id", "ASC NULLS FIRST")],
+        [None if value is None else params.add(value) for value in cursor],
+    )
+
+
+def __build_keyset_page_order(
+    params: QueryParams, sort_keys: List[Tuple[str, str]], limit: Any
+) -> str:
+    columns = [f"{expression} {order}" for expression, order in sort_keys]
+    columns.append("r.id")
+    return __add_limit_and_offset(params, "ORDER BY " + ", ".join(columns), limit, 0)
+
+
+def __build_keyset_order_by(sort_keys: List[Tuple[str, str]], alias: str) -> str:
+    columns = [
+        f"{alias}.sort_{idx} {order}" for idx, (_, order) in enumerate(sort_keys)
+    ]
+    columns.append(f"{alias}.record_id")
+    return "ORDER BY " + ", ".join(columns)
+
+
+def __build_sort_columns(sort_keys: List[Tuple[str, str]]) -> str:
+    return "".join(
+        f", {expression} sort_{idx}" for idx, (expression, _) in enumerate(sort_keys)
+    )
+
+
+def __get_sort_keys(
+    params: QueryParams,
+    order_element: Optional[Dict[str, Any]],
+    data_types: Dict[str, str],
+) -> List[Tuple[str, str]]:
+    sort_keys = []
+    if not order_element:
+        return sort_keys
+    for column, direction in zip(
+        order_element[FilterDataDictKeys.ORDER_BY.value],
+        order_element[FilterDataDictKeys.ORDER_DIRECTION.value],
+    ):
+        if column == "RANDOM":
+            # RANDOM() can't be continued on the next page, a hash of seed & record can.
+            # It's another permutation for every seed, so it can't be indexed.
+            seed = params.add(direction)
+            sort_keys.append((f"md5({seed}::TEXT || r.id::TEXT)", "ASC NULLS FIRST"))
+        else:
+            sort_keys.append(build_sort_key(column, direction, data_types.get(column)))
+    return sort_keys
+
+
+def __get_order_element(
+    filter_data: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    for filter_element in filter_data:
+        if FilterDataDictKeys.ORDER_BY.value in filter_element:
+            return filter_element
+    return None
+
+
+def __count_sort_keys(filter_data: List[Dict[str, Any]]) -> int:
+    order_element = __get_order_element(filter_data)
+    if not order_element:
+        return 0
+    return min(
+        len(order_element[FilterDataDictKeys.ORDER_BY.value]),
+        len(order_element[FilterDataDictKeys.ORDER_DIRECTION.value]),
+    )
+
+
+def __cursor_skeleton(cursor: Optional[List[Any]]) -> Optional[List[Any]]:
+    # NULL cursor values change the keyset condition
+    if cursor is None:
+        return None
+    return [
+        None if value is None else Slot(("cursor", idx))
+        for idx, value in enumerate(cursor)
+    ]
+
+
+def __decode_cursor(cursor: Optional[str], sort_key_count: int) -> Optional[List[Any]]:
+    if not cursor:
+        return None
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        values = decoded["values"] + [decoded["id"]]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor.")
+    if len(values) != sort_key_count + 1:
+        raise ValueError("Cursor doesn't match the requested order.")
+    return values
+
+
+def __encode_next_cursor(
+    record_list: List[Any], limit: int, sort_key_count: int
+) -> Optional[str]:
+    if not limit or len(record_list) < limit:
+        return None
+    last = record_list[-1]
+    values = [__to_cursor_value(last[f"sort_{idx}"]) for idx in range(sort_key_count)]
+    cursor = {"values": values, "id": str(last["record_id"])}
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode("utf-8")).decode("ascii")
+
+
+def __to_cursor_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        # as text to keep the precision, postgres casts it back
+        return str(value)
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def __static_slice_order(
+    order_by: Dict[str, Any], data_types: Dict[str, str], is_outlier_slice: bool
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    if is_outlier_slice:
+        return "ORDER BY outlier_score DESC", ", outlier_score", None
+    if not order_by:
+        return None, None, None
+    select_add, from_add = __build_order_by_subquery(order_by, data_types)
+    return __build_order_by(order_by), select_add, from_add
+
+
 def __build_inner_query(
+    params: QueryParams,
     filter_data: List[Dict[str, Any]],
-    project_id: str,
-    limit: int,
-    offset: int,
+    data_types: Dict[str, str],
+    project_id: Any,
+    limit: Any,
+    offset: Any,
     for_count: bool,
 ) -> str:
-    sql = __build_base_query(filter_data, project_id, for_count)
-    sql = __add_limit_and_offset(sql, limit, offset)
+    sql = __build_base_query(params, filter_data, data_types, project_id, for_count)
+    sql = __add_limit_and_offset(params, sql, limit, offset)
     return sql
 
 
 def __build_base_query(
-    filter_data: List[Dict[str, Any]], project_id: str, for_count: bool
+    params: QueryParams,
+    filter_data: List[Dict[str, Any]],
+    data_types: Dict[str, str],
+    project_id: Any,
+    for_count: bool,
+    sort_keys: Optional[List[Tuple[str, str]]] = None,
+    keyset_where_add: str = "",
+    keyset_order_by_add: str = "",
 ) -> str:
     select_add = ""
     from_add = ""
     where_add = ""
     if for_count:
         order_by_add = ""
+    elif sort_keys is not None:
+        order_by_add = keyset_order_by_add
     else:
-        order_by_add = __get_order_by(filter_data, project_id)
+        order_by_add = __get_order_by(filter_data)
 
-    where_add = __build_where_add(filter_data)
+    where_add = __build_where_add(params, filter_data) + keyset_where_add
 
     tmp_selection_add, tmp_from_add = __build_subquery_data(
-        filter_data, project_id, "WHITELIST"
+        params, filter_data, project_id, "WHITELIST"
     )
     select_add += tmp_selection_add
     from_add += tmp_from_add
 
     tmp_where_add, tmp_from_add = __build_subquery_data(
-        filter_data, project_id, "BLACKLIST"
+        params, filter_data, project_id, "BLACKLIST"
     )
     where_add += tmp_where_add
     from_add += tmp_from_add
 
-    if order_by_add != "":
+    if sort_keys is not None:
+        # keyset pagination, the page is filtered, ordered & limited here
+        from_add += __get_order_by_subquery(filter_data, data_types)[1]
+        select_add += __build_sort_columns(sort_keys)
+    elif order_by_add != "":
         tmp_selection_add, tmp_from_add = __get_order_by_subquery(
-            filter_data, project_id
+            filter_data, data_types
         )
         select_add += tmp_selection_add
         from_add += tmp_from_add
@@ -390,7 +895,7 @@ def __build_base_query(
     base_sql = base_sql.replace("@@WHERE_ADD@@", where_add)
     base_sql = base_sql.replace("@@ORDER_BY_ADD@@", order_by_add)
 
-    base_sql = base_sql.replace("@@PROJECT_ID@@", project_id)
+    base_sql = base_sql.replace("@@PROJECT_ID@@", params.add(project_id))
 
     # format a bit
     base_sql = base_sql.replace("\n\n", "\n")
@@ -400,7 +905,10 @@ def __build_base_query(
 
 
 def __build_subquery_data(
-    filter_data: List[Dict[str, Any]], project_id: str, type_key: str
+    params: QueryParams,
+    filter_data: List[Dict[str, Any]],
+    project_id: Any,
+    type_key: str,
 ) -> Tuple[str, str]:
     c = 1
     select_add = ""
@@ -410,7 +918,7 @@ def __build_subquery_data(
     queries = __get_subqueries(filter_data, type_key)
     for query in queries:
         alias = type_key[0] + "L_" + str(c)
-        query_text = __build_subquery(query, project_id, 1)
+        query_text = __build_subquery(params, query, project_id, 1)
         if type_key == "WHITELIST":
             select_add += f", {alias}.*"
             from_add += f"""
@@ -430,7 +938,7 @@ LEFT JOIN ( {query_text} ) {alias}
 
 
 def __build_subquery(
-    query_data: List[Dict[str, Any]], project_id: str, depth: int
+    params: QueryParams, query_data: List[Dict[str, Any]], project_id: Any, depth: int
 ) -> str:
 
     final_query = ""
@@ -443,6 +951,7 @@ def __build_subquery(
             query_template_key,
             filter_element[FilterDataDictKeys.VALUES.value],
             project_id,
+            params,
         )
         if final_query != "":
             final_query += "\nUNION "
@@ -454,17 +963,19 @@ def __build_subquery(
 
 
 def __build_where_add(
-    filter_data: List[Dict[str, Any]], outer: Optional[bool] = True
+    params: QueryParams,
+    filter_data: List[Dict[str, Any]],
+    outer: Optional[bool] = True,
 ) -> str:
     current_condition = ""
     for filter_element in filter_data:
         ret = ""
         if FilterDataDictKeys.OPERATOR.value in filter_element:
-            ret = build_search_condition(filter_element)
+            ret = build_search_condition(filter_element, params)
 
         if FilterDataDictKeys.FILTER.value in filter_element:
             ret = __build_where_add(
-                filter_element[FilterDataDictKeys.FILTER.value], False
+                params, filter_element[FilterDataDictKeys.FILTER.value], False
             )
             if ret != "" and ret[0] != "(":
                 ret = f"( {ret} )"
@@ -491,16 +1002,16 @@ def __get_subqueries(filter_data: List[Dict[str, Any]], type_key: str) -> List[A
 
 
 def __get_order_by_subquery(
-    filter_data: List[Dict[str, Any]], project_id: str
+    filter_data: List[Dict[str, Any]], data_types: Dict[str, str]
 ) -> Tuple[str, str]:
     for filter_element in filter_data:
         if FilterDataDictKeys.ORDER_BY.value in filter_element:
-            return __build_order_by_subquery(filter_element, project_id)
+            return __build_order_by_subquery(filter_element, data_types)
     return "", ""
 
 
 def __build_order_by_subquery(
-    filter_element: Dict[str, str], project_id: str
+    filter_element: Dict[str, str], data_types: Dict[str, str]
 ) -> Tuple[str, str]:
     order_subqueries = []
     random_requested = False
@@ -514,8 +1025,9 @@ def __build_order_by_subquery(
             continue
         tmp = build_order_by_table_select(column, direction)
         if tmp == "RECORD":
-            data_type = attribute.get_data_type(project_id, column.split("@")[1])
-            select_append += ", " + build_order_column_record_data(column, data_type)
+            select_append += ", " + build_order_column_record_data(
+                column, data_types[column]
+            )
         elif tmp:
             order_subqueries.append(tmp)
 
@@ -548,17 +1060,16 @@ def __build_order_by_subquery(
     return select_append, return_query
 
 
-def __get_order_by(filter_data: List[Dict[str, str]], project_id: str) -> str:
+def __get_order_by(filter_data: List[Dict[str, str]]) -> str:
 
     for filter_element in filter_data:
         if FilterDataDictKeys.ORDER_BY.value in filter_element:
-            return __build_order_by(filter_element, project_id)
+            return __build_order_by(filter_element)
     return ""
 
 
-def __build_order_by(filter_element: Dict[str, str], project_id: str) -> str:
-    global __seed_number
-
+def __build_order_by(filter_element: Dict[str, str]) -> str:
+    # the random seed is set separately before the query runs (__get_random_seed)
     order_statement = ""
 
     for column, direction in zip(
@@ -570,7 +1081,6 @@ def __build_order_by(filter_element: Dict[str, str], project_id: str) -> str:
         if "@" in column:
             order_statement += build_order_by_record_data(column, direction)
         elif column == "RANDOM":
-            __seed_number = __string_to_postgres_seed(direction)
             order_statement += "rnd_order"
         else:
             order_statement += build_order_by_column(column, direction)
@@ -582,7 +1092,11 @@ def __build_order_by(filter_element: Dict[str, str], project_id: str) -> str:
 
 
 def __build_final_query(
-    inner_select: str, project_id: str, for_count: bool, for_id: bool
+    params: QueryParams,
+    inner_select: str,
+    project_id: Any,
+    for_count: bool,
+    for_id: bool,
 ) -> str:
 
     if for_count:
@@ -606,12 +1120,12 @@ def __build_final_query(
         LEFT JOIN (
             SELECT project_id data_pID, record_id data_rID, json_agg(row_to_json(record_label_association)) rla_data
             FROM record_label_association
-            WHERE project_id = '{project_id}'
+            WHERE project_id = {params.add(project_id)}
             GROUP BY project_id, record_id
         ) data_grabber
             ON id_grabber.record_id = data_grabber.data_rID 
             AND id_grabber.project_id = data_grabber.data_pID
-        WHERE r.project_id = '{project_id}'
+        WHERE r.project_id = {params.add(project_id)}
         """
 
 
@@ -629,22 +1143,27 @@ FROM ( {inner_select} ) r) WHERE id = '{session_id}' """
 
 
 def __basic_query(
-    project_id: str,
-    limit: int,
-    offset: int,
-    slice_id: Optional[str] = None,
+    params: QueryParams,
+    project_id: Any,
+    limit: Any,
+    offset: Any,
+    slice_id: Optional[Any] = None,
     order_by: Optional[str] = None,
     select_add: Optional[str] = None,
     from_add: Optional[str] = None,
 ) -> str:
 
-    sql = __select_record_data(project_id, slice_id, order_by, select_add, from_add)
-    sql = __add_limit_and_offset(sql, limit, offset)
-    sql = __select_full_extended_search(project_id, sql, order_by)
+    sql = __select_record_data(
+        params, project_id, slice_id, order_by, select_add, from_add
+    )
+    sql = __add_limit_and_offset(params, sql, limit, offset)
+    sql = __select_full_extended_search(params, project_id, sql, order_by)
     return sql
 
 
-def __select_full_extended_search(project_id: str, sql: str, order_by: str) -> str:
+def __select_full_extended_search(
+    params: QueryParams, project_id: Any, sql: str, order_by: str
+) -> str:
     if not order_by:
         order_by = "ORDER BY db_order"
     return f"""
@@ -653,7 +1172,7 @@ def __select_full_extended_search(project_id: str, sql: str, order_by: str) -> s
     LEFT JOIN (
         SELECT project_id data_pID, record_id data_rID, json_agg(row_to_json(record_label_association)) rla_data
         FROM record_label_association
-        WHERE project_id = '{project_id}'
+        WHERE project_id = {params.add(project_id)}
         GROUP BY project_id, record_id
     ) data_grabber
         ON r.id = data_grabber.data_rID 
@@ -663,47 +1182,52 @@ def __select_full_extended_search(project_id: str, sql: str, order_by: str) -> s
 
 
 def __select_record_data(
-    project_id: str,
-    slice_id: Optional[str] = None,
+    params: QueryParams,
+    project_id: Any,
+    slice_id: Optional[Any] = None,
     order_by: Optional[str] = None,
     select_add: Optional[str] = None,
     from_add: Optional[str] = None,
+    where_add: Optional[str] = None,
 ) -> str:
+    # where_add is set for keyset pages, they're ordered on their sort columns
     if not order_by:
         order_by = "ORDER BY db_order"
-    if not select_add:
+    if not select_add and where_add is None:
         select_add = ", ROW_NUMBER() OVER() db_order"
     sql = f"""
         SELECT r.*, r.id as record_id {select_add}
         FROM record r
         """
     if slice_id:
-        sql += __join_dsra_on_slice_id(project_id, slice_id)
+        sql += __join_dsra_on_slice_id(params, project_id, slice_id)
     if from_add:
         sql += from_add
-    sql += f"WHERE r.project_id = '{project_id}' "
+    sql += f"WHERE r.project_id = {params.add(project_id)} "
     if not slice_id:
         sql += f"AND r.category = '{RecordCategory.SCALE.value}' "
+    if where_add:
+        sql += where_add
 
     sql += "\n" + order_by
     return sql
 
 
-def __basic_id_query(project_id: str) -> str:
+def __basic_id_query(params: QueryParams, project_id: Any) -> str:
     return f"""
         SELECT r.id record_id
         FROM record r
-        WHERE r.project_id = '{project_id}'
+        WHERE r.project_id = {params.add(project_id)}
         AND r.category = '{RecordCategory.SCALE.value}'
         """
 
 
 def __add_data_slice_id_and_project_id_column(
-    sql: str, data_slice_id: str, project_id: str
+    sql: str, data_slice_id: Any, project_id: Any, params: QueryParams
 ) -> str:
     return sql.replace(
         "SELECT id_grabber.record_id",
-        f"SELECT '{data_slice_id}' as data_slice_id, id_grabber.record_id, '{project_id}' as project_id",
+        f"SELECT {params.add(data_slice_id)} as data_slice_id, id_grabber.record_id, {params.add(project_id)} as project_id",
     )
 
 
@@ -711,25 +1235,27 @@ def __add_insert_into_dsra_statement(sql: str) -> str:
     return f"INSERT INTO {Tablenames.DATA_SLICE_RECORD_ASSOCIATION.value}{sql}"
 
 
-def __add_limit_and_offset(sql: str, limit: int, offset: int) -> str:
+def __add_limit_and_offset(
+    params: QueryParams, sql: str, limit: Any, offset: Any
+) -> str:
     if limit != 0:
-        sql += f"\nLIMIT {limit} "
+        sql += f"\nLIMIT {params.add(limit)} "
     if offset != 0:
-        sql += f"OFFSET {offset} "
+        sql += f"OFFSET {params.add(offset)} "
     return sql
 
 
-def __join_dsra_on_slice_id(project_id: str, slice_id: str) -> str:
+def __join_dsra_on_slice_id(params: QueryParams, project_id: Any, slice_id: Any) -> str:
     return f"""INNER JOIN data_slice_record_association dsra
-                ON dsra.project_id = '{project_id}' AND dsra.data_slice_id = '{slice_id}' AND r.id = dsra.record_id AND r.project_id = dsra.project_id
+                ON dsra.project_id = {params.add(project_id)} AND dsra.data_slice_id = {params.add(slice_id)} AND r.id = dsra.record_id AND r.project_id = dsra.project_id
                 """
 
 
-def __count_dsra(slice_id: str) -> str:
+def __count_dsra(params: QueryParams, slice_id: Any) -> str:
     return f"""
         SELECT COUNT(*) distinct_count
         FROM data_slice_record_association dsra
-        WHERE dsra.data_slice_id = '{slice_id}'
+        WHERE dsra.data_slice_id = {params.add(slice_id)}
         """
 
 
@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Optional, Tuple, Union
 
 from .search_enum import (
     SearchOrderBy,
@@ -8,35 +8,27 @@ from .search_enum import (
     SearchQueryTemplate,
     SearchTargetTables,
 )
+from .search_query import QueryParams, Slot
 from submodules.model.enums import LabelSource
 
 
-def build_search_condition_value(target: SearchOperators, value) -> str:
+def build_search_condition_value(
+    target: SearchOperators, value, params: QueryParams
+) -> str:
     if target in __lookup_operator:
         operator = __lookup_operator[target]
         if target == SearchOperators.IN:
-            all_in_values = ""
-            for v in value:
-                part = v
-                if isinstance(v, str):
-                    part = "'" + part + "'"
-                if all_in_values != "":
-                    all_in_values += ", " + part
-                else:
-                    all_in_values = part
-            return operator.replace("@@VALUES@@", all_in_values)
+            return operator.replace("@@VALUES@@", params.add(__to_array(value)))
         else:
-            if target not in __lookup_operator_has_quotes and isinstance(value, str):
-                value = "'" + value + "'"
-            return operator.replace("@@VALUE@@", value)
+            return operator.replace("@@VALUE@@", params.add(value))
     else:
         raise ValueError(target.value + " no operator info")
 
 
-def build_search_condition(filter_element: Dict[str, str]) -> str:
+def build_search_condition(filter_element: Dict[str, str], params: QueryParams) -> str:
     table = SearchTargetTables[filter_element[FilterDataDictKeys.TARGET_TABLE.value]]
     column = SearchColumn[filter_element[FilterDataDictKeys.TARGET_COLUMN.value]]
-    column_text = build_search_column_text(filter_element)
+    column_text = build_search_column_text(filter_element, params)
     operator = SearchOperators[filter_element[FilterDataDictKeys.OPERATOR.value]]
 
     if operator == SearchOperators.IN:
@@ -44,24 +36,31 @@ def build_search_condition(filter_element: Dict[str, str]) -> str:
             filter_values = filter_element[FilterDataDictKeys.VALUES.value][1:]
         else:
             filter_values = filter_element[FilterDataDictKeys.VALUES.value]
-        return column_text + build_search_condition_value(operator, filter_values)
+        return column_text + build_search_condition_value(
+            operator, filter_values, params
+        )
     else:
         if table == SearchTargetTables.RECORD and column == SearchColumn.DATA:
             filter_value = filter_element[FilterDataDictKeys.VALUES.value][1]
         else:
             filter_value = filter_element[FilterDataDictKeys.VALUES.value][0]
 
-        return column_text + build_search_condition_value(operator, filter_value)
+        return column_text + build_search_condition_value(
+            operator, filter_value, params
+        )
 
 
-def build_search_column_text(filter_element: Dict[str, str]) -> str:
+def build_search_column_text(
+    filter_element: Dict[str, str], params: QueryParams
+) -> str:
 
     table = SearchTargetTables[filter_element[FilterDataDictKeys.TARGET_TABLE.value]]
     table_alias = __lookup_table_alias[table]
     column = SearchColumn[filter_element[FilterDataDictKeys.TARGET_COLUMN.value]]
 
     if table == SearchTargetTables.RECORD and column == SearchColumn.DATA:
-        col_str = f"{table_alias}.\"data\" ->> '{filter_element[FilterDataDictKeys.VALUES.value][0]}'::TEXT"
+        json_key = params.add(filter_element[FilterDataDictKeys.VALUES.value][0])
+        col_str = f"{table_alias}.\"data\" ->> {json_key}::TEXT"
     else:
         col_str = f"{table_alias}.{column.value}"
     return col_str
@@ -69,18 +68,68 @@ def build_search_column_text(filter_element: Dict[str, str]) -> str:
 
 def build_order_column_record_data(order_by_col_text: str, data_type: str) -> str:
     json_field = order_by_col_text.split("@")[1]
+    text = build_record_data_expression(order_by_col_text, data_type)
+    text += f' "order_{__escape_identifier(json_field)}"'
+    return text
+
+
+def build_record_data_expression(order_by_col_text: str, data_type: str) -> str:
+    json_field = order_by_col_text.split("@")[1]
 
-    text = f"r.\"data\" ->> '{json_field}'"
+    text = f"r.\"data\" ->> '{__escape_literal(json_field)}'"
     if data_type == "INTEGER" or data_type == "FLOAT":
         text = f"CAST({text} AS {data_type})"
-
-    text += f' "order_{json_field}"'
     return text
 
 
+def build_sort_key(
+    order_by_col_text: str, direction: str, data_type: Optional[str]
+) -> Tuple[str, str]:
+    # expression on the base record query and its order, used for keyset pagination
+    if direction == "ASC":
+        order = "ASC NULLS FIRST"
+    else:
+        order = "DESC NULLS LAST"
+    if "@" in order_by_col_text:
+        return build_record_data_expression(order_by_col_text, data_type), order
+
+    order_by_col = SearchOrderBy[order_by_col_text]
+    if __lookup_order_by_table[order_by_col] == SearchTargetTables.RECORD:
+        return f"r.{__lookup_order_by_column[order_by_col].value}", order
+    # aggregated in the ORDER_RLA subquery
+    alias = build_order_by_table_select(order_by_col_text, direction)["SELECT_APPEND"]
+    return f"order_rla.{alias}", order
+
+
+def build_keyset_condition(
+    sort_keys: List[Tuple[str, str]], cursor_values: List[Optional[str]]
+) -> str:
+    # rows strictly after the cursor row in the given order, None is a NULL cursor value
+    conditions = []
+    equal_before = []
+    for (column, order), value in zip(sort_keys, cursor_values):
+        operator = ">" if order.startswith("ASC") else "<"
+        if order.endswith("NULLS FIRST"):
+            if value is None:
+                after = f"{column} IS NOT NULL"
+            else:
+                after = f"{column} {operator} {value}"
+        else:
+            if value is None:
+                after = "FALSE"
+            else:
+                after = f"({column} {operator} {value} OR {column} IS NULL)"
+        conditions.append(" AND ".join(equal_before + [after]))
+        if value is None:
+            equal_before.append(f"{column} IS NULL")
+        else:
+            equal_before.append(f"{column} = {value}")
+    return "(" + " OR ".join(f"( {c} )" for c in conditions) + ")"
+
+
 def build_order_by_record_data(order_by_col_text: str, direction: str) -> str:
     json_field = order_by_col_text.split("@")[1]
-    text = f'"order_{json_field}"'
+    text = f'"order_{__escape_identifier(json_field)}"'
     if direction == "ASC":
         text = f"{text} {direction} NULLS FIRST"
     else:
@@ -107,7 +156,10 @@ def build_order_by_column(order_by_col_text: str, direction: str) -> str:
 
 
 def build_query_template(
-    target: SearchQueryTemplate, filter_values: List[Any], project_id: str
+    target: SearchQueryTemplate,
+    filter_values: List[Any],
+    project_id: Any,
+    params: QueryParams,
 ) -> str:
     template = get_query_template(target)
     if target in [
@@ -115,38 +167,27 @@ def build_query_template(
         SearchQueryTemplate.SUBQUERY_RLA_LABEL,
         SearchQueryTemplate.SUBQUERY_RLA_NO_LABEL,
     ]:
-        template = template.replace("@@SOURCE_TYPE@@", filter_values[0])
-        in_values = ""
-        for v in filter_values[1:]:
-            part = v
-            if isinstance(v, str):
-                part = "'" + part + "'"
-            if in_values != "":
-                in_values += ", "
-            in_values += part
-        template = template.replace("@@IN_VALUES@@", in_values)
+        template = template.replace("@@SOURCE_TYPE@@", params.add(filter_values[0]))
+        template = template.replace("@@IN_VALUES@@", params.add(filter_values[1:]))
     elif target == SearchQueryTemplate.SUBQUERY_RLA_CREATED_BY:
-        in_values = "'" + "', '".join(filter_values) + "'"
-        template = template.replace("@@IN_VALUES@@", in_values)
+        template = template.replace(
+            "@@IN_VALUES@@", params.add(__to_array(filter_values))
+        )
     elif target in [
         SearchQueryTemplate.SUBQUERY_RLA_DIFFERENT_IS_CLASSIFICATION,
         SearchQueryTemplate.SUBQUERY_RLA_DIFFERENT_IS_EXTRACTION,
     ]:
-        template = template.replace("@@LABELING_TASK_ID@@", filter_values[0])
+        template = template.replace(
+            "@@LABELING_TASK_ID@@", params.add(filter_values[0])
+        )
     elif target in [
         SearchQueryTemplate.SUBQUERY_RLA_CONFIDENCE,
         SearchQueryTemplate.SUBQUERY_CALLBACK_CONFIDENCE,
     ]:
-        lower, upper = filter_values
-        if isinstance(lower, str):
-            lower = "'" + lower + "'"
-            upper = "'" + upper + "'"
-        else:
-            lower = str(lower)
-            upper = str(upper)
-        template = template.replace("@@VALUE1@@", lower)
-        template = template.replace("@@VALUE2@@", upper)
-    template = template.replace("@@PROJECT_ID@@", project_id)
+        lower, upper = filter_values[0], filter_values[1]
+        template = template.replace("@@VALUE1@@", params.add(lower))
+        template = template.replace("@@VALUE2@@", params.add(upper))
+    template = template.replace("@@PROJECT_ID@@", params.add(project_id))
     return template
 
 
@@ -195,18 +236,26 @@ def build_order_by_table_select(
         raise ValueError(order_by.value + " cant match order table to template")
 
 
+def __to_array(values: Any) -> Any:
+    # a slot stands for the whole value list while the template is compiled
+    return values if isinstance(values, Slot) else list(values)
+
+
+def __escape_literal(value: str) -> str:
+    return value.replace("'", "''")
+
+
+def __escape_identifier(value: str) -> str:
+    return value.replace('"', '""')
+
+
+# values are bound as parameters, the casts let postgres infer the parameter types
 __lookup_operator = {
     SearchOperators.EQUAL: " = @@VALUE@@",
-    SearchOperators.CONTAINS: " ILIKE '%@@VALUE@@%'",
-    SearchOperators.BEGINS_WITH: " ILIKE '@@VALUE@@%'",
-    SearchOperators.ENDS_WITH: " ILIKE '%@@VALUE@@'",
-    SearchOperators.IN: " IN (@@VALUES@@)",
-}
-
-__lookup_operator_has_quotes = {
-    SearchOperators.CONTAINS: True,
-    SearchOperators.BEGINS_WITH: True,
-    SearchOperators.ENDS_WITH: True,
+    SearchOperators.CONTAINS: " ILIKE '%' || @@VALUE@@::TEXT || '%'",
+    SearchOperators.BEGINS_WITH: " ILIKE @@VALUE@@::TEXT || '%'",
+    SearchOperators.ENDS_WITH: " ILIKE '%' || @@VALUE@@::TEXT",
+    SearchOperators.IN: " = ANY(@@VALUES@@)",
 }
 
 
@@ -235,16 +284,16 @@ __lookup_query_templates = {
 SELECT r.project_id, r.id record_id @@SELECT_ADD@@
 FROM record r
 @@FROM_ADD@@
-WHERE r.project_id = '@@PROJECT_ID@@'
+WHERE r.project_id = @@PROJECT_ID@@
 @@WHERE_ADD@@
 @@ORDER_BY_ADD@@ 
 """,
     SearchQueryTemplate.SUBQUERY_RLA_LABEL: """
 SELECT rla.project_id pID, rla.record_id rID
 FROM record_label_association rla
-WHERE rla.project_id = '@@PROJECT_ID@@'
-    AND rla.source_type = '@@SOURCE_TYPE@@'
-    AND rla.labeling_task_label_id IN (@@IN_VALUES@@)
+WHERE rla.project_id = @@PROJECT_ID@@
+    AND rla.source_type = @@SOURCE_TYPE@@
+    AND rla.labeling_task_label_id = ANY(@@IN_VALUES@@)
 GROUP BY rla.project_id, rla.record_id """,
     SearchQueryTemplate.SUBQUERY_RLA_NO_LABEL: """
 SELECT r.project_id pID, r.id rID
@@ -252,33 +301,33 @@ FROM record r
 LEFT JOIN record_label_association rla
     ON r.project_id = rla.project_id 
     AND r.id = rla.record_id 
-    AND rla.source_type = '@@SOURCE_TYPE@@'
-    AND rla.labeling_task_label_id IN (@@IN_VALUES@@)
-WHERE r.project_id = '@@PROJECT_ID@@' AND rla.id IS NULL """,
+    AND rla.source_type = @@SOURCE_TYPE@@
+    AND rla.labeling_task_label_id = ANY(@@IN_VALUES@@)
+WHERE r.project_id = @@PROJECT_ID@@ AND rla.id IS NULL """,
     SearchQueryTemplate.SUBQUERY_RLA_INFORMATION_SOURCE: """
 SELECT rla.project_id pID, rla.record_id rID
 FROM record_label_association rla
-WHERE rla.project_id = '@@PROJECT_ID@@'
-    AND rla.source_type = '@@SOURCE_TYPE@@'
-    AND rla.source_id IN (@@IN_VALUES@@)
+WHERE rla.project_id = @@PROJECT_ID@@
+    AND rla.source_type = @@SOURCE_TYPE@@
+    AND rla.source_id = ANY(@@IN_VALUES@@)
 GROUP BY rla.project_id, rla.record_id """,
     SearchQueryTemplate.SUBQUERY_RLA_CREATED_BY: """
 SELECT rla.project_id pID, rla.record_id rID
 FROM record_label_association rla
-WHERE rla.project_id = '@@PROJECT_ID@@'
+WHERE rla.project_id = @@PROJECT_ID@@
     AND rla.source_type = 'MANUAL'
-    AND rla.created_by IN (@@IN_VALUES@@)
+    AND rla.created_by = ANY(@@IN_VALUES@@)
 GROUP BY rla.project_id, rla.record_id """,
     SearchQueryTemplate.SUBQUERY_RLA_CONFIDENCE: """
 SELECT rla.project_id pID, rla.record_id rID
 FROM record_label_association rla
-WHERE rla.project_id = '@@PROJECT_ID@@'
+WHERE rla.project_id = @@PROJECT_ID@@
     AND rla.source_type = 'WEAK_SUPERVISION'
     AND rla.confidence BETWEEN @@VALUE1@@ AND @@VALUE2@@ """,
     SearchQueryTemplate.SUBQUERY_CALLBACK_CONFIDENCE: """
 SELECT rla.project_id pID, rla.record_id rID
 FROM record_label_association rla
-WHERE rla.project_id = '@@PROJECT_ID@@'
+WHERE rla.project_id = @@PROJECT_ID@@
     AND rla.source_type = 'MODEL_CALLBACK'
     AND rla.confidence BETWEEN @@VALUE1@@ AND @@VALUE2@@ """,
     SearchQueryTemplate.ORDER_RLA: """
@@ -294,8 +343,8 @@ FROM (
 	FROM record_label_association rla
 	INNER JOIN labeling_task_label ltl
 		ON rla.labeling_task_label_id = ltl.id AND rla.project_id = ltl.project_id
-	WHERE rla.project_id = '@@PROJECT_ID@@' 
-	AND ltl.labeling_task_id = '@@LABELING_TASK_ID@@' 
+	WHERE rla.project_id = @@PROJECT_ID@@ 
+	AND ltl.labeling_task_id = @@LABELING_TASK_ID@@ 
 	AND rla.source_type = 'INFORMATION_SOURCE'
 	AND rla.return_type = 'RETURN'
 	GROUP BY rla.record_id,rla.project_id, rla.labeling_task_label_id ) base_select
@@ -311,7 +360,7 @@ FROM (
 		FROM record_label_association rla
 		INNER JOIN record_label_association_token rlat
 			ON rla.id = rlat.record_label_association_id
-		WHERE rla.project_id = '@@PROJECT_ID@@' 
+		WHERE rla.project_id = @@PROJECT_ID@@ 
 			AND rla.source_type = 'INFORMATION_SOURCE'
 			AND rla.return_type = 'YIELD'
 		GROUP BY rla.id, rla.labeling_task_label_id
@@ -319,8 +368,8 @@ FROM (
 		ON rla.id = rlat.id
 	INNER JOIN labeling_task_label ltl
 		ON rla.labeling_task_label_id = ltl.id AND rla.project_id = ltl.project_id
-	WHERE rla.project_id = '@@PROJECT_ID@@' 
-	AND ltl.labeling_task_id = '@@LABELING_TASK_ID@@' 
+	WHERE rla.project_id = @@PROJECT_ID@@ 
+	AND ltl.labeling_task_id = @@LABELING_TASK_ID@@ 
 	AND rla.source_type = 'INFORMATION_SOURCE'
 	AND rla.return_type = 'YIELD'
 	GROUP BY rla.record_id,rla.project_id, rlat.label ) base_select
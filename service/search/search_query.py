@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import traceback
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from submodules.model.session import session
+
+# compiled templates kept (by filter shape) & prepared statements per connection
+CACHE_SIZE = int(os.getenv("SEARCH_QUERY_CACHE_SIZE", 512))
+# server side prepared statements don't work behind transaction pooling (e.g. pgbouncer)
+USE_PREPARED_STATEMENTS = os.getenv("SEARCH_PREPARED_STATEMENTS", "true") == "true"
+
+__PARAM_PATTERN = re.compile(r"@@PARAM_(\d+)@@")
+__PREPARED_KEY = "search_prepared_statements"
+
+__cache: "OrderedDict[str, Tuple[str, List[Any]]]" = OrderedDict()
+__cache_lock = threading.Lock()
+__cache_stats = {"hits": 0, "misses": 0}
+__not_preparable = set()
+
+
+class Slot:
+    # stands in for a value while a template is compiled, path points into the arguments
+    def __init__(self, path: Tuple[Any, ...]):
+        self.path = path
+
+    def __getitem__(self, key: Any) -> "Slot":
+        # e.g. values[0] or values[1:] of a filter, resolved once the values are bound
+        return Slot(self.path + (key,))
+
+    def __iter__(self):
+        # the length of the values is not part of the template
+        raise TypeError("Slots can't be iterated, index or slice them instead")
+
+    def resolve(self, args: Dict[str, Any]) -> Any:
+        value = args
+        for part in self.path:
+            value = value[part]
+        return value
+
+
+class QueryParams:
+    def __init__(self):
+        self.specs: List[Any] = []
+        self.__known: Dict[str, str] = {}
+
+    def add(self, value: Any) -> str:
+        # same slot (e.g. project id) is bound only once
+        if isinstance(value, Slot) and repr(value.path) in self.__known:
+            return self.__known[repr(value.path)]
+        placeholder = f"@@PARAM_{len(self.specs)}@@"
+        self.specs.append(value)
+        if isinstance(value, Slot):
+            self.__known[repr(value.path)] = placeholder
+        return placeholder
+
+
+@dataclass
+class SearchQuery:
+    sql: str
+    params: List[Any]
+
+
+def render(query: SearchQuery) -> str:
+    # plain sql with inlined values, for statements that are stored or returned as text
+    return __PARAM_PATTERN.sub(
+        lambda m: __to_literal(query.params[int(m.group(1))]), query.sql
+    )
+
+
+def compile_query(
+    name: str,
+    args: Dict[str, Any],
+    skeleton_args: Dict[str, Any],
+    build: Callable[..., str],
+    key_extra: Any = None,
+) -> SearchQuery:
+    # skeleton_args hold Slots instead of values -> template only depends on the shape
+    key = name + json.dumps(
+        [skeleton_args, key_extra], default=__slot_to_key, sort_keys=True
+    )
+    with __cache_lock:
+        cached = __cache.get(key)
+        if cached:
+            __cache.move_to_end(key)
+            __cache_stats["hits"] += 1
+    if not cached:
+        params = QueryParams()
+        cached = (build(params, **skeleton_args), params.specs)
+        with __cache_lock:
+            __cache_stats["misses"] += 1
+            __cache[key] = cached
+            if len(__cache) > CACHE_SIZE:
+                __cache.popitem(last=False)
+    sql, specs = cached
+    return SearchQuery(sql, [__resolve(spec, args) for spec in specs])
+
+
+def execute(query: SearchQuery) -> Any:
+    bind_values = {
+        f"param_{idx}": __to_bind_value(value)
+        for idx, value in enumerate(query.params)
+    }
+    if not USE_PREPARED_STATEMENTS or not __prepare(query):
+        named_sql = __PARAM_PATTERN.sub(lambda m: f":param_{m.group(1)}", query.sql)
+        return session.execute(text(named_sql), bind_values)
+    name = __statement_name(query)
+    if not query.params:
+        return session.execute(text(f"EXECUTE {name}"))
+    placeholders = ", ".join(f":{key}" for key in bind_values)
+    return session.execute(text(f"EXECUTE {name}({placeholders})"), bind_values)
+
+
+def execute_all(query: SearchQuery) -> List[Any]:
+    return execute(query).all()
+
+
+def execute_first(query: SearchQuery) -> Any:
+    return execute(query).first()
+
+
+def execute_distinct_count(query: SearchQuery) -> int:
+    return execute(query).first().distinct_count
+
+
+def get_cache_info() -> Dict[str, int]:
+    with __cache_lock:
+        return {**__cache_stats, "size": len(__cache), "max_size": CACHE_SIZE}
+
+
+def __statement_name(query: SearchQuery) -> str:
+    return "search_" + hashlib.md5(query.sql.encode("utf-8")).hexdigest()[:20]
+
+
+def __prepare(query: SearchQuery) -> bool:
+    name = __statement_name(query)
+    if name in __not_preparable:
+        return False
+    connection = session.connection()
+    # info lives as long as the pooled db connection and with it the prepared statements
+    prepared = connection.info.setdefault(__PREPARED_KEY, set())
+    if name in prepared:
+        return True
+    if len(prepared) >= CACHE_SIZE:
+        connection.execute(text("DEALLOCATE ALL"))
+        prepared.clear()
+    savepoint = session.begin_nested()
+    try:
+        positional_sql = __PARAM_PATTERN.sub(
+            lambda m: f"${int(m.group(1)) + 1}", query.sql
+        )
+        connection.execute(text(f"PREPARE {name} AS {positional_sql}"))
+        savepoint.commit()
+    except SQLAlchemyError:
+        savepoint.rollback()
+        print(traceback.format_exc(), flush=True)
+        if len(__not_preparable) >= CACHE_SIZE:
+            # bounded like the templates, a forgotten statement is only tried again
+            __not_preparable.clear()
+        __not_preparable.add(name)
+        return False
+    prepared.add(name)
+    return True
+
+
+def __resolve(spec: Any, args: Dict[str, Any]) -> Any:
+    if isinstance(spec, Slot):
+        return spec.resolve(args)
+    if isinstance(spec, list):
+        return [__resolve(s, args) for s in spec]
+    return spec
+
+
+def __slot_to_key(value: Any) -> str:
+    if isinstance(value, Slot):
+        return "?"
+    raise TypeError(f"Can't build search cache key for {type(value)}")
+
+
+def __to_bind_value(value: Any) -> Any:
+    # arrays are sent as untyped literal so postgres casts them to the column type
+    if isinstance(value, list):
+        return __to_array_literal(value)
+    return value
+
+
+def __to_array_literal(values: List[Any]) -> str:
+    parts = []
+    for value in values:
+        if value is None:
+            parts.append("NULL")
+            continue
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        parts.append(f'"{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def __to_literal(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, list):
+        value = __to_array_literal(value)
+    return "'" + str(value).replace("'", "''") + "'"
@@ -0,0 +1,13 @@
+import os
+
+import pytest
+
+# benchmarks are slow and only run on demand, e.g. RUN_BENCHMARKS=true pytest tests
+benchmark = pytest.mark.skipif(
+    os.getenv("RUN_BENCHMARKS") != "true", reason="RUN_BENCHMARKS is not true"
+)
+
+
+def report(name: str, count: int, seconds: float) -> None:
+    rate = count / seconds if seconds > 0 else count
+    print(f"{name}: {count} rows in {seconds:.3f}s ({rate:.0f} rows/sec)", flush=True)
@@ -0,0 +1,43 @@
+import contextlib
+import importlib.util
+import os
+from typing import Any, Iterator
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+VERSIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic", "versions"
+)
+
+
+@contextlib.contextmanager
+def applied(db: Any, *revisions: str) -> Iterator[None]:
+    # creates the tables that are not part of the models (e.g. job) with their
+    # migration and drops them again before the models are dropped
+    migrations = [__load(revision) for revision in revisions]
+    __run(db, [migration.upgrade for migration in migrations])
+    try:
+        yield
+    finally:
+        db.rollback()
+        __run(db, [migration.downgrade for migration in reversed(migrations)])
+
+
+def __run(db: Any, steps: Any) -> None:
+    with Operations.context(MigrationContext.configure(db.connection())):
+        for step in steps:
+            step()
+    db.commit()
+
+
+def __load(revision: str) -> Any:
+    file_name = next(
+        name for name in os.listdir(VERSIONS_DIR) if name.startswith(f"{revision}_")
+    )
+    spec = importlib.util.spec_from_file_location(
+        f"migration_{revision}", os.path.join(VERSIONS_DIR, file_name)
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,21 @@
+from contextlib import contextmanager
+from typing import Any, Iterator, List
+
+from sqlalchemy import event
+
+
+@contextmanager
+def count_queries(bind: Any) -> Iterator[List[str]]:
+    """Collects the sql statements executed on bind inside the with block, e.g.
+    assert len(statements) == 1 to make sure resolvers are batched.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,62 @@
+import pytest
+
+from controller.auth import access_cache
+
+USER_ID = "user"
+PROJECT_ID = "project"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    access_cache.invalidate_all()
+    yield
+    access_cache.invalidate_all()
+
+
+def test_granted_access_is_reused():
+    assert not access_cache.has_project_access(USER_ID, PROJECT_ID)
+
+    access_cache.grant_project_access(USER_ID, PROJECT_ID)
+    access_cache.set_organization_id(USER_ID, "organization")
+
+    assert access_cache.has_project_access(USER_ID, PROJECT_ID)
+    assert not access_cache.has_project_access(USER_ID, "other project")
+    assert access_cache.get_organization_id(USER_ID) == "organization"
+
+
+def test_decisions_expire_after_the_ttl(monkeypatch):
+    access_cache.grant_project_access(USER_ID, PROJECT_ID)
+    access_cache.set_organization_id(USER_ID, "organization")
+
+    monkeypatch.setattr(access_cache, "ACCESS_CACHE_TTL", 0)
+
+    assert not access_cache.has_project_access(USER_ID, PROJECT_ID)
+    assert access_cache.get_organization_id(USER_ID) is None
+
+
+def test_invalidation_drops_the_decisions_of_the_user_or_project():
+    access_cache.grant_project_access(USER_ID, PROJECT_ID)
+    access_cache.grant_project_access(USER_ID, "other project")
+    access_cache.grant_project_access("other user", PROJECT_ID)
+    access_cache.set_organization_id(USER_ID, "organization")
+
+    access_cache.invalidate_user(USER_ID)
+
+    assert access_cache.get_organization_id(USER_ID) is None
+    assert not access_cache.has_project_access(USER_ID, "other project")
+    assert access_cache.has_project_access("other user", PROJECT_ID)
+
+    access_cache.invalidate_project(PROJECT_ID)
+
+    assert not access_cache.has_project_access("other user", PROJECT_ID)
+
+
+def test_expired_decisions_are_dropped_when_the_cache_is_full(monkeypatch):
+    monkeypatch.setattr(access_cache, "MAX_ENTRIES", 3)
+    for idx in range(3):
+        access_cache.grant_project_access(USER_ID, f"project {idx}")
+    monkeypatch.setattr(access_cache, "ACCESS_CACHE_TTL", 0)
+
+    access_cache.grant_project_access(USER_ID, PROJECT_ID)
+
+    assert access_cache.get_cache_info()["project_access"] == 1
@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from controller.misc import config_service
+
+
+class ConfigStandIn(BaseHTTPRequestHandler):
+    requests = []
+    config = {}
+    delay = 0
+
+    def do_GET(self):
+        ConfigStandIn.requests.append(self.path)
+        time.sleep(ConfigStandIn.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        # the config service answers with the config as json encoded string
+        self.wfile.write(json.dumps(json.dumps(ConfigStandIn.config)).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def config_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ConfigStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        config_service,
+        "REQUEST_URL",
+        f"http://127.0.0.1:{server.server_port}/full_config",
+    )
+    monkeypatch.setattr(config_service, "__config", None)
+    ConfigStandIn.requests = []
+    ConfigStandIn.config = {"is_managed": False, "s3": {"bucket": "first"}}
+    ConfigStandIn.delay = 0
+    yield ConfigStandIn
+    server.shutdown()
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_config_is_fetched_once(config_server):
+    assert config_service.get_config_value("s3", "bucket") == "first"
+    assert config_service.get_config_value("is_managed") is False
+
+    assert config_server.requests == ["/full_config"]
+
+
+def test_stale_config_is_served_while_it_is_refreshed(config_server, monkeypatch):
+    config_service.get_config_value("s3")
+    config_server.config = {"s3": {"bucket": "second"}}
+    monkeypatch.setattr(config_service, "CONFIG_TTL", 0)
+
+    assert config_service.get_config_value("s3", "bucket") == "first"
+
+    monkeypatch.setattr(config_service, "CONFIG_TTL", 3600)
+    wait_for(lambda: config_service.get_config_value("s3", "bucket") == "second")
+
+
+def test_slow_service_times_out_without_holding_the_lock(config_server, monkeypatch):
+    monkeypatch.setattr(config_service, "CONFIG_REQUEST_TIMEOUT", 0.5)
+    config_server.delay = 1
+    lock = getattr(config_service, "__refresh_lock")
+    errors = []
+
+    def refresh():
+        try:
+            config_service.refresh_config()
+        except requests.exceptions.Timeout as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=refresh)
+    thread.start()
+    wait_for(lambda: config_server.requests)
+
+    assert lock.acquire(timeout=0.1)
+    lock.release()
+    thread.join()
+    assert len(errors) == 1
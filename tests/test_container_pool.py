@@ -0,0 +1,128 @@
+import itertools
+import threading
+from types import SimpleNamespace
+
+from util.container_pool import ContainerPool
+
+
+class FakeContainer:
+    def __init__(self, client, image):
+        self.client = client
+        self.id = f"{image}-{next(client.ids)}"
+        self.status = "running"
+        self.removed = False
+
+    def reload(self):
+        self.client.assert_unlocked()
+
+    def remove(self, force=False):
+        self.client.assert_unlocked()
+        self.client.remove_gate.wait(5)
+        self.removed = True
+        self.status = "removed"
+
+
+class OwnedLock:
+    # the lock of the pool, knows which thread holds it
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.owner = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.owner = threading.get_ident()
+
+    def __exit__(self, *args):
+        self.owner = None
+        self._lock.release()
+
+
+class FakeClient:
+    # the parts of the docker-py client used by the pool
+    def __init__(self):
+        self.ids = itertools.count()
+        self.pool = None
+        self.remove_gate = threading.Event()
+        self.remove_gate.set()
+        self.containers = SimpleNamespace(run=self.run)
+
+    def run(self, image, **kwargs):
+        self.assert_unlocked()
+        return FakeContainer(self, image)
+
+    def assert_unlocked(self):
+        # other threads may hold the lock meanwhile, only the calling one must not
+        assert self.pool._lock.owner != threading.get_ident()
+
+
+def create_pool(size=1, max_uses=2):
+    client = FakeClient()
+    pool = ContainerPool(client, size=size, max_uses=max_uses)
+    pool._lock = OwnedLock()
+    client.pool = pool
+    return client, pool
+
+
+def test_containers_are_reused_until_max_uses():
+    client, pool = create_pool(size=1, max_uses=2)
+    pool.register("lf", asynchronous=False)
+    # no refill in the background, the released container is the only idle one
+    pool.fill = lambda image, asynchronous=True: None
+
+    first = pool.acquire("lf")
+    pool.release("lf", first)
+    second = pool.acquire("lf")
+    pool.release("lf", second)
+
+    assert first is second
+    assert first.removed
+    metrics = pool.get_metrics()["lf"]
+    assert metrics["hits"] == 2
+    assert metrics["recycled"] == 1
+    assert metrics["destroyed"] == 1
+    assert metrics["in_use"] == 0
+
+
+def test_stopped_containers_are_replaced():
+    client, pool = create_pool()
+    pool.register("lf", asynchronous=False)
+    stopped = pool.acquire("lf")
+    pool.release("lf", stopped)
+    stopped.status = "exited"
+
+    container = pool.acquire("lf")
+
+    assert container is not stopped
+    assert stopped.removed
+
+
+def test_slow_remove_does_not_block_other_images():
+    client, pool = create_pool(size=1, max_uses=1)
+    pool.register("lf", asynchronous=False)
+    pool.register("ml", asynchronous=False)
+    container = pool.acquire("lf")
+    client.remove_gate.clear()
+
+    releasing = threading.Thread(
+        target=pool.release, args=("lf", container), daemon=True
+    )
+    releasing.start()
+    acquired = pool.acquire("ml")
+    assert not container.removed
+
+    client.remove_gate.set()
+    releasing.join(5)
+    assert container.removed
+    pool.release("ml", acquired, reusable=False)
+
+
+def test_shutdown_removes_idle_containers():
+    client, pool = create_pool(size=2)
+    pool.register("lf", asynchronous=False)
+    idle = list(getattr(pool, "_idle")["lf"])
+
+    pool.shutdown()
+
+    assert len(idle) == 2
+    assert all(container.removed for container in idle)
+    assert pool.get_metrics()["lf"]["idle"] == 0
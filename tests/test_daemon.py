@@ -0,0 +1,33 @@
+import queue
+import threading
+
+from util import daemon
+
+
+def test_put_waits_for_the_consumer():
+    item_queue = queue.Queue(maxsize=1)
+    cancelled = threading.Event()
+    item_queue.put("first")
+    results = []
+
+    producer = threading.Thread(
+        target=lambda: results.append(
+            daemon.put_unless_cancelled(item_queue, "second", cancelled)
+        )
+    )
+    producer.start()
+    assert item_queue.get(timeout=5) == "first"
+    producer.join(5)
+
+    assert results == [True]
+    assert item_queue.get_nowait() == "second"
+
+
+def test_put_stops_once_the_consumer_cancelled():
+    item_queue = queue.Queue(maxsize=1)
+    cancelled = threading.Event()
+    item_queue.put("first")
+    cancelled.set()
+
+    assert not daemon.put_unless_cancelled(item_queue, "second", cancelled)
+    assert item_queue.qsize() == 1
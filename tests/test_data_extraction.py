@@ -0,0 +1,134 @@
+import timeit
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from controller.payload import payload_scheduler
+from tests.benchmark import benchmark, report
+
+LABELS = {"person": "label-person", "city": "label-city"}
+
+
+def collect_spans(chunk, max_token_num):
+    return getattr(payload_scheduler, "__collect_extraction_spans")(
+        chunk, max_token_num
+    )
+
+
+def check_spans(spans, tmp_log_store):
+    return getattr(payload_scheduler, "__check_extraction_span_errors")(
+        spans, LABELS, tmp_log_store, {}
+    )
+
+
+def check_per_span(chunk, max_token_num, tmp_log_store):
+    # the check add_data_extraction ran for every single span before
+    check = getattr(payload_scheduler, "__check_extraction_errors")
+    labels_valid = {}
+    has_errors = False
+    for record_id, lf_results in chunk.items():
+        for lf_result in lf_results:
+            if check(
+                max_token_num,
+                record_id,
+                lf_result,
+                LABELS,
+                tmp_log_store,
+                labels_valid,
+            ):
+                has_errors = True
+    return has_errors
+
+
+def create_chunk(record_count, spans_per_record=3):
+    chunk = {
+        str(idx): [
+            (0.9, "person" if span % 2 else "city", span * 3, span * 3 + 2)
+            for span in range(spans_per_record)
+        ]
+        for idx in range(record_count)
+    }
+    return chunk, {record_id: 20 for record_id in chunk}
+
+
+def test_columnar_check_logs_the_same_errors_as_the_per_span_check():
+    chunk, max_token_num = create_chunk(4)
+    chunk["1"].append((0.5, "person", 25, 26))
+    chunk["2"].append((0.5, "person", 4, 4))
+    chunk["3"].append((0.5, "country", 1, 2))
+    # deleted records are skipped
+    chunk["deleted"] = [(0.5, "person", 1, 2)]
+    expected_log = []
+    columnar_log = []
+
+    assert check_per_span(
+        {k: v for k, v in chunk.items() if k != "deleted"}, max_token_num, expected_log
+    )
+    assert check_spans(collect_spans(chunk, max_token_num), columnar_log)
+    assert sorted(line[20:] for line in columnar_log) == sorted(
+        line[20:] for line in expected_log
+    )
+
+
+def test_valid_spans_have_no_errors():
+    chunk, max_token_num = create_chunk(10)
+    tmp_log_store = []
+
+    assert not check_spans(collect_spans(chunk, max_token_num), tmp_log_store)
+    assert tmp_log_store == []
+
+
+def test_token_rows_cover_each_span():
+    spans = {
+        "starts": np.array([2, 0, 7], dtype=np.int64),
+        "ends": np.array([4, 1, 10], dtype=np.int64),
+    }
+    rla_ids = [uuid.uuid4() for _ in range(3)]
+
+    rows = list(
+        getattr(payload_scheduler, "__build_extraction_token_rows")(
+            spans, "project", rla_ids
+        )
+    )
+
+    assert [(row[2], row[3], row[4]) for row in rows] == [
+        (rla_ids[0], 2, True),
+        (rla_ids[0], 3, False),
+        (rla_ids[1], 0, True),
+        (rla_ids[2], 7, True),
+        (rla_ids[2], 8, False),
+        (rla_ids[2], 9, False),
+    ]
+
+
+@benchmark
+def test_extraction_rows_benchmark():
+    chunk, max_token_num = create_chunk(100000)
+    count = sum(len(spans) for spans in chunk.values())
+    payload = SimpleNamespace(source_id="source", created_by="user")
+
+    start = timeit.default_timer()
+    assert not check_per_span(chunk, max_token_num, [])
+    report("per span check", count, timeit.default_timer() - start)
+
+    start = timeit.default_timer()
+    spans = collect_spans(chunk, max_token_num)
+    assert not check_spans(spans, [])
+    report("columnar check", count, timeit.default_timer() - start)
+
+    start = timeit.default_timer()
+    rla_ids, rla_rows = getattr(payload_scheduler, "__build_extraction_rla_rows")(
+        spans, "project", LABELS, payload, datetime.now()
+    )
+    token_rows = list(
+        getattr(payload_scheduler, "__build_extraction_token_rows")(
+            spans, "project", rla_ids
+        )
+    )
+    report(
+        "association & token rows",
+        len(rla_rows) + len(token_rows),
+        timeit.default_timer() - start,
+    )
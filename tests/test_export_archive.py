@@ -0,0 +1,56 @@
+import zipfile
+
+import pytest
+
+from util import export_archive
+
+
+def rows(count, fail_at=None):
+    def generate():
+        for idx in range(count):
+            if idx == fail_at:
+                raise ValueError("fetch failed")
+            yield {"id": idx, "text": f"row {idx}"}
+
+    return generate
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # many chunks per section, so the background sections hit the queue limit
+    monkeypatch.setattr(export_archive, "WRITE_CHUNK_SIZE", 64)
+    monkeypatch.setattr(export_archive, "PREFETCH_CHUNKS", 2)
+
+
+def test_sections_are_read_back_in_order(tmp_path):
+    file_name = str(tmp_path / "export.zip")
+
+    export_archive.write_archive(
+        file_name,
+        {"name": "project"},
+        [
+            ("records", rows(500), True),
+            ("labels", rows(3), True),
+            ("comments", rows(20), False),
+        ],
+    )
+
+    with zipfile.ZipFile(file_name) as zip_file:
+        assert export_archive.is_archive(zip_file)
+        data = export_archive.ArchiveData(zip_file, {"records"})
+        assert data.get("name") == "project"
+        records = data.get("records")
+        assert len(records) == 500
+        assert [row["id"] for row in records] == list(range(500))
+        assert data.get("labels") == list(rows(3)())
+        assert len(data.get("comments")) == 20
+        assert data.get("missing", []) == []
+
+
+def test_errors_of_background_sections_reach_the_writer(tmp_path):
+    with pytest.raises(ValueError, match="fetch failed"):
+        export_archive.write_archive(
+            str(tmp_path / "export.zip"),
+            {},
+            [("records", rows(500, fail_at=300), True)],
+        )
@@ -0,0 +1,203 @@
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.sql import text as sql_text
+from submodules.model import enums, models
+
+from controller.payload import incremental
+from tests.migrations import applied
+from tests.test_setup import (  # noqa: F401
+    db_session,
+    default_setup,
+    project_setup,
+)
+
+BASE_FINGERPRINT = "base"
+
+
+@pytest.fixture
+def source(default_setup, project_setup, monkeypatch):
+    db = default_setup
+    monkeypatch.setattr(incremental, "session", db)
+    monkeypatch.setattr(incremental, "USE_INCREMENTAL_PAYLOAD", True)
+    monkeypatch.setattr(incremental, "INCREMENTAL_MAX_SHARE", 0.5)
+
+    with applied(db, "4a9b07e3d5c1", "e81c5f2b9a06", "b58e0c3a7f12"):
+        project_id = str(project_setup.id)
+        source_id = str(uuid.uuid4())
+        db.execute(
+            sql_text(
+                "INSERT INTO information_source (id, project_id, name) "
+                "VALUES (:id, :project_id, 'lf')"
+            ),
+            {"id": source_id, "project_id": project_id},
+        )
+        db.commit()
+        yield SimpleNamespace(
+            db=db, project_id=project_id, id=source_id, payload_count=0
+        )
+
+
+def add_payload(source, state, base_fingerprint=BASE_FINGERPRINT):
+    payload_id = str(uuid.uuid4())
+    source.payload_count += 1
+    source.db.execute(
+        sql_text(
+            """
+            INSERT INTO information_source_payload (
+                id, project_id, source_id, state, created_at
+            )
+            VALUES (:id, :project_id, :source_id, :state, :created_at);
+
+            INSERT INTO payload_fingerprint (
+                payload_id, project_id, source_id, fingerprint, base_fingerprint
+            )
+            VALUES (:id, :project_id, :source_id, 'fingerprint', :base_fingerprint);
+            """
+        ),
+        {
+            "id": payload_id,
+            "project_id": source.project_id,
+            "source_id": source.id,
+            "state": state,
+            "created_at": datetime.now() + timedelta(seconds=source.payload_count),
+            "base_fingerprint": base_fingerprint,
+        },
+    )
+    source.db.commit()
+    return payload_id
+
+
+def add_records(source, count):
+    records = [
+        models.Record(
+            project_id=source.project_id,
+            data={"text": str(idx)},
+            category=enums.RecordCategory.SCALE.value,
+        )
+        for idx in range(count)
+    ]
+    source.db.add_all(records)
+    source.db.commit()
+    record_ids = [str(record_item.id) for record_item in records]
+    for record_id in record_ids:
+        tokenize(source, record_id)
+    return record_ids
+
+
+def tokenize(source, record_id):
+    # retokenization replaces the row, its id is the docbin version
+    source.db.execute(
+        sql_text(
+            """
+            DELETE FROM record_tokenized WHERE record_id = :record_id;
+
+            INSERT INTO record_tokenized (id, project_id, record_id)
+            VALUES (:id, :project_id, :record_id);
+            """
+        ),
+        {
+            "id": str(uuid.uuid4()),
+            "project_id": source.project_id,
+            "record_id": record_id,
+        },
+    )
+    source.db.commit()
+
+
+def finished_run(source, record_ids=None):
+    # a run that took its snapshot and finished
+    payload_id = add_payload(source, enums.PayloadState.CREATED.value)
+    incremental.take_snapshot(source.project_id, source.id, record_ids)
+    source.db.execute(
+        sql_text("UPDATE information_source_payload SET state = :state WHERE id = :id"),
+        {"state": enums.PayloadState.FINISHED.value, "id": payload_id},
+    )
+    incremental.confirm_snapshot(source.id, payload_id, with_commit=True)
+    return payload_id
+
+
+def changed_records(source, base_fingerprint=BASE_FINGERPRINT):
+    # the payload is only planned, it isn't the previous run of later calls
+    payload_id = add_payload(source, enums.PayloadState.CREATED.value)
+    result = incremental.get_changed_records(
+        source.project_id, payload_id, source.id, base_fingerprint
+    )
+    source.db.execute(
+        sql_text("DELETE FROM information_source_payload WHERE id = :id"),
+        {"id": payload_id},
+    )
+    source.db.commit()
+    return result
+
+
+def test_changed_and_removed_records_are_detected(source):
+    record_ids = add_records(source, 6)
+    finished_run(source)
+
+    assert changed_records(source) == ([], [])
+
+    tokenize(source, record_ids[0])
+    source.db.execute(
+        sql_text("DELETE FROM record_tokenized WHERE record_id = :record_id"),
+        {"record_id": record_ids[1]},
+    )
+    source.db.commit()
+    (new_record_id,) = add_records(source, 1)
+
+    changed, removed = changed_records(source)
+    assert sorted(changed) == sorted([record_ids[0], new_record_id])
+    assert removed == [record_ids[1]]
+
+
+def test_falls_back_to_full_runs(source):
+    record_ids = add_records(source, 4)
+
+    # no earlier run
+    assert changed_records(source) is None
+
+    finished_run(source)
+    assert changed_records(source, base_fingerprint="other code") is None
+
+    # more than the max share changed
+    for record_id in record_ids[:3]:
+        tokenize(source, record_id)
+    assert changed_records(source) is None
+
+    finished_run(source)
+    assert changed_records(source) == ([], [])
+    add_payload(source, enums.PayloadState.FAILED.value)
+    assert changed_records(source) is None
+
+
+def test_snapshot_writes_only_changed_versions(source):
+    record_ids = add_records(source, 3)
+    finished_run(source)
+
+    def row_versions():
+        # xmin changes with every write of a row
+        return dict(
+            source.db.execute(
+                sql_text(
+                    "SELECT record_id::TEXT, xmin::TEXT FROM payload_record_version "
+                    "WHERE source_id = :source_id"
+                ),
+                {"source_id": source.id},
+            ).fetchall()
+        )
+
+    before = row_versions()
+    tokenize(source, record_ids[0])
+    source.db.execute(
+        sql_text("DELETE FROM record_tokenized WHERE record_id = :record_id"),
+        {"record_id": record_ids[1]},
+    )
+    source.db.commit()
+    finished_run(source)
+    after = row_versions()
+
+    assert sorted(after) == sorted([record_ids[0], record_ids[2]])
+    assert after[record_ids[0]] != before[record_ids[0]]
+    assert after[record_ids[2]] == before[record_ids[2]]
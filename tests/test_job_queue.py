@@ -0,0 +1,129 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.sql import text as sql_text
+
+from controller.job_queue import job
+from controller.job_queue import manager as job_manager
+from tests.migrations import applied
+from tests.test_setup import (  # noqa: F401
+    create_project,
+    db_session,
+    default_setup,
+    project_setup,
+)
+
+KIND = "test_job"
+
+
+@pytest.fixture
+def queue(default_setup, project_setup, monkeypatch):
+    db = default_setup
+    monkeypatch.setattr(job, "session", db)
+    monkeypatch.setattr(
+        job_manager,
+        "general",
+        SimpleNamespace(
+            get_ctx_token=lambda: None,
+            reset_ctx_token=lambda *args: None,
+            commit=db.commit,
+            rollback=db.rollback,
+        ),
+    )
+    monkeypatch.setattr(job_manager, "JOB_RETRY_DELAY", 0)
+    monkeypatch.setitem(
+        getattr(job_manager, "__kinds"), KIND, {"max_attempts": 2, "project_limit": 1}
+    )
+    monkeypatch.setitem(getattr(job_manager, "__wake_ups"), KIND, threading.Event())
+
+    projects = [project_setup, create_project(db, "other")]
+    with applied(db, "c2f6d1a8e4b7"):
+        yield SimpleNamespace(db=db, project_ids=[str(p.id) for p in projects])
+
+
+def enqueue(project_id, priority=0):
+    return job_manager.enqueue(
+        KIND, project_id, {"project_id": project_id}, priority, with_commit=True
+    )
+
+
+def claim():
+    return job.claim(KIND, "worker", 1, with_commit=True)
+
+
+def state_of(job_id):
+    return job.get_states([job_id])[job_id]
+
+
+def test_enqueue_leaves_the_commit_to_the_caller(queue):
+    job_id = job_manager.enqueue(KIND, queue.project_ids[0], {})
+    queue.db.rollback()
+
+    assert job.get_states([job_id]) == {}
+
+    job_id = job_manager.enqueue(KIND, queue.project_ids[0], {})
+    queue.db.commit()
+
+    assert state_of(job_id) == job.QUEUED
+
+
+def test_claim_takes_the_highest_priority_within_the_project_limit(queue):
+    first_project, second_project = queue.project_ids
+    low = enqueue(first_project)
+    high = enqueue(first_project, priority=5)
+    other = enqueue(second_project)
+
+    claimed = [claim().id, claim().id]
+
+    assert claimed == [high, other]
+    # one running job per project, the second job of the project waits
+    assert claim() is None
+    assert state_of(low) == job.QUEUED
+
+    job.finish(high, job.FINISHED, with_commit=True)
+    assert claim().id == low
+
+
+def test_failed_jobs_are_retried_until_max_attempts(queue):
+    job_id = enqueue(queue.project_ids[0])
+    complete = getattr(job_manager, "__complete")
+
+    complete(claim(), "first error")
+    assert state_of(job_id) == job.QUEUED
+
+    claimed = claim()
+    assert claimed.id == job_id
+    assert claimed.attempts == 2
+    complete(claimed, "second error")
+
+    assert state_of(job_id) == job.FAILED
+    assert claim() is None
+
+
+def make_stale(queue, job_id):
+    queue.db.execute(
+        sql_text(
+            "UPDATE job SET heartbeat_at = NOW() - INTERVAL '1 hour' WHERE id = :id"
+        ),
+        {"id": job_id},
+    )
+    queue.db.commit()
+
+
+def test_stale_jobs_are_released(queue):
+    job_id = enqueue(queue.project_ids[0])
+    claim()
+    job.touch([job_id], with_commit=True)
+
+    assert job.release_stale(60, with_commit=True) == 0
+
+    make_stale(queue, job_id)
+    assert job.release_stale(60, with_commit=True) == 1
+    assert state_of(job_id) == job.QUEUED
+
+    # the last attempt isn't given back
+    claim()
+    make_stale(queue, job_id)
+    assert job.release_stale(60, with_commit=True) == 1
+    assert state_of(job_id) == job.FAILED
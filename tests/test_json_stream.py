@@ -0,0 +1,91 @@
+import io
+import json
+import timeit
+
+import pytest
+
+from tests.benchmark import benchmark, report
+from util import json_stream
+
+DATA = {
+    "a": [1, 2.5, "text with , and }"],
+    "b": {"nested": None, "flag": True},
+    "c": 12345678901234567890,
+    "d": "",
+}
+
+
+@pytest.mark.parametrize("read_size", [1, 3, 1024])
+def test_object_items_match_json_load(read_size):
+    items = json_stream.iterate_object_items(io.StringIO(json.dumps(DATA)), read_size)
+
+    assert dict(items) == DATA
+
+
+@pytest.mark.parametrize("read_size", [1, 1024])
+def test_array_items_match_json_load(read_size):
+    items = [DATA, [], 1, "two", None]
+
+    result = json_stream.iterate_array_items(io.StringIO(json.dumps(items)), read_size)
+
+    assert list(result) == items
+
+
+@pytest.mark.parametrize("content", ["{}", " { } \n", "[]"])
+def test_empty_containers(content):
+    iterate = (
+        json_stream.iterate_object_items
+        if content.strip().startswith("{")
+        else json_stream.iterate_array_items
+    )
+
+    assert list(iterate(io.StringIO(content))) == []
+
+
+@pytest.mark.parametrize(
+    "content",
+    ['{"a": 1} {"b": 2}', '{"a": 1}x', "{}]", '["a"] ["b"]', "[1],"],
+)
+def test_data_after_the_end_is_rejected(content):
+    iterate = (
+        json_stream.iterate_object_items
+        if content.startswith("{")
+        else json_stream.iterate_array_items
+    )
+
+    with pytest.raises(ValueError):
+        list(iterate(io.StringIO(content), 2))
+
+
+@pytest.mark.parametrize("content", ['{"a": 1', '{"a": 1,', '{"a" 1}', "[1 2]"])
+def test_broken_json_is_rejected(content):
+    iterate = (
+        json_stream.iterate_object_items
+        if content.startswith("{")
+        else json_stream.iterate_array_items
+    )
+
+    with pytest.raises(ValueError):
+        list(iterate(io.StringIO(content)))
+
+
+@benchmark
+def test_iterate_object_items_benchmark(tmp_path):
+    count = 200000
+    file_name = tmp_path / "output.json"
+    file_name.write_text(
+        json.dumps({f"record-{idx}": [idx, "label", 0.9] for idx in range(count)})
+    )
+
+    start = timeit.default_timer()
+    with open(file_name, encoding="utf-8") as file:
+        assert len(json.load(file)) == count
+    report("json.load", count, timeit.default_timer() - start)
+
+    start = timeit.default_timer()
+    assert (
+        sum(1 for _ in json_stream.iterate_file_object_items(str(file_name))) == count
+    )
+    report(
+        "json_stream.iterate_file_object_items", count, timeit.default_timer() - start
+    )
@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.sql import text as sql_text
+from submodules.model import enums, models
+
+from controller.transfer import key_hash_index
+from tests.migrations import applied
+from tests.test_setup import (  # noqa: F401
+    db_session,
+    default_setup,
+    project_setup,
+)
+from util import bulk_write
+
+
+def hashes_of(values, key_names=["id"]):
+    return key_hash_index.hash_keys(pd.DataFrame(values, columns=key_names), key_names)
+
+
+def test_integral_floats_hash_like_postgres_text():
+    # an int column with gaps is read as float, postgres returns 1 for data->>'id'
+    from_file = hashes_of([[1.0], [2.0], [-3.0]])
+    from_database = hashes_of([["1"], ["2"], ["-3"]])
+
+    assert np.array_equal(from_file, from_database)
+    assert np.array_equal(from_file, hashes_of([[1], [2], [-3]]))
+
+
+def test_fractions_and_bools_keep_their_text():
+    assert np.array_equal(hashes_of([[1.5]]), hashes_of([["1.5"]]))
+    assert np.array_equal(
+        hashes_of([[True], [False]]), hashes_of([["true"], ["false"]])
+    )
+    assert not np.array_equal(hashes_of([[1.5]]), hashes_of([["1"]]))
+
+
+def test_hashes_are_stable():
+    # stored in record_key_hash, a changed hash would miss every existing record
+    assert hashes_of([[1]]).tolist() == [3984358298208767412]
+    assert hashes_of([["1", "x"], [2.0, "y"]], ["a", "b"]).tolist() == [
+        246668540000267107,
+        888700840438783862,
+    ]
+
+
+def test_composite_keys_depend_on_every_column():
+    key_names = ["a", "b"]
+
+    assert not key_hash_index.has_duplicates(
+        hashes_of([["x", "1"], ["x", "2"], ["y", "1"]], key_names)
+    )
+    assert key_hash_index.has_duplicates(hashes_of([["x", "1"], ["x", 1.0]], key_names))
+    assert not key_hash_index.has_duplicates(
+        hashes_of([["ab", "c"], ["a", "bc"]], key_names)
+    )
+
+
+@pytest.fixture
+def project(default_setup, project_setup, monkeypatch):
+    db = default_setup
+    monkeypatch.setattr(key_hash_index, "session", db)
+    monkeypatch.setattr(key_hash_index, "general", SimpleNamespace(commit=db.commit))
+    monkeypatch.setattr(bulk_write, "session", db)
+
+    with applied(db, "7d3e9c41b2f8"):
+        yield SimpleNamespace(db=db, id=str(project_setup.id))
+
+
+def add_records(project, keys):
+    records = [
+        models.Record(
+            project_id=project.id,
+            data={"id": key, "text": f"record {key}"},
+            category=enums.RecordCategory.SCALE.value,
+        )
+        for key in keys
+    ]
+    project.db.add_all(records)
+    project.db.commit()
+    return records
+
+
+def stored_hash_count(project):
+    return project.db.execute(
+        sql_text("SELECT COUNT(*) FROM record_key_hash WHERE project_id = :project_id"),
+        {"project_id": project.id},
+    ).scalar()
+
+
+def test_sync_hashes_only_new_records(project):
+    add_records(project, [1, 2])
+    key_hash_index.sync(project.id, ["id"], with_commit=True)
+    add_records(project, [3])
+
+    key_hash_index.sync(project.id, ["id"], with_commit=True)
+
+    assert stored_hash_count(project) == 3
+    assert key_hash_index.count_existing(project.id, hashes_of([[1.0], [3], [4]])) == 2
+
+
+def test_key_edits_and_deletes_are_seen(project):
+    records = add_records(project, [1, 2])
+    key_hash_index.sync(project.id, ["id"], with_commit=True)
+
+    records[0].data = {"id": 10, "text": "record 10"}
+    project.db.delete(records[1])
+    project.db.commit()
+    # the trigger dropped the outdated hash, the delete cascaded
+    assert stored_hash_count(project) == 0
+
+    key_hash_index.sync(project.id, ["id"], with_commit=True)
+
+    assert key_hash_index.count_existing(project.id, hashes_of([[1], [2]])) == 0
+    assert key_hash_index.count_existing(project.id, hashes_of([[10]])) == 1
+
+
+def test_changed_key_names_rebuild_the_hashes(project):
+    add_records(project, [1])
+    key_hash_index.sync(project.id, ["id"], with_commit=True)
+
+    key_hash_index.sync(project.id, ["id", "text"], with_commit=True)
+
+    assert stored_hash_count(project) == 1
+    assert key_hash_index.count_existing(project.id, hashes_of([[1]])) == 0
+    assert (
+        key_hash_index.count_existing(
+            project.id, hashes_of([[1, "record 1"]], ["id", "text"])
+        )
+        == 1
+    )
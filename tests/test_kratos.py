@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from controller.auth import kratos
+
+IDENTITIES = [
+    {
+        "id": "5b1b6d1c-5f7c-4c5a-9b59-1a9f5a3c1d01",
+        "traits": {
+            "email": "jane@example.com",
+            "name": {"first": "Jane", "last": "Doe"},
+        },
+    },
+    {
+        "id": "5b1b6d1c-5f7c-4c5a-9b59-1a9f5a3c1d02",
+        "traits": {
+            "email": "john@example.com",
+            "name": {"first": "John", "last": "Roe"},
+        },
+    },
+]
+
+
+class KratosStandIn(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        KratosStandIn.requests.append(self.path)
+        if self.path == "/identities/slow":
+            # longer than the timeout of the test
+            time.sleep(1)
+        if self.path == "/identities":
+            self.__respond(200, IDENTITIES)
+            return
+        for identity in IDENTITIES:
+            if self.path == f"/identities/{identity['id']}":
+                self.__respond(200, identity)
+                return
+        self.__respond(404, {"error": {"code": 404}})
+
+    def log_message(self, *args):
+        pass
+
+    def __respond(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+
+@pytest.fixture
+def kratos_server(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), KratosStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        kratos, "KRATOS_ADMIN_URL", f"http://127.0.0.1:{server.server_port}"
+    )
+    KratosStandIn.requests = []
+    kratos.invalidate()
+    yield KratosStandIn.requests
+    kratos.invalidate()
+    server.shutdown()
+
+
+def test_identity_is_fetched_once(kratos_server):
+    user_id = IDENTITIES[0]["id"]
+    assert kratos.resolve_user_mail_by_id(user_id) == "jane@example.com"
+    assert kratos.resolve_user_name_by_id(user_id) == {"first": "Jane", "last": "Doe"}
+    assert kratos_server == [f"/identities/{user_id}"]
+    assert kratos.get_cache_info()["hits"] >= 1
+
+
+def test_unknown_identity_is_cached(kratos_server):
+    assert kratos.resolve_user_mail_by_id("unknown") is None
+    assert kratos.resolve_user_mail_by_id("unknown") is None
+    assert kratos_server == ["/identities/unknown"]
+
+
+def test_mail_index_is_filled_by_one_list_call(kratos_server):
+    assert kratos.get_userid_from_mail("john@example.com") == IDENTITIES[1]["id"]
+    assert kratos.get_userid_from_mail("jane@example.com") == IDENTITIES[0]["id"]
+    assert kratos.resolve_user_mail_by_id(IDENTITIES[0]["id"]) == "jane@example.com"
+    assert kratos_server == ["/identities"]
+
+
+def test_bulk_resolve_uses_list_call(kratos_server):
+    traits = kratos.resolve_users_by_ids([identity["id"] for identity in IDENTITIES])
+    assert [traits[identity["id"]]["email"] for identity in IDENTITIES] == [
+        "jane@example.com",
+        "john@example.com",
+    ]
+    assert kratos_server == ["/identities"]
+
+
+def test_invalidate_and_ttl_refetch(kratos_server, monkeypatch):
+    user_id = IDENTITIES[0]["id"]
+    kratos.resolve_user_mail_by_id(user_id)
+    kratos.invalidate(user_id)
+    kratos.resolve_user_mail_by_id(user_id)
+    monkeypatch.setattr(kratos, "KRATOS_CACHE_TTL", 0)
+    kratos.resolve_user_mail_by_id(user_id)
+    assert kratos_server == [f"/identities/{user_id}"] * 3
+
+
+def test_slow_kratos_times_out_without_caching(kratos_server, monkeypatch):
+    monkeypatch.setattr(kratos, "KRATOS_TIMEOUT", 0.2)
+
+    start = time.monotonic()
+    assert kratos.resolve_user_mail_by_id("slow") is None
+
+    assert time.monotonic() - start < 1
+    assert kratos.get_cache_info()["identities"] == 0
@@ -0,0 +1,178 @@
+from types import SimpleNamespace
+
+import pytest
+from promise import Promise
+from submodules.model import enums, models
+
+from graphql_api import loaders
+from tests.query_count import count_queries
+from tests.test_kratos import IDENTITIES, kratos_server  # noqa: F401
+from tests.test_setup import db_session, default_setup  # noqa: F401
+
+SCALE = enums.RecordCategory.SCALE.value
+MANUAL = enums.LabelSource.MANUAL.value
+
+
+@pytest.fixture
+def db(default_setup, monkeypatch):
+    monkeypatch.setattr(loaders, "session", default_setup)
+    yield default_setup
+
+
+@pytest.fixture
+def projects(db):
+    organization = db.query(models.Organization).first()
+    project_items = [
+        models.Project(name=f"project {idx}", organization_id=organization.id)
+        for idx in range(3)
+    ]
+    db.add_all(project_items)
+    db.flush()
+    for idx, project_item in enumerate(project_items):
+        db.add_all(
+            [
+                models.Record(
+                    project_id=project_item.id,
+                    data={"text": str(number)},
+                    category=SCALE,
+                )
+                for number in range(idx + 1)
+            ]
+        )
+    db.commit()
+    yield project_items
+
+
+def load_counted(db, name, keys):
+    # like the graphql executor the loads happen inside a promise callback, the batch
+    # is dispatched once the callback returned
+    info = SimpleNamespace(context={})
+
+    def load_all(_):
+        return Promise.all([loaders.load(info, name, key) for key in keys])
+
+    with count_queries(db.get_bind()) as statements:
+        values = Promise.resolve(None).then(load_all).get()
+        cached = loaders.load(info, name, keys[0]).get()
+    assert cached == values[0]
+    return values, statements
+
+
+def test_project_record_counts_use_one_query(db, projects):
+    counts, statements = load_counted(
+        db, "project_record_counts", [project_item.id for project_item in projects]
+    )
+
+    assert len(statements) == 1
+    assert [count[SCALE] for count in counts] == [1, 2, 3]
+
+
+def test_label_counts_use_one_query_per_loader(db, projects):
+    project_item = projects[2]
+    task = models.LabelingTask(
+        name="sentiment",
+        project_id=project_item.id,
+        task_type=enums.LabelingTaskType.CLASSIFICATION.value,
+    )
+    db.add(task)
+    db.flush()
+    labels = [
+        models.LabelingTaskLabel(
+            name=name, labeling_task_id=task.id, project_id=project_item.id
+        )
+        for name in ["positive", "negative"]
+    ]
+    db.add_all(labels)
+    db.flush()
+    record_items = (
+        db.query(models.Record).filter(models.Record.project_id == project_item.id)
+    ).all()
+    db.add_all(
+        [
+            models.RecordLabelAssociation(
+                project_id=project_item.id,
+                record_id=record_item.id,
+                labeling_task_label_id=labels[idx % 2].id,
+                source_type=MANUAL,
+            )
+            for idx, record_item in enumerate(record_items)
+        ]
+    )
+    db.commit()
+
+    label_counts, label_statements = load_counted(
+        db, "label_counts", [label.id for label in labels]
+    )
+    task_counts, task_statements = load_counted(db, "labeling_task_counts", [task.id])
+    labeled_counts, labeled_statements = load_counted(
+        db, "project_labeled_counts", [project_item.id for project_item in projects]
+    )
+
+    assert len(label_statements) == len(task_statements) == 1
+    assert len(labeled_statements) == 1
+    assert [count[(SCALE, MANUAL)] for count in label_counts] == [2, 1]
+    assert task_counts == [{(SCALE, MANUAL): 3}]
+    assert labeled_counts == [{}, {}, {(SCALE, MANUAL): 3}]
+
+
+def test_embedding_counts_and_dimensions_use_one_query_per_loader(db, projects):
+    project_item = projects[2]
+    embeddings = [
+        models.Embedding(project_id=project_item.id, name=name)
+        for name in ["attribute", "token"]
+    ]
+    db.add_all(embeddings)
+    db.flush()
+    record_items = (
+        db.query(models.Record).filter(models.Record.project_id == project_item.id)
+    ).all()
+    db.add_all(
+        [
+            models.EmbeddingTensor(
+                project_id=project_item.id,
+                record_id=record_item.id,
+                embedding_id=embeddings[0].id,
+                data=[0.1, 0.2, 0.3],
+            )
+            for record_item in record_items
+        ]
+        + [
+            models.EmbeddingTensor(
+                project_id=project_item.id,
+                record_id=record_items[0].id,
+                embedding_id=embeddings[1].id,
+                data=[[0.1, 0.2], [0.3, 0.4]],
+            )
+        ]
+    )
+    db.commit()
+    embedding_ids = [embedding.id for embedding in embeddings]
+
+    tensor_counts, count_statements = load_counted(
+        db, "embedding_tensor_counts", embedding_ids
+    )
+    dimensions, dimension_statements = load_counted(
+        db, "embedding_dimensions", embedding_ids
+    )
+
+    assert len(count_statements) == len(dimension_statements) == 1
+    assert tensor_counts == [3, 1]
+    assert dimensions == [3, 2]
+
+
+def test_keys_that_are_no_ids_get_the_default_without_query(db):
+    counts, statements = load_counted(
+        db, "project_record_counts", ["'); DROP TABLE record; --"]
+    )
+
+    assert statements == []
+    assert counts == [{}]
+
+
+def test_user_traits_use_one_kratos_request(db, kratos_server):
+    traits, _ = load_counted(
+        db, "user_traits", [identity["id"] for identity in IDENTITIES]
+    )
+
+    assert kratos_server == ["/identities"]
+    assert traits == [identity["traits"] for identity in IDENTITIES]
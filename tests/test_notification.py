@@ -0,0 +1,117 @@
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from util import notification
+
+ORGANIZATION_ID = "5b1b6d1c-5f7c-4c5a-9b59-1a9f5a3c1d01"
+
+
+class WebsocketStandIn(BaseHTTPRequestHandler):
+    messages = queue.Queue()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if body["message"].endswith(":slow"):
+            # longer than the timeout, the dispatcher is gone before the answer
+            time.sleep(1)
+        else:
+            WebsocketStandIn.messages.put(body)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def websocket_messages(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WebsocketStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        notification, "WEBSOCKET_ENDPOINT", f"http://127.0.0.1:{server.server_port}"
+    )
+    WebsocketStandIn.messages = queue.Queue()
+    yield WebsocketStandIn.messages
+    server.shutdown()
+
+
+def received(messages, count):
+    return [messages.get(timeout=5)["message"] for _ in range(count)]
+
+
+def test_duplicates_keep_their_last_position():
+    coalesce = getattr(notification, "__coalesce")
+
+    batch = [("o", "a"), ("o", "b"), ("o", "a"), ("p", "a"), ("o", "c")]
+
+    assert coalesce(batch) == [("o", "b"), ("o", "a"), ("p", "a"), ("o", "c")]
+
+
+@pytest.fixture
+def project_lookups(monkeypatch):
+    lookups = []
+
+    def get(project_id):
+        lookups.append(project_id)
+        return SimpleNamespace(organization_id=ORGANIZATION_ID)
+
+    monkeypatch.setattr(notification.project, "get", get)
+    monkeypatch.setattr(notification, "__organization_by_project", {})
+    yield lookups
+
+
+def test_organization_of_a_deleted_project_is_looked_up_again(project_lookups):
+    get_organization_id = getattr(notification, "__get_organization_id")
+
+    get_organization_id("project")
+    get_organization_id("project")
+    notification.invalidate_project("project")
+    get_organization_id("project")
+
+    assert project_lookups == ["project", "project"]
+
+
+def test_organization_mapping_is_bounded(project_lookups, monkeypatch):
+    monkeypatch.setattr(notification, "MAX_ORGANIZATION_ENTRIES", 2)
+    get_organization_id = getattr(notification, "__get_organization_id")
+
+    for project_id in ["a", "b", "c", "a"]:
+        assert get_organization_id(project_id) == ORGANIZATION_ID
+
+    assert len(getattr(notification, "__organization_by_project")) <= 2
+    assert project_lookups == ["a", "b", "c", "a"]
+
+
+def test_updates_reach_the_websocket_service(websocket_messages):
+    for message in ["first", "second", "first"]:
+        notification.send_organization_update(
+            "project", message, organization_id=ORGANIZATION_ID
+        )
+
+    assert received(websocket_messages, 2) == ["project:second", "project:first"]
+
+
+def test_dispatcher_survives_broken_updates(websocket_messages, monkeypatch):
+    monkeypatch.setattr(notification, "POST_TIMEOUT", 0.2)
+    notification.send_organization_update(
+        "project", "warm up", organization_id=ORGANIZATION_ID
+    )
+    received(websocket_messages, 1)
+
+    # not serializable, fails outside of requests' own exceptions
+    getattr(notification, "__queue").put((object(), "broken"))
+    notification.send_organization_update(
+        "project", "slow", organization_id=ORGANIZATION_ID
+    )
+    notification.send_organization_update(
+        "project", "after", organization_id=ORGANIZATION_ID
+    )
+
+    # the slow update timed out instead of blocking the ones behind it
+    assert received(websocket_messages, 1) == ["project:after"]
@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+
+import pytest
+from submodules.model import enums
+
+from controller.payload import payload_scheduler
+
+PROJECT_ID = "5b1b6d1c-5f7c-4c5a-9b59-1a9f5a3c1d01"
+
+
+@pytest.fixture
+def batch(monkeypatch):
+    calls = SimpleNamespace(
+        enqueued=[], waited=[], deleted=[], weak_supervision=[], notifications=[]
+    )
+    states = {}
+
+    def enqueue(kind, project_id, arguments):
+        calls.enqueued.append((kind, arguments))
+        return f"job {len(calls.enqueued)}"
+
+    monkeypatch.setattr(
+        payload_scheduler,
+        "job_manager",
+        SimpleNamespace(enqueue=enqueue, wait_for=calls.waited.extend),
+    )
+    monkeypatch.setattr(
+        payload_scheduler,
+        "s3",
+        SimpleNamespace(
+            put_object=lambda *args: None,
+            delete_object=lambda org_id, name: calls.deleted.append(name),
+        ),
+    )
+    monkeypatch.setattr(
+        payload_scheduler,
+        "organization",
+        SimpleNamespace(get_id_by_project_id=lambda project_id: "org"),
+    )
+    monkeypatch.setattr(
+        payload_scheduler,
+        "knowledge_base",
+        SimpleNamespace(build_knowledge_base_from_project=lambda project_id: "{}"),
+    )
+    monkeypatch.setattr(
+        payload_scheduler, "get_doc_bin_progress", lambda project_id: "100"
+    )
+    monkeypatch.setattr(
+        payload_scheduler, "general", SimpleNamespace(commit=lambda: None)
+    )
+    monkeypatch.setattr(
+        payload_scheduler,
+        "information_source",
+        SimpleNamespace(
+            get_payload=lambda project_id, payload_id: SimpleNamespace(
+                state=states[payload_id]
+            )
+        ),
+    )
+    monkeypatch.setattr(
+        payload_scheduler,
+        "ws_manager",
+        SimpleNamespace(
+            create_task_for_project=lambda project_id, user_id: "ws task",
+            run_task_for_project=lambda *args: calls.weak_supervision.append(args),
+        ),
+    )
+    monkeypatch.setattr(
+        payload_scheduler,
+        "create_notification",
+        lambda notification_type, *args: calls.notifications.append(notification_type),
+    )
+    monkeypatch.setattr(
+        payload_scheduler,
+        "notification",
+        SimpleNamespace(send_organization_update=lambda *args: None),
+    )
+
+    def run(payload_states):
+        states.update(payload_states)
+        payload_scheduler.run_payload_batch(
+            PROJECT_ID,
+            list(payload_states),
+            [f"source of {payload_id}" for payload_id in payload_states],
+            "user",
+            True,
+        )
+        return calls
+
+    return run
+
+
+def test_heuristics_are_queued_as_payload_jobs(batch):
+    calls = batch(
+        {
+            "payload 1": enums.PayloadState.FINISHED.value,
+            "payload 2": enums.PayloadState.FINISHED.value,
+        }
+    )
+
+    assert [kind for kind, _ in calls.enqueued] == ["payload", "payload"]
+    assert [arguments["payload_id"] for _, arguments in calls.enqueued] == [
+        "payload 1",
+        "payload 2",
+    ]
+    staged = calls.enqueued[0][1]["staged"]
+    assert calls.enqueued[1][1]["staged"] == staged
+    assert calls.waited == ["job 1", "job 2"]
+    assert calls.deleted == [f"{PROJECT_ID}/{staged['knowledge_base']}"]
+    assert calls.weak_supervision == [(PROJECT_ID, "user", "ws task")]
+
+
+def test_failed_heuristic_skips_weak_supervision(batch):
+    calls = batch(
+        {
+            "payload 1": enums.PayloadState.FINISHED.value,
+            "payload 2": enums.PayloadState.FAILED.value,
+        }
+    )
+
+    assert calls.weak_supervision == []
+    assert calls.notifications == [enums.NotificationType.WEAK_SUPERVISION_TASK_FAILED]
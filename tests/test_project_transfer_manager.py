@@ -0,0 +1,77 @@
+import pytest
+from submodules.model import enums, models
+from submodules.model.session import session
+
+from controller.transfer import project_bulk_writer, project_transfer_manager
+from tests.test_setup import db_session, default_setup  # noqa: F401
+
+
+@pytest.fixture
+def project_id(default_setup):
+    db = default_setup
+    # the import writes through the session of the business objects
+    bind = session.session_factory.kw.get("bind")
+    session.remove()
+    session.configure(bind=db.get_bind())
+
+    organization = db.query(models.Organization).first()
+    project_item = models.Project(name="target", organization_id=organization.id)
+    db.add(project_item)
+    db.commit()
+    yield str(project_item.id)
+
+    session.remove()
+    session.configure(bind=bind)
+
+
+def export_data():
+    data = {
+        name: []
+        for name in [
+            "attributes_data",
+            "labeling_tasks_data",
+            "labeling_task_labels_data",
+            "information_sources_data",
+            "record_attribute_token_statistics_data",
+            "data_slice_data",
+            "record_label_associations_data",
+            "information_source_payloads_data",
+            "information_source_statistics_data",
+            "record_label_association_tokens_data",
+            "knowledge_bases_data",
+            "comments",
+        ]
+    }
+    data["project_details_data"] = {
+        "name": "imported",
+        "description": "",
+        "tokenizer": "en_core_web_sm",
+        "status": enums.ProjectStatus.IN_DEVELOPMENT.value,
+    }
+    data["records_data"] = [
+        {
+            "id": f"00000000-0000-0000-0000-00000000000{idx}",
+            "data": {"text": f"record {idx}"},
+            "category": enums.RecordCategory.SCALE.value,
+        }
+        for idx in range(2)
+    ]
+    data["terms_data"] = []
+    return data
+
+
+def test_failing_section_rolls_back_the_whole_import(
+    project_id, default_setup, monkeypatch
+):
+    def fail(*args, **kwargs):
+        raise RuntimeError("broken terms")
+
+    monkeypatch.setattr(project_bulk_writer, "copy_knowledge_terms", fail)
+
+    with pytest.raises(RuntimeError):
+        project_transfer_manager.import_file(project_id, None, export_data())
+    session.rollback()
+
+    db = default_setup
+    assert db.query(models.Record).filter_by(project_id=project_id).count() == 0
+    assert db.query(models.Project).get(project_id).name == "target"
@@ -0,0 +1,162 @@
+import timeit
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.sql import text as sql_text
+from submodules.model import enums, models
+
+from controller.transfer import record_bulk_writer
+from tests.benchmark import benchmark, report
+from tests.test_setup import (  # noqa: F401
+    db_session,
+    default_setup,
+    project_setup,
+)
+from util import bulk_write
+
+USER_ID = "5b1b6d1c-5f7c-4c5a-9b59-1a9f5a3c1d01"
+
+
+@pytest.fixture
+def project(default_setup, project_setup, monkeypatch):
+    db = default_setup
+    # the writer runs its statements in the session of the test database
+    monkeypatch.setattr(record_bulk_writer, "session", db)
+    monkeypatch.setattr(bulk_write, "session", db)
+
+    project_item = project_setup
+    task = models.LabelingTask(
+        name="sentiment",
+        project_id=project_item.id,
+        task_type=enums.LabelingTaskType.CLASSIFICATION.value,
+    )
+    db.add(task)
+    db.flush()
+    labels = {
+        name: models.LabelingTaskLabel(
+            name=name, labeling_task_id=task.id, project_id=project_item.id
+        )
+        for name in ["positive", "negative"]
+    }
+    db.add_all(labels.values())
+    db.commit()
+    yield SimpleNamespace(db=db, id=str(project_item.id), labels=labels)
+
+
+def write(project, records_data, labels_data, primary_key_names=None):
+    result = record_bulk_writer.write_records_and_labels(
+        project_id=project.id,
+        user_id=USER_ID,
+        records_data=records_data,
+        labels_data=labels_data,
+        category=enums.RecordCategory.SCALE.value,
+        primary_key_names=primary_key_names or [],
+    )
+    project.db.commit()
+    return result
+
+
+def records_by_key(project):
+    return {
+        record_item.data["id"]: record_item
+        for record_item in project.db.query(models.Record).filter(
+            models.Record.project_id == project.id
+        )
+    }
+
+
+def manual_labels(project, record_id):
+    return sorted(
+        project.db.query(models.LabelingTaskLabel.name)
+        .join(
+            models.RecordLabelAssociation,
+            models.RecordLabelAssociation.labeling_task_label_id
+            == models.LabelingTaskLabel.id,
+        )
+        .filter(
+            models.RecordLabelAssociation.record_id == record_id,
+            models.RecordLabelAssociation.source_type == enums.LabelSource.MANUAL.value,
+        )
+        .all()
+    )
+
+
+def test_records_are_inserted_with_their_labels(project):
+    created, updated = write(
+        project,
+        [{"id": 1, "text": "good"}, {"id": 2, "text": "bad"}, {"id": 3, "text": "?"}],
+        [{"sentiment": "positive"}, {"sentiment": "negative"}, {}],
+    )
+
+    records = records_by_key(project)
+    assert (created, updated) == (3, 0)
+    assert sorted(records) == [1, 2, 3]
+    assert list(records[1].data) == ["id", "text"]
+    assert manual_labels(project, records[1].id) == [("positive",)]
+    assert manual_labels(project, records[2].id) == [("negative",)]
+    assert manual_labels(project, records[3].id) == []
+
+
+def test_unknown_labels_are_skipped(project):
+    write(
+        project,
+        [{"id": 1, "text": "good"}],
+        [{"sentiment": "neutral", "unknown task": "positive"}],
+    )
+
+    assert manual_labels(project, records_by_key(project)[1].id) == []
+
+
+def test_records_are_updated_by_primary_key(project):
+    write(project, [{"id": 1, "text": "old"}], [{"sentiment": "negative"}])
+    record_id = records_by_key(project)[1].id
+
+    created, updated = write(
+        project,
+        [{"id": 1, "text": "new"}, {"id": 2, "text": "other"}],
+        [{"sentiment": "positive"}, {}],
+        primary_key_names=["id"],
+    )
+
+    project.db.expire_all()
+    records = records_by_key(project)
+    assert (created, updated) == (1, 1)
+    assert sorted(records) == [1, 2]
+    assert records[1].id == record_id
+    assert records[1].data["text"] == "new"
+    # the manual label of the uploaded task is replaced
+    assert manual_labels(project, record_id) == [("positive",)]
+
+
+def test_values_are_bound(project):
+    write(project, [{"it's": "a'b", "text": "old"}], [{}])
+
+    created, updated = write(
+        project, [{"it's": "a'b", "text": "new"}], [{}], primary_key_names=["it's"]
+    )
+
+    project.db.expire_all()
+    record_items = project.db.query(models.Record).all()
+    assert (created, updated) == (0, 1)
+    assert [record_item.data["text"] for record_item in record_items] == ["new"]
+
+
+@benchmark
+def test_bulk_write_benchmark(project):
+    count = 20000
+    records_data = [{"id": idx, "text": f"record {idx}"} for idx in range(count)]
+    labels_data = [
+        {"sentiment": "positive" if idx % 2 else "negative"} for idx in range(count)
+    ]
+
+    start = timeit.default_timer()
+    write(project, records_data, labels_data)
+    report("bulk insert", count, timeit.default_timer() - start)
+
+    # like autovacuum would on a used database, the fresh table has no statistics
+    project.db.execute(sql_text("ANALYZE record_label_association"))
+    start = timeit.default_timer()
+    write(project, records_data, labels_data, primary_key_names=["id"])
+    report("bulk update by primary key", count, timeit.default_timer() - start)
+
+    assert len(records_by_key(project)) == count
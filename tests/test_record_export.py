@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+import timeit
+import zlib
+from datetime import datetime
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from controller.transfer import manager
+from tests.benchmark import benchmark, report
+
+COLUMNS = ["id", "text", "created_at", "labels"]
+
+
+class FakeResult:
+    # the parts of a streamed sqlalchemy result used by the export
+    def __init__(self, rows):
+        self.rows = rows
+        self.closed = False
+
+    def keys(self):
+        return COLUMNS
+
+    def partitions(self, size):
+        for start in range(0, len(self.rows), size):
+            yield self.rows[start : start + size]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self, result):
+        self.result = result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execution_options(self, **options):
+        assert options == {"stream_results": True}
+        return self
+
+    def execute(self, sql):
+        return self.result
+
+
+def create_rows(count):
+    return [
+        (idx, f"record {idx}", datetime(2024, 1, 1), {"sentiment": ["positive"]})
+        for idx in range(count)
+    ]
+
+
+@pytest.fixture
+def export(monkeypatch):
+    def stream(rows, **kwargs):
+        result = FakeResult(rows)
+        monkeypatch.setattr(
+            manager,
+            "general",
+            SimpleNamespace(
+                get_bind=lambda: SimpleNamespace(connect=lambda: FakeConnection(result))
+            ),
+        )
+        return b"".join(manager.stream_records("project", **kwargs))
+
+    monkeypatch.setattr(manager.attribute, "get_all_ordered", lambda *args: ["text"])
+    monkeypatch.setattr(
+        manager, "build_full_record_sql_export", lambda *args: "SELECT 1"
+    )
+    monkeypatch.setattr(manager, "EXPORT_CHUNK_SIZE", 3)
+    return stream
+
+
+def test_ndjson_has_one_object_per_row(export):
+    content = export(create_rows(7))
+
+    lines = content.decode("utf-8").splitlines()
+    assert len(lines) == 7
+    assert json.loads(lines[6]) == {
+        "id": 6,
+        "text": "record 6",
+        "created_at": "2024-01-01T00:00:00",
+        "labels": {"sentiment": ["positive"]},
+    }
+
+
+def test_csv_has_a_header_and_json_cells(export):
+    content = export(create_rows(4), file_format="csv")
+
+    rows = list(csv.reader(io.StringIO(content.decode("utf-8"))))
+    assert rows[0] == COLUMNS
+    assert len(rows) == 5
+    assert json.loads(rows[1][3]) == {"sentiment": ["positive"]}
+
+
+def test_num_samples_stops_early(export):
+    content = export(create_rows(10), num_samples=4)
+
+    assert len(content.decode("utf-8").splitlines()) == 4
+
+
+def test_gzip_is_decompressable(export):
+    plain = export(create_rows(5))
+    compressed = export(create_rows(5), compress=True)
+
+    assert zlib.decompress(compressed, wbits=zlib.MAX_WBITS | 16) == plain
+
+
+def test_no_attributes_returns_none(export, monkeypatch):
+    monkeypatch.setattr(manager.attribute, "get_all_ordered", lambda *args: [])
+    assert manager.stream_records("project") is None
+
+
+@benchmark
+def test_record_export_benchmark(export, monkeypatch):
+    count = 200000
+    rows = create_rows(count)
+    monkeypatch.setattr(manager, "EXPORT_CHUNK_SIZE", 5000)
+
+    start = timeit.default_timer()
+    pd.DataFrame(rows, columns=COLUMNS).to_json(orient="records", date_format="iso")
+    report("DataFrame.to_json", count, timeit.default_timer() - start)
+
+    for file_format in ["ndjson", "csv"]:
+        start = timeit.default_timer()
+        export(rows, file_format=file_format)
+        report(f"stream_records {file_format}", count, timeit.default_timer() - start)
@@ -0,0 +1,156 @@
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.sql import text as sql_text
+from submodules.model import enums, models
+
+from controller.payload import result_cache
+from tests.migrations import applied
+from tests.test_setup import (  # noqa: F401
+    db_session,
+    default_setup,
+    project_setup,
+)
+
+
+@pytest.fixture
+def source(default_setup, project_setup, monkeypatch):
+    db = default_setup
+    monkeypatch.setattr(result_cache, "session", db)
+    monkeypatch.setattr(result_cache, "USE_RESULT_CACHE", True)
+    monkeypatch.setattr(result_cache, "LF_EXEC_ENV_IMAGE", "lf-exec-env:1")
+
+    with applied(db, "4a9b07e3d5c1", "e81c5f2b9a06", "c91d4e7a2b68"):
+        project_id = str(project_setup.id)
+        labeling_task_id = str(uuid.uuid4())
+        source_id = str(uuid.uuid4())
+        db.execute(
+            sql_text(
+                """
+                INSERT INTO labeling_task (id, project_id, name)
+                VALUES (:labeling_task_id, :project_id, 'task');
+
+                INSERT INTO information_source (id, project_id, labeling_task_id, name)
+                VALUES (:source_id, :project_id, :labeling_task_id, 'lf');
+                """
+            ),
+            {
+                "project_id": project_id,
+                "labeling_task_id": labeling_task_id,
+                "source_id": source_id,
+            },
+        )
+        db.commit()
+        yield SimpleNamespace(
+            db=db,
+            project_id=project_id,
+            id=source_id,
+            item=SimpleNamespace(
+                id=source_id,
+                type=enums.InformationSourceType.LABELING_FUNCTION.value,
+                return_type=enums.InformationSourceReturnType.RETURN.value,
+                labeling_task_id=labeling_task_id,
+            ),
+            payload_count=0,
+        )
+
+
+def tokenize_new_record(source):
+    record_item = models.Record(
+        project_id=source.project_id,
+        data={"text": "new"},
+        category=enums.RecordCategory.SCALE.value,
+    )
+    source.db.add(record_item)
+    source.db.commit()
+    source.db.execute(
+        sql_text(
+            "INSERT INTO record_tokenized (id, project_id, record_id) "
+            "VALUES (:id, :project_id, :record_id)"
+        ),
+        {
+            "id": str(uuid.uuid4()),
+            "project_id": source.project_id,
+            "record_id": str(record_item.id),
+        },
+    )
+    source.db.commit()
+
+
+def run(source, source_code="return 'a'"):
+    # a payload that looks up the cache and finishes without reusing
+    payload_id = str(uuid.uuid4())
+    source.payload_count += 1
+    source.db.execute(
+        sql_text(
+            """
+            INSERT INTO information_source_payload (
+                id, project_id, source_id, state, created_at
+            )
+            VALUES (:id, :project_id, :source_id, :state, :created_at)
+            """
+        ),
+        {
+            "id": payload_id,
+            "project_id": source.project_id,
+            "source_id": source.id,
+            "state": enums.PayloadState.FINISHED.value,
+            "created_at": datetime.now() + timedelta(seconds=source.payload_count),
+        },
+    )
+    fingerprint, base_fingerprint = result_cache.get_fingerprints(
+        source.project_id, source.item, SimpleNamespace(source_code=source_code)
+    )
+    reusable = result_cache.get_reusable_payload(
+        source.project_id, payload_id, source.id, fingerprint
+    )
+    result_cache.store_fingerprint(
+        source.project_id,
+        payload_id,
+        source.id,
+        fingerprint,
+        base_fingerprint,
+        with_commit=True,
+    )
+    return reusable
+
+
+def test_unchanged_function_is_a_hit(source):
+    tokenize_new_record(source)
+    first = run(source)
+
+    assert first is None
+    assert run(source) is not None
+
+
+def test_changed_code_records_or_exec_env_are_misses(source, monkeypatch):
+    tokenize_new_record(source)
+    run(source)
+
+    assert run(source, source_code="return 'b'") is None
+
+    tokenize_new_record(source)
+    assert run(source, source_code="return 'b'") is None
+
+    monkeypatch.setattr(result_cache, "LF_EXEC_ENV_IMAGE", "lf-exec-env:2")
+    assert run(source, source_code="return 'b'") is None
+    assert run(source, source_code="return 'b'") is not None
+
+
+def test_projects_with_docbins_can_be_deleted(source):
+    tokenize_new_record(source)
+
+    source.db.execute(
+        sql_text("DELETE FROM project WHERE id = :project_id"),
+        {"project_id": source.project_id},
+    )
+    source.db.commit()
+
+    assert (
+        source.db.execute(
+            sql_text("SELECT COUNT(*) FROM record_tokenized_version")
+        ).scalar()
+        == 0
+    )
@@ -0,0 +1,110 @@
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+from submodules.model import enums, models
+
+from service.search import search, search_query
+from service.search.search_query import QueryParams
+from tests.test_setup import (  # noqa: F401
+    db_session,
+    default_setup,
+    project_setup,
+)
+
+
+def order_element(columns, directions):
+    return {
+        "RELATION": "NONE",
+        "NEGATION": False,
+        "ORDER_BY": columns,
+        "ORDER_DIRECTION": directions,
+    }
+
+
+def test_random_order_sorts_on_a_hash_of_seed_and_record():
+    sort_keys = getattr(search, "__get_sort_keys")(
+        QueryParams(), order_element(["RANDOM"], ["seed"]), {}
+    )
+
+    assert sort_keys == [("md5(@@PARAM_0@@::TEXT || r.id::TEXT)", "ASC NULLS FIRST")]
+
+
+@pytest.mark.parametrize("filter_data", [[], [order_element(["RANDOM"], ["seed"])]])
+def test_page_is_filtered_and_limited_in_the_base_query(filter_data):
+    sort_key_count = getattr(search, "__count_sort_keys")(filter_data)
+    sql = getattr(search, "__build_select_sql")(
+        QueryParams(),
+        "project",
+        filter_data,
+        {},
+        3,
+        0,
+        keyset=True,
+        cursor=["value"] * sort_key_count + ["record"],
+    )
+    inner_sql = sql[sql.index("FROM (") : sql.rindex(")")]
+
+    assert "keyset_page" not in sql
+    assert "r.id > " in inner_sql
+    assert inner_sql.index("r.id > ") < inner_sql.index("ORDER BY")
+    assert inner_sql.index("ORDER BY") < inner_sql.index("LIMIT")
+
+
+@pytest.fixture
+def project(default_setup, project_setup, monkeypatch):
+    db = default_setup
+    monkeypatch.setattr(search_query, "session", db)
+    monkeypatch.setattr(search_query, "USE_PREPARED_STATEMENTS", False)
+
+    records = [
+        models.Record(
+            project_id=project_setup.id,
+            data={"text": f"record {idx}"},
+            category=enums.RecordCategory.SCALE.value,
+        )
+        for idx in range(11)
+    ]
+    db.add_all(records)
+    db.commit()
+    yield SimpleNamespace(
+        db=db,
+        id=str(project_setup.id),
+        record_ids=[str(record.id) for record in records],
+    )
+
+
+def page_through(project, filter_data, limit=3):
+    sort_key_count = getattr(search, "__count_sort_keys")(filter_data)
+    record_ids = []
+    cursor = ""
+    while cursor is not None:
+        query = getattr(search, "__compile_select_query")(
+            project.id,
+            filter_data,
+            limit,
+            0,
+            keyset=True,
+            cursor=getattr(search, "__decode_cursor")(cursor, sort_key_count),
+        )
+        rows = search_query.execute_all(query)
+        record_ids += [str(row["record_id"]) for row in rows]
+        cursor = getattr(search, "__encode_next_cursor")(rows, limit, sort_key_count)
+    return record_ids
+
+
+def md5(value):
+    return hashlib.md5(value.encode("utf-8")).hexdigest()
+
+
+def test_random_pages_follow_a_permutation_per_seed(project):
+    orders = [
+        page_through(project, [order_element(["RANDOM"], [seed])])
+        for seed in ["first seed", "second seed"]
+    ]
+
+    for seed, record_ids in zip(["first seed", "second seed"], orders):
+        assert record_ids == sorted(
+            project.record_ids, key=lambda record_id: md5(seed + record_id)
+        )
+    assert orders[0] != orders[1]
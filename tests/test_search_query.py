@@ -0,0 +1,102 @@
+import random
+import timeit
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+
+from service.search import search, search_query
+from service.search.search_query import SearchQuery, Slot
+from tests.benchmark import benchmark, report
+
+PROJECT_ID = "5b1b6d1c-5f7c-4c5a-9b59-1a9f5a3c1d01"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(
+        search_query, "__cache", type(getattr(search_query, "__cache"))()
+    )
+    monkeypatch.setattr(search_query, "__cache_stats", {"hits": 0, "misses": 0})
+    monkeypatch.setattr(search_query, "__not_preparable", set())
+
+
+def in_filter(values):
+    return [
+        {
+            "RELATION": "NONE",
+            "NEGATION": False,
+            "TARGET_TABLE": "RECORD",
+            "TARGET_COLUMN": "DATA",
+            "OPERATOR": "IN",
+            "VALUES": ["text"] + values,
+        }
+    ]
+
+
+def test_in_lists_of_any_length_share_the_template():
+    short = search.generate_count_sql(PROJECT_ID, in_filter(["a"]))
+    long = search.generate_count_sql(PROJECT_ID, in_filter(["a", "b", "c'd"]))
+
+    assert "ANY('{\"a\"}')" in short
+    assert 'ANY(\'{"a","b","c\'\'d"}\')' in long
+    info = search_query.get_cache_info()
+    assert (info["misses"], info["hits"], info["size"]) == (1, 1, 1)
+
+
+def test_slots_are_indexed_and_sliced_when_bound():
+    values = Slot(("filter", "VALUES"))
+    args = {"filter": {"VALUES": ["key", "a", "b"]}}
+
+    assert values[0].resolve(args) == "key"
+    assert values[1:].resolve(args) == ["a", "b"]
+    with pytest.raises(TypeError):
+        list(values)
+
+
+def test_same_slot_is_bound_once():
+    params = search_query.QueryParams()
+    values = Slot(("VALUES",))
+
+    assert params.add(values[0]) == params.add(values[0])
+    assert params.add(values[1]) != params.add(values[0])
+    assert len(params.specs) == 2
+
+
+def test_not_preparable_statements_are_bounded(monkeypatch):
+    def fail(statement):
+        raise SQLAlchemyError("cannot prepare")
+
+    monkeypatch.setattr(
+        search_query,
+        "session",
+        SimpleNamespace(
+            connection=lambda: SimpleNamespace(info={}, execute=fail),
+            begin_nested=lambda: SimpleNamespace(
+                commit=lambda: None, rollback=lambda: None
+            ),
+        ),
+    )
+    monkeypatch.setattr(search_query, "CACHE_SIZE", 2)
+    prepare = getattr(search_query, "__prepare")
+
+    for idx in range(5):
+        assert not prepare(SearchQuery(f"SELECT {idx}", []))
+
+    assert len(getattr(search_query, "__not_preparable")) <= 2
+
+
+@benchmark
+def test_compile_query_benchmark():
+    count = 20000
+    filters = [
+        in_filter([str(value) for value in range(random.randint(1, 200))])
+        for _ in range(count)
+    ]
+
+    start = timeit.default_timer()
+    for filter_data in filters:
+        search.generate_count_sql(PROJECT_ID, filter_data)
+    report("compile & render count query", count, timeit.default_timer() - start)
+
+    assert search_query.get_cache_info()["misses"] == 1
@@ -1,7 +1,7 @@
 import os
 
 import pytest
-from submodules.model import Organization
+from submodules.model import Organization, Project
 from sqlalchemy import create_engine
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.pool import NullPool
@@ -33,3 +33,17 @@ def default_setup(db_session):
     db.add(Organization(name="default"))
     db.commit()
     yield db
+
+
+def create_project(db, name: str = "test") -> Project:
+    organization = db.query(Organization).first()
+    project_item = Project(name=name, organization_id=organization.id)
+    db.add(project_item)
+    db.commit()
+    return project_item
+
+
+@pytest.fixture
+def project_setup(default_setup):
+    """Project of the default organization."""
+    yield create_project(default_setup)
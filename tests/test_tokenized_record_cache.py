@@ -0,0 +1,128 @@
+import threading
+import time
+
+import pytest
+
+from controller.tokenization import tokenized_record_cache
+
+
+def entry(text):
+    return {"text": (text, [(text, 0, 0, len(text), "")])}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    tokenized_record_cache.invalidate_project("project")
+    yield
+    tokenized_record_cache.invalidate_project("project")
+
+
+def test_entry_is_served_for_its_version_only():
+    tokenized_record_cache.put("project", "record", "v1", entry("a"))
+
+    assert tokenized_record_cache.get("project", "record", "v1") == entry("a")
+    assert tokenized_record_cache.get("project", "record", "v2") is None
+    assert tokenized_record_cache.contains("project", "record", "v1")
+    assert not tokenized_record_cache.contains("project", "record", "v2")
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    size = tokenized_record_cache.TOKEN_OVERHEAD + 2
+    monkeypatch.setattr(tokenized_record_cache, "MAX_BYTES", size * 2)
+    tokenized_record_cache.put("project", "r1", "v", entry("a"))
+    tokenized_record_cache.put("project", "r2", "v", entry("b"))
+    tokenized_record_cache.get("project", "r1", "v")
+    tokenized_record_cache.put("project", "r3", "v", entry("c"))
+
+    assert tokenized_record_cache.get("project", "r1", "v") == entry("a")
+    assert tokenized_record_cache.get("project", "r2", "v") is None
+    assert tokenized_record_cache.get("project", "r3", "v") == entry("c")
+    assert tokenized_record_cache.get_cache_info()["bytes"] == size * 2
+
+
+def test_invalidation_of_records_and_projects():
+    tokenized_record_cache.put("project", "r1", "v", entry("a"))
+    tokenized_record_cache.put("project", "r2", "v", entry("b"))
+    tokenized_record_cache.set_language("project", "en")
+
+    tokenized_record_cache.invalidate_records("project", ["r1"])
+    assert tokenized_record_cache.get("project", "r1", "v") is None
+    assert tokenized_record_cache.get("project", "r2", "v") == entry("b")
+
+    tokenized_record_cache.invalidate_project("project")
+    assert tokenized_record_cache.get("project", "r2", "v") is None
+    assert tokenized_record_cache.get_language("project") is None
+
+
+class SlowSet(set):
+    # widens the gap between the check and the add of a prefetch key
+    def __contains__(self, key):
+        contained = super().__contains__(key)
+        time.sleep(0.01)
+        return contained
+
+
+def test_one_prefetch_per_user_and_project(monkeypatch):
+    from controller.tokenization import manager as tokenization_manager
+
+    monkeypatch.setattr(tokenization_manager, "__prefetching", SlowSet())
+    started = []
+    # the prefetch never finishes, so its key stays taken
+    monkeypatch.setattr(
+        tokenization_manager.daemon, "run", lambda target, *args: started.append(args)
+    )
+    start_prefetch = getattr(tokenization_manager, "__start_prefetch")
+    threads = [
+        threading.Thread(target=start_prefetch, args=("project", "user", "record"))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(started) == 1
+
+
+def test_contains_waits_for_the_cache_lock():
+    lock = getattr(tokenized_record_cache, "__lock")
+    results = []
+    with lock:
+        thread = threading.Thread(
+            target=lambda: results.append(
+                tokenized_record_cache.contains("project", "record", "v1")
+            )
+        )
+        thread.start()
+        thread.join(0.05)
+        assert not results
+    thread.join()
+
+    assert results == [False]
+
+
+def test_docbins_are_decoded_one_at_a_time(monkeypatch):
+    from controller.tokenization import manager as tokenization_manager
+
+    running = []
+    overlaps = []
+
+    def to_cache_entry(docs):
+        running.append(1)
+        overlaps.append(len(running) > 1)
+        time.sleep(0.01)
+        running.pop()
+        return {}
+
+    monkeypatch.setattr(tokenization_manager, "__get_docs", lambda *args: {})
+    monkeypatch.setattr(tokenization_manager, "__to_cache_entry", to_cache_entry)
+    decode = getattr(tokenization_manager, "__decode")
+    threads = [
+        threading.Thread(target=decode, args=("project", None)) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert overlaps == [False] * 4
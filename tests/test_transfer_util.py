@@ -0,0 +1,67 @@
+import json
+
+import pandas as pd
+
+from controller.transfer import util
+
+
+def read_records(monkeypatch, file_type, file_name, chunk_size=2):
+    monkeypatch.setattr(util, "FILE_CHUNK_SIZE", chunk_size)
+    monkeypatch.setattr(
+        util,
+        "run_checks_on_chunks",
+        lambda chunks, project_id, user_id: sum(df.shape[0] for df in chunks),
+    )
+    number_records, chunks = util.convert_to_record_chunks(
+        file_type, str(file_name), "user", "", "project", chunk_size=3
+    )
+    records = [item for chunk, _ in chunks for item in chunk]
+    assert number_records == len(records)
+    return records
+
+
+def test_csv_chunks_match_a_full_read(tmp_path, monkeypatch):
+    file_name = tmp_path / "records.csv"
+    file_name.write_text(
+        "text,count,flag\n" "a,1,true\n" "b,2,false\n" "c,,true\n" "d,4,\n" "e,5,x\n"
+    )
+    expected = pd.read_csv(file_name).fillna(" ").to_dict(orient="records")
+
+    records = read_records(monkeypatch, "csv", file_name)
+
+    assert records == expected
+    # 1 == 1.0, the types have to match as well
+    assert [type(record["count"]) for record in records] == [
+        type(record["count"]) for record in expected
+    ]
+
+
+def test_json_array_chunks_match_a_full_read(tmp_path, monkeypatch):
+    file_name = tmp_path / "records.json"
+    items = [{"text": str(idx), "count": idx} for idx in range(5)]
+    items[3]["count"] = None
+    file_name.write_text(json.dumps(items))
+    expected = pd.read_json(file_name).fillna(" ").to_dict(orient="records")
+
+    records = read_records(monkeypatch, "json", file_name)
+
+    assert records == expected
+
+
+def test_progress_reaches_the_file_size(tmp_path, monkeypatch):
+    file_name = tmp_path / "records.csv"
+    file_name.write_text("text\n" + "".join(f"{idx}\n" for idx in range(7)))
+    monkeypatch.setattr(util, "FILE_CHUNK_SIZE", 2)
+    monkeypatch.setattr(
+        util,
+        "run_checks_on_chunks",
+        lambda chunks, project_id, user_id: sum(df.shape[0] for df in chunks),
+    )
+
+    _, chunks = util.convert_to_record_chunks(
+        "csv", str(file_name), "user", "", "project", chunk_size=3
+    )
+    progress = [done for _, done in chunks]
+
+    assert progress == sorted(progress)
+    assert progress[-1] == 100.0
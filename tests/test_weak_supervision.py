@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from submodules.model import enums
+
+from controller.weak_supervision import manager as ws_manager
+from controller.weak_supervision import weak_supervision_service
+
+FIT_SECONDS = 0.2
+
+
+class WeakSupervisionStandIn(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+    fitted = []
+    failing = set()
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = WeakSupervisionStandIn
+        with cls.lock:
+            cls.running += 1
+            cls.max_running = max(cls.max_running, cls.running)
+        time.sleep(FIT_SECONDS)
+        with cls.lock:
+            cls.running -= 1
+            cls.fitted.append(data["labeling_task_id"])
+        if self.path != "/fit_predict" or data["labeling_task_id"] in cls.failing:
+            self.__respond(500, {"error": "fit failed"})
+            return
+        self.__respond(200, [None, 200])
+
+    def log_message(self, *args):
+        pass
+
+    def __respond(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+
+@pytest.fixture
+def weak_supervision_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WeakSupervisionStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        weak_supervision_service,
+        "BASE_URI",
+        f"http://127.0.0.1:{server.server_port}",
+    )
+    WeakSupervisionStandIn.running = 0
+    WeakSupervisionStandIn.max_running = 0
+    WeakSupervisionStandIn.fitted = []
+    WeakSupervisionStandIn.failing = set()
+    updates = []
+    monkeypatch.setattr(
+        ws_manager.notification,
+        "send_organization_update",
+        lambda project_id, message: updates.append(message),
+    )
+    yield updates
+    server.shutdown()
+
+
+def test_labeling_tasks_are_fitted_concurrently(weak_supervision_server, monkeypatch):
+    monkeypatch.setattr(ws_manager, "WEAK_SUPERVISION_PARALLELISM", 3)
+    labeling_task_ids = [f"task-{idx}" for idx in range(6)]
+
+    start = time.monotonic()
+    progress = ws_manager.fit_labeling_tasks(
+        "project", "user", "ws-task", labeling_task_ids
+    )
+    duration = time.monotonic() - start
+
+    assert sorted(WeakSupervisionStandIn.fitted) == labeling_task_ids
+    assert WeakSupervisionStandIn.max_running == 3
+    # two rounds of three fits instead of six fits one after another
+    assert duration < FIT_SECONDS * 4
+    assert all(
+        task_progress["state"] == enums.PayloadState.FINISHED.value
+        and task_progress["seconds"] > 0
+        for task_progress in progress.values()
+    )
+    assert [update.split(":")[-2:] for update in weak_supervision_server] == [
+        [str(count), "6"] for count in range(1, 7)
+    ]
+
+
+def test_failed_fit_is_raised_after_all_fits(weak_supervision_server, monkeypatch):
+    monkeypatch.setattr(ws_manager, "WEAK_SUPERVISION_PARALLELISM", 2)
+    WeakSupervisionStandIn.failing = {"task-1"}
+
+    with pytest.raises(Exception, match="fit failed"):
+        ws_manager.fit_labeling_tasks(
+            "project", "user", "ws-task", ["task-0", "task-1", "task-2"]
+        )
+
+    assert sorted(WeakSupervisionStandIn.fitted) == ["task-0", "task-1", "task-2"]
+    states = {
+        update.split(":")[2]: update.split(":")[3] for update in weak_supervision_server
+    }
+    assert states == {
+        "task-0": enums.PayloadState.FINISHED.value,
+        "task-1": enums.PayloadState.FAILED.value,
+        "task-2": enums.PayloadState.FINISHED.value,
+    }
@@ -0,0 +1,67 @@
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, List, Sequence
+
+from submodules.model.session import session
+
+COPY_CHUNK_SIZE = 10000
+
+
+def copy_rows(
+    table: str,
+    columns: List[str],
+    rows: Iterable[Sequence[Any]],
+    chunk_size: int = COPY_CHUNK_SIZE,
+) -> int:
+    # streams the rows with postgres COPY through the connection of the current session
+    # so the rows are part of the open transaction. Only chunk_size rows are held in memory.
+    cursor = session.connection().connection.cursor()
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    count = 0
+    buffer = io.StringIO()
+    in_buffer = 0
+    try:
+        for row in rows:
+            buffer.write("\t".join(__to_copy_value(value) for value in row))
+            buffer.write("\n")
+            in_buffer += 1
+            if in_buffer >= chunk_size:
+                __flush(cursor, sql, buffer)
+                count += in_buffer
+                in_buffer = 0
+                buffer = io.StringIO()
+        if in_buffer:
+            __flush(cursor, sql, buffer)
+            count += in_buffer
+    finally:
+        cursor.close()
+    return count
+
+
+def begin_savepoint() -> Any:
+    return session.begin_nested()
+
+
+def __flush(cursor: Any, sql: str, buffer: io.StringIO) -> None:
+    buffer.seek(0)
+    cursor.copy_expert(sql, buffer)
+
+
+def __to_copy_value(value: Any) -> str:
+    # postgres COPY text format
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
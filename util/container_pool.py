@@ -0,0 +1,319 @@
+import atexit
+import os
+import threading
+import timeit
+import traceback
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import docker
+
+from util import daemon
+
+# number of idle containers kept per image, 0 disables pooling (cold start for every run)
+POOL_SIZE = int(os.getenv("EXEC_ENV_POOL_SIZE", 0))
+# how often a container is reused before it's destroyed, 1 means fresh container for every job
+POOL_MAX_USES = int(os.getenv("EXEC_ENV_POOL_MAX_USES", 1))
+POOL_LABEL = "refinery-gateway-pool"
+# keeps the container alive without doing anything until a job is executed inside
+IDLE_ENTRYPOINT = ["tail", "-f", "/dev/null"]
+
+__pool = None
+__pool_lock = threading.Lock()
+
+
+class ContainerPool:
+    """
+    Keeps a number of pre-started (idle) containers per image. Jobs are executed inside
+    an idle container with the image's original entrypoint so the container start time
+    isn't part of the job runtime. Works with any object providing the docker-py client
+    interface (containers, images & api) so it can be tested with a fake client.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        size: int = POOL_SIZE,
+        max_uses: int = POOL_MAX_USES,
+        network: Optional[str] = None,
+    ):
+        self.client = client
+        self.size = size
+        self.max_uses = max(max_uses, 1)
+        self.network = network
+        self._lock = threading.Lock()
+        self._idle: Dict[str, List[Any]] = {}
+        self._uses: Dict[str, int] = {}
+        self._run_kwargs: Dict[str, Dict[str, Any]] = {}
+        self._entrypoints: Dict[str, List[str]] = {}
+        self._filling: Dict[str, bool] = {}
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+
+    def is_enabled(self) -> bool:
+        return self.size > 0
+
+    def register(self, image: str, asynchronous: bool = True, **run_kwargs) -> None:
+        # run_kwargs are forwarded to containers.run, e.g. ulimits for the record ide
+        if not image:
+            return
+        with self._lock:
+            self._run_kwargs[image] = run_kwargs
+            self._idle.setdefault(image, [])
+            self.__ensure_metrics(image)
+        self.fill(image, asynchronous)
+
+    def fill(self, image: str, asynchronous: bool = True) -> None:
+        if not self.is_enabled():
+            return
+        with self._lock:
+            if self._filling.get(image):
+                return
+            self._filling[image] = True
+        if asynchronous:
+            daemon.run(self.__fill, image)
+        else:
+            self.__fill(image)
+
+    def acquire(self, image: str) -> Any:
+        start = timeit.default_timer()
+        container = None
+        while container is None:
+            with self._lock:
+                self.__ensure_metrics(image)
+                idle = self._idle.setdefault(image, [])
+                if not idle:
+                    break
+                candidate = idle.pop(0)
+            # docker is asked outside of the lock, other images aren't blocked by it
+            if self.__is_running(candidate):
+                container = candidate
+            else:
+                self.__remove(image, candidate)
+        if container is not None:
+            self.__add_metric(image, "hits", 1)
+        else:
+            container = self.__start_idle_container(image)
+            self.__add_metric(image, "misses", 1)
+        waited = timeit.default_timer() - start
+        with self._lock:
+            metrics = self._metrics[image]
+            metrics["in_use"] += 1
+            metrics["acquired"] += 1
+            metrics["wait_time_total"] += waited
+            metrics["wait_time_last"] = waited
+            metrics["wait_time_max"] = max(metrics["wait_time_max"], waited)
+        self.fill(image)
+        return container
+
+    def release(self, image: str, container: Any, reusable: bool = True) -> None:
+        with self._lock:
+            self._metrics[image]["in_use"] -= 1
+            self._uses[container.id] = self._uses.get(container.id, 0) + 1
+            reusable = reusable and self._uses[container.id] < self.max_uses
+        if reusable and self.__is_running(container):
+            with self._lock:
+                idle = self._idle.setdefault(image, [])
+                if len(idle) < self.size:
+                    idle.append(container)
+                    self._metrics[image]["recycled"] += 1
+                    return
+        self.__remove(image, container)
+        self.fill(image)
+
+    def execute(
+        self, image: str, command: List[str], timestamps: bool = True
+    ) -> List[str]:
+        if not self.is_enabled():
+            return self.__execute_cold(image, command, timestamps)
+
+        container = self.acquire(image)
+        exit_code = None
+        try:
+            logs, exit_code = self.exec_in(container, image, command, timestamps)
+        finally:
+            self.release(image, container, reusable=exit_code == 0)
+        return logs
+
+    def exec_in(
+        self, container: Any, image: str, command: List[str], timestamps: bool = True
+    ) -> Tuple[List[str], int]:
+        # runs the image's own entrypoint with the job command inside a warm container
+        full_command = self.__get_entrypoint(image) + [str(c) for c in command]
+        exec_id = self.client.api.exec_create(
+            container.id, full_command, stdout=True, stderr=True
+        )["Id"]
+        logs = []
+        buffer = ""
+        for chunk in self.client.api.exec_start(exec_id, stream=True):
+            buffer += chunk.decode("utf-8")
+            *lines, buffer = buffer.split("\n")
+            logs += [self.__format_line(line, timestamps) for line in lines]
+        if buffer:
+            logs.append(self.__format_line(buffer, timestamps))
+        exit_code = self.client.api.exec_inspect(exec_id).get("ExitCode")
+        return logs, exit_code
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for image, metrics in self._metrics.items():
+                result[image] = {
+                    **metrics,
+                    "idle": len(self._idle.get(image, [])),
+                    "pool_size": self.size,
+                    "wait_time_avg": (
+                        metrics["wait_time_total"] / metrics["acquired"]
+                        if metrics["acquired"]
+                        else 0
+                    ),
+                }
+            return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self.size = 0
+            idle_containers = [
+                (image, container)
+                for image, idle in self._idle.items()
+                for container in idle
+            ]
+            for idle in self._idle.values():
+                idle.clear()
+        for image, container in idle_containers:
+            self.__remove(image, container)
+
+    def __fill(self, image: str) -> None:
+        try:
+            while True:
+                with self._lock:
+                    missing = self.size - len(self._idle.get(image, []))
+                if missing <= 0:
+                    break
+                container = self.__start_idle_container(image)
+                with self._lock:
+                    if len(self._idle[image]) < self.size:
+                        self._idle[image].append(container)
+                        continue
+                self.__remove(image, container)
+        except Exception:
+            print(traceback.format_exc(), flush=True)
+        finally:
+            with self._lock:
+                self._filling[image] = False
+
+    def __start_idle_container(self, image: str) -> Any:
+        container = self.client.containers.run(
+            image=image,
+            entrypoint=IDLE_ENTRYPOINT,
+            detach=True,
+            network=self.network,
+            labels={POOL_LABEL: image},
+            **self._run_kwargs.get(image, {}),
+        )
+        self.__add_metric(image, "created", 1)
+        return container
+
+    def __execute_cold(
+        self, image: str, command: List[str], timestamps: bool
+    ) -> List[str]:
+        container = self.client.containers.run(
+            image=image,
+            command=command,
+            remove=True,
+            detach=True,
+            network=self.network,
+            **self._run_kwargs.get(image, {}),
+        )
+        return [
+            line.decode("utf-8").strip("\n")
+            for line in container.logs(
+                stream=True, stdout=True, stderr=True, timestamps=timestamps
+            )
+        ]
+
+    def __get_entrypoint(self, image: str) -> List[str]:
+        if image not in self._entrypoints:
+            config = self.client.images.get(image).attrs.get("Config") or {}
+            entrypoint = config.get("Entrypoint") or []
+            if isinstance(entrypoint, str):
+                entrypoint = [entrypoint]
+            self._entrypoints[image] = entrypoint
+        return self._entrypoints[image]
+
+    def __remove(self, image: str, container: Any) -> None:
+        # caller must not hold the lock, removing a container can take seconds
+        try:
+            container.remove(force=True)
+        except docker.errors.APIError:
+            pass
+        with self._lock:
+            self._uses.pop(container.id, None)
+            self._metrics[image]["destroyed"] += 1
+
+    def __is_running(self, container: Any) -> bool:
+        try:
+            container.reload()
+        except docker.errors.NotFound:
+            return False
+        return container.status == "running"
+
+    def __format_line(self, line: str, timestamps: bool) -> str:
+        if not timestamps:
+            return line
+        # same format as docker logs with timestamps
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")
+        return f"{now}000Z {line}"
+
+    def __ensure_metrics(self, image: str) -> None:
+        if image not in self._metrics:
+            self._metrics[image] = {
+                "in_use": 0,
+                "acquired": 0,
+                "hits": 0,
+                "misses": 0,
+                "created": 0,
+                "destroyed": 0,
+                "recycled": 0,
+                "wait_time_total": 0.0,
+                "wait_time_last": 0.0,
+                "wait_time_max": 0.0,
+            }
+
+    def __add_metric(self, image: str, key: str, value: float) -> None:
+        with self._lock:
+            self.__ensure_metrics(image)
+            self._metrics[image][key] += value
+
+
+def get_pool() -> ContainerPool:
+    global __pool
+    with __pool_lock:
+        if __pool is None:
+            __pool = ContainerPool(docker.from_env(), network=os.getenv("LF_NETWORK"))
+            atexit.register(__pool.shutdown)
+    return __pool
+
+
+def execute(image: str, command: List[str], timestamps: bool = True) -> List[str]:
+    return get_pool().execute(image, command, timestamps)
+
+
+def warm_up() -> None:
+    pool = get_pool()
+    if not pool.is_enabled():
+        return
+    for image in [
+        os.getenv("LF_EXEC_ENV_IMAGE"),
+        os.getenv("ML_EXEC_ENV_IMAGE"),
+        os.getenv("AC_EXEC_ENV_IMAGE"),
+    ]:
+        pool.register(image)
+    # record ide containers are limited in cpu time
+    pool.register(
+        os.getenv("RECORD_IDE_IMAGE"),
+        ulimits=[docker.types.Ulimit(name="cpu", soft=50, hard=50)],
+    )
+
+
+def get_metrics() -> Dict[str, Dict[str, Any]]:
+    return get_pool().get_metrics()
@@ -1,5 +1,21 @@
+import queue
 import threading
+from typing import Any
 
 
 def run(target, *args, **kwargs):
     threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True,).start()
+
+
+def put_unless_cancelled(
+    item_queue: queue.Queue, item: Any, cancelled: threading.Event
+) -> bool:
+    # for producer threads feeding a bounded queue: blocks while the consumer is
+    # behind (backpressure), False once the consumer stopped & set cancelled
+    while True:
+        try:
+            item_queue.put(item, timeout=1)
+            return True
+        except queue.Full:
+            if cancelled.is_set():
+                return False
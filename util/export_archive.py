@@ -0,0 +1,180 @@
+import io
+import json
+import os
+import queue
+import threading
+import zipfile
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+from util import daemon
+
+MANIFEST_NAME = "manifest.json"
+ARCHIVE_VERSION = 1
+# zlib level for the zip entries, 0 stores them uncompressed
+COMPRESSION_LEVEL = int(os.getenv("EXPORT_COMPRESSION_LEVEL", 6))
+# number of sections fetched & serialized in background threads at the same time
+PARALLEL_SECTIONS = int(os.getenv("EXPORT_PARALLEL_SECTIONS", 3))
+# serialized bytes collected before they are handed to the zip writer
+WRITE_CHUNK_SIZE = 1024 * 1024
+# chunks a section can buffer ahead of the writer
+PREFETCH_CHUNKS = 8
+
+# (section name, row factory, fetch in background thread)
+Section = Tuple[str, Callable[[], Iterable[Dict[str, Any]]], bool]
+
+
+def write_archive(
+    file_name: str, header: Dict[str, Any], sections: List[Section]
+) -> None:
+    # every section becomes its own ndjson entry that is written while the rows are
+    # fetched, so only a few chunks per section are held in memory.
+    # Background sections must not use the request session (e.g. own connection).
+    cancelled = threading.Event()
+    queues = {
+        name: queue.Queue(maxsize=PREFETCH_CHUNKS)
+        for name, _, threaded in sections
+        if threaded and PARALLEL_SECTIONS > 0
+    }
+    if queues:
+        daemon.run(__dispatch_sections, sections, queues, cancelled)
+
+    compression = zipfile.ZIP_DEFLATED if COMPRESSION_LEVEL > 0 else zipfile.ZIP_STORED
+    counts = {}
+    try:
+        with zipfile.ZipFile(
+            file_name,
+            mode="w",
+            compression=compression,
+            compresslevel=COMPRESSION_LEVEL if COMPRESSION_LEVEL > 0 else None,
+        ) as zip_file:
+            for name, rows, _ in sections:
+                if name in queues:
+                    chunks = __consume_queue(queues[name])
+                else:
+                    chunks = __encode_rows(rows())
+                count = 0
+                with zip_file.open(
+                    name + ".ndjson", mode="w", force_zip64=True
+                ) as entry:
+                    for chunk, row_count in chunks:
+                        entry.write(chunk)
+                        count += row_count
+                counts[name] = count
+            manifest = {
+                "version": ARCHIVE_VERSION,
+                "header": header,
+                "sections": counts,
+            }
+            zip_file.writestr(MANIFEST_NAME, json.dumps(manifest, default=str))
+    finally:
+        cancelled.set()
+
+
+def is_archive(zip_file: zipfile.ZipFile) -> bool:
+    return MANIFEST_NAME in zip_file.namelist()
+
+
+class ArchiveData:
+    """
+    Dict like read access to an archive written by write_archive. Sections in
+    streamed_sections are read line by line on every iteration, all other sections
+    are loaded once as list.
+    """
+
+    def __init__(self, zip_file: zipfile.ZipFile, streamed_sections: Set[str]):
+        self.zip_file = zip_file
+        self.streamed_sections = streamed_sections
+        manifest = json.loads(zip_file.read(MANIFEST_NAME).decode("utf-8"))
+        self.header = manifest["header"]
+        self.counts = manifest["sections"]
+        self.loaded: Dict[str, List[Dict[str, Any]]] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.header:
+            return self.header[key]
+        if key not in self.counts:
+            return default
+        if key in self.streamed_sections:
+            return ArchiveSection(self.zip_file, key, self.counts[key])
+        if key not in self.loaded:
+            self.loaded[key] = list(
+                ArchiveSection(self.zip_file, key, self.counts[key])
+            )
+        return self.loaded[key]
+
+
+class ArchiveSection:
+    def __init__(self, zip_file: zipfile.ZipFile, name: str, count: int):
+        self.zip_file = zip_file
+        self.name = name
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with self.zip_file.open(self.name + ".ndjson") as entry:
+            for line in io.TextIOWrapper(entry, encoding="utf-8"):
+                if line.strip():
+                    yield json.loads(line)
+
+
+def __encode_rows(rows: Iterable[Dict[str, Any]]) -> Iterator[Tuple[bytes, int]]:
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, default=str) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= WRITE_CHUNK_SIZE:
+            yield "".join(lines).encode("utf-8"), len(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield "".join(lines).encode("utf-8"), len(lines)
+
+
+def __consume_queue(section_queue: queue.Queue) -> Iterator[Tuple[bytes, int]]:
+    while True:
+        item = section_queue.get()
+        if item is None:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+def __dispatch_sections(
+    sections: List[Section],
+    queues: Dict[str, queue.Queue],
+    cancelled: threading.Event,
+) -> None:
+    # sections are started in archive order so the one the writer waits for always
+    # gets a slot, later ones only prefetch until their queue is full
+    slots = threading.Semaphore(PARALLEL_SECTIONS)
+    for name, rows, _ in sections:
+        if name not in queues:
+            continue
+        while not slots.acquire(timeout=1):
+            if cancelled.is_set():
+                return
+        if cancelled.is_set():
+            return
+        daemon.run(__fetch_section, rows, queues[name], slots, cancelled)
+
+
+def __fetch_section(
+    rows: Callable[[], Iterable[Dict[str, Any]]],
+    section_queue: queue.Queue,
+    slots: threading.Semaphore,
+    cancelled: threading.Event,
+) -> None:
+    try:
+        for chunk in __encode_rows(rows()):
+            if not daemon.put_unless_cancelled(section_queue, chunk, cancelled):
+                return
+        daemon.put_unless_cancelled(section_queue, None, cancelled)
+    except Exception as e:
+        daemon.put_unless_cancelled(section_queue, e, cancelled)
+    finally:
+        slots.release()
@@ -0,0 +1,116 @@
+import json
+from json import JSONDecodeError
+from typing import IO, Any, Iterator, Tuple
+
+READ_SIZE = 1024 * 1024
+
+
+def iterate_object_items(
+    file: IO[str], read_size: int = READ_SIZE
+) -> Iterator[Tuple[str, Any]]:
+    # yields the (key, value) pairs of a top level json object one by one
+    # only the current value and the unconsumed part of a read block are held in memory
+    reader = _Reader(file, read_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.expect("}")
+        reader.expect_end()
+        return
+    while True:
+        key = reader.decode()
+        if not isinstance(key, str):
+            raise ValueError(f"Expected object key, got {type(key)}")
+        reader.expect(":")
+        yield key, reader.decode()
+        if reader.peek() == "}":
+            reader.expect("}")
+            reader.expect_end()
+            return
+        reader.expect(",")
+
+
+def iterate_array_items(file: IO[str], read_size: int = READ_SIZE) -> Iterator[Any]:
+    # same for the elements of a top level json array
+    reader = _Reader(file, read_size)
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.expect("]")
+        reader.expect_end()
+        return
+    while True:
+        yield reader.decode()
+        if reader.peek() == "]":
+            reader.expect("]")
+            reader.expect_end()
+            return
+        reader.expect(",")
+
+
+def iterate_file_object_items(
+    file_name: str, read_size: int = READ_SIZE
+) -> Iterator[Tuple[str, Any]]:
+    with open(file_name, "r", encoding="utf-8") as file:
+        yield from iterate_object_items(file, read_size)
+
+
+class _Reader:
+    def __init__(self, file: IO[str], read_size: int):
+        self.file = file
+        self.read_size = read_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def peek(self) -> str:
+        self.__skip_whitespace()
+        if self.pos >= len(self.buffer):
+            raise ValueError("Unexpected end of json data")
+        return self.buffer[self.pos]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(
+                f"Expected '{char}' but found '{self.buffer[self.pos]}' in json data"
+            )
+        self.pos += 1
+
+    def expect_end(self) -> None:
+        # e.g. a second document or garbage written after the closing bracket
+        self.__skip_whitespace()
+        if self.pos < len(self.buffer):
+            raise ValueError("Unexpected data after the end of the json data")
+
+    def decode(self) -> Any:
+        self.__skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except JSONDecodeError:
+                if self.eof:
+                    raise
+                self.__read_more()
+                continue
+            if not self.eof and (
+                end >= len(self.buffer) or self.buffer[end] not in " \t\n\r,:}]"
+            ):
+                # value could be cut at the block border (e.g. numbers)
+                self.__read_more()
+                continue
+            self.pos = end
+            return value
+
+    def __skip_whitespace(self) -> None:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\n\r":
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return
+            self.__read_more()
+
+    def __read_more(self) -> None:
+        chunk = self.file.read(self.read_size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
@@ -1,8 +1,30 @@
+import uuid
 from itertools import islice
-from typing import Dict, Any, Iterator, Optional
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
 
 
 def chunk_dict(data: Dict, SIZE: Optional[int] = 1000) -> Iterator[Dict[str, Any]]:
     it = iter(data)
     for i in range(0, len(data), SIZE):
         yield {k: data[k] for k in islice(it, SIZE)}
+
+
+def chunk_items(
+    items: Iterable[Tuple[str, Any]], SIZE: Optional[int] = 1000
+) -> Iterator[Dict[str, Any]]:
+    # like chunk_dict but for (key, value) pairs that are not in memory, e.g. streamed json
+    it = iter(items)
+    while True:
+        chunk = dict(islice(it, SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+def is_uuid(value: str) -> bool:
+    # ids from the client are checked before they're cast to UUID in a query
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
@@ -1,5 +1,8 @@
 import os
-from typing import Union, List, Dict, Optional
+import queue
+import threading
+import time
+from typing import Union, List, Dict, Optional, Tuple
 
 import requests
 import logging
@@ -13,11 +16,27 @@ from submodules.model.business_objects.notification import get_duplicated, creat
 from submodules.model.business_objects.organization import get_organization_id
 from submodules.model.enums import NotificationType
 from submodules.model.models import Notification
-from util import doc_ock
+from util import daemon, doc_ock
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 WEBSOCKET_ENDPOINT = os.getenv("WS_NOTIFY_ENDPOINT")
+# updates waiting for the dispatcher, if full new updates are dropped instead of blocking
+QUEUE_SIZE = int(os.getenv("WS_NOTIFY_QUEUE_SIZE", 10000))
+# max updates taken from the queue at once, duplicates within are only sent once
+BATCH_SIZE = int(os.getenv("WS_NOTIFY_BATCH_SIZE", 200))
+# seconds the dispatcher waits for more updates before a batch is sent
+BATCH_WAIT = float(os.getenv("WS_NOTIFY_BATCH_WAIT", 0.05))
+# seconds a single update may take, a hanging websocket service would block all others
+POST_TIMEOUT = float(os.getenv("WS_NOTIFY_TIMEOUT", 5))
+# projects whose organization is kept, the mapping is dropped once it is full
+MAX_ORGANIZATION_ENTRIES = 10000
+
+__queue: "queue.Queue[Tuple[str, str]]" = queue.Queue(maxsize=QUEUE_SIZE)
+__dispatcher_lock = threading.Lock()
+__dispatcher_started = False
+__organization_by_project: Dict[str, str] = {}
+__organization_lock = threading.Lock()
 
 
 def send_organization_update(
@@ -26,6 +45,7 @@ def send_organization_update(
     is_global: bool = False,
     organization_id: Optional[str] = None,
 ) -> None:
+    # only queues the update, a background thread sends it to the websocket service
 
     if not WEBSOCKET_ENDPOINT:
         print(
@@ -37,19 +57,89 @@ def send_organization_update(
         message = f"GLOBAL:{message}"
     else:
         message = f"{project_id}:{message}"
+    if not organization_id:
+        organization_id = __get_organization_id(project_id)
+        if not organization_id:
+            logger.warning(f"Could not find organization of project {project_id}")
+            return
+
+    __ensure_dispatcher()
+    try:
+        __queue.put_nowait((str(organization_id), message))
+    except queue.Full:
+        logger.warning("Notification queue full -- update dropped")
+
+
+def __get_organization_id(project_id: str) -> Optional[str]:
+    # projects never change their organization so the mapping can be kept
+    project_id = str(project_id)
+    organization_id = __organization_by_project.get(project_id)
     if not organization_id:
         project_item = project.get(project_id)
+        if not project_item:
+            return None
         organization_id = str(project_item.organization_id)
+        with __organization_lock:
+            if len(__organization_by_project) >= MAX_ORGANIZATION_ENTRIES:
+                __organization_by_project.clear()
+            __organization_by_project[project_id] = organization_id
+    return organization_id
+
+
+def invalidate_project(project_id: str) -> None:
+    with __organization_lock:
+        __organization_by_project.pop(str(project_id), None)
 
-    req = requests.post(
+
+def __ensure_dispatcher() -> None:
+    global __dispatcher_started
+    if __dispatcher_started:
+        return
+    with __dispatcher_lock:
+        if not __dispatcher_started:
+            daemon.run(__dispatch_updates)
+            __dispatcher_started = True
+
+
+def __dispatch_updates() -> None:
+    # keep-alive connection to the websocket service for all updates
+    http_session = requests.Session()
+    while True:
+        batch = [__queue.get()]
+        if BATCH_WAIT > 0:
+            time.sleep(BATCH_WAIT)
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(__queue.get_nowait())
+            except queue.Empty:
+                break
+        for organization_id, message in __coalesce(batch):
+            try:
+                __post_update(http_session, organization_id, message)
+            except Exception:
+                # the dispatcher has to outlive every broken update
+                logger.exception("Could not send notification update")
+
+
+def __coalesce(batch: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    # identical updates are sent once at the position of their last occurrence, so
+    # e.g. a final refresh still comes after the updates queued before it
+    return list(reversed(dict.fromkeys(reversed(batch))))
+
+
+def __post_update(
+    http_session: requests.Session, organization_id: str, message: str
+) -> None:
+    req = http_session.post(
         f"{WEBSOCKET_ENDPOINT}/notify",
         json={
             "organization": organization_id,
             "message": message,
         },
+        timeout=POST_TIMEOUT,
     )
     if req.status_code != 200:
-        print("Could not send notification update", flush=True)
+        logger.warning(f"Could not send notification update ({req.status_code})")
 
 
 def create_notification(
@@ -12,7 +12,7 @@ from submodules.model.business_objects.record import __get_tokenized_record
 import time
 import uuid
 
-from util import daemon
+from util import container_pool, daemon
 
 client = docker.from_env()
 image = os.getenv("RECORD_IDE_IMAGE")
@@ -45,16 +45,22 @@ def run_record_ide(
     knowledge_base_bytes_path = pack_knowledge_base(project_id)
 
     command = [code, record_bytes_path, knowledge_base_bytes_path]
-    cpu_limit = docker.types.Ulimit(name="cpu", soft=50, hard=50)
-    container_name = str(uuid.uuid4())
-    container = client.containers.create(
-        command=command,
-        name=container_name,
-        image=image,
-        detach=True,
-        network=exec_env_network,
-        ulimits=[cpu_limit],
-    )
+    pool = container_pool.get_pool()
+    if pool.is_enabled():
+        # warm container, the cpu limit is set on pool registration
+        container = pool.acquire(image)
+        container_name = container.name
+    else:
+        cpu_limit = docker.types.Ulimit(name="cpu", soft=50, hard=50)
+        container_name = str(uuid.uuid4())
+        container = client.containers.create(
+            command=command,
+            name=container_name,
+            image=image,
+            detach=True,
+            network=exec_env_network,
+            ulimits=[cpu_limit],
+        )
     error = ""
     try:
         record_tar_path = f"{record_id}.tar"
@@ -72,13 +78,16 @@ def run_record_ide(
         )
         daemon.run(cancel_container, container_name, container)
         __containers_running[container_name] = True
-        container.start()
-        logs_arr = [
-            line.decode("utf-8").strip("\n")
-            for line in container.logs(
-                stream=True, stdout=True, stderr=True, timestamps=False
-            )
-        ]
+        if pool.is_enabled():
+            logs_arr, _ = pool.exec_in(container, image, command, timestamps=False)
+        else:
+            container.start()
+            logs_arr = [
+                line.decode("utf-8").strip("\n")
+                for line in container.logs(
+                    stream=True, stdout=True, stderr=True, timestamps=False
+                )
+            ]
         logs = "\n".join(logs_arr)
         if logs_arr:
             last_log = logs_arr[-1]
@@ -88,9 +97,13 @@ def run_record_ide(
     finally:
         if not __containers_running[container_name]:
             error = "run time"
-        else:
+        elif not pool.is_enabled():
             container.stop()
-        container.remove()
+        if pool.is_enabled():
+            # copied record data is left in the container so it's never reused
+            pool.release(image, container, reusable=False)
+        else:
+            container.remove()
         os.remove(record_bytes_path)
         os.remove(record_tar_path)
         os.remove(knowledge_base_bytes_path)